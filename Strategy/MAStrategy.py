@@ -80,16 +80,14 @@ class MAStrategy:
         for code in code_list:
             if self.existing_orders[code] is False:
                 if holdings[code] == 0:
-                    if last_rows.loc[code,
-                                     ma_short][0] > last_rows.loc[code,
-                                                                  ma_long][0]:
+                    if last_rows.loc[code, ma_short].iloc[0] > last_rows.loc[
+                            code, ma_long].iloc[0]:
                         buy_sell_signals['buys'][code] = last_rows.loc[
                             code].tail(1).reset_index().loc[0].to_dict()
 
                 elif holdings[code] != 0:
-                    if last_rows.loc[code,
-                                     ma_short][0] < last_rows.loc[code,
-                                                                  ma_long][0]:
+                    if last_rows.loc[code, ma_short].iloc[0] < last_rows.loc[
+                            code, ma_long].iloc[0]:
                         buy_sell_signals['sells'][code] = last_rows.loc[
                             code].tail(1).reset_index().loc[0].to_dict()
 
@@ -0,0 +1,50 @@
+import pytest
+from helpers import create_candles
+
+from futubot.stockframe import StockFrame
+
+# The number of codes and the number of days of 1-minute candlesticks.
+SIZES = [(10, 1), (10, 20), (100, 1), (100, 20), (1000, 1), (1000, 20)]
+
+# Sizes which need several GB of memory. They are only run with --run-large.
+LARGE_SIZES = [(1000, 20)]
+
+
+def pytest_addoption(parser):
+    parser.addoption('--run-large',
+                     action='store_true',
+                     help='whether to run the benchmarks of large sizes.')
+
+
+def pytest_generate_tests(metafunc):
+    if 'size' in metafunc.fixturenames:
+        params = []
+        for n_codes, days in SIZES:
+            marks = []
+            if (n_codes, days) in LARGE_SIZES:
+                marks.append(pytest.mark.large)
+            params.append(
+                pytest.param((n_codes, days),
+                             id=f'{n_codes}codes-{days}days',
+                             marks=marks))
+        metafunc.parametrize('size', params)
+
+
+def pytest_configure(config):
+    config.addinivalue_line('markers', 'large: benchmarks of large sizes.')
+
+
+def pytest_collection_modifyitems(config, items):
+    if config.getoption('--run-large'):
+        return
+
+    skip_large = pytest.mark.skip(reason='need --run-large option to run')
+    for item in items:
+        if 'large' in item.keywords:
+            item.add_marker(skip_large)
+
+
+@pytest.fixture
+def stockframe(size):
+    n_codes, days = size
+    return StockFrame(data=create_candles(n_codes, days))
@@ -0,0 +1,86 @@
+import functools
+
+import numpy as np
+import pandas as pd
+
+from futubot.accounts import Accounts
+from futubot.fake_opend import (CANDLE_COLUMNS, FakeQuoteContext,
+                                FakeTradeContext, generate_synthetic_klines)
+from futubot.indicators import Indicators
+from futubot.portfolio import Portfolio
+
+
+def create_code_list(n_codes):
+    return [f'HK.{i:05d}' for i in range(1, n_codes + 1)]
+
+
+@functools.lru_cache(maxsize=1)
+def create_klines(n_codes, days):
+    return generate_synthetic_klines(code_list=create_code_list(n_codes),
+                                     days=days)
+
+
+def create_candles(n_codes, days):
+    """Create candlesticks in the format returned by Robot."""
+    klines = create_klines(n_codes, days)
+    return klines[CANDLE_COLUMNS].to_dict('records')
+
+
+def create_daily_candles(n_codes, days=250, seed=0):
+    """Create a year of daily candlesticks for portfolio metrics."""
+    rng = np.random.default_rng(seed)
+
+    time_keys = pd.bdate_range(end='2022-08-08', periods=days)
+    close = 100 * np.exp(
+        np.cumsum(rng.normal(scale=0.02, size=(n_codes, days)), axis=1))
+
+    daily_klines = pd.DataFrame(
+        dict(time_key=np.tile(time_keys.strftime('%Y-%m-%d 00:00:00'),
+                              n_codes),
+             code=np.repeat(create_code_list(n_codes), days),
+             open=close.ravel(),
+             close=close.ravel(),
+             high=close.ravel(),
+             low=close.ravel(),
+             volume=1000000))
+
+    return daily_klines.to_dict('records')
+
+
+def create_accounts(n_codes):
+    """Create Accounts connected to a fake FutuOpenD holding every code."""
+    code_list = create_code_list(n_codes)
+    klines = generate_synthetic_klines(code_list=code_list)
+    positions = {code: dict(qty=100.0, cost_price=100.0) for code in code_list}
+
+    return Accounts(paper_trading=True,
+                    quote_context=FakeQuoteContext(klines=klines,
+                                                   rate_limits=None),
+                    trade_context=FakeTradeContext(positions=positions,
+                                                   rate_limits=None))
+
+
+def create_portfolio(accounts):
+    """Create a portfolio of the positions of accounts."""
+    portfolio = Portfolio(accounts=accounts)
+
+    for code, position in accounts.get_positions().items():
+        portfolio.add_position(code=code,
+                               stock_name=position['stock_name'],
+                               quantity=position['qty'])
+
+    return portfolio
+
+
+def create_indicator_client(stockframe):
+    """Create an Indicators object with all the indicators."""
+    indicator_client = Indicators(stockframe=stockframe)
+    indicator_client.rsi()
+    indicator_client.sma()
+    indicator_client.ema()
+    indicator_client.macd()
+    indicator_client.bollinger_bands()
+    indicator_client.standard_deviation()
+    indicator_client.stochastic_oscillator()
+
+    return indicator_client
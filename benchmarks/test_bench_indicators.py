@@ -0,0 +1,8 @@
+from helpers import create_indicator_client
+
+
+def test_refresh(benchmark, stockframe):
+    indicator_client = create_indicator_client(stockframe)
+
+    benchmark.pedantic(indicator_client.refresh, rounds=3)
+    assert 'rsi_14' in stockframe.frame.columns
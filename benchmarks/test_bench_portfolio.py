@@ -0,0 +1,54 @@
+import pandas as pd
+import pytest
+from helpers import create_accounts, create_daily_candles, create_portfolio
+
+from futubot.stockframe import StockFrame
+
+
+# Portfolio metrics are calculated from a year of daily candlesticks, so
+# the benchmark only depends on the number of codes.
+@pytest.mark.parametrize('n_codes', [10, 100, 1000])
+def test_calculate_portfolio_metrics(benchmark, n_codes):
+    portfolio = create_portfolio(accounts=create_accounts(n_codes))
+    portfolio._stockframe_daily = StockFrame(
+        data=create_daily_candles(n_codes))
+
+    portfolio_metrics = benchmark(portfolio.calculate_portfolio_metrics)
+    assert len(portfolio_metrics) == n_codes + 1
+
+
+# Adding a daily bar to the statistics of returns does not depend on the
+# length of the history.
+@pytest.mark.parametrize('n_codes', [10, 100, 1000])
+def test_update_daily_prices(benchmark, n_codes):
+    portfolio = create_portfolio(accounts=create_accounts(n_codes))
+    portfolio._stockframe_daily = StockFrame(
+        data=create_daily_candles(n_codes))
+    portfolio.calculate_portfolio_metrics()
+
+    daily_prices = create_daily_candles(n_codes, days=2, seed=1)
+    time_keys = iter(pd.bdate_range(start='2022-08-09', periods=100000))
+
+    def update_daily_prices():
+        time_key = next(time_keys).strftime('%Y-%m-%d 00:00:00')
+        portfolio.update_daily_prices(daily_prices=[
+            dict(daily_price, time_key=time_key)
+            for daily_price in daily_prices[::2]
+        ])
+
+    benchmark(update_daily_prices)
+
+
+# A rebalance optimizes the weights on the covariance matrix of the
+# returns, which is only updated when a daily bar is added.
+@pytest.mark.parametrize('method',
+                         ['min_variance', 'max_sharpe', 'risk_parity'])
+@pytest.mark.parametrize('n_codes', [10, 100, 1000])
+def test_optimize_weights(benchmark, n_codes, method):
+    portfolio = create_portfolio(accounts=create_accounts(n_codes))
+    portfolio._stockframe_daily = StockFrame(
+        data=create_daily_candles(n_codes))
+    portfolio.calculate_portfolio_metrics()
+
+    weights = benchmark(portfolio.optimize_weights, method=method)
+    assert len(weights) == n_codes
@@ -0,0 +1,35 @@
+from helpers import create_candles
+
+from futubot.stockframe import StockFrame
+
+
+def test_create_frame(benchmark, size):
+    n_codes, days = size
+    candles = create_candles(n_codes, days)
+
+    stockframe = benchmark(StockFrame, data=candles)
+    assert len(stockframe.frame) == len(candles)
+
+
+def test_add_rows(benchmark, size):
+    n_codes, days = size
+    candles = create_candles(n_codes, days)
+
+    # The last bar of every code is added to a frame of the other bars.
+    last_time_key = candles[-1]['time_key']
+    history = [
+        candle for candle in candles if candle['time_key'] != last_time_key
+    ]
+    latest_bars = [
+        candle for candle in candles if candle['time_key'] == last_time_key
+    ]
+
+    def setup():
+        return (StockFrame(data=history), ), {}
+
+    def add_rows(stockframe):
+        stockframe.add_rows(data=latest_bars)
+        return stockframe
+
+    stockframe = benchmark.pedantic(add_rows, setup=setup, rounds=3)
+    assert len(stockframe.frame) == len(candles)
@@ -0,0 +1,22 @@
+import pytest
+from helpers import create_accounts, create_indicator_client, create_portfolio
+
+from Strategy import (BollingerBandsStrategy, MACDCrossOverStrategy,
+                      MAStrategy, RSIStrategy)
+
+
+@pytest.mark.parametrize(
+    'StrategyClass',
+    [BollingerBandsStrategy, MACDCrossOverStrategy, MAStrategy, RSIStrategy])
+def test_calculate_buy_sell_signals(benchmark, size, stockframe,
+                                    StrategyClass):
+    n_codes, _ = size
+    portfolio = create_portfolio(accounts=create_accounts(n_codes))
+    indicator_client = create_indicator_client(stockframe)
+    existing_orders = {code: False for code in portfolio.positions}
+
+    strategy_client = StrategyClass(stockframe, portfolio, indicator_client,
+                                    existing_orders)
+
+    buy_sell_signals = benchmark(strategy_client.calculate_buy_sell_signals)
+    assert set(buy_sell_signals.keys()) == {'buys', 'sells'}
@@ -9,4 +9,8 @@ cfg = dict(account=dict(filter_trdmarket='TrdMarket.HK',
            historical_quote_dates=dict(start_date='2022-08-08 9:30:00',
                                        end_date=None),
            indicators=dict(rsi=dict(period=14)),
-           strategy=dict(name='RSIStrategy', params=dict()))
+           strategy=dict(name='RSIStrategy', params=dict()),
+           calendar_file='configs/hkex_calendar.json',
+           daily_bar_file='data/daily_bars.pkl',
+           journal_file='data/trade_journal.bin',
+           sizing=None)
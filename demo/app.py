@@ -13,6 +13,7 @@ import plotly.graph_objects as go
 from dash.dependencies import Input, Output, State
 
 from futubot.accounts import Accounts
+from futubot.charts import LiveGraphBuilder
 from futubot.indicators import Indicators
 from futubot.robot import Robot
 from utils.config import Config
@@ -66,6 +67,11 @@ indicator_client.stochastic_oscillator()
 
 colors = {'background': '#000000', 'text': '#ffFFFF'}
 
+# Maximum number of points per trace of the live graph.
+DEFAULT_GRAPH_WIDTH = 1000
+
+graph_builder = LiveGraphBuilder(text_color=colors['text'])
+
 app = dash.Dash(__name__, external_stylesheets=[dbc.themes.SLATE])
 
 app.layout = html.Div([
@@ -450,8 +456,7 @@ def run_futubot(n_intervals, code_name, indicator_name, start_date=end_date):
             dcc.Dropdown table with id 'indicators'.
 
     Returns:
-        (plotly.graph_objects): A Plotly graph of StockFrame with id
-            'live_graph'.
+        (dict): A Plotly figure dict of StockFrame with id 'live_graph'.
     """
     # Artificial counter for advancing time
     global i
@@ -459,8 +464,6 @@ def run_futubot(n_intervals, code_name, indicator_name, start_date=end_date):
 
     df = stockframe.frame.loc[code_name]
 
-    fig = go.Figure()
-
     end_date = datetime.strptime(start_date, '%Y-%m-%d %H:%M:%S')
     end_date = end_date + i * timedelta(minutes=1)
     end_date = end_date.strftime('%Y-%m-%d %H:%M:%S')
@@ -490,143 +493,15 @@ def run_futubot(n_intervals, code_name, indicator_name, start_date=end_date):
 
     print('holdings after', portfolio.holdings)
 
-    fig.add_trace(trace=go.Candlestick(x=df.index,
-                                       open=df['open'],
-                                       high=df['high'],
-                                       low=df['low'],
-                                       close=df['close'],
-                                       name='Close'))
-
-    volume_colors = [
-        '#16ff32' if row['open'] - row['close'] >= 0 else 'red'
-        for _, row in df.iterrows()
-    ]
-
-    if indicator_name == 'Volume':
-        fig = go.Figure(data=go.Bar(x=df.index,
-                                    y=df['volume'],
-                                    marker_color=volume_colors,
-                                    name='Volume'))
-
-    if indicator_name[:3] == 'RSI':
-        fig = go.Figure(
-            data=go.Scatter(x=df.index,
-                            y=df[indicator_name.lower()],
-                            name=indicator_name,
-                            line=dict(color='rgb(255, 237, 111)', width=2)))
-        fig.update_layout(yaxis_range=[0, 100])
-        fig.add_hline(y=30.0,
-                      line_width=1,
-                      line_dash='dash',
-                      annotation_text='Oversold Line',
-                      line_color='#16ff32',
-                      annotation_font_color='#16ff32')
-        fig.add_hline(y=70.0,
-                      line_width=1,
-                      line_dash='dash',
-                      annotation_text='Overbought Line',
-                      line_color='#fb0d0d',
-                      annotation_font_color='#fb0d0d')
-
-    if indicator_name[:3] == 'SMA':
-        fig.add_trace(trace=go.Scatter(
-            x=df.index,
-            y=df[indicator_name.lower()],
-            name=indicator_name,
-            line=dict(color='orange', width=2),
-        ), )
-
-    if indicator_name[:3] == 'EMA':
-        fig.add_trace(trace=go.Scatter(
-            x=df.index,
-            y=df[indicator_name.lower()],
-            name=indicator_name,
-            line=dict(color='#2ed9ff', width=2),
-        ), )
-
-    if indicator_name == 'MACD':
-        fig = go.Figure()
-        macd_colors = [
-            '#16ff32' if val >= 0 else 'red'
-            for val in df.histogram.values.tolist()
-        ]
+    live_graph = graph_builder.build(code=code_name,
+                                     price_df=df,
+                                     indicator_name=indicator_name,
+                                     max_points=DEFAULT_GRAPH_WIDTH)
 
-        fig.add_trace(
-            go.Bar(x=df.index,
-                   y=df.histogram,
-                   marker_color=macd_colors,
-                   name='Histogram'))
-
-        fig.add_trace(
-            go.Scatter(x=df.index,
-                       y=df.macd,
-                       line=dict(color='#ffa15a', width=2),
-                       name='MACD'))
-
-        fig.add_trace(
-            go.Scatter(x=df.index,
-                       y=df.signal,
-                       line=dict(color='#2ed9ff', width=2),
-                       name='Signal'))
-
-    if indicator_name == 'BOLLINGER_BANDS':
-        fig.add_trace(
-            go.Scatter(x=df.index,
-                       y=df['sma'],
-                       line=dict(color='orange', width=2),
-                       name='SMA'))
-
-        fig.add_trace(
-            go.Scatter(x=df.index,
-                       y=df['upper_band'],
-                       line_color='#2ed9ff',
-                       line={'dash': 'dash'},
-                       name='Upper Band',
-                       opacity=0.1))
-
-        fig.add_trace(
-            go.Scatter(x=df.index,
-                       y=df['lower_band'],
-                       line_color='#2ed9ff',
-                       line={'dash': 'dash'},
-                       fill='tonexty',
-                       name='Lower Band',
-                       opacity=0.1))
-
-    if indicator_name == 'STANDARD_DEVIATION':
-        fig = go.Figure(
-            go.Scatter(x=df.index,
-                       y=df['standard_deviation'],
-                       line=dict(color='rgb(102, 166, 30)', width=2),
-                       name='Standard Deviation'))
-
-    if indicator_name == 'STOCHASTIC_OSCILLATOR':
-        fig = go.Figure()
-        fig.add_trace(
-            go.Scatter(x=df.index,
-                       y=df['%K'],
-                       name='%K Line (Fast)',
-                       line=dict(color='#af0038', width=2)))
-
-        fig.add_trace(
-            go.Scatter(x=df.index,
-                       y=df['%D'],
-                       name='%D Line (Slow)',
-                       line=dict(color='rgb(29, 105, 150)', width=2)))
-
-    fig.update_layout(
-        height=400,
-        showlegend=True,
-        xaxis_rangeslider_visible=False,
-        template='plotly_dark',
-        plot_bgcolor='rgba(0, 0, 0, 0)',
-        paper_bgcolor='rgba(0, 0, 0, 0)',
-        font={'color': colors['text']},
-    )
     # Increment the counter by one every callback
     i += 1
 
-    return [fig]
+    return [live_graph]
 
 
 if __name__ == '__main__':
@@ -1,9 +1,12 @@
 import time
+from collections.abc import Mapping
 
 from futu import (RET_OK, KLType, Market, ModifyOrderOp, OpenQuoteContext,
                   OpenSecTradeContext, OrderStatus, OrderType, SecurityFirm,
                   SecurityType, TrdEnv, TrdMarket)
 
+from .api_metrics import ApiMetrics, InstrumentedContext
+
 
 class Accounts:
     """An Accounts class containing all the necessary Futu APIs for FutuBot.
@@ -21,6 +24,19 @@ class Accounts:
         paper_trading (bool): Whether to enable paper trading or not.
             Default: False.
         password (str): Transaction password.
+        quote_context (OpenQuoteContext): An existing market connection,
+            e.g. a futubot.fake_opend.FakeQuoteContext for running
+            offline. Default: None, meaning a new connection to
+            FutuOpenD is created.
+        trade_context (OpenSecTradeContext): An existing transaction
+            connection, e.g. a futubot.fake_opend.FakeTradeContext for
+            running offline. Default: None, meaning a new connection to
+            FutuOpenD is created.
+        order_interval (float): The interval in seconds to wait after
+            placing an order, since Futu does not allow two consecutive
+            orders within 0.02 seconds. Default: 0.02.
+        metrics (ApiMetrics): The metrics into which every call to the
+            connections is recorded. Default: None, meaning new metrics.
     """
     def __init__(self,
                  host='127.0.0.1',
@@ -28,15 +44,27 @@ class Accounts:
                  filter_trdmarket=TrdMarket.HK,
                  security_firm=SecurityFirm.FUTUSECURITIES,
                  paper_trading=False,
-                 password='******'):
+                 password='******',
+                 quote_context=None,
+                 trade_context=None,
+                 order_interval=0.02,
+                 metrics=None):
         self.host = host
         self.port = port
         self.filter_trdmarket = filter_trdmarket
         self.security_firm = security_firm
         self.paper_trading = paper_trading
         self.password = password
-        self.quote_context = self.create_quote_context()
-        self.trade_context = self.create_trade_context()
+        self.order_interval = order_interval
+
+        if quote_context is None:
+            quote_context = self.create_quote_context()
+        if trade_context is None:
+            trade_context = self.create_trade_context()
+
+        self.metrics = metrics or ApiMetrics()
+        self.quote_context = InstrumentedContext(quote_context, self.metrics)
+        self.trade_context = InstrumentedContext(trade_context, self.metrics)
 
         if self.paper_trading:
             self.trd_env = TrdEnv.SIMULATE
@@ -366,6 +394,10 @@ class Accounts:
                     Format: yyyy-MM-dd HH:mm:ss.
                 updated_time (str): The time at which the order is updated.
                     Format: yyyy-MM-dd HH:mm:ss.
+                dealt_qty (float): The quantity filled when the order is
+                    placed.
+                dealt_avg_price (float): The average price of the filled
+                    quantity.
         """
         if not isinstance(price, float):
             raise TypeError(f'Only float type is supported for price, '
@@ -423,9 +455,11 @@ class Accounts:
             order_info['price'] = data['price'][0]
             order_info['create_time'] = data['create_time'][0]
             order_info['updated_time'] = data['updated_time'][0]
+            order_info['dealt_qty'] = float(data['dealt_qty'][0])
+            order_info['dealt_avg_price'] = float(data['dealt_avg_price'][0])
 
             # Prevent calling consecutive requests too frequently.
-            time.sleep(0.02)
+            time.sleep(self.order_interval)
             return order_info
         else:
             print('Error in place_order: ', data)
@@ -520,47 +554,63 @@ class Accounts:
         else:
             print('Error in check_today_orders: ', data)
 
-    def check_existing_orders(self, code_list):
+    def get_history_orders(self):
+        """Query all the orders of the trading account.
+
+        This function uses Futu API history_order_list_query() to get the
+        orders of a given trading account, including the filled quantity
+        and the average fill price of each order. A maximum of 10 requests
+        is allowed per 30 seconds.
+
+        Returns:
+            data (pd.DataFrame): A pandas dataframe of all the orders with
+                columns: order_id, code, stock_name, trd_side, order_type,
+                qty, order_status, price, create_time, updated_time,
+                dealt_qty, dealt_avg_price.
+        """
+        ret, data = self.trade_context.history_order_list_query(
+            trd_env=self.trd_env)
+
+        if ret == RET_OK:
+            return data
+        else:
+            print('Error in get_history_orders: ', data)
+
+    def check_existing_orders(self, code_list, orders=None):
         """Check whether there are existing orders for a given list of codes.
 
-        This function uses Futu API history_order_list_query() to check
-        if there are any pending orders for a given list of codes. New
-        orders are only placed when there are no pending orders for a
-        given code. A maximum of 10 requests is allowed per 30 seconds.
+        This function uses get_history_orders() to check if there are any
+        pending orders for a given list of codes. New orders are only
+        placed when there are no pending orders for a given code.
 
         Args:
-            code_list (list[str] | dict[str]): A list of codes.
+            code_list (list[str] | Mapping[str]): A list of codes, or a
+                mapping with codes as keys, e.g. Portfolio.holdings.
+            orders (pd.DataFrame): The orders already queried with
+                get_history_orders(), so that they are not queried again.
+                Default: None.
 
         Returns:
             existing_orders (dict[bool]): A dict of existing orders for
             code_list. True if there are pending orders, otherwise False.
         """
-        if not isinstance(code_list, (list, dict)):
+        if not isinstance(code_list, (list, Mapping)):
             raise TypeError(
                 f'Only list or dict type is supported for code_list, '
                 f'but got {type(code_list)}')
 
-        existing_orders = {}
-
-        ret, data = self.trade_context.history_order_list_query(
-            trd_env=self.trd_env)
+        if orders is None:
+            orders = self.get_history_orders()
+            if orders is None:
+                return None
 
-        if ret == RET_OK:
-            if data.shape[0] > 0:
-                for code in code_list:
-                    if data[(data['code'] == code)
-                            & (data['order_status'] == OrderStatus.SUBMITTED
-                               )].shape[0] > 0:
-                        existing_orders[code] = True
-                    else:
-                        existing_orders[code] = False
-            else:
-                for code in code_list:
-                    existing_orders[code] = False
+        pending_codes = set()
+        if orders.shape[0] > 0:
+            pending_codes = set(
+                orders.loc[orders['order_status'] == OrderStatus.SUBMITTED,
+                           'code'])
 
-            return existing_orders
-        else:
-            print('Error in check_existing_orders: ', data)
+        return {code: code in pending_codes for code in code_list}
 
     def get_max_power(self, code, price, order_type='limit'):
         """Get the maximum buying and selling power.
@@ -0,0 +1,311 @@
+import collections
+import functools
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from futu import RET_OK
+
+from .latency import LatencyHistogram
+
+# The frequency limits of each Futu API used by Accounts, see the docstrings
+# of the corresponding Accounts methods. min_interval is the minimum number
+# of seconds between two calls.
+QUOTE_RATE_LIMITS = {
+    'get_market_state': dict(max_requests=10, period=30),
+    'request_history_kline': dict(max_requests=10, period=30),
+}
+
+TRADE_RATE_LIMITS = {
+    'accinfo_query': dict(max_requests=10, period=30),
+    'position_list_query': dict(max_requests=10, period=30),
+    'unlock_trade': dict(max_requests=10, period=30),
+    'place_order': dict(max_requests=15, period=30, min_interval=0.02),
+    'order_list_query': dict(max_requests=10, period=30),
+    'history_order_list_query': dict(max_requests=10, period=30),
+    'acctradinginfo_query': dict(max_requests=10, period=30),
+    'modify_order': dict(max_requests=20, period=30, min_interval=0.04),
+    'cancel_all_order': dict(max_requests=20, period=30, min_interval=0.04),
+}
+
+FUTU_RATE_LIMITS = {**QUOTE_RATE_LIMITS, **TRADE_RATE_LIMITS}
+
+
+class EndpointMetrics:
+    """The metrics of the calls to a Futu API.
+
+    Args:
+        max_requests (int): The maximum number of requests per period
+            allowed by Futu. Default: None, meaning no frequency limit.
+        period (float): The length in seconds of the sliding window of
+            the frequency limit. Default: 30.0.
+    """
+    def __init__(self, max_requests=None, period=30.0):
+        self.max_requests = max_requests
+        self.period = period
+
+        self.calls = 0
+        self.errors = collections.Counter()
+        self.last_error = None
+        self.latency = LatencyHistogram()
+        self._call_times = collections.deque()
+
+    def record(self, now, latency, error_code=None, error=None):
+        """Record a call.
+
+        Args:
+            now (float): The monotonic time of the call in seconds.
+            latency (float): The latency of the call in seconds.
+            error_code (str): The error code if the call failed, i.e. the
+                ret code returned by Futu or the name of the exception
+                raised. Default: None, meaning the call succeeded.
+            error (str): The error message. Default: None.
+        """
+        self.calls += 1
+        self.latency.record(latency)
+        self._call_times.append(now)
+        # Only the calls within the sliding window are kept.
+        self._trim(now)
+
+        if error_code is not None:
+            self.errors[error_code] += 1
+            self.last_error = error
+
+    def quota_used(self, now):
+        """Get the number of calls within the sliding window.
+
+        Args:
+            now (float): The current monotonic time in seconds.
+
+        Returns:
+            int: The number of calls in the last period seconds.
+        """
+        self._trim(now)
+
+        return len(self._call_times)
+
+    def _trim(self, now):
+        """Drop the call times out of the sliding window."""
+        while self._call_times and now - self._call_times[0] >= self.period:
+            self._call_times.popleft()
+
+
+class ApiMetrics:
+    """Count, time and track the quota of every call to FutuOpenD.
+
+    The metrics of each endpoint (the name of the Futu API, e.g.
+    place_order) are recorded by InstrumentedContext, which wraps the
+    connections of Accounts. The quota used is the number of calls made
+    through this process within the sliding window of the frequency
+    limit of the endpoint, which tells which call is about to hit the
+    limit. stats() returns the metrics in-process, and to_prometheus()
+    or serve() exports them in the Prometheus text format.
+
+    Args:
+        rate_limits (dict[dict]): The frequency limits per endpoint, each
+            a dict with keys max_requests and period.
+            Default: FUTU_RATE_LIMITS.
+        clock (callable): A function returning the current monotonic time
+            in seconds. Default: time.monotonic.
+    """
+    def __init__(self, rate_limits=FUTU_RATE_LIMITS, clock=time.monotonic):
+        self.rate_limits = rate_limits or {}
+        self.clock = clock
+        self.endpoints = {}
+
+        self._lock = threading.Lock()
+
+    def record(self, endpoint, latency, error_code=None, error=None):
+        """Record a call to an endpoint.
+
+        Args:
+            endpoint (str): The name of the Futu API.
+            latency (float): The latency of the call in seconds.
+            error_code (str): See EndpointMetrics.record(). Default: None.
+            error (str): The error message. Default: None.
+        """
+        with self._lock:
+            if endpoint not in self.endpoints:
+                limits = self.rate_limits.get(endpoint, {})
+                self.endpoints[endpoint] = EndpointMetrics(
+                    max_requests=limits.get('max_requests'),
+                    period=limits.get('period', 30.0))
+            self.endpoints[endpoint].record(self.clock(), latency, error_code,
+                                            error)
+
+    def stats(self):
+        """Get the metrics of all the endpoints called.
+
+        Returns:
+            stats (dict[dict]): A dict with the endpoints as keys. Inner
+                dict contains the following keys:
+                    calls (int): The number of calls.
+                    errors (dict[int]): The number of failed calls per
+                        error code.
+                    last_error (str): The last error message, or None.
+                    latency (dict): See LatencyHistogram.summary().
+                    quota_used (int): The number of calls within the
+                        sliding window of the frequency limit.
+                    quota_limit (int): The maximum number of calls within
+                        the window, or None if there is no limit.
+                    quota_period (float): The length in seconds of the
+                        window.
+        """
+        with self._lock:
+            now = self.clock()
+            return {
+                endpoint: {
+                    'calls': metrics.calls,
+                    'errors': dict(metrics.errors),
+                    'last_error': metrics.last_error,
+                    'latency': metrics.latency.summary(),
+                    'quota_used': metrics.quota_used(now),
+                    'quota_limit': metrics.max_requests,
+                    'quota_period': metrics.period,
+                }
+                for endpoint, metrics in self.endpoints.items()
+            }
+
+    def to_prometheus(self):
+        """Export the metrics in the Prometheus text format.
+
+        Returns:
+            str: The metrics of every endpoint.
+        """
+        stats = self.stats()
+        lines = []
+
+        def add_metric(name, metric_type, description, samples):
+            lines.append(f'# HELP {name} {description}')
+            lines.append(f'# TYPE {name} {metric_type}')
+            for suffix, labels, value in samples:
+                label_text = ','.join(f'{key}="{label}"'
+                                      for key, label in labels.items())
+                lines.append(f'{name}{suffix}{{{label_text}}} {value}')
+
+        add_metric('futubot_api_calls_total', 'counter',
+                   'The number of calls to each Futu API.',
+                   [('', dict(endpoint=endpoint), endpoint_stats['calls'])
+                    for endpoint, endpoint_stats in stats.items()])
+        add_metric('futubot_api_errors_total', 'counter',
+                   'The number of failed calls to each Futu API per code.',
+                   [('', dict(endpoint=endpoint, code=code), count)
+                    for endpoint, endpoint_stats in stats.items()
+                    for code, count in endpoint_stats['errors'].items()])
+
+        latency_samples = []
+        for endpoint, endpoint_stats in stats.items():
+            latency = endpoint_stats['latency']
+            for quantile, key in [('0.5', 'p50'), ('0.99', 'p99')]:
+                latency_samples.append(
+                    ('', dict(endpoint=endpoint,
+                              quantile=quantile), latency[key]))
+            latency_samples.append(('_sum', dict(endpoint=endpoint),
+                                    latency['mean'] * latency['count']))
+            latency_samples.append(
+                ('_count', dict(endpoint=endpoint), latency['count']))
+        add_metric('futubot_api_latency_seconds', 'summary',
+                   'The latency of the calls to each Futu API.',
+                   latency_samples)
+
+        add_metric('futubot_api_quota_used', 'gauge',
+                   'The number of calls within the frequency limit window.',
+                   [('', dict(endpoint=endpoint), endpoint_stats['quota_used'])
+                    for endpoint, endpoint_stats in stats.items()])
+        add_metric(
+            'futubot_api_quota_limit', 'gauge',
+            'The maximum number of calls within the window.',
+            [('', dict(endpoint=endpoint), endpoint_stats['quota_limit'])
+             for endpoint, endpoint_stats in stats.items()
+             if endpoint_stats['quota_limit'] is not None])
+
+        return '\n'.join(lines) + '\n'
+
+    def serve(self, host='127.0.0.1', port=9108):
+        """Serve the metrics over HTTP in a background thread.
+
+        Args:
+            host (str): The address to listen on. Default: 127.0.0.1.
+            port (int): The port to listen on. Default: 9108.
+
+        Returns:
+            server (ThreadingHTTPServer): The server, which is stopped
+                with server.shutdown().
+        """
+        metrics = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] != '/metrics':
+                    self.send_error(404)
+                    return
+
+                body = metrics.to_prometheus().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type',
+                                 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), MetricsHandler)
+        thread = threading.Thread(target=server.serve_forever,
+                                  name='futubot-metrics',
+                                  daemon=True)
+        thread.start()
+
+        return server
+
+
+class InstrumentedContext:
+    """Record the metrics of the calls to a Futu connection.
+
+    Every public method of the wrapped connection is timed, and its call
+    is recorded into metrics if it returns a tuple starting with a Futu
+    ret code, like the Futu APIs do. A ret code other than RET_OK or an
+    exception is recorded as an error. Other attributes are passed
+    through.
+
+    Args:
+        context (OpenQuoteContext | OpenSecTradeContext): The connection,
+            or its fake from futubot.fake_opend.
+        metrics (ApiMetrics): The metrics to record into.
+    """
+    def __init__(self, context, metrics):
+        self.context = context
+        self.metrics = metrics
+
+    def __getattr__(self, name):
+        attr = getattr(self.context, name)
+        if name.startswith('_') or name == 'close' or not callable(attr):
+            return attr
+
+        @functools.wraps(attr)
+        def call(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                result = attr(*args, **kwargs)
+            except Exception as e:
+                self.metrics.record(name,
+                                    time.perf_counter() - start,
+                                    error_code=type(e).__name__,
+                                    error=str(e))
+                raise
+            latency = time.perf_counter() - start
+
+            if isinstance(result, tuple) and result and \
+                    isinstance(result[0], int):
+                if result[0] == RET_OK:
+                    self.metrics.record(name, latency)
+                else:
+                    self.metrics.record(name,
+                                        latency,
+                                        error_code=str(result[0]),
+                                        error=str(result[1]))
+
+            return result
+
+        return call
@@ -0,0 +1,274 @@
+import contextlib
+import signal
+
+import numpy as np
+import pandas as pd
+
+from .accounts import Accounts
+from .clock import SimulatedClock
+from .fake_opend import FakeQuoteContext, FakeTradeContext
+from .indicators import Indicators
+from .robot import Robot
+from .stockframe import StockFrame
+
+
+class ReplayStockFrame(StockFrame):
+    """A StockFrame exposing the stored candlesticks up to the current bar.
+
+    The frame property only contains the rows whose time_key is not later
+    than the current bar, so that strategies cannot look ahead. Columns
+    added to the stored frame (e.g. indicators) are visible immediately.
+    The frames of the timeframes added with add_timeframe() are resampled
+    from the rows up to the current bar, and are aggregated again as the
+    current bar moves forward, in the same way as StockFrame.add_rows().
+
+    Args:
+        stockframe (StockFrame): The StockFrame of all the stored
+            candlesticks.
+    """
+    def __init__(self, stockframe):
+        if not isinstance(stockframe, StockFrame):
+            raise TypeError(f'Only StockFrame type is supported for '
+                            f'stockframe, but got {type(stockframe)}')
+
+        self.data = stockframe.data
+        self.stockframe = stockframe
+        self.ktype = stockframe.ktype
+        self._code_groups = None
+        self._resampled = {}
+
+        time_keys = stockframe.frame.index.get_level_values('time_key')
+        self.time_keys = pd.DatetimeIndex(np.unique(time_keys.values))
+        self._bar_ids = self.time_keys.get_indexer(time_keys)
+        self._current_bar = len(self.time_keys) - 1
+
+    @property
+    def frame(self):
+        """Getter for the frame property up to the current bar."""
+        return self.stockframe.frame[self._bar_ids <= self.current_bar]
+
+    @property
+    def current_bar(self):
+        """Setter and getter for the index of the current bar.
+
+        The resampled frames are aggregated again from the first new bar
+        when the current bar moves forward, and resampled from scratch
+        when it moves backward.
+        """
+        return self._current_bar
+
+    @current_bar.setter
+    def current_bar(self, bar):
+        previous_bar = self._current_bar
+        self._current_bar = bar
+
+        for ktype in self._resampled:
+            if bar > previous_bar:
+                self._update_timeframe(ktype, self.time_keys[previous_bar + 1])
+            elif bar < previous_bar:
+                self._resampled[ktype] = self._resample(self.frame, ktype)
+
+    @property
+    def current_time(self):
+        """Getter of the time_key of the current bar."""
+        return self.time_keys[self.current_bar]
+
+    def add_rows(self, data):
+        """Reject the rows, which are only added to the stored StockFrame.
+
+        Args:
+            data (list[dict]): A list of historical quotes data.
+        """
+        raise RuntimeError(
+            'Rows cannot be added to a ReplayStockFrame. Please add them to '
+            'the stored StockFrame instead.')
+
+
+class Backtester:
+    """Replay stored candlesticks through FutuBot offline.
+
+    Each bar of the stored StockFrame is streamed in time order through
+    the strategy, Robot.execute_signals() and Portfolio.update_positions()
+    in the same way as tools/main.py. The Robot runs on a SimulatedClock
+    set to the time of the current bar, and orders are sent to a
+    FakeTradeContext on the same clock and are filled at the order price,
+    so nothing is sent to FutuOpenD and nothing sleeps.
+
+    The indicators are calculated once over all the stored bars. Since
+    every indicator of futubot.indicators only depends on the current and
+    previous bars, the strategy sees the same values as if the indicators
+    were refreshed after every bar, without recalculating the whole frame
+    at every bar.
+
+    Args:
+        stockframe (StockFrame): The stored candlesticks to be replayed.
+        strategy (type): The strategy class, e.g. Strategy.RSIStrategy.
+        strategy_params (dict): The keyword arguments of the strategy.
+            Default: None.
+        indicators (dict[dict]): The indicators to be calculated, with the
+            names of Indicators methods as keys and their keyword
+            arguments as values, e.g. dict(rsi=dict(period=14)).
+            Default: None, meaning the strategy calculates the indicators
+            it needs.
+        cash (float): The initial cash. Default: 1000000.0.
+        order_type (str): The type of order. Default: limit.
+        start_date (str): The time of the first bar on which the strategy
+            trades in format yyyy-MM-dd HH:mm:ss. Earlier bars only warm up
+            the indicators. Default: None, meaning from the first bar.
+        calendar (TradingCalendar): The trading calendar shared with the
+            Robot. Bars outside its sessions, e.g. on holidays, are not
+            replayed. Default: None, meaning all the bars are replayed.
+        verbose (bool): Whether to print the outputs of the strategy and
+            Robot at every bar. Default: False.
+    """
+    def __init__(self,
+                 stockframe,
+                 strategy,
+                 strategy_params=None,
+                 indicators=None,
+                 cash=1000000.0,
+                 order_type='limit',
+                 start_date=None,
+                 calendar=None,
+                 verbose=False):
+        if not isinstance(stockframe, StockFrame):
+            raise TypeError(f'Only StockFrame type is supported for '
+                            f'stockframe, but got {type(stockframe)}')
+        if not isinstance(cash, float):
+            raise TypeError(f'Only float type is supported for cash, '
+                            f'but got {type(cash)}')
+        assert cash > 0, f'cash must be greater than 0, but got {cash}'
+
+        self.strategy = strategy
+        self.strategy_params = strategy_params or {}
+        self.verbose = verbose
+
+        self.stockframe = ReplayStockFrame(stockframe=stockframe)
+        self.code_list = self.stockframe.frame.index.get_level_values(
+            'code').unique().to_list()
+
+        self.indicator_client = Indicators(stockframe=stockframe)
+        for indicator, params in (indicators or {}).items():
+            getattr(self.indicator_client, indicator)(**params)
+
+        self.start_bar = 0
+        if start_date is not None:
+            self.start_bar = self.stockframe.time_keys.searchsorted(
+                pd.to_datetime(start_date))
+
+        # The bars to be replayed.
+        self.bars = np.arange(self.start_bar, len(self.stockframe.time_keys))
+        if calendar is not None:
+            in_session = calendar.is_in_session(
+                self.stockframe.time_keys[self.start_bar:])
+            self.bars = self.bars[in_session]
+
+        close_prices = stockframe.frame['close'].unstack(level='code')
+        self._close_prices = close_prices.reindex(
+            index=self.stockframe.time_keys, columns=self.code_list).ffill()
+
+        self.clock = SimulatedClock(
+            start=self.stockframe.time_keys[0].to_pydatetime())
+        self.trade_context = FakeTradeContext(cash=cash,
+                                              now=self.clock.now,
+                                              rate_limits=None)
+        quote_context = FakeQuoteContext(klines=stockframe.frame.reset_index(),
+                                         rate_limits=None)
+
+        self.accounts = Accounts(paper_trading=True,
+                                 quote_context=quote_context,
+                                 trade_context=self.trade_context,
+                                 order_interval=0.0)
+
+        # The robot cancels orders on FutuOpenD at KeyboardInterrupt, which
+        # does not apply to a backtest.
+        sigint_handler = signal.getsignal(signal.SIGINT)
+        self.robot = Robot(accounts=self.accounts,
+                           order_type=order_type,
+                           clock=self.clock,
+                           calendar=calendar)
+        signal.signal(signal.SIGINT, sigint_handler)
+
+        self.portfolio = self.robot.create_portfolio(
+            stocks_of_interest=self.code_list)
+
+    def step(self, bar):
+        """Trade on a single bar.
+
+        Args:
+            bar (int): The index of the bar in time order.
+
+        Returns:
+            order_infos (dict[dict]): A dict of order infos of the orders
+                placed on the bar. See Robot.execute_signals().
+        """
+        self.stockframe.current_bar = bar
+        self.clock.set_time(self.stockframe.current_time.to_pydatetime())
+
+        close_prices = self._close_prices.iloc[bar].dropna()
+        self.trade_context.mark_prices(close_prices.to_dict())
+
+        orders = self.accounts.get_history_orders()
+        existing_orders = self.accounts.check_existing_orders(
+            code_list=self.portfolio.holdings, orders=orders)
+        self.portfolio.update_pending_orders(existing_orders)
+        self.portfolio.update_order_fills(orders)
+
+        strategy_client = self.strategy(self.stockframe, self.portfolio,
+                                        self.indicator_client, existing_orders,
+                                        **self.strategy_params)
+        buy_sell_signals = strategy_client.calculate_buy_sell_signals()
+
+        order_infos = self.robot.execute_signals(
+            buy_sell_signals=buy_sell_signals)
+        self.portfolio.update_positions(order_infos=order_infos)
+
+        return order_infos
+
+    def run(self):
+        """Replay all the bars from start_date within the sessions.
+
+        Returns:
+            results (dict): A dict of backtest results with the following
+                keys:
+                    equity_curve (pd.Series): The total assets after each
+                        bar, indexed by time_key.
+                    orders (pd.DataFrame): All the orders placed.
+                    final_equity (float): The total assets after the last
+                        bar.
+                    total_pnl_value (float): The absolute profit and loss.
+                    total_return (float): The total return in ratio terms.
+        """
+        initial_equity = self._get_equity()
+        time_keys = self.stockframe.time_keys[self.bars]
+        equity_curve = np.empty(len(time_keys))
+
+        if self.verbose:
+            output = contextlib.nullcontext()
+        else:
+            # print() is a no-op when sys.stdout is None, which also skips
+            # formatting the dataframes printed by the strategies.
+            output = contextlib.redirect_stdout(None)
+
+        with output:
+            for i, bar in enumerate(self.bars):
+                self.step(bar)
+                equity_curve[i] = self._get_equity()
+
+        equity_curve = pd.Series(equity_curve, index=time_keys, name='equity')
+        _, orders = self.trade_context.history_order_list_query()
+        final_equity = float(equity_curve.iloc[-1])
+
+        results = {
+            'equity_curve': equity_curve,
+            'orders': orders,
+            'final_equity': final_equity,
+            'total_pnl_value': final_equity - initial_equity,
+            'total_return': final_equity / initial_equity - 1,
+        }
+
+        return results
+
+    def _get_equity(self):
+        """Get the total assets marked at the current bar."""
+        return self.trade_context.cash + self.trade_context.market_value
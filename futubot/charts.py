@@ -0,0 +1,508 @@
+import copy
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+UP_COLOR = '#16ff32'
+DOWN_COLOR = 'red'
+
+
+def lttb_indices(x, y, max_points):
+    """Select points with the Largest-Triangle-Three-Buckets algorithm.
+
+    The first and last points are always kept. The remaining points are
+    split into (max_points - 2) buckets, and for each bucket the point
+    forming the largest triangle with the previously selected point and
+    the average of the next bucket is kept. This preserves the visual
+    shape (peaks and troughs) of a line series with far fewer points.
+
+    Args:
+        x (np.ndarray): The x values of the series in ascending order.
+        y (np.ndarray): The y values of the series with the same length
+            as x.
+        max_points (int): The maximum number of points to keep.
+
+    Returns:
+        indices (np.ndarray): The sorted indices of the selected points.
+    """
+    if not isinstance(max_points, int):
+        raise TypeError(f'Only int type is supported for max_points, '
+                        f'but got {type(max_points)}')
+    assert max_points > 2, (f'max_points must be greater than 2, '
+                            f'but got {max_points}')
+
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    n_points = len(y)
+
+    if n_points <= max_points:
+        return np.arange(n_points)
+
+    # Bucket edges of the points between the first and the last one.
+    edges = np.linspace(1, n_points - 1, max_points - 1).astype(np.int64)
+
+    indices = np.empty(max_points, dtype=np.int64)
+    indices[0] = 0
+    indices[-1] = n_points - 1
+
+    # Averages of every bucket, used as the third vertex of the triangle.
+    bucket_sizes = np.diff(edges)
+    next_x = np.add.reduceat(x[1:n_points - 1], edges[:-1] - 1) / bucket_sizes
+    next_y = np.add.reduceat(y[1:n_points - 1], edges[:-1] - 1) / bucket_sizes
+    next_x = np.append(next_x[1:], x[-1])
+    next_y = np.append(next_y[1:], y[-1])
+
+    selected = 0
+    for bucket in range(max_points - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+
+        area = np.abs((x[selected] - next_x[bucket]) *
+                      (y[start:end] - y[selected]) -
+                      (x[selected] - x[start:end]) *
+                      (next_y[bucket] - y[selected]))
+
+        selected = start + int(np.argmax(area))
+        indices[bucket + 1] = selected
+
+    return indices
+
+
+def downsample_series(series, max_points):
+    """Downsample a time-indexed series with LTTB.
+
+    Missing values (e.g. the warm-up period of an indicator) are dropped
+    before downsampling.
+
+    Args:
+        series (pd.Series): A series indexed by time_key.
+        max_points (int): The maximum number of points to keep.
+
+    Returns:
+        (pd.Series): The downsampled series.
+    """
+    if not isinstance(series, pd.Series):
+        raise TypeError(f'Only pd.Series type is supported for series, '
+                        f'but got {type(series)}')
+
+    series = series.dropna()
+
+    if len(series) <= max_points:
+        return series
+
+    x = _datetime_index_to_int(series.index)
+    indices = lttb_indices(x=x, y=series.values, max_points=max_points)
+
+    return series.iloc[indices]
+
+
+def downsample_columns(price_df, columns, max_points, by=None):
+    """Downsample several columns of a dataframe at the same time_keys.
+
+    The LTTB points are selected on the column 'by' and the same rows are
+    kept for all the other columns, so that related lines (e.g. the
+    Bollinger Bands or the MACD and signal lines) stay aligned.
+
+    Args:
+        price_df (pd.DataFrame): A dataframe indexed by time_key.
+        columns (list[str]): The columns to be kept.
+        max_points (int): The maximum number of points to keep.
+        by (str): The column on which the points are selected.
+            Default: None, meaning the first column in columns.
+
+    Returns:
+        (pd.DataFrame): The downsampled dataframe with columns 'columns'.
+    """
+    if not isinstance(columns, list):
+        raise TypeError(f'Only list type is supported for columns, '
+                        f'but got {type(columns)}')
+
+    if by is None:
+        by = columns[0]
+
+    price_df = price_df[columns].dropna(subset=[by])
+
+    if len(price_df) <= max_points:
+        return price_df
+
+    x = _datetime_index_to_int(price_df.index)
+    indices = lttb_indices(x=x, y=price_df[by].values, max_points=max_points)
+
+    return price_df.iloc[indices]
+
+
+def downsample_ohlcv(price_df, max_points):
+    """Aggregate candlesticks into at most max_points buckets.
+
+    Unlike LTTB, the candlesticks are aggregated rather than sampled so
+    that no price extreme is lost: each bucket takes the first open, the
+    highest high, the lowest low, the last close and the total volume of
+    its bars. The time_key of a bucket is the time_key of its first bar.
+
+    Args:
+        price_df (pd.DataFrame): A dataframe indexed by time_key with
+            columns 'open', 'close', 'high', 'low', 'volume'.
+        max_points (int): The maximum number of candlesticks to keep.
+
+    Returns:
+        (pd.DataFrame): The aggregated dataframe with the same columns.
+    """
+    if not isinstance(price_df, pd.DataFrame):
+        raise TypeError(f'Only pd.DataFrame type is supported for price_df, '
+                        f'but got {type(price_df)}')
+    if not isinstance(max_points, int):
+        raise TypeError(f'Only int type is supported for max_points, '
+                        f'but got {type(max_points)}')
+    assert max_points > 0, (f'max_points must be greater than 0, '
+                            f'but got {max_points}')
+
+    n_points = len(price_df)
+
+    if n_points <= max_points:
+        return price_df[['open', 'close', 'high', 'low', 'volume']]
+
+    starts = np.unique(
+        np.linspace(0, n_points, max_points, endpoint=False).astype(np.int64))
+    ends = np.append(starts[1:], n_points) - 1
+
+    return pd.DataFrame(
+        data={
+            'open': price_df['open'].values[starts],
+            'close': price_df['close'].values[ends],
+            'high': np.maximum.reduceat(price_df['high'].values, starts),
+            'low': np.minimum.reduceat(price_df['low'].values, starts),
+            'volume': np.add.reduceat(price_df['volume'].values, starts),
+        },
+        index=price_df.index[starts],
+    )
+
+
+def slice_frame(price_df, x_range):
+    """Slice a time-indexed dataframe to the visible x range.
+
+    Args:
+        price_df (pd.DataFrame): A dataframe indexed by time_key.
+        x_range (tuple | None): The (start, end) of the visible range.
+            Default: None, meaning the whole dataframe is visible.
+
+    Returns:
+        (pd.DataFrame): The rows of price_df within x_range.
+    """
+    if x_range is None:
+        return price_df
+
+    start, end = pd.to_datetime(x_range[0]), pd.to_datetime(x_range[1])
+
+    return price_df[(price_df.index >= start) & (price_df.index <= end)]
+
+
+def parse_relayout_range(relayout_data):
+    """Parse the visible x range from Plotly relayout data.
+
+    Plotly reports a zoom either as 'xaxis.range[0]'/'xaxis.range[1]'
+    or as 'xaxis.range', and a reset as 'xaxis.autorange'.
+
+    Args:
+        relayout_data (dict | None): The relayoutData of a dcc.Graph.
+
+    Returns:
+        (tuple | None): The (start, end) of the visible x range, or
+            None if the whole x axis is visible.
+
+    Examples:
+    >>> parse_relayout_range({'xaxis.range[0]': '2022-08-08 10:00',
+                              'xaxis.range[1]': '2022-08-08 11:00'})
+    ('2022-08-08 10:00', '2022-08-08 11:00')
+    >>> parse_relayout_range({'xaxis.autorange': True})
+    None
+    """
+    if not relayout_data or relayout_data.get('xaxis.autorange'):
+        return None
+
+    if 'xaxis.range[0]' in relayout_data and \
+            'xaxis.range[1]' in relayout_data:
+        return (relayout_data['xaxis.range[0]'],
+                relayout_data['xaxis.range[1]'])
+
+    if 'xaxis.range' in relayout_data:
+        return tuple(relayout_data['xaxis.range'][:2])
+
+    return None
+
+
+class LiveGraphBuilder:
+    """Build the live graph figures of the dashboard.
+
+    Building a Plotly figure through plotly.graph_objects validates every
+    property of every trace, which dominates the refresh time of the
+    dashboard. Instead, the layout and trace styles of each (code,
+    indicator) pair are built once with plotly.graph_objects and cached
+    as a figure template. On every refresh only the downsampled arrays
+    are inserted into a copy of the template, and all the trace inputs
+    (e.g. volume and histogram colors) are computed with NumPy over whole
+    columns instead of Python loops.
+
+    The live graph has the following options:
+        - Candlestick (default)
+        - Volume
+        - RSI
+        - SMA
+        - EMA
+        - MACD
+        - Bollinger Bands
+        - Standard Deviation
+        - Stochastic Oscillator
+
+    Args:
+        text_color (str): The color of the text. Default: '#ffFFFF'.
+        height (int): The height of the figure in pixels. Default: 400.
+    """
+    def __init__(self, text_color='#ffFFFF', height=400):
+        self.text_color = text_color
+        self.height = height
+        self._templates = {}
+
+    def get_template(self, code, indicator_name):
+        """Get the figure template of a code and an indicator.
+
+        The template is created on first use and reused afterwards.
+
+        Args:
+            code (str): The code of security.
+            indicator_name (str): The name of the indicator as shown in
+                the dropdown of the dashboard.
+
+        Returns:
+            template (dict): A Plotly figure dict with traces containing
+                styles only.
+        """
+        key = (code, indicator_name)
+
+        if key not in self._templates:
+            self._templates[key] = self._create_template(
+                code=code, indicator_name=indicator_name)
+
+        return self._templates[key]
+
+    def build(self, code, price_df, indicator_name, max_points, x_range=None):
+        """Build the live graph figure of a code and an indicator.
+
+        Args:
+            code (str): The code of security.
+            price_df (pd.DataFrame): The stockframe of the code indexed by
+                time_key.
+            indicator_name (str): The name of the indicator as shown in
+                the dropdown of the dashboard.
+            max_points (int): The maximum number of points per trace,
+                normally the width of the graph in pixels.
+            x_range (tuple | None): The (start, end) of the visible range.
+                Default: None, meaning the whole stockframe is visible.
+
+        Returns:
+            figure (dict): A Plotly figure dict.
+        """
+        template = self.get_template(code=code, indicator_name=indicator_name)
+
+        price_df = slice_frame(price_df, x_range=x_range)
+        traces_data = self._get_traces_data(price_df=price_df,
+                                            indicator_name=indicator_name,
+                                            max_points=max_points)
+
+        data = [
+            dict(style, **trace_data)
+            for style, trace_data in zip(template['data'], traces_data)
+        ]
+        figure = {'data': data, 'layout': template['layout']}
+
+        return figure
+
+    def _create_template(self, code, indicator_name):
+        """Create the figure template of a code and an indicator."""
+        fig = go.Figure()
+
+        if indicator_name == 'Volume':
+            fig.add_trace(go.Bar(name='Volume'))
+
+        elif indicator_name[:3] == 'RSI':
+            fig.add_trace(
+                go.Scatter(name=indicator_name,
+                           line=dict(color='rgb(255, 237, 111)', width=2)))
+            fig.update_layout(yaxis_range=[0, 100])
+            fig.add_hline(y=30.0,
+                          line_width=1,
+                          line_dash='dash',
+                          annotation_text='Oversold Line',
+                          line_color=UP_COLOR,
+                          annotation_font_color=UP_COLOR)
+            fig.add_hline(y=70.0,
+                          line_width=1,
+                          line_dash='dash',
+                          annotation_text='Overbought Line',
+                          line_color='#fb0d0d',
+                          annotation_font_color='#fb0d0d')
+
+        elif indicator_name == 'MACD':
+            fig.add_trace(go.Bar(name='Histogram'))
+            fig.add_trace(
+                go.Scatter(line=dict(color='#ffa15a', width=2), name='MACD'))
+            fig.add_trace(
+                go.Scatter(line=dict(color='#2ed9ff', width=2), name='Signal'))
+
+        elif indicator_name == 'STANDARD_DEVIATION':
+            fig.add_trace(
+                go.Scatter(line=dict(color='rgb(102, 166, 30)', width=2),
+                           name='Standard Deviation'))
+
+        elif indicator_name == 'STOCHASTIC_OSCILLATOR':
+            fig.add_trace(
+                go.Scatter(name='%K Line (Fast)',
+                           line=dict(color='#af0038', width=2)))
+            fig.add_trace(
+                go.Scatter(name='%D Line (Slow)',
+                           line=dict(color='rgb(29, 105, 150)', width=2)))
+
+        else:
+            fig.add_trace(go.Candlestick(name='Close'))
+
+            if indicator_name[:3] == 'SMA':
+                fig.add_trace(
+                    go.Scatter(name=indicator_name,
+                               line=dict(color='orange', width=2)))
+
+            elif indicator_name[:3] == 'EMA':
+                fig.add_trace(
+                    go.Scatter(name=indicator_name,
+                               line=dict(color='#2ed9ff', width=2)))
+
+            elif indicator_name == 'BOLLINGER_BANDS':
+                fig.add_trace(
+                    go.Scatter(line=dict(color='orange', width=2), name='SMA'))
+                fig.add_trace(
+                    go.Scatter(line_color='#2ed9ff',
+                               line={'dash': 'dash'},
+                               name='Upper Band',
+                               opacity=0.1))
+                fig.add_trace(
+                    go.Scatter(line_color='#2ed9ff',
+                               line={'dash': 'dash'},
+                               fill='tonexty',
+                               name='Lower Band',
+                               opacity=0.1))
+
+        fig.update_layout(
+            height=self.height,
+            showlegend=True,
+            xaxis_rangeslider_visible=False,
+            template='plotly_dark',
+            plot_bgcolor='rgba(0, 0, 0, 0)',
+            paper_bgcolor='rgba(0, 0, 0, 0)',
+            font={'color': self.text_color},
+            # Keep the zoom level when the graph is refreshed.
+            uirevision=f'{code}-{indicator_name}',
+        )
+
+        return copy.deepcopy(fig.to_plotly_json())
+
+    def _get_traces_data(self, price_df, indicator_name, max_points):
+        """Get the data arrays of the traces in template order."""
+        if indicator_name == 'Volume':
+            candles = downsample_ohlcv(price_df, max_points=max_points)
+            volume_colors = np.where(
+                candles['open'].values - candles['close'].values >= 0,
+                UP_COLOR, DOWN_COLOR)
+
+            return [{
+                'x': _format_time_keys(candles.index),
+                'y': candles['volume'].values,
+                'marker': {
+                    'color': volume_colors
+                },
+            }]
+
+        if indicator_name[:3] == 'RSI' or \
+                indicator_name == 'STANDARD_DEVIATION':
+            return [
+                _line_data(
+                    downsample_series(price_df[indicator_name.lower()],
+                                      max_points=max_points))
+            ]
+
+        if indicator_name == 'MACD':
+            macd = downsample_columns(price_df,
+                                      ['histogram', 'macd', 'signal'],
+                                      max_points=max_points)
+            x = _format_time_keys(macd.index)
+            histogram = macd['histogram'].values
+            macd_colors = np.where(histogram >= 0, UP_COLOR, DOWN_COLOR)
+
+            return [
+                {
+                    'x': x,
+                    'y': histogram,
+                    'marker': {
+                        'color': macd_colors
+                    }
+                },
+                {
+                    'x': x,
+                    'y': macd['macd'].values
+                },
+                {
+                    'x': x,
+                    'y': macd['signal'].values
+                },
+            ]
+
+        if indicator_name == 'STOCHASTIC_OSCILLATOR':
+            stochastic = downsample_columns(price_df, ['%K', '%D'],
+                                            max_points=max_points)
+            x = _format_time_keys(stochastic.index)
+
+            return [{
+                'x': x,
+                'y': stochastic['%K'].values
+            }, {
+                'x': x,
+                'y': stochastic['%D'].values
+            }]
+
+        candles = downsample_ohlcv(price_df, max_points=max_points)
+        traces_data = [{
+            'x': _format_time_keys(candles.index),
+            'open': candles['open'].values,
+            'high': candles['high'].values,
+            'low': candles['low'].values,
+            'close': candles['close'].values,
+        }]
+
+        if indicator_name[:3] in ('SMA', 'EMA'):
+            traces_data.append(
+                _line_data(
+                    downsample_series(price_df[indicator_name.lower()],
+                                      max_points=max_points)))
+
+        elif indicator_name == 'BOLLINGER_BANDS':
+            bands = downsample_columns(price_df,
+                                       ['sma', 'upper_band', 'lower_band'],
+                                       max_points=max_points)
+            x = _format_time_keys(bands.index)
+
+            for column in ['sma', 'upper_band', 'lower_band']:
+                traces_data.append({'x': x, 'y': bands[column].values})
+
+        return traces_data
+
+
+def _line_data(series):
+    """Get the data arrays of a line trace from a series."""
+    return {'x': _format_time_keys(series.index), 'y': series.values}
+
+
+def _format_time_keys(index):
+    """Format a datetime index as an array of ISO strings."""
+    return np.datetime_as_string(np.asarray(index, dtype='datetime64[s]'))
+
+
+def _datetime_index_to_int(index):
+    """Convert a datetime index to nanoseconds since epoch."""
+    return np.asarray(index, dtype='datetime64[ns]').astype(np.int64)
@@ -0,0 +1,311 @@
+import os
+import pickle
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from .indicators import Indicators
+from .journal import ORDER
+from .portfolio import PENDING_STATUSES, Portfolio
+from .snapshot import write_atomic
+from .stockframe import StockFrame
+
+# The version of the checkpoint format. Checkpoints of other versions are
+# ignored.
+CHECKPOINT_VERSION = 3
+
+
+class Checkpointer:
+    """Checkpoint the state of the robot for a warm restart.
+
+    The StockFrame with its indicator columns, the indicators to refresh,
+    the positions with their pending quantities, the mark-to-market PnL,
+    the daily returns of the portfolio and the open orders are pickled to
+    the checkpoint file with write_atomic(), so that a crash while saving
+    leaves the previous checkpoint intact.
+
+    After a restart, restore() rebuilds the portfolio, the StockFrame and
+    the indicators from the checkpoint without querying the broker, and
+    only requests the candlesticks since the last bar of the checkpoint,
+    instead of the whole history.
+
+    Args:
+        path (str): The path of the checkpoint file.
+        interval (float): The minimum number of seconds between two saves
+            by maybe_save(). Default: 60.0.
+    """
+    def __init__(self, path, interval=60.0):
+        if not isinstance(path, str):
+            raise TypeError(f'Only str type is supported for path, '
+                            f'but got {type(path)}')
+        assert interval >= 0, \
+            f'interval must not be negative, but got {interval}'
+
+        self.path = path
+        self.interval = interval
+        self._saved_at = -np.inf
+
+    def save(self, portfolio, stockframe, indicator_client=None):
+        """Save the state of the robot to the checkpoint file.
+
+        Args:
+            portfolio (Portfolio): The Portfolio object.
+            stockframe (StockFrame): The StockFrame object.
+            indicator_client (Indicators): The Indicators object whose
+                current indicators are refreshed after a restore.
+                Default: None.
+
+        Returns:
+            state (dict): The saved state, see collect().
+        """
+        return self.write(self.collect(portfolio, stockframe,
+                                       indicator_client))
+
+    def collect(self, portfolio, stockframe, indicator_client=None):
+        """Collect the state of the robot to be saved.
+
+        The state only holds copies, so that it can be written with
+        write() while the robot goes on updating the StockFrame and the
+        portfolio.
+
+        Args:
+            portfolio (Portfolio): The Portfolio object.
+            stockframe (StockFrame): The StockFrame object.
+            indicator_client (Indicators): The Indicators object whose
+                current indicators are refreshed after a restore.
+                Default: None.
+
+        Returns:
+            state (dict): The state to be saved with the following keys:
+                version (int): CHECKPOINT_VERSION.
+                saved_at (str): The time at which the checkpoint is
+                    saved. Format: yyyy-MM-dd HH:mm:ss.
+                frame (pd.DataFrame): The frame of the StockFrame.
+                ktype (KLType): The type of candlestick of the frame.
+                indicators (dict[dict]): The name of the function and the
+                    arguments of each current indicator.
+                timeframes (dict[dict]): The indicators of each resampled
+                    timeframe of the StockFrame, which is resampled again
+                    after a restore.
+                portfolio (dict): The state of the portfolio, see
+                    Portfolio.get_state().
+                open_orders (np.ndarray): The orders in the journal of
+                    the codes with pending quantities which were not
+                    filled yet when they were placed.
+        """
+        if not isinstance(portfolio, Portfolio):
+            raise TypeError(f'Only Portfolio type is supported for '
+                            f'portfolio, but got {type(portfolio)}')
+        if not isinstance(stockframe, StockFrame):
+            raise TypeError(f'Only StockFrame type is supported for '
+                            f'stockframe, but got {type(stockframe)}')
+
+        indicators = {}
+        timeframes = {ktype: {} for ktype in stockframe.timeframes}
+        if indicator_client is not None:
+            indicators = _get_indicators(indicator_client)
+            for ktype, timeframe_client in \
+                    indicator_client.timeframes.items():
+                timeframes[ktype] = _get_indicators(timeframe_client)
+
+        pending_codes = [
+            code for code, position in portfolio.positions.items()
+            if position['pending_qty'] != 0
+        ]
+        orders = portfolio.journal.records(kind=ORDER)
+        open_orders = orders[np.isin(orders['code'], pending_codes)
+                             & np.isin(orders['order_status'],
+                                       [str(s) for s in PENDING_STATUSES])]
+
+        state = {
+            'version': CHECKPOINT_VERSION,
+            'saved_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'frame': stockframe.frame.copy(),
+            'ktype': stockframe.ktype,
+            'indicators': indicators,
+            'timeframes': timeframes,
+            'portfolio': portfolio.get_state(),
+            'open_orders': open_orders,
+        }
+
+        return state
+
+    def write(self, state):
+        """Write a state collected by collect() to the checkpoint file.
+
+        Args:
+            state (dict): The state returned by collect().
+
+        Returns:
+            state (dict): The saved state.
+        """
+        write_atomic(self.path,
+                     pickle.dumps(state, protocol=pickle.HIGHEST_PROTOCOL))
+        self._saved_at = time.monotonic()
+
+        return state
+
+    def is_due(self):
+        """Whether interval seconds have passed since the last save.
+
+        Returns:
+            bool: True if the state is to be saved by maybe_save().
+        """
+        return time.monotonic() - self._saved_at >= self.interval
+
+    def maybe_save(self, portfolio, stockframe, indicator_client=None):
+        """Save the state if interval seconds have passed since the last save.
+
+        Args:
+            portfolio (Portfolio): The Portfolio object.
+            stockframe (StockFrame): The StockFrame object.
+            indicator_client (Indicators): The Indicators object.
+                Default: None.
+
+        Returns:
+            state (dict): The saved state, see save(), or None if it is
+                not saved.
+        """
+        if not self.is_due():
+            return None
+
+        return self.save(portfolio, stockframe, indicator_client)
+
+    def load(self):
+        """Load the state of the checkpoint file.
+
+        Returns:
+            state (dict): The saved state, see save(), or None if there is
+                no checkpoint, it cannot be read or it is of another
+                version.
+        """
+        if not os.path.exists(self.path):
+            return None
+
+        try:
+            with open(self.path, 'rb') as f:
+                state = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError, AttributeError,
+                ImportError, IndexError) as e:
+            print(f'Cannot read the checkpoint {self.path}: {e}')
+            return None
+
+        if not isinstance(state, dict) or \
+                state.get('version') != CHECKPOINT_VERSION:
+            return None
+
+        return state
+
+    def restore(self, robot, daily_bar_store=None, journal=None):
+        """Restore the state of the robot from the checkpoint file.
+
+        The checkpoint is only restored if its last bar is from the day of
+        the clock of the robot, since the positions may have changed
+        overnight. The candlesticks after the last bar are requested with
+        Robot.get_historical_quotes() and added to the StockFrame, and the
+        indicators are refreshed once.
+
+        Args:
+            robot (Robot): The Robot object, whose portfolio and
+                stockframe are set to the restored ones.
+            daily_bar_store (DailyBarStore): The store of the daily
+                candlesticks of the portfolio. Default: None, meaning a
+                new store kept in memory.
+            journal (TradeJournal): The journal of the portfolio. The open
+                orders of the checkpoint are added to it if it is not
+                kept in a file. Default: None, meaning a new journal kept
+                in memory.
+
+        Returns:
+            (tuple): (portfolio, stockframe, indicator_client), or None if
+                there is no checkpoint of today to restore.
+        """
+        state = self.load()
+        if state is None:
+            return None
+
+        frame = state['frame']
+        time_keys = frame.index.get_level_values('time_key')
+        now = robot.clock.now()
+        if len(frame) == 0 or time_keys.max().date() != now.date():
+            print(f'The checkpoint {self.path} is not of today, '
+                  f'starting from scratch.')
+            return None
+
+        portfolio = Portfolio(
+            accounts=robot.accounts,
+            daily_bar_store=daily_bar_store,
+            journal=journal,
+            portfolio_info=state['portfolio']['portfolio_info'])
+        portfolio.restore_state(state['portfolio'])
+        if portfolio.journal.path is None:
+            for order in state['open_orders']:
+                portfolio.journal.record_order({
+                    'create_time':
+                    str(order['time']),
+                    'order_id':
+                    str(order['order_id']),
+                    'code':
+                    str(order['code']),
+                    'trd_side':
+                    str(order['trd_side']),
+                    'qty':
+                    float(order['qty']),
+                    'price':
+                    float(order['price']),
+                    'order_status':
+                    str(order['order_status']),
+                })
+        robot.portfolio = portfolio
+
+        stockframe = StockFrame.from_frame(frame, ktype=state['ktype'])
+        robot.stockframe = stockframe
+
+        # Only the bars since the last bar of the checkpoint are fetched.
+        start = time_keys.max() + timedelta(minutes=1)
+        if start <= pd.Timestamp(now):
+            gap = robot.get_historical_quotes(
+                start_date=start.strftime('%Y-%m-%d %H:%M:%S'),
+                end_date=now.strftime('%Y-%m-%d %H:%M:%S'),
+                code_list=frame.index.get_level_values(
+                    'code').unique().to_list())
+            if gap:
+                stockframe.add_rows(data=gap)
+
+        for ktype in state['timeframes']:
+            stockframe.add_timeframe(ktype)
+
+        indicator_client = Indicators(stockframe=stockframe)
+        _add_indicators(indicator_client, state['indicators'])
+        for ktype, indicators in state['timeframes'].items():
+            if indicators:
+                _add_indicators(indicator_client.timeframe(ktype), indicators)
+        indicator_client.refresh()
+        portfolio.update_intraday_prices(stockframe)
+
+        print(f'Restored the checkpoint saved at {state["saved_at"]} with '
+              f'{len(state["open_orders"])} open orders.')
+
+        return portfolio, stockframe, indicator_client
+
+
+def _get_indicators(indicator_client):
+    """Get the name of the function and the arguments of each indicator."""
+    return {
+        name: {
+            'func': indicator['func'].__name__,
+            'args': dict(indicator['args']),
+        }
+        for name, indicator in indicator_client.current_indicators.items()
+    }
+
+
+def _add_indicators(indicator_client, indicators):
+    """Register indicators to be calculated at the next refresh."""
+    for name, indicator in indicators.items():
+        indicator_client.current_indicators[name] = {
+            'args': indicator['args'],
+            'func': getattr(indicator_client, indicator['func']),
+        }
@@ -0,0 +1,133 @@
+import time
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta, timezone
+
+# Hong Kong Time, in which HKEX trades and Futu reports time_keys.
+HKT = timezone(timedelta(hours=8))
+
+
+class Clock(ABC):
+    """The base class of the clocks used by FutuBot.
+
+    A clock tells the current exchange time and puts the caller on sleep,
+    so that the same trading loop can run live, as an accelerated replay
+    or as an event-driven simulation by swapping the clock. Times are
+    naive datetimes in HKT, like the time_keys of candlesticks.
+    """
+    @abstractmethod
+    def now(self):
+        """Get the current time.
+
+        Returns:
+            (datetime): The current naive datetime in HKT.
+        """
+
+    @abstractmethod
+    def monotonic(self):
+        """Get the value of a monotonic clock in seconds.
+
+        Returns:
+            (float): The seconds elapsed on the clock since an arbitrary
+                reference point, which never goes backwards.
+        """
+
+    @abstractmethod
+    def sleep(self, seconds):
+        """Sleep for a number of seconds of the clock.
+
+        Args:
+            seconds (float): The number of seconds to sleep.
+        """
+
+    def sleep_until(self, deadline):
+        """Sleep until a time of the clock.
+
+        Args:
+            deadline (datetime): The naive datetime in HKT at which to
+                wake up. No sleep if it has passed.
+        """
+        seconds = (deadline - self.now()).total_seconds()
+        if seconds > 0:
+            self.sleep(seconds)
+
+
+class WallClock(Clock):
+    """The real clock for live trading."""
+    def now(self):
+        return datetime.now(HKT).replace(tzinfo=None)
+
+    def monotonic(self):
+        return time.monotonic()
+
+    def sleep(self, seconds):
+        time.sleep(seconds)
+
+
+class AcceleratedClock(Clock):
+    """A clock running faster than real time from a start time.
+
+    Args:
+        start (datetime): The naive datetime in HKT at which the clock
+            starts. Default: None, meaning the current time.
+        speed (float): The number of clock seconds per real second.
+            Default: 60.0.
+    """
+    def __init__(self, start=None, speed=60.0):
+        if start is not None and not isinstance(start, datetime):
+            raise TypeError(f'Only datetime type is supported for start, '
+                            f'but got {type(start)}')
+        assert speed > 0, f'speed must be greater than 0, but got {speed}'
+
+        self.start = start or WallClock().now()
+        self.speed = speed
+        self._real_start = time.monotonic()
+
+    def now(self):
+        return self.start + timedelta(seconds=self.monotonic())
+
+    def monotonic(self):
+        return (time.monotonic() - self._real_start) * self.speed
+
+    def sleep(self, seconds):
+        time.sleep(seconds / self.speed)
+
+
+class SimulatedClock(Clock):
+    """An event-driven clock which only moves when told to.
+
+    Sleeping advances the clock immediately instead of waiting, and a
+    backtest moves the clock to the time of each replayed bar with
+    set_time(), so that a loop runs as fast as it can be computed.
+
+    Args:
+        start (datetime): The naive datetime in HKT at which the clock
+            starts.
+    """
+    def __init__(self, start):
+        if not isinstance(start, datetime):
+            raise TypeError(f'Only datetime type is supported for start, '
+                            f'but got {type(start)}')
+
+        self.start = start
+        self._now = start
+
+    def now(self):
+        return self._now
+
+    def monotonic(self):
+        return (self._now - self.start).total_seconds()
+
+    def sleep(self, seconds):
+        assert seconds >= 0, f'seconds must not be negative, but got {seconds}'
+        self._now += timedelta(seconds=seconds)
+
+    def set_time(self, now):
+        """Move the clock forward to a time.
+
+        Args:
+            now (datetime): The new naive datetime in HKT, which must not
+                be earlier than the current time of the clock.
+        """
+        assert now >= self._now, \
+            f'The clock cannot go backwards from {self._now} to {now}'
+        self._now = now
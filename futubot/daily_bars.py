@@ -0,0 +1,185 @@
+import os
+import pickle
+from datetime import datetime, timedelta
+
+import pandas as pd
+from futu import KLType
+
+from .snapshot import write_atomic
+
+DAILY_BAR_COLUMNS = [
+    'code', 'time_key', 'open', 'close', 'high', 'low', 'volume'
+]
+
+
+def roll_daily_bars(frame):
+    """Aggregate intraday candlesticks into daily candlesticks.
+
+    Args:
+        frame (pd.DataFrame): The frame of a StockFrame of intraday
+            candlesticks with index (code, time_key).
+
+    Returns:
+        daily_bars (list[dict]): A list of daily candlesticks sorted by
+            code and time_key, each a dict with keys code, time_key (the
+            date at midnight in format yyyy-MM-dd HH:mm:ss, as returned
+            by the Futu API), open, close, high, low and volume.
+    """
+    if not isinstance(frame, pd.DataFrame):
+        raise TypeError(f'Only pd.DataFrame type is supported for frame, '
+                        f'but got {type(frame)}')
+    if frame.empty:
+        return []
+
+    frame = frame.sort_index()
+    dates = pd.DatetimeIndex(
+        frame.index.get_level_values('time_key')).normalize()
+    grouped = frame.groupby(
+        [frame.index.get_level_values('code'),
+         dates.rename('time_key')])
+    daily_bars = grouped.agg(open=('open', 'first'),
+                             close=('close', 'last'),
+                             high=('high', 'max'),
+                             low=('low', 'min'),
+                             volume=('volume', 'sum')).reset_index()
+    daily_bars['time_key'] = daily_bars['time_key'].dt.strftime(
+        '%Y-%m-%d %H:%M:%S')
+
+    return daily_bars[DAILY_BAR_COLUMNS].to_dict(orient='records')
+
+
+class DailyBarStore:
+    """A local store of the daily candlesticks of securities.
+
+    The daily history of each code is fetched from Futu once, and later
+    only the days after its last stored candlestick are requested. With a
+    path, the store is pickled to disk after every change, so that the
+    history is kept across runs. The candlesticks of today are not stored,
+    as they are rolled from the intraday StockFrame with roll_daily_bars()
+    until the day is over.
+
+    Args:
+        path (str): The file in which the candlesticks are kept.
+            Default: None, meaning they are only kept in memory.
+    """
+    def __init__(self, path=None):
+        if path is not None and not isinstance(path, str):
+            raise TypeError(f'Only str type is supported for path, '
+                            f'but got {type(path)}')
+
+        self.path = path
+        self.bars = pd.DataFrame(columns=DAILY_BAR_COLUMNS)
+
+        if path is not None and os.path.exists(path):
+            with open(path, 'rb') as f:
+                self.bars = pickle.load(f)
+
+    def last_time_keys(self):
+        """Get the time_key of the last stored candlestick of each code.
+
+        Returns:
+            (dict[str]): The last time_keys with codes as keys.
+        """
+        return self.bars.groupby('code')['time_key'].max().to_dict()
+
+    def add(self, daily_bars):
+        """Add daily candlesticks, replacing the stored ones of same day.
+
+        Args:
+            daily_bars (list[dict]): A list of daily candlesticks, each a
+                dict with at least the keys of DAILY_BAR_COLUMNS.
+        """
+        if not isinstance(daily_bars, list):
+            raise TypeError(f'Only list type is supported for daily_bars, '
+                            f'but got {type(daily_bars)}')
+        if not daily_bars:
+            return
+
+        new_bars = pd.DataFrame(daily_bars)[DAILY_BAR_COLUMNS]
+        bars = pd.concat([self.bars, new_bars], ignore_index=True)
+        bars = bars.drop_duplicates(subset=['code', 'time_key'], keep='last')
+        self.bars = bars.sort_values(['code', 'time_key'], ignore_index=True)
+
+        if self.path is not None:
+            write_atomic(self.path, pickle.dumps(self.bars))
+
+    def fetch(self, accounts, code_list, end_date=None, days=365):
+        """Fetch the daily candlesticks missing from the store.
+
+        Args:
+            accounts (Accounts): The Accounts object.
+            code_list (list[str]): The codes of securities.
+            end_date (str): The last date to be fetched in format
+                yyyy-MM-dd. Default: None, meaning yesterday.
+            days (int): The number of days of history fetched for a code
+                not in the store yet. Default: 365.
+
+        Returns:
+            int: The number of requests sent to Futu.
+        """
+        if not isinstance(code_list, list):
+            raise TypeError(f'Only list type is supported for code_list, '
+                            f'but got {type(code_list)}')
+        assert days > 0, f'days must be greater than 0, but got {days}'
+
+        if end_date is None:
+            end = datetime.today() - timedelta(days=1)
+        else:
+            end = datetime.strptime(end_date, '%Y-%m-%d')
+        end = end.replace(hour=0, minute=0, second=0, microsecond=0)
+
+        last_time_keys = self.last_time_keys()
+        requests = 0
+        # The bars of all the codes are added at once, so that the file is
+        # written once per fetch instead of once per code.
+        fetched_bars = []
+
+        for code in code_list:
+            if code in last_time_keys:
+                start = datetime.strptime(last_time_keys[code],
+                                          '%Y-%m-%d %H:%M:%S')
+                start += timedelta(days=1)
+            else:
+                start = end - timedelta(days=days)
+            if start > end:
+                continue
+
+            historical_quotes = accounts.get_historical_candles(
+                code=code,
+                start=start.strftime('%Y-%m-%d %H:%M:%S'),
+                end=end.strftime('%Y-%m-%d 23:59:59'),
+                ktype=KLType.K_DAY,
+            )
+            requests += 1
+            if historical_quotes is not None:
+                fetched_bars.extend(
+                    historical_quotes[DAILY_BAR_COLUMNS].to_dict(
+                        orient='records'))
+
+        self.add(fetched_bars)
+
+        return requests
+
+    def get_bars(self, code_list=None, days=None):
+        """Get the stored daily candlesticks.
+
+        Args:
+            code_list (list[str]): The codes of securities.
+                Default: None, meaning all the codes.
+            days (int): The number of days up to the last stored day of
+                the codes to be returned. Default: None, meaning all the
+                stored days.
+
+        Returns:
+            (list[dict]): A list of daily candlesticks sorted by code and
+                time_key.
+        """
+        bars = self.bars
+        if code_list is not None:
+            bars = bars[bars['code'].isin(code_list)]
+        if days is not None and not bars.empty:
+            start = pd.Timestamp(
+                bars['time_key'].max()) - pd.Timedelta(days=days)
+            bars = bars[bars['time_key'] > start.strftime('%Y-%m-%d %H:%M:%S')]
+
+        return bars.to_dict(orient='records')
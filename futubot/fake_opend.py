@@ -0,0 +1,766 @@
+import collections
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+from futu import (RET_ERROR, RET_OK, KLType, MarketState, ModifyOrderOp,
+                  OrderStatus, OrderType, PositionSide, TrdEnv, TrdSide)
+
+from .api_metrics import QUOTE_RATE_LIMITS, TRADE_RATE_LIMITS
+from .sessions import bucket_time_keys, hkex_session_minutes
+
+KLINE_COLUMNS = [
+    'code', 'time_key', 'open', 'close', 'high', 'low', 'pe_ratio',
+    'turnover_rate', 'volume', 'turnover', 'change_rate', 'last_close'
+]
+
+# The columns of the candlesticks returned by Robot.
+CANDLE_COLUMNS = ['time_key', 'code', 'open', 'close', 'high', 'low', 'volume']
+
+ORDER_COLUMNS = [
+    'order_id', 'code', 'stock_name', 'trd_side', 'order_type', 'qty',
+    'order_status', 'price', 'currency', 'create_time', 'updated_time',
+    'dealt_qty', 'dealt_avg_price'
+]
+
+
+def generate_synthetic_klines(code_list,
+                              start_date='2022-08-08',
+                              days=1,
+                              start_price=100.0,
+                              volatility=0.001,
+                              seed=0):
+    """Generate synthetic 1-minute candlesticks.
+
+    The close prices of each code follow a geometric random walk over the
+    HKEX regular trading sessions of 'days' business days.
+
+    Args:
+        code_list (list[str]): A list of codes.
+        start_date (str): The first trading day in format yyyy-MM-dd.
+            Default: '2022-08-08'.
+        days (int): The number of business days. Default: 1.
+        start_price (float): The first open price of every code.
+            Default: 100.0.
+        volatility (float): The standard deviation of 1-minute log
+            returns. Default: 0.001.
+        seed (int): The seed of the random generator. Default: 0.
+
+    Returns:
+        klines (pd.DataFrame): A pandas dataframe of candlesticks with the
+            same columns as the Futu API request_history_kline().
+    """
+    if not isinstance(code_list, list):
+        raise TypeError(f'Only list type is supported for code_list, '
+                        f'but got {type(code_list)}')
+    if not isinstance(days, int):
+        raise TypeError(f'Only int type is supported for days, '
+                        f'but got {type(days)}')
+    assert days > 0, f'days must be greater than 0, but got {days}'
+
+    rng = np.random.default_rng(seed)
+
+    trading_days = pd.bdate_range(start=start_date, periods=days)
+    session_minutes = hkex_session_minutes()
+    time_keys = (trading_days.values[:, None] +
+                 session_minutes.values[None, :]).ravel()
+    time_keys = pd.DatetimeIndex(time_keys).strftime('%Y-%m-%d %H:%M:%S')
+
+    n_codes, n_bars = len(code_list), len(time_keys)
+
+    log_returns = rng.normal(scale=volatility, size=(n_codes, n_bars))
+    close = np.round(start_price * np.exp(np.cumsum(log_returns, axis=1)), 2)
+    last_close = np.concatenate(
+        [np.full((n_codes, 1), start_price), close[:, :-1]], axis=1)
+    open_ = last_close
+    spread = np.abs(rng.normal(scale=volatility, size=(n_codes, n_bars)))
+    high = np.round(np.maximum(open_, close) * (1 + spread), 2)
+    low = np.round(np.minimum(open_, close) * (1 - spread), 2)
+    volume = rng.integers(1000, 100000, size=(n_codes, n_bars))
+
+    klines = pd.DataFrame(
+        dict(code=np.repeat(np.array(code_list, dtype=object), n_bars),
+             time_key=np.tile(np.asarray(time_keys, dtype=object), n_codes),
+             open=open_.ravel(),
+             close=close.ravel(),
+             high=high.ravel(),
+             low=low.ravel(),
+             pe_ratio=0.0,
+             turnover_rate=0.0,
+             volume=volume.ravel(),
+             turnover=(close * volume).ravel(),
+             change_rate=((close / last_close - 1) * 100).ravel(),
+             last_close=last_close.ravel()))
+
+    return klines
+
+
+def resample_klines(klines, ktype):
+    """Aggregate 1-minute candlesticks into candlesticks of ktype.
+
+    See bucket_time_keys() for the labels of the candlesticks.
+
+    Args:
+        klines (pd.DataFrame): A pandas dataframe of 1-minute candlesticks.
+        ktype (KLType): The type of candlestick, either K_DAY or one of
+            the intraday types in KLTYPE_MINUTES.
+
+    Returns:
+        (pd.DataFrame): A pandas dataframe of candlesticks of ktype.
+    """
+    buckets = bucket_time_keys(pd.to_datetime(klines['time_key']), ktype)
+
+    grouped = klines.assign(time_key=buckets).groupby(['code', 'time_key'],
+                                                      sort=True)
+    resampled = grouped.agg(open=('open', 'first'),
+                            close=('close', 'last'),
+                            high=('high', 'max'),
+                            low=('low', 'min'),
+                            pe_ratio=('pe_ratio', 'last'),
+                            turnover_rate=('turnover_rate', 'sum'),
+                            volume=('volume', 'sum'),
+                            turnover=('turnover', 'sum'),
+                            last_close=('last_close', 'first')).reset_index()
+
+    change = resampled['close'] / resampled['last_close'] - 1
+    resampled['change_rate'] = change * 100
+    resampled['time_key'] = resampled['time_key'].dt.strftime(
+        '%Y-%m-%d %H:%M:%S')
+
+    return resampled[KLINE_COLUMNS]
+
+
+class RateLimiter:
+    """A sliding window rate limiter.
+
+    Args:
+        max_requests (int): The maximum number of requests per period.
+        period (float): The length of the sliding window in seconds.
+        min_interval (float): The minimum interval in seconds between
+            two consecutive requests. Default: 0.0.
+        clock (callable): A function returning the current time in
+            seconds. Default: time.monotonic.
+    """
+    def __init__(self,
+                 max_requests,
+                 period,
+                 min_interval=0.0,
+                 clock=time.monotonic):
+        self.max_requests = max_requests
+        self.period = period
+        self.min_interval = min_interval
+        self.clock = clock
+        self._request_times = collections.deque()
+
+    def acquire(self):
+        """Record a request if it is within the frequency limits.
+
+        Returns:
+            bool: True if the request is allowed, otherwise False.
+        """
+        now = self.clock()
+
+        while self._request_times and \
+                now - self._request_times[0] >= self.period:
+            self._request_times.popleft()
+
+        if len(self._request_times) >= self.max_requests:
+            return False
+
+        if self._request_times and \
+                now - self._request_times[-1] < self.min_interval:
+            return False
+
+        self._request_times.append(now)
+        return True
+
+
+class _FakeContext:
+    """The common behaviour of the fake FutuOpenD connections.
+
+    Args:
+        latency (float | dict[float]): The latency in seconds of every
+            request, or a dict of latencies per endpoint. Default: 0.0.
+        rate_limits (dict[dict]): The frequency limits per endpoint, each
+            a dict of RateLimiter arguments. Default: None, meaning no
+            frequency limit.
+        clock (callable): A function returning the current time in
+            seconds. Default: time.monotonic.
+        sleep (callable): A function sleeping for a given number of
+            seconds. Default: time.sleep.
+    """
+    def __init__(self,
+                 latency=0.0,
+                 rate_limits=None,
+                 clock=time.monotonic,
+                 sleep=time.sleep):
+        self.latency = latency
+        self.clock = clock
+        self.sleep = sleep
+        self.request_counts = collections.Counter()
+        self._rate_limiters = {
+            endpoint: RateLimiter(clock=clock, **limits)
+            for endpoint, limits in (rate_limits or {}).items()
+        }
+
+    def close(self):
+        """Close the fake connection."""
+        pass
+
+    def _request(self, endpoint):
+        """Simulate the latency and frequency limit of a request.
+
+        Args:
+            endpoint (str): The name of the Futu API.
+
+        Returns:
+            (str | None): An error message if the frequency limit is
+                exceeded, otherwise None.
+        """
+        self.request_counts[endpoint] += 1
+
+        if isinstance(self.latency, dict):
+            latency = self.latency.get(endpoint, 0.0)
+        else:
+            latency = self.latency
+
+        if latency > 0:
+            self.sleep(latency)
+
+        rate_limiter = self._rate_limiters.get(endpoint)
+        if rate_limiter is not None and not rate_limiter.acquire():
+            return (f'Frequency limitation: {endpoint} allows at most '
+                    f'{rate_limiter.max_requests} requests per '
+                    f'{rate_limiter.period} seconds.')
+
+        return None
+
+
+class FakeQuoteContext(_FakeContext):
+    """An in-process stand-in for the Futu OpenQuoteContext.
+
+    Candlesticks are served from recorded or synthetic 1-minute data, and
+    other candlestick types are aggregated from it on demand.
+
+    Args:
+        klines (pd.DataFrame): A pandas dataframe of 1-minute
+            candlesticks with the same columns as the Futu API
+            request_history_kline(), e.g. from
+            generate_synthetic_klines() or a recorded csv file.
+        stock_names (dict[str]): The names of codes. Default: None,
+            meaning the code is used as its name.
+        lot_sizes (dict[int]): The lot sizes of codes. Default: None,
+            meaning a lot size of 100 for every code.
+        latency (float | dict[float]): See _FakeContext. Default: 0.0.
+        rate_limits (dict[dict]): See _FakeContext.
+            Default: QUOTE_RATE_LIMITS.
+        clock (callable): See _FakeContext. Default: time.monotonic.
+        sleep (callable): See _FakeContext. Default: time.sleep.
+    """
+    def __init__(self,
+                 klines,
+                 stock_names=None,
+                 lot_sizes=None,
+                 latency=0.0,
+                 rate_limits=QUOTE_RATE_LIMITS,
+                 clock=time.monotonic,
+                 sleep=time.sleep):
+        super().__init__(latency=latency,
+                         rate_limits=rate_limits,
+                         clock=clock,
+                         sleep=sleep)
+
+        if not isinstance(klines, pd.DataFrame):
+            raise TypeError(f'Only pd.DataFrame type is supported for '
+                            f'klines, but got {type(klines)}')
+
+        self.stock_names = stock_names or {}
+        self.lot_sizes = lot_sizes or {}
+        self._klines = {}
+        self._add_klines(KLType.K_1M, klines)
+
+    def request_history_kline(self,
+                              code,
+                              start=None,
+                              end=None,
+                              ktype=KLType.K_DAY,
+                              max_count=1000,
+                              page_req_key=None,
+                              **kwargs):
+        """Get the candlesticks of code between start and end.
+
+        Returns:
+            (tuple): (ret, data, page_req_key) as the Futu API.
+        """
+        error = self._request('request_history_kline')
+        if error is not None:
+            return RET_ERROR, error, None
+
+        if ktype not in self._klines:
+            try:
+                self._add_klines(ktype, resample_klines(self.klines, ktype))
+            except ValueError as e:
+                return RET_ERROR, str(e), None
+
+        if code not in self._klines[ktype]:
+            return RET_ERROR, f'Unknown stock {code}', None
+
+        code_klines, time_keys = self._klines[ktype][code]
+
+        first = 0 if start is None else np.searchsorted(
+            time_keys, np.datetime64(pd.to_datetime(start)), side='left')
+        last = len(time_keys) if end is None else np.searchsorted(
+            time_keys, np.datetime64(pd.to_datetime(end)), side='right')
+
+        if page_req_key is not None:
+            first = page_req_key
+
+        next_page_req_key = None
+        if last - first > max_count:
+            next_page_req_key = first + max_count
+            last = next_page_req_key
+
+        data = code_klines.iloc[first:last].reset_index(drop=True)
+
+        return RET_OK, data, next_page_req_key
+
+    def get_market_state(self, code_list):
+        """Get the market states of codes.
+
+        Returns:
+            (tuple): (ret, data) as the Futu API.
+        """
+        error = self._request('get_market_state')
+        if error is not None:
+            return RET_ERROR, error
+
+        stock_names = [self._get_stock_name(code) for code in code_list]
+        data = pd.DataFrame({
+            'code': code_list,
+            'stock_name': stock_names,
+            'market_state': MarketState.NONE,
+        })
+
+        return RET_OK, data
+
+    def get_stock_basicinfo(self, market, stock_type, code_list=None):
+        """Get the basic information of codes.
+
+        Returns:
+            (tuple): (ret, data) as the Futu API.
+        """
+        error = self._request('get_stock_basicinfo')
+        if error is not None:
+            return RET_ERROR, error
+
+        if code_list is None:
+            code_list = list(self._klines[KLType.K_1M].keys())
+
+        stock_names = [self._get_stock_name(code) for code in code_list]
+        lot_sizes = [self.lot_sizes.get(code, 100) for code in code_list]
+        data = pd.DataFrame({
+            'code': code_list,
+            'name': stock_names,
+            'lot_size': lot_sizes,
+            'stock_type': stock_type,
+        })
+
+        return RET_OK, data
+
+    @property
+    def klines(self):
+        """Getter of the 1-minute candlesticks of all codes."""
+        code_klines = [
+            klines for klines, _ in self._klines[KLType.K_1M].values()
+        ]
+        return pd.concat(code_klines, ignore_index=True)
+
+    def _add_klines(self, ktype, klines):
+        """Index the candlesticks of ktype by code for fast lookup."""
+        self._klines[ktype] = {}
+
+        for code, code_klines in klines.groupby('code', sort=False):
+            code_klines = code_klines.sort_values('time_key').reset_index(
+                drop=True)
+            time_keys = pd.to_datetime(code_klines['time_key']).values
+            self._klines[ktype][code] = (code_klines, time_keys)
+
+    def _get_stock_name(self, code):
+        """Get the name of code."""
+        return self.stock_names.get(code, code)
+
+
+class FakeTradeContext(_FakeContext):
+    """An in-process stand-in for the Futu OpenSecTradeContext.
+
+    The fake keeps a cash balance, positions and orders in memory. Orders
+    are either filled immediately at the order price (fill_orders=True)
+    or left pending with status SUBMITTED until they are filled with
+    fill_order() or cancelled.
+
+    Args:
+        cash (float): The initial cash. Default: 1000000.0.
+        positions (dict[dict]): The initial positions with keys 'code'
+            and values dicts with keys 'qty' and 'cost_price'.
+            Default: None, meaning no position.
+        fill_orders (bool): Whether to fill orders immediately.
+            Default: True.
+        now (callable): A function returning the current datetime used
+            as order times. Default: datetime.now.
+        latency (float | dict[float]): See _FakeContext. Default: 0.0.
+        rate_limits (dict[dict]): See _FakeContext.
+            Default: TRADE_RATE_LIMITS.
+        clock (callable): See _FakeContext. Default: time.monotonic.
+        sleep (callable): See _FakeContext. Default: time.sleep.
+    """
+    def __init__(self,
+                 cash=1000000.0,
+                 positions=None,
+                 fill_orders=True,
+                 now=datetime.now,
+                 latency=0.0,
+                 rate_limits=TRADE_RATE_LIMITS,
+                 clock=time.monotonic,
+                 sleep=time.sleep):
+        super().__init__(latency=latency,
+                         rate_limits=rate_limits,
+                         clock=clock,
+                         sleep=sleep)
+
+        self.cash = float(cash)
+        self.fill_orders = fill_orders
+        self.now = now
+        self.positions = {}
+        self.orders = []
+        self._next_order_id = 1
+
+        for code, position in (positions or {}).items():
+            self.positions[code] = {
+                'qty': float(position['qty']),
+                'cost_price': float(position['cost_price']),
+                'nominal_price': float(position['cost_price']),
+            }
+
+    def get_acc_list(self):
+        """Get the list of trading accounts.
+
+        Returns:
+            (tuple): (ret, data) as the Futu API.
+        """
+        error = self._request('get_acc_list')
+        if error is not None:
+            return RET_ERROR, error
+
+        data = pd.DataFrame([{
+            'acc_id': 1,
+            'trd_env': TrdEnv.SIMULATE,
+            'acc_type': 'CASH',
+            'card_num': 'N/A',
+            'security_firm': 'FUTUSECURITIES',
+            'sim_acc_type': 'STOCK',
+            'trdmarket_auth': ['HK'],
+        }])
+
+        return RET_OK, data
+
+    def unlock_trade(self, password=None, password_md5=None, is_unlock=True):
+        """Unlock the trading account.
+
+        Returns:
+            (tuple): (ret, data) as the Futu API.
+        """
+        error = self._request('unlock_trade')
+        if error is not None:
+            return RET_ERROR, error
+
+        return RET_OK, None
+
+    def accinfo_query(self, trd_env=TrdEnv.REAL, **kwargs):
+        """Get the fund data of the trading account.
+
+        Returns:
+            (tuple): (ret, data) as the Futu API.
+        """
+        error = self._request('accinfo_query')
+        if error is not None:
+            return RET_ERROR, error
+
+        market_value = self.market_value
+
+        data = pd.DataFrame([{
+            'power': self.cash,
+            'max_power_short': 0.0,
+            'net_cash_power': self.cash,
+            'total_assets': self.cash + market_value,
+            'cash': self.cash,
+            'market_val': market_value,
+        }])
+
+        return RET_OK, data
+
+    def position_list_query(self, code='', trd_env=TrdEnv.REAL, **kwargs):
+        """Get the holding positions of the trading account.
+
+        Returns:
+            (tuple): (ret, data) as the Futu API.
+        """
+        error = self._request('position_list_query')
+        if error is not None:
+            return RET_ERROR, error
+
+        rows = []
+        for position_code, position in self.positions.items():
+            if position['qty'] == 0 or code not in ('', position_code):
+                continue
+
+            market_value = position['qty'] * position['nominal_price']
+            cost_value = position['qty'] * position['cost_price']
+
+            rows.append({
+                'code': position_code,
+                'stock_name': position_code,
+                'position_side': PositionSide.LONG,
+                'qty': position['qty'],
+                'cost_price': position['cost_price'],
+                'market_val': market_value,
+                'nominal_price': position['nominal_price'],
+                'pl_ratio': (market_value / cost_value - 1) * 100,
+                'pl_val': market_value - cost_value,
+            })
+
+        return RET_OK, pd.DataFrame(rows)
+
+    def acctradinginfo_query(self,
+                             order_type,
+                             code,
+                             price,
+                             trd_env=TrdEnv.REAL,
+                             **kwargs):
+        """Get the maximum quantities that can be bought or sold.
+
+        Returns:
+            (tuple): (ret, data) as the Futu API.
+        """
+        error = self._request('acctradinginfo_query')
+        if error is not None:
+            return RET_ERROR, error
+
+        max_cash_buy = float(np.floor(self.cash / price)) if price > 0 else 0.0
+
+        data = pd.DataFrame([{
+            'max_cash_buy': max_cash_buy,
+            'max_cash_and_margin_buy': max_cash_buy,
+            'max_position_sell': self._get_qty(code),
+            'max_sell_short': 0.0,
+            'max_buy_back': 0.0,
+        }])
+
+        return RET_OK, data
+
+    def place_order(self,
+                    price,
+                    qty,
+                    code,
+                    trd_side,
+                    order_type=OrderType.NORMAL,
+                    trd_env=TrdEnv.REAL,
+                    **kwargs):
+        """Place an order.
+
+        Returns:
+            (tuple): (ret, data) as the Futu API.
+        """
+        error = self._request('place_order')
+        if error is not None:
+            return RET_ERROR, error
+
+        if trd_side == TrdSide.BUY and price * qty > self.cash:
+            return RET_ERROR, 'Insufficient buying power'
+
+        if trd_side == TrdSide.SELL and qty > self._get_qty(code):
+            return RET_ERROR, 'Insufficient position'
+
+        order_time = self.now().strftime('%Y-%m-%d %H:%M:%S')
+
+        order = {
+            'order_id': str(self._next_order_id),
+            'code': code,
+            'stock_name': code,
+            'trd_side': trd_side,
+            'order_type': order_type,
+            'qty': float(qty),
+            'order_status': OrderStatus.SUBMITTED,
+            'price': float(price),
+            'currency': 'HKD',
+            'create_time': order_time,
+            'updated_time': order_time,
+            'dealt_qty': 0.0,
+            'dealt_avg_price': 0.0,
+        }
+        self._next_order_id += 1
+        self.orders.append(order)
+
+        if self.fill_orders:
+            self.fill_order(order_id=order['order_id'])
+
+        return RET_OK, pd.DataFrame([order], columns=ORDER_COLUMNS)
+
+    def fill_order(self, order_id, price=None):
+        """Fill a pending order.
+
+        Args:
+            order_id (str): The ID of order.
+            price (float): The fill price. Default: None, meaning the
+                order price.
+
+        Returns:
+            order (dict): The filled order.
+        """
+        order = self._get_order(order_id)
+
+        if price is None:
+            price = order['price']
+
+        qty = order['qty']
+        position = self.positions.setdefault(order['code'], {
+            'qty': 0.0,
+            'cost_price': 0.0,
+            'nominal_price': price,
+        })
+
+        if order['trd_side'] == TrdSide.BUY:
+            total_cost = position['qty'] * position['cost_price'] + qty * price
+            position['qty'] += qty
+            position['cost_price'] = total_cost / position['qty']
+            self.cash -= qty * price
+        else:
+            position['qty'] -= qty
+            self.cash += qty * price
+
+        position['nominal_price'] = price
+
+        order['order_status'] = OrderStatus.FILLED_ALL
+        order['dealt_qty'] = qty
+        order['dealt_avg_price'] = price
+        order['updated_time'] = self.now().strftime('%Y-%m-%d %H:%M:%S')
+
+        return order
+
+    def mark_prices(self, prices):
+        """Update the nominal prices of positions.
+
+        Args:
+            prices (dict[float]): The latest prices with keys 'code'.
+        """
+        for code, price in prices.items():
+            if code in self.positions:
+                self.positions[code]['nominal_price'] = float(price)
+
+    def order_list_query(self,
+                         code='',
+                         status_filter_list=[],
+                         trd_env=TrdEnv.REAL,
+                         **kwargs):
+        """Get today's orders.
+
+        Returns:
+            (tuple): (ret, data) as the Futu API.
+        """
+        error = self._request('order_list_query')
+        if error is not None:
+            return RET_ERROR, error
+
+        today = self.now().strftime('%Y-%m-%d')
+        orders = []
+        for order in self.orders:
+            if not order['create_time'].startswith(today):
+                continue
+            if code not in ('', order['code']):
+                continue
+            if status_filter_list and \
+                    order['order_status'] not in status_filter_list:
+                continue
+            orders.append(order)
+
+        return RET_OK, pd.DataFrame(orders, columns=ORDER_COLUMNS)
+
+    def history_order_list_query(self, trd_env=TrdEnv.REAL, **kwargs):
+        """Get all the orders.
+
+        Returns:
+            (tuple): (ret, data) as the Futu API.
+        """
+        error = self._request('history_order_list_query')
+        if error is not None:
+            return RET_ERROR, error
+
+        return RET_OK, pd.DataFrame(self.orders, columns=ORDER_COLUMNS)
+
+    def modify_order(self,
+                     modify_order_op,
+                     order_id,
+                     qty,
+                     price,
+                     trd_env=TrdEnv.REAL,
+                     **kwargs):
+        """Modify or cancel an order.
+
+        Only cancelling is supported by the fake.
+
+        Returns:
+            (tuple): (ret, data) as the Futu API.
+        """
+        error = self._request('modify_order')
+        if error is not None:
+            return RET_ERROR, error
+
+        if modify_order_op != ModifyOrderOp.CANCEL:
+            return RET_ERROR, f'Unsupported modify_order_op {modify_order_op}'
+
+        order = self._get_order(order_id)
+        if order['order_status'] not in (OrderStatus.SUBMITTING,
+                                         OrderStatus.SUBMITTED):
+            return RET_ERROR, f'Order {order_id} cannot be cancelled'
+
+        order['order_status'] = OrderStatus.CANCELLED_ALL
+        order['updated_time'] = self.now().strftime('%Y-%m-%d %H:%M:%S')
+
+        return RET_OK, pd.DataFrame([{'order_id': order_id}])
+
+    def cancel_all_order(self, trd_env=TrdEnv.REAL, **kwargs):
+        """Cancel all pending orders.
+
+        Returns:
+            (tuple): (ret, data) as the Futu API.
+        """
+        error = self._request('cancel_all_order')
+        if error is not None:
+            return RET_ERROR, error
+
+        for order in self.orders:
+            if order['order_status'] in (OrderStatus.SUBMITTING,
+                                         OrderStatus.SUBMITTED):
+                order['order_status'] = OrderStatus.CANCELLED_ALL
+
+        return RET_OK, None
+
+    @property
+    def market_value(self):
+        """Getter of the total market value of positions."""
+        return float(
+            sum(position['qty'] * position['nominal_price']
+                for position in self.positions.values()))
+
+    def _get_qty(self, code):
+        """Get the holding quantity of code."""
+        if code in self.positions:
+            return self.positions[code]['qty']
+        return 0.0
+
+    def _get_order(self, order_id):
+        """Get the order with order_id."""
+        for order in self.orders:
+            if order['order_id'] == order_id:
+                return order
+        raise KeyError(f'Order {order_id} does not exist')
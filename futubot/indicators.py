@@ -1,16 +1,50 @@
 class Indicators:
     """Implementation of common technical indicators.
 
+    The indicators are calculated on the frame of one timeframe of the
+    stockframe. The indicators of the other timeframes are registered on
+    the Indicators objects returned by timeframe(), which are refreshed
+    together with this one.
+
     Args:
         stockframe (StockFrame): A stockframe object for which the
             indicators are calculated.
+        ktype (KLType): The type of candlestick of the frame for which
+            the indicators are calculated, see StockFrame.get_frame().
+            Default: None, meaning that of the stockframe.
     """
-    def __init__(self, stockframe):
+    def __init__(self, stockframe, ktype=None):
         self.stockframe = stockframe
-        self.frame = stockframe.frame
-        self.code_list = stockframe.frame.index.get_level_values(0).to_list()
-        self.code_groups = stockframe.code_groups
+        self.ktype = ktype
+        self.frame = stockframe.get_frame(ktype)
+        self.code_list = self.frame.index.get_level_values(
+            0).unique().to_list()
+        self.code_groups = stockframe.get_code_groups(ktype)
         self.current_indicators = {}
+        # The indicators of the other timeframes by type of candlestick.
+        self.timeframes = {}
+
+    def timeframe(self, ktype):
+        """Get the indicators of another timeframe of the stockframe.
+
+        Args:
+            ktype (KLType): The type of candlestick of the timeframe.
+
+        Returns:
+            (Indicators): The Indicators object of the timeframe, which
+                is refreshed by refresh().
+
+        Examples:
+        >>> indicator_client.timeframe(KLType.K_5M).rsi(period=14)
+        >>> stockframe.get_frame(KLType.K_5M)['rsi_14']
+        """
+        if ktype is None or ktype == self.ktype:
+            return self
+        if ktype not in self.timeframes:
+            self.timeframes[ktype] = Indicators(stockframe=self.stockframe,
+                                                ktype=ktype)
+
+        return self.timeframes[ktype]
 
     def change_in_price(self, indicator='change_in_price'):
         """Calculate the change in price.
@@ -312,11 +346,19 @@ class Indicators:
             lambda x: x.rolling(window=period).std())
 
     def refresh(self):
-        """Refresh the current indicators after new rows are added."""
-        self.code_groups = self.stockframe.code_groups
+        """Refresh the current indicators after new rows are added.
+
+        The indicators of the other timeframes are refreshed as well.
+        """
+        # The resampled frames are replaced when new rows are added.
+        self.frame = self.stockframe.get_frame(self.ktype)
+        self.code_groups = self.stockframe.get_code_groups(self.ktype)
 
         for indicator in self.current_indicators:
 
             indicator_arguments = self.current_indicators[indicator]['args']
             indicator_function = self.current_indicators[indicator]['func']
             indicator_function(**indicator_arguments)
+
+        for indicator_client in self.timeframes.values():
+            indicator_client.refresh()
@@ -0,0 +1,233 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+ORDER = 0
+FILL = 1
+RECORD_KINDS = {ORDER: 'ORDER', FILL: 'FILL'}
+
+JOURNAL_DTYPE = np.dtype([
+    ('time', 'datetime64[ms]'),
+    ('kind', 'i1'),
+    ('order_id', 'U32'),
+    ('code', 'U16'),
+    ('trd_side', 'U8'),
+    ('qty', 'f8'),
+    ('price', 'f8'),
+    ('order_status', 'U16'),
+])
+
+
+class TradeJournal:
+    """Append-only journal of orders and fills.
+
+    Every order and fill is a record of JOURNAL_DTYPE appended to an
+    in-memory array and, if path is given, to the end of the journal
+    file, which is never rewritten. On restart the file is mapped with
+    np.memmap and loaded in one copy, and a partial record left by a
+    crash during an append is dropped. The aggregations run on the
+    record array with a few vectorized group sums.
+
+    Args:
+        path (str): The path of the journal file. Default: None, meaning
+            that the journal is only kept in memory.
+    """
+    def __init__(self, path=None):
+        if path is not None and not isinstance(path, str):
+            raise TypeError(f'Only str type is supported for path, '
+                            f'but got {type(path)}')
+
+        self.path = path
+        self._records = np.zeros(16, dtype=JOURNAL_DTYPE)
+        self._size = 0
+
+        if path is not None and os.path.exists(path):
+            self._load()
+
+    def __len__(self):
+        return self._size
+
+    def record_order(self, order_info):
+        """Append an order.
+
+        Args:
+            order_info (dict): The order info returned by
+                Accounts.place_order(), with at least the keys code,
+                trd_side, qty and price.
+        """
+        if not isinstance(order_info, dict):
+            raise TypeError(f'Only dict type is supported for order_info, '
+                            f'but got {type(order_info)}')
+
+        self._append(kind=ORDER,
+                     time=order_info.get('updated_time')
+                     or order_info.get('create_time'),
+                     order_id=order_info.get('order_id', ''),
+                     code=order_info['code'],
+                     trd_side=order_info['trd_side'],
+                     qty=order_info['qty'],
+                     price=order_info['price'],
+                     order_status=order_info.get('order_status', ''))
+
+    def record_fill(self, code, qty, price, order_id='', time=None):
+        """Append a fill.
+
+        Args:
+            code (str): The code of security.
+            qty (int | float): The quantity filled, positive for buys and
+                negative for sells.
+            price (int | float): The fill price.
+            order_id (str): The id of the order filled. Default: ''.
+            time (str): The time of the fill. Format: yyyy-MM-dd
+                HH:mm:ss. Default: None, meaning now.
+        """
+        if not isinstance(qty, (int, float)):
+            raise TypeError(f'Only int or float type is supported for qty, '
+                            f'but got {type(qty)}')
+
+        self._append(kind=FILL,
+                     time=time,
+                     order_id=order_id,
+                     code=code,
+                     trd_side='BUY' if qty > 0 else 'SELL',
+                     qty=abs(qty),
+                     price=price,
+                     order_status='')
+
+    def records(self, kind=None, since=None):
+        """Get the records of the journal.
+
+        Args:
+            kind (int): ORDER or FILL. Default: None, meaning both.
+            since (str): The earliest time of the records. Format:
+                yyyy-MM-dd HH:mm:ss. Default: None, meaning all.
+
+        Returns:
+            (np.ndarray): A read-only array of JOURNAL_DTYPE.
+        """
+        records = self._records[:self._size]
+        mask = np.ones(self._size, dtype=bool)
+        if kind is not None:
+            mask &= records['kind'] == kind
+        if since is not None:
+            mask &= records['time'] >= np.datetime64(pd.Timestamp(since), 'ms')
+        records = records[mask]
+        records.flags.writeable = False
+
+        return records
+
+    def to_frame(self, kind=None, since=None):
+        """Get the records of the journal as a dataframe.
+
+        Args:
+            kind (int): ORDER or FILL. Default: None, meaning both.
+            since (str): The earliest time of the records. Default: None,
+                meaning all.
+
+        Returns:
+            (pd.DataFrame): A dataframe with the fields of JOURNAL_DTYPE
+                as columns, of which time is formatted as yyyy-MM-dd
+                HH:mm:ss and kind is ORDER or FILL.
+        """
+        frame = pd.DataFrame(self.records(kind=kind, since=since))
+        frame['time'] = frame['time'].dt.strftime('%Y-%m-%d %H:%M:%S')
+        frame['kind'] = frame['kind'].map(RECORD_KINDS)
+
+        return frame
+
+    def aggregate(self, since=None):
+        """Aggregate the fills by code.
+
+        The buys and sells of each code are matched at their average
+        prices, as if the code had no position at the start of the
+        journal.
+
+        Args:
+            since (str): The earliest time of the fills. Default: None,
+                meaning all.
+
+        Returns:
+            (pd.DataFrame): A dataframe indexed by code with columns
+                buy_qty, sell_qty, net_qty, turnover (the value bought
+                and sold), average_cost (the average price of the net
+                position) and realized_pnl (of the matched quantity).
+        """
+        fills = self.records(kind=FILL, since=since)
+        codes, inverse = np.unique(fills['code'], return_inverse=True)
+        is_buy = fills['trd_side'] == 'BUY'
+        value = fills['qty'] * fills['price']
+
+        def group_sum(weights):
+            return np.bincount(inverse, weights=weights, minlength=len(codes))
+
+        buy_qty = group_sum(np.where(is_buy, fills['qty'], 0.0))
+        sell_qty = group_sum(np.where(is_buy, 0.0, fills['qty']))
+        buy_value = group_sum(np.where(is_buy, value, 0.0))
+        sell_value = group_sum(np.where(is_buy, 0.0, value))
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            average_buy_price = np.nan_to_num(buy_value / buy_qty)
+            average_sell_price = np.nan_to_num(sell_value / sell_qty)
+        net_qty = buy_qty - sell_qty
+        matched_qty = np.minimum(buy_qty, sell_qty)
+        realized_pnl = matched_qty * (average_sell_price - average_buy_price)
+        average_cost = np.select([net_qty > 0, net_qty < 0],
+                                 [average_buy_price, average_sell_price], 0.0)
+
+        aggregates = pd.DataFrame(
+            {
+                'buy_qty': buy_qty,
+                'sell_qty': sell_qty,
+                'net_qty': net_qty,
+                'turnover': buy_value + sell_value,
+                'average_cost': average_cost,
+                'realized_pnl': realized_pnl,
+            },
+            index=pd.Index(codes, name='code'))
+
+        return aggregates
+
+    def _append(self, kind, time, order_id, code, trd_side, qty, price,
+                order_status):
+        """Append a record to the array and to the journal file."""
+        if self._size == len(self._records):
+            self._records = np.resize(self._records, 2 * self._size)
+
+        record = self._records[self._size:self._size + 1]
+        record['time'] = np.datetime64(pd.Timestamp(time or 'now'), 'ms')
+        record['kind'] = kind
+        record['order_id'] = str(order_id)
+        record['code'] = code
+        record['trd_side'] = str(trd_side)
+        record['qty'] = qty
+        record['price'] = price
+        record['order_status'] = str(order_status)
+        self._size += 1
+
+        if self.path is not None:
+            directory = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(directory, exist_ok=True)
+            with open(self.path, 'ab') as f:
+                f.write(record.tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+
+    def _load(self):
+        """Load the records of the journal file."""
+        n_records, partial = divmod(os.path.getsize(self.path),
+                                    JOURNAL_DTYPE.itemsize)
+        if partial:
+            # The partial record of an interrupted append.
+            os.truncate(self.path, n_records * JOURNAL_DTYPE.itemsize)
+        if n_records == 0:
+            return
+
+        records = np.memmap(self.path,
+                            dtype=JOURNAL_DTYPE,
+                            mode='r',
+                            shape=(n_records, ))
+        self._records = np.zeros(max(16, 2 * n_records), dtype=JOURNAL_DTYPE)
+        self._records[:n_records] = records
+        self._size = n_records
+        del records
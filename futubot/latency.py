@@ -0,0 +1,205 @@
+import contextlib
+import json
+import math
+import threading
+import time
+
+import numpy as np
+
+
+class LatencyHistogram:
+    """A histogram of latencies in logarithmic buckets.
+
+    Recording a latency only increments the count of its bucket, so that
+    it is cheap enough for every stage of every bar. The buckets grow
+    geometrically from min_latency to max_latency, so that the percentiles
+    are within a relative error of growth - 1 on any scale. Latencies out
+    of range are counted in the first or last bucket.
+
+    Args:
+        min_latency (float): The upper bound in seconds of the first
+            bucket. Default: 1e-6.
+        max_latency (float): The lower bound in seconds of the last
+            bucket. Default: 1000.0.
+        growth (float): The ratio between the bounds of a bucket.
+            Default: 1.05.
+    """
+    def __init__(self, min_latency=1e-6, max_latency=1000.0, growth=1.05):
+        assert 0 < min_latency < max_latency, \
+            f'min_latency must be greater than 0 and less than ' \
+            f'max_latency, but got {min_latency} and {max_latency}'
+        assert growth > 1, f'growth must be greater than 1, but got {growth}'
+
+        self.min_latency = min_latency
+        self._log_growth = math.log(growth)
+        n_buckets = math.ceil(
+            math.log(max_latency / min_latency) / self._log_growth) + 2
+        # The upper bound of each bucket.
+        self.bounds = min_latency * np.power(growth, np.arange(n_buckets))
+        self.counts = np.zeros(n_buckets, dtype=np.int64)
+
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, latency):
+        """Record a latency.
+
+        Args:
+            latency (float): The latency in seconds.
+        """
+        if latency <= self.min_latency:
+            index = 0
+        else:
+            index = min(
+                math.ceil(
+                    math.log(latency / self.min_latency) / self._log_growth),
+                len(self.counts) - 1)
+
+        self.counts[index] += 1
+        self.count += 1
+        self.total += latency
+        self.max = max(self.max, latency)
+
+    def percentile(self, q):
+        """Get a percentile of the recorded latencies.
+
+        Args:
+            q (float): The percentile between 0 and 100.
+
+        Returns:
+            (float): The upper bound of the bucket of the percentile in
+                seconds, capped at the maximum latency, or NaN if nothing
+                has been recorded.
+        """
+        assert 0 <= q <= 100, f'q must be between 0 and 100, but got {q}'
+        if self.count == 0:
+            return math.nan
+
+        rank = max(math.ceil(q / 100 * self.count), 1)
+        index = np.searchsorted(np.cumsum(self.counts), rank)
+
+        return min(float(self.bounds[index]), self.max)
+
+    def summary(self):
+        """Summarize the recorded latencies.
+
+        Returns:
+            summary (dict): A dict with the following keys:
+                count (int): The number of latencies recorded.
+                mean (float): The mean latency in seconds.
+                p50 (float): The median latency in seconds.
+                p99 (float): The 99th percentile latency in seconds.
+                max (float): The maximum latency in seconds.
+        """
+        summary = {
+            'count': self.count,
+            'mean': self.total / self.count if self.count else math.nan,
+            'p50': self.percentile(50),
+            'p99': self.percentile(99),
+            'max': self.max,
+        }
+
+        return summary
+
+
+class LatencyRecorder:
+    """Record the latency of each stage of the trading loop.
+
+    Each stage has its own LatencyHistogram, timed with time() or recorded
+    with record(). The recorder is shared by the threads of the trading
+    loop, and stats() summarizes all the stages. report() writes the
+    stats every interval seconds, as a JSON line appended to path or
+    printed if there is no path.
+
+    Args:
+        path (str): The file to which the stats are appended.
+            Default: None, meaning the stats are printed.
+        interval (float): The minimum number of seconds between two
+            reports. Default: 60.0.
+    """
+    def __init__(self, path=None, interval=60.0):
+        assert interval >= 0, \
+            f'interval must not be negative, but got {interval}'
+
+        self.path = path
+        self.interval = interval
+        self.histograms = {}
+
+        self._lock = threading.Lock()
+        self._last_report = time.monotonic()
+
+    def record(self, stage, latency):
+        """Record the latency of a stage.
+
+        Args:
+            stage (str): The name of the stage, e.g. bar_fetch.
+            latency (float): The latency in seconds.
+        """
+        with self._lock:
+            if stage not in self.histograms:
+                self.histograms[stage] = LatencyHistogram()
+            self.histograms[stage].record(latency)
+
+    @contextlib.contextmanager
+    def time(self, stage):
+        """Time the code run within the context as a stage.
+
+        Args:
+            stage (str): The name of the stage.
+
+        Examples:
+        >>> with recorder.time('signal_calc'):
+        ...     buy_sell_signals = strategy.calculate_buy_sell_signals()
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, time.perf_counter() - start)
+
+    def stats(self):
+        """Get the summaries of all the stages.
+
+        Returns:
+            stats (dict[dict]): A dict of summaries with the names of the
+                stages as keys. See LatencyHistogram.summary().
+        """
+        with self._lock:
+            return {
+                stage: histogram.summary()
+                for stage, histogram in self.histograms.items()
+            }
+
+    def report(self, force=False):
+        """Write the stats if interval seconds have passed since the last.
+
+        Args:
+            force (bool): Whether to write the stats regardless of the
+                interval. Default: False.
+
+        Returns:
+            bool: True if the stats are written, otherwise False.
+        """
+        now = time.monotonic()
+        if not force and now - self._last_report < self.interval:
+            return False
+        self._last_report = now
+
+        stats = self.stats()
+        if self.path is None:
+            print('Latency (ms):')
+            for stage, summary in stats.items():
+                print(f'  {stage}: count={summary["count"]} '
+                      f'p50={summary["p50"] * 1e3:.3f} '
+                      f'p99={summary["p99"] * 1e3:.3f} '
+                      f'max={summary["max"] * 1e3:.3f}')
+        else:
+            record = {
+                'time': time.strftime('%Y-%m-%d %H:%M:%S'),
+                'stats': stats,
+            }
+            with open(self.path, 'a') as f:
+                f.write(json.dumps(record) + '\n')
+
+        return True
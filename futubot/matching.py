@@ -0,0 +1,264 @@
+import numpy as np
+import pandas as pd
+from futu import OrderStatus, OrderType, TrdSide
+
+# The columns of candlesticks required by the MatchingEngine.
+BAR_COLUMNS = ['time_key', 'code', 'open', 'high', 'low', 'volume']
+
+
+class MatchingEngine:
+    """Fill orders locally against the subsequent candlesticks.
+
+    An order is matched against the bars of its code strictly after its
+    create_time, in time order:
+        - A market order fills at the open price of each bar, plus
+          slippage for a buy and minus slippage for a sell.
+        - A limit buy fills on a bar whose low price touches the order
+          price, at the open price plus slippage but never above the order
+          price. A limit sell fills on a bar whose high price touches the
+          order price, at the open price minus slippage but never below
+          the order price.
+    The quantity filled on each bar is capped at participation_rate of the
+    volume of the bar, rounded down to board lots, and the cap is shared
+    by all the orders of a code in the order of their create_time, so an
+    order larger than the cap is filled over several bars. As Futu orders
+    of the HK market, orders are valid for the day and the unfilled
+    quantity is cancelled after the last bar of the day.
+
+    The candlesticks are stored as numpy arrays sorted by code and time,
+    so that each order only looks at the bars it can fill on, and millions
+    of bars can be matched in seconds.
+
+    Args:
+        candles (pd.DataFrame): The candlesticks with columns time_key,
+            code, open, high, low and volume, e.g. the klines of
+            request_history_kline() or StockFrame.frame.reset_index().
+        slippage (float): The slippage in ratio terms of the fill price.
+            Default: 0.0.
+        participation_rate (float): The maximum ratio of the volume of a
+            bar that can be filled. Default: 0.1.
+        lot_sizes (dict[float]): The lot sizes of codes. Default: None,
+            meaning a lot size of 1 share for every code.
+    """
+    def __init__(self,
+                 candles,
+                 slippage=0.0,
+                 participation_rate=0.1,
+                 lot_sizes=None):
+        if not isinstance(candles, pd.DataFrame):
+            raise TypeError(f'Only pd.DataFrame type is supported for '
+                            f'candles, but got {type(candles)}')
+        missing_columns = set(BAR_COLUMNS) - set(candles.columns)
+        if missing_columns:
+            raise ValueError(f'Missing columns {sorted(missing_columns)} '
+                             f'in candles')
+        assert slippage >= 0, \
+            f'slippage must not be negative, but got {slippage}'
+        assert 0 < participation_rate <= 1, (
+            f'participation_rate must be in (0, 1], '
+            f'but got {participation_rate}')
+
+        self.slippage = slippage
+        self.participation_rate = participation_rate
+
+        time_keys = pd.to_datetime(
+            candles['time_key']).to_numpy(dtype='datetime64[ns]')
+        codes, code_ids = np.unique(candles['code'].to_numpy(dtype=str),
+                                    return_inverse=True)
+
+        order = np.lexsort((time_keys, code_ids))
+        self.time_keys = time_keys[order]
+        self.open = candles['open'].to_numpy(dtype=np.float64)[order]
+        self.high = candles['high'].to_numpy(dtype=np.float64)[order]
+        self.low = candles['low'].to_numpy(dtype=np.float64)[order]
+        code_ids = code_ids[order]
+
+        # The bars of each code are stored in a contiguous slice.
+        starts = np.searchsorted(code_ids, np.arange(len(codes)))
+        ends = np.append(starts[1:], len(code_ids))
+        self._code_slices = {
+            code: (int(start), int(end))
+            for code, start, end in zip(codes, starts, ends)
+        }
+
+        lot_sizes = lot_sizes or {}
+        lots = np.array([lot_sizes.get(code, 1.0) for code in codes])[code_ids]
+        volume = candles['volume'].to_numpy(dtype=np.float64)[order]
+        # The remaining quantity that can be filled on each bar.
+        self.capacity = np.floor(volume * participation_rate / lots) * lots
+
+        # The index after the last bar of the day of each bar.
+        dates = self.time_keys.astype('datetime64[D]')
+        boundaries = np.flatnonzero((dates[1:] != dates[:-1])
+                                    | (code_ids[1:] != code_ids[:-1])) + 1
+        boundaries = np.append(boundaries, len(dates))
+        self._day_ends = boundaries[np.searchsorted(boundaries,
+                                                    np.arange(len(dates)),
+                                                    side='right')]
+
+        self._next_deal_id = 1
+
+    def match(self, order_infos):
+        """Match orders against the candlesticks after their create_time.
+
+        The orders are matched in the order of their create_time, and the
+        volume they fill is no longer available to later orders or calls.
+
+        Args:
+            order_infos (list[dict]): The orders as returned by
+                Accounts.place_order(). The keys trd_side, order_type,
+                order_id, code, qty, price and create_time are used.
+
+        Returns:
+            order_events (list[dict]): The updates of the orders in time
+                order, one per bar on which an order is filled or
+                cancelled. Each has the keys of Accounts.place_order() with
+                the order_status and updated_time of the update, plus
+                dealt_qty and dealt_avg_price.
+            deal_events (list[dict]): The deals in time order with keys
+                deal_id, order_id, code, stock_name, trd_side, qty, price
+                and create_time.
+        """
+        if not isinstance(order_infos, list):
+            raise TypeError(f'Only list type is supported for order_infos, '
+                            f'but got {type(order_infos)}')
+
+        order_infos = sorted(order_infos,
+                             key=lambda order_info: order_info['create_time'])
+
+        order_events = []
+        deal_events = []
+        for order_info in order_infos:
+            self._match_order(order_info, order_events, deal_events)
+
+        order_events.sort(key=lambda event: event['updated_time'])
+        deal_events.sort(key=lambda event: event['create_time'])
+
+        return order_events, deal_events
+
+    def _match_order(self, order_info, order_events, deal_events):
+        """Match a single order and append its events."""
+        code = order_info['code']
+        if code not in self._code_slices:
+            return
+        code_start, code_end = self._code_slices[code]
+
+        create_time = np.datetime64(pd.Timestamp(order_info['create_time']),
+                                    'ns')
+        start = code_start + np.searchsorted(
+            self.time_keys[code_start:code_end], create_time, side='right')
+        if start == code_end:
+            return
+        end = self._day_ends[start]
+
+        prices = self._get_fill_prices(order_info, start, end)
+        bars = start + np.flatnonzero(~np.isnan(prices)
+                                      & (self.capacity[start:end] > 0))
+
+        # Fill the capacity of each bar until the order quantity is filled.
+        fill_qtys = self.capacity[bars]
+        filled = np.cumsum(fill_qtys)
+        n_fills = min(
+            np.searchsorted(filled, order_info['qty']) + 1, len(bars))
+        bars = bars[:n_fills]
+        fill_qtys = fill_qtys[:n_fills]
+        if n_fills > 0 and filled[n_fills - 1] > order_info['qty']:
+            fill_qtys[-1] -= filled[n_fills - 1] - order_info['qty']
+        self.capacity[bars] -= fill_qtys
+
+        fill_prices = prices[bars - start]
+        fill_times = pd.DatetimeIndex(
+            self.time_keys[bars]).strftime('%Y-%m-%d %H:%M:%S')
+
+        dealt_qty = 0.0
+        dealt_value = 0.0
+        for qty, price, fill_time in zip(fill_qtys.tolist(),
+                                         fill_prices.tolist(), fill_times):
+            dealt_qty += qty
+            dealt_value += qty * price
+
+            if dealt_qty < order_info['qty']:
+                order_status = OrderStatus.FILLED_PART
+            else:
+                order_status = OrderStatus.FILLED_ALL
+
+            order_events.append(
+                self._create_order_event(order_info, order_status, fill_time,
+                                         dealt_qty, dealt_value))
+            deal_events.append({
+                'deal_id': str(self._next_deal_id),
+                'order_id': order_info['order_id'],
+                'code': code,
+                'stock_name': order_info.get('stock_name', code),
+                'trd_side': order_info['trd_side'],
+                'qty': qty,
+                'price': price,
+                'create_time': fill_time,
+            })
+            self._next_deal_id += 1
+
+        # Day orders are cancelled after the last bar of the day, if it
+        # has been matched.
+        if dealt_qty < order_info['qty'] and end < code_end:
+            if dealt_qty > 0:
+                order_status = OrderStatus.CANCELLED_PART
+            else:
+                order_status = OrderStatus.CANCELLED_ALL
+            cancel_time = pd.Timestamp(
+                self.time_keys[end - 1]).strftime('%Y-%m-%d %H:%M:%S')
+
+            order_events.append(
+                self._create_order_event(order_info, order_status, cancel_time,
+                                         dealt_qty, dealt_value))
+
+    def _get_fill_prices(self, order_info, start, end):
+        """Get the fill prices of an order on the bars in [start, end).
+
+        Returns:
+            (np.ndarray): The fill price on each bar, or NaN if the order
+                cannot be filled on the bar.
+        """
+        is_buy = order_info['trd_side'] in (TrdSide.BUY, TrdSide.BUY_BACK)
+        if is_buy:
+            prices = self.open[start:end] * (1 + self.slippage)
+        else:
+            prices = self.open[start:end] * (1 - self.slippage)
+
+        if order_info['order_type'] == OrderType.MARKET:
+            return prices
+
+        limit_price = order_info['price']
+        if is_buy:
+            prices = np.minimum(prices, limit_price)
+            prices[self.low[start:end] > limit_price] = np.nan
+        else:
+            prices = np.maximum(prices, limit_price)
+            prices[self.high[start:end] < limit_price] = np.nan
+
+        return prices
+
+    @staticmethod
+    def _create_order_event(order_info, order_status, updated_time, dealt_qty,
+                            dealt_value):
+        """Create an update of an order."""
+        if dealt_qty > 0:
+            dealt_avg_price = dealt_value / dealt_qty
+        else:
+            dealt_avg_price = 0.0
+
+        order_event = {
+            'trd_side': order_info['trd_side'],
+            'order_type': order_info['order_type'],
+            'order_status': order_status,
+            'order_id': order_info['order_id'],
+            'code': order_info['code'],
+            'stock_name': order_info.get('stock_name', order_info['code']),
+            'qty': order_info['qty'],
+            'price': order_info['price'],
+            'create_time': order_info['create_time'],
+            'updated_time': updated_time,
+            'dealt_qty': dealt_qty,
+            'dealt_avg_price': dealt_avg_price,
+        }
+
+        return order_event
@@ -0,0 +1,172 @@
+import numpy as np
+import pandas as pd
+
+
+class OnlineCovariance:
+    """The means, variances and covariances of returns updated online.
+
+    The state of every pair of codes is the number of observations of
+    both codes, the mean of each code over those observations and the sum
+    of the products of their deviations (the co-moment). A new observation
+    updates the state of the pairs of codes it contains with Welford's
+    algorithm in O(codes^2), however long the history is, and a batch of
+    observations is merged with the parallel algorithm of Chan et al.
+    Missing returns are skipped pairwise, so the statistics are the same
+    as pd.DataFrame.mean(), var() and cov() of the returns.
+
+    Args:
+        codes (list[str]): The codes known in advance. Other codes are
+            added as their returns arrive. Default: None.
+    """
+    def __init__(self, codes=None):
+        self.codes = []
+        self._index = {}
+        self.count = np.zeros((0, 0))
+        self.mean = np.zeros((0, 0))
+        self.comoment = np.zeros((0, 0))
+
+        self.add_codes(codes or [])
+
+    def add_codes(self, codes):
+        """Add codes without observations.
+
+        Args:
+            codes (list[str]): The codes, of which the known ones are
+                ignored.
+        """
+        new_codes = [code for code in codes if code not in self._index]
+        if not new_codes:
+            return
+
+        for code in new_codes:
+            self._index[code] = len(self.codes)
+            self.codes.append(code)
+
+        pad_width = ((0, len(new_codes)), (0, len(new_codes)))
+        self.count = np.pad(self.count, pad_width)
+        self.mean = np.pad(self.mean, pad_width)
+        self.comoment = np.pad(self.comoment, pad_width)
+
+    def update(self, returns):
+        """Add an observation of the returns of some codes.
+
+        Args:
+            returns (dict[float]): The returns with codes as keys. NaN
+                returns are skipped.
+        """
+        returns = {
+            code: value
+            for code, value in returns.items() if not np.isnan(value)
+        }
+        if not returns:
+            return
+        self.add_codes(list(returns))
+
+        index = np.array([self._index[code] for code in returns])
+        pairs = np.ix_(index, index)
+        x = np.fromiter(returns.values(), dtype=float, count=len(returns))
+
+        count = self.count[pairs] + 1
+        delta = x[:, None] - self.mean[pairs]
+        mean = self.mean[pairs] + delta / count
+
+        self.comoment[pairs] += delta * (x[None, :] - mean.T)
+        self.count[pairs] = count
+        self.mean[pairs] = mean
+
+    def update_batch(self, returns):
+        """Add a batch of observations of the returns.
+
+        Args:
+            returns (pd.DataFrame): The returns with an observation per
+                row and a code per column. NaN returns are skipped.
+        """
+        if not isinstance(returns, pd.DataFrame):
+            raise TypeError(f'Only pd.DataFrame type is supported for '
+                            f'returns, but got {type(returns)}')
+        if returns.empty:
+            return
+        self.add_codes(returns.columns.to_list())
+
+        x = returns.to_numpy(dtype=float)
+        observed = ~np.isnan(x)
+
+        # Shift each code by its mean, which leaves the co-moments
+        # unchanged, so that they are not lost to cancellation.
+        with np.errstate(invalid='ignore'):
+            shift = np.nan_to_num(
+                np.nanmean(np.where(observed, x, np.nan), axis=0))
+        x = np.where(observed, x - shift, 0.0)
+        observed = observed.astype(float)
+
+        count = observed.T @ observed
+        with np.errstate(divide='ignore', invalid='ignore'):
+            mean = np.where(count > 0, (x.T @ observed) / count, 0.0)
+        comoment = x.T @ x - count * mean * mean.T
+        mean += shift[:, None]
+
+        index = np.array([self._index[code] for code in returns.columns])
+        pairs = np.ix_(index, index)
+
+        total = self.count[pairs] + count
+        delta = mean - self.mean[pairs]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            weight = np.where(total > 0, count / total, 0.0)
+
+        self.comoment[pairs] += (comoment +
+                                 delta * delta.T * self.count[pairs] * weight)
+        self.mean[pairs] += delta * weight
+        self.count[pairs] = total
+
+    def copy(self):
+        """Copy the statistics.
+
+        Returns:
+            (OnlineCovariance): An independent copy of the statistics.
+        """
+        stats = OnlineCovariance()
+        stats.codes = list(self.codes)
+        stats._index = dict(self._index)
+        stats.count = self.count.copy()
+        stats.mean = self.mean.copy()
+        stats.comoment = self.comoment.copy()
+
+        return stats
+
+    def means(self):
+        """Get the mean returns.
+
+        Returns:
+            (pd.Series): The mean return of each code.
+        """
+        means = np.where(np.diag(self.count) > 0, np.diag(self.mean), np.nan)
+        return pd.Series(means, index=self.codes).sort_index()
+
+    def variances(self):
+        """Get the sample variances of the returns.
+
+        Returns:
+            (pd.Series): The variance of the returns of each code, or NaN
+                with less than two observations.
+        """
+        return pd.Series(np.diag(self._covariance()),
+                         index=self.codes).sort_index()
+
+    def covariance(self):
+        """Get the sample covariance matrix of the returns.
+
+        Returns:
+            (pd.DataFrame): The covariance matrix indexed by the sorted
+                codes, with NaN for the pairs with less than two
+                observations of both codes.
+        """
+        covariance = pd.DataFrame(self._covariance(),
+                                  index=self.codes,
+                                  columns=self.codes)
+        return covariance.sort_index(axis=0).sort_index(axis=1)
+
+    def _covariance(self):
+        """Get the covariance matrix in the order of self.codes."""
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(self.count > 1, self.comoment / (self.count - 1),
+                            np.nan)
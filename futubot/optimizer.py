@@ -0,0 +1,356 @@
+import numpy as np
+
+
+def _solve(covariance, b):
+    """Solve covariance @ x = b, or in the least squares sense if singular."""
+    try:
+        return np.linalg.solve(covariance, b)
+    except np.linalg.LinAlgError:
+        return np.linalg.lstsq(covariance, b, rcond=None)[0]
+
+
+def _project_simplex(weights):
+    """Project each row of weights onto the long-only fully invested set."""
+    n_codes = weights.shape[1]
+    sorted_weights = -np.sort(-weights, axis=1)
+    excess = np.cumsum(sorted_weights, axis=1) - 1
+    support = sorted_weights - excess / np.arange(1, n_codes + 1) > 0
+    rho = support.sum(axis=1)
+    theta = excess[np.arange(len(weights)), rho - 1] / rho
+
+    return np.maximum(weights - theta[:, None], 0.0)
+
+
+def _solve_active_set(covariance, q, a, b, weights=None, max_iter=None):
+    """Solve min w'Cw / 2 - q'w subject to a'w = b and w >= 0.
+
+    The primal active set method starts from a single code, or from the
+    weights of a nearby problem, and solves the equality constrained
+    problem of the codes held. It then either steps towards its solution
+    until a weight reaches zero and the code is dropped, or adds the code
+    whose weight would most decrease the objective, until none would. As
+    the long-only solutions hold few codes, every linear solve is small.
+
+    Returns:
+        (tuple): The weights and whether the method converged.
+    """
+    n_codes = len(q)
+    if weights is None:
+        # The code of the lowest objective with the whole budget in it.
+        with np.errstate(divide='ignore', invalid='ignore'):
+            objectives = np.where(
+                a > 0,
+                np.diag(covariance) * (b / a)**2 / 2 - q * b / a, np.inf)
+        weights = np.zeros(n_codes)
+        i = np.argmin(objectives)
+        weights[i] = b / a[i]
+    held = weights > 0
+    tol = 1e-12 * max(
+        np.abs(np.diag(covariance)).max(),
+        np.abs(q).max(), 1e-300)
+
+    for _ in range(max_iter or 10 * n_codes):
+        index = np.flatnonzero(held)
+        kkt = np.zeros((len(index) + 1, len(index) + 1))
+        kkt[:-1, :-1] = covariance[np.ix_(index, index)]
+        kkt[:-1, -1] = -a[index]
+        kkt[-1, :-1] = a[index]
+        solution = _solve(kkt, np.append(q[index], b))
+        target = solution[:-1]
+
+        blocking = target < weights[index]
+        if np.any(target[blocking] < 0):
+            # Step until the first weight reaches zero.
+            ratios = weights[index][blocking] / (weights[index][blocking] -
+                                                 target[blocking])
+            step = ratios.min()
+            weights[index] += step * (target - weights[index])
+            weights[index[blocking][ratios == step]] = 0.0
+            held = weights > 0
+            continue
+
+        weights[index] = target
+        multipliers = covariance[:, index] @ target - q - solution[-1] * a
+        multipliers[index] = 0.0
+        i = np.argmin(multipliers)
+        if multipliers[i] >= -tol:
+            return weights, True
+        held[i] = True
+
+    return weights, False
+
+
+def _project_gradient(mean, covariance, risk_aversions, max_iter, tol):
+    """Solve min w'Cw / 2 - t * mean'w over long-only weights for every t.
+
+    All the problems are solved together by accelerated projected
+    gradient descent, so that every iteration is a single matrix product
+    of the batch of weights with the covariance matrix. It is slower than
+    the active set method, but always converges.
+    """
+    n_codes = len(mean)
+    step = 1 / max(np.linalg.eigvalsh(covariance)[-1], 1e-12)
+
+    weights = np.full((len(risk_aversions), n_codes), 1 / n_codes)
+    momentum = weights
+    t = 1.0
+    for _ in range(max_iter):
+        gradient = momentum @ covariance - risk_aversions[:, None] * mean
+        next_weights = _project_simplex(momentum - step * gradient)
+
+        next_t = (1 + np.sqrt(1 + 4 * t * t)) / 2
+        momentum = next_weights + (t - 1) / next_t * (next_weights - weights)
+        converged = np.abs(next_weights - weights).max() < tol
+        weights, t = next_weights, next_t
+        if converged:
+            break
+
+    return weights
+
+
+def _solve_long_only(mean, covariance, risk_aversions):
+    """Solve min w'Cw / 2 - t * mean'w over long-only weights for every t.
+
+    The problems are solved in order of t by the active set method, each
+    warm started from the last, and by projected gradient descent if it
+    does not converge.
+    """
+    ones = np.ones(len(mean))
+    weights = np.zeros((len(risk_aversions), len(mean)))
+
+    last_weights = None
+    for i, risk_aversion in enumerate(risk_aversions):
+        weights[i], converged = _solve_active_set(covariance,
+                                                  risk_aversion * mean,
+                                                  ones,
+                                                  1.0,
+                                                  weights=last_weights)
+        if not converged:
+            weights[i] = _project_gradient(mean,
+                                           covariance,
+                                           risk_aversions[i:i + 1],
+                                           max_iter=10000,
+                                           tol=1e-12)[0]
+        last_weights = weights[i].copy()
+
+    return weights
+
+
+def efficient_frontier(mean, covariance, n_points=20, long_only=True):
+    """Calculate points of the mean-variance efficient frontier.
+
+    Each point minimizes w'Cw / 2 - t * mean'w over fully invested
+    weights for a risk aversion t from 0 (the minimum variance portfolio)
+    up to one that reaches the highest mean returns. Without the
+    long-only constraint, all the points are combinations of the same two
+    solutions of the covariance matrix. With it, every point is solved by
+    an active set method warm started from the previous point, which only
+    adds or drops the few codes that differ.
+
+    Args:
+        mean (np.ndarray): The mean return of each code.
+        covariance (np.ndarray): The covariance matrix of the returns.
+        n_points (int): The number of points. Default: 20.
+        long_only (bool): Whether the weights must not be negative.
+            Default: True.
+
+    Returns:
+        frontier (dict[np.ndarray]): A dict with the following keys:
+            weights (np.ndarray): The n_points x n_codes weights.
+            returns (np.ndarray): The mean return of each point.
+            volatilities (np.ndarray): The standard deviation of the
+                returns of each point.
+    """
+    assert n_points >= 2, f'n_points must be at least 2, but got {n_points}'
+
+    mean = np.asarray(mean, dtype=float)
+    covariance = np.asarray(covariance, dtype=float)
+    ones = np.ones(len(mean))
+
+    # The risk aversions up to the one at which the spread of the mean
+    # returns outweighs the largest variance.
+    spread = max(np.ptp(mean), 1e-12)
+    max_risk_aversion = 2 * np.trace(covariance) / spread
+    risk_aversions = np.concatenate([[0.0],
+                                     np.geomspace(1e-3, 1, n_points - 1) *
+                                     max_risk_aversion])
+
+    if long_only:
+        weights = _solve_long_only(mean, covariance, risk_aversions)
+    else:
+        solutions = _solve(covariance, np.column_stack([ones, mean]))
+        min_variance = solutions[:, 0] / solutions[:, 0].sum()
+        # The zero-investment direction along the frontier.
+        tilt = solutions[:, 1] - solutions[:, 1].sum() * min_variance
+        weights = min_variance + risk_aversions[:, None] * tilt
+
+    frontier = {
+        'weights':
+        weights,
+        'returns':
+        weights @ mean,
+        'volatilities':
+        np.sqrt(
+            np.maximum(np.einsum('ij,jk,ik->i', weights, covariance, weights),
+                       0.0)),
+    }
+
+    return frontier
+
+
+def min_variance_weights(covariance, long_only=True):
+    """Calculate the weights of the minimum variance portfolio.
+
+    Args:
+        covariance (np.ndarray): The covariance matrix of the returns.
+        long_only (bool): Whether the weights must not be negative.
+            Default: True.
+
+    Returns:
+        (np.ndarray): The weight of each code, summing to 1.
+    """
+    covariance = np.asarray(covariance, dtype=float)
+    ones = np.ones(len(covariance))
+
+    if long_only:
+        return _solve_long_only(ones, covariance, np.zeros(1))[0]
+
+    weights = _solve(covariance, ones)
+
+    return weights / weights.sum()
+
+
+def max_sharpe_weights(mean, covariance, risk_free_rate=0.0, long_only=True):
+    """Calculate the weights of the maximum Sharpe ratio portfolio.
+
+    The weights are proportional to those of the minimum variance y'Cy
+    with one unit of excess return. Without the long-only constraint, y
+    is the solution of the covariance matrix for the excess returns, and
+    with it y is found by the active set method. When no portfolio beats
+    the risk-free rate, the point of the efficient frontier with the
+    highest Sharpe ratio is taken.
+
+    Args:
+        mean (np.ndarray): The mean return of each code.
+        covariance (np.ndarray): The covariance matrix of the returns.
+        risk_free_rate (float): The return of a zero-risk investment.
+            Default: 0.0.
+        long_only (bool): Whether the weights must not be negative.
+            Default: True.
+
+    Returns:
+        (np.ndarray): The weight of each code, summing to 1.
+    """
+    mean = np.asarray(mean, dtype=float)
+    covariance = np.asarray(covariance, dtype=float)
+    excess_returns = mean - risk_free_rate
+
+    if not long_only:
+        weights = _solve(covariance, excess_returns)
+        if weights.sum() > 0:
+            return weights / weights.sum()
+    elif np.any(excess_returns > 0):
+        weights, converged = _solve_active_set(covariance, np.zeros(len(mean)),
+                                               excess_returns, 1.0)
+        if converged and weights.sum() > 0:
+            return weights / weights.sum()
+
+    frontier = efficient_frontier(mean,
+                                  covariance,
+                                  n_points=50,
+                                  long_only=long_only)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        sharpe_ratios = (frontier['returns'] -
+                         risk_free_rate) / frontier['volatilities']
+
+    return frontier['weights'][np.nanargmax(sharpe_ratios)]
+
+
+def risk_parity_weights(covariance, budgets=None, max_iter=100, tol=1e-10):
+    """Calculate the weights whose risk contributions match the budgets.
+
+    The risk contribution of a code is its weight times its marginal
+    contribution to the volatility of the portfolio. The weights are
+    found with Newton's method on the convex formulation of Spinu, of
+    which every step is a single linear solve, and are always positive.
+
+    Args:
+        covariance (np.ndarray): The covariance matrix of the returns.
+        budgets (np.ndarray): The share of the risk of each code.
+            Default: None, meaning equal shares.
+        max_iter (int): The maximum number of Newton steps. Default: 100.
+        tol (float): The norm of the gradient relative to that of the log
+            barrier at which the solver stops. Default: 1e-10.
+
+    Returns:
+        (np.ndarray): The weight of each code, summing to 1.
+    """
+    covariance = np.asarray(covariance, dtype=float)
+    n_codes = len(covariance)
+    if budgets is None:
+        budgets = np.full(n_codes, 1 / n_codes)
+    budgets = np.asarray(budgets, dtype=float) / np.sum(budgets)
+
+    try:
+        np.linalg.cholesky(covariance)
+    except np.linalg.LinAlgError:
+        # A singular covariance matrix, e.g. of fewer days than codes, has
+        # no risk parity weights, so it is shrunk towards its diagonal.
+        covariance = 0.99 * covariance + 0.01 * np.diag(np.diag(covariance))
+
+    # Minimize y'Cy / 2 - budgets'log(y), whose solution y is proportional
+    # to the weights.
+    volatilities = np.sqrt(np.maximum(np.diag(covariance), 1e-24))
+    y = budgets / volatilities
+    for _ in range(max_iter):
+        barrier = budgets / y
+        gradient = covariance @ y - barrier
+        if np.linalg.norm(gradient) < tol * np.linalg.norm(barrier):
+            break
+        hessian = covariance + np.diag(budgets / (y * y))
+        step = _solve(hessian, gradient)
+        # Halve the step until y stays positive.
+        scale = 1.0
+        while np.any(y - scale * step <= 0):
+            scale /= 2
+        y = y - scale * step
+
+    return y / y.sum()
+
+
+def weights_to_lots(weights, total_value, prices, lot_sizes):
+    """Convert weights into quantities in whole lots.
+
+    The quantity of each code is first rounded down to whole lots, and
+    the cash left is spent one lot at a time on the codes furthest below
+    their weights, as long as it is enough for their lots.
+
+    Args:
+        weights (np.ndarray): The long-only weight of each code.
+        total_value (float): The value of the portfolio.
+        prices (np.ndarray): The price of each code.
+        lot_sizes (np.ndarray): The lot size of each code.
+
+    Returns:
+        (np.ndarray): The quantity of each code.
+    """
+    weights = np.asarray(weights, dtype=float)
+    lot_values = np.asarray(prices, dtype=float) * np.asarray(lot_sizes,
+                                                              dtype=float)
+    assert np.all(weights >= 0), 'weights must not be negative'
+    assert np.all(lot_values > 0), \
+        'prices and lot_sizes must be greater than 0'
+
+    target_lots = weights * total_value / lot_values
+    lots = np.floor(target_lots)
+    cash = total_value - lots @ lot_values
+
+    # The lots bought with the cash left, by the largest shortfall first.
+    for i in np.argsort(lots - target_lots):
+        if lots[i] >= target_lots[i]:
+            break
+        if lot_values[i] <= cash:
+            lots[i] += 1
+            cash -= lot_values[i]
+
+    return lots * np.asarray(lot_sizes, dtype=float)
@@ -0,0 +1,485 @@
+import itertools
+import math
+import multiprocessing
+import os
+import random
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from .stockframe import StockFrame
+from .vectorized import (STRATEGY_SIGNALS, IndicatorCache, backtest_signals,
+                         pivot_prices)
+
+# The parameters of each strategy on which its indicators depend.
+# Combinations sharing these parameters share their indicators.
+INDICATOR_PARAMS = {
+    'RSIStrategy': ('period', ),
+    'MAStrategy': ('is_ema', 'short_period', 'long_period'),
+    'MACDCrossOverStrategy':
+    ('adjust', 'fast_length', 'slow_length', 'signal_length'),
+    'BollingerBandsStrategy': ('period', ),
+}
+
+METRICS = ('total_return', 'total_pnl_value', 'final_equity', 'max_drawdown',
+           'number_of_trades')
+
+# The state of a worker process, set by _init_worker().
+_worker = {}
+
+
+def grid_parameters(param_grid):
+    """Enumerate every combination of a parameter grid.
+
+    Args:
+        param_grid (dict[list]): The candidate values of each parameter,
+            e.g. dict(period=[7, 14], oversold_signal=[20, 30]).
+
+    Returns:
+        (list[dict]): The combinations, with the last parameter varying
+            the fastest.
+    """
+    if not isinstance(param_grid, dict):
+        raise TypeError(f'Only dict type is supported for param_grid, '
+                        f'but got {type(param_grid)}')
+
+    names = list(param_grid)
+    return [
+        dict(zip(names, values))
+        for values in itertools.product(*param_grid.values())
+    ]
+
+
+def sample_parameters(param_grid, n_iter, seed=0):
+    """Randomly sample distinct combinations of a parameter grid.
+
+    The combinations are drawn by their index in the grid, so that the
+    grid is never enumerated.
+
+    Args:
+        param_grid (dict[list]): The candidate values of each parameter.
+        n_iter (int): The number of combinations to be sampled. The whole
+            grid is returned if it has no more than n_iter combinations.
+        seed (int): The random seed. Default: 0.
+
+    Returns:
+        (list[dict]): The sampled combinations.
+    """
+    if not isinstance(param_grid, dict):
+        raise TypeError(f'Only dict type is supported for param_grid, '
+                        f'but got {type(param_grid)}')
+    assert n_iter > 0, f'n_iter must be greater than 0, but got {n_iter}'
+
+    names = list(param_grid)
+    candidates = [list(values) for values in param_grid.values()]
+    n_combinations = math.prod(len(values) for values in candidates)
+
+    indices = random.Random(seed).sample(range(n_combinations),
+                                         min(n_iter, n_combinations))
+
+    combinations = []
+    for index in indices:
+        values = []
+        for candidate in reversed(candidates):
+            index, position = divmod(index, len(candidate))
+            values.append(candidate[position])
+        combinations.append(dict(zip(names, reversed(values))))
+
+    return combinations
+
+
+def evaluate_parameters(close,
+                        strategy_name,
+                        params,
+                        lot_sizes,
+                        cash,
+                        start_bar=0,
+                        end_bar=None,
+                        cache=None):
+    """Backtest a strategy with a single combination of parameters.
+
+    The signals are calculated over the whole close prices, so that the
+    indicators warm up on the bars before start_bar and can be reused
+    from the cache for any window of bars.
+
+    Args:
+        close (pd.DataFrame): The close prices with codes as columns.
+        strategy_name (str): The name of the strategy, one of the keys of
+            STRATEGY_SIGNALS.
+        params (dict): The keyword arguments of the strategy.
+        lot_sizes (np.ndarray): The lot size of each code.
+        cash (float): The initial cash.
+        start_bar (int): The index of the first bar on which the strategy
+            trades. Default: 0.
+        end_bar (int): The index after the last bar on which the strategy
+            trades. Default: None, meaning until the last bar.
+        cache (IndicatorCache): The cache of the indicators of close.
+            Default: None, meaning the indicators are not cached.
+
+    Returns:
+        (dict): The metrics of the backtest, with the keys of METRICS.
+    """
+    signals_function = STRATEGY_SIGNALS[strategy_name]
+    buys, sells = signals_function(close, cache=cache, **params)
+
+    # The strategy is flat before start_bar, so only the bars of the
+    # window need to be backtested.
+    window = slice(start_bar, end_bar)
+    equity_curve, trades = backtest_signals(close=close.to_numpy()[window],
+                                            buys=buys[window],
+                                            sells=sells[window],
+                                            lot_sizes=lot_sizes,
+                                            cash=cash)
+
+    final_equity = float(equity_curve[-1])
+    drawdowns = equity_curve / np.maximum.accumulate(equity_curve) - 1
+
+    metrics = {
+        'total_return': final_equity / cash - 1,
+        'total_pnl_value': final_equity - cash,
+        'final_equity': final_equity,
+        'max_drawdown': float(drawdowns.min()),
+        'number_of_trades': int(np.abs(trades).sum()),
+    }
+
+    return metrics
+
+
+def _init_worker(shm_name, shape, dtype, strategy_name, lot_sizes, cash,
+                 cache_size):
+    """Attach a worker process to the close prices in shared memory."""
+    shm = shared_memory.SharedMemory(name=shm_name)
+    close = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+    close = pd.DataFrame(close, copy=False)
+
+    # The shared memory must stay referenced for as long as the worker
+    # reads the close prices from it.
+    _worker.update(shm=shm,
+                   close=close,
+                   strategy_name=strategy_name,
+                   lot_sizes=lot_sizes,
+                   cash=cash,
+                   cache=IndicatorCache(close, max_size=cache_size))
+
+
+def _evaluate_in_worker(task):
+    """Evaluate a task of ParameterEvaluator in a worker process."""
+    params, start_bar, end_bar = task
+
+    return evaluate_parameters(close=_worker['close'],
+                               strategy_name=_worker['strategy_name'],
+                               params=params,
+                               lot_sizes=_worker['lot_sizes'],
+                               cash=_worker['cash'],
+                               start_bar=start_bar,
+                               end_bar=end_bar,
+                               cache=_worker['cache'])
+
+
+class ParameterEvaluator:
+    """Evaluate combinations of parameters on a pool of worker processes.
+
+    The close prices are copied once into shared memory, from which every
+    worker process of the pool reads them without copying. The tasks are
+    sorted by the parameters on which the indicators depend and sent to
+    the workers in contiguous chunks, so that each worker reuses the
+    indicators of its IndicatorCache across the tasks sharing a period.
+    The pool is kept alive until close() is called, so that the caches of
+    the workers are reused across calls of evaluate().
+
+    Args:
+        close (np.ndarray): The n_bars x n_codes close prices.
+        strategy_name (str): The name of the strategy, one of the keys of
+            STRATEGY_SIGNALS.
+        lot_sizes (np.ndarray): The lot size of each code.
+        cash (float): The initial cash.
+        processes (int): The number of worker processes. Default: None,
+            meaning os.cpu_count(). If 1, the tasks are evaluated in the
+            current process.
+        cache_size (int): The maximum number of indicator arrays cached by
+            each worker. Default: 16.
+    """
+    def __init__(self,
+                 close,
+                 strategy_name,
+                 lot_sizes,
+                 cash,
+                 processes=None,
+                 cache_size=16):
+        if strategy_name not in STRATEGY_SIGNALS:
+            raise ValueError(f'Unsupported strategy {strategy_name}')
+
+        self.strategy_name = strategy_name
+        self.processes = processes or os.cpu_count()
+
+        close = np.ascontiguousarray(close, dtype=np.float64)
+
+        if self.processes == 1:
+            self._shm = None
+            self._pool = None
+            self._close = pd.DataFrame(close, copy=False)
+            self._lot_sizes = lot_sizes
+            self._cash = cash
+            self._cache = IndicatorCache(self._close, max_size=cache_size)
+            return
+
+        self._shm = shared_memory.SharedMemory(create=True, size=close.nbytes)
+        shared_close = np.ndarray(close.shape,
+                                  dtype=close.dtype,
+                                  buffer=self._shm.buf)
+        shared_close[:] = close
+        del shared_close
+
+        initargs = (self._shm.name, close.shape, close.dtype, strategy_name,
+                    lot_sizes, cash, cache_size)
+        self._pool = multiprocessing.Pool(processes=self.processes,
+                                          initializer=_init_worker,
+                                          initargs=initargs)
+
+    def evaluate(self, tasks):
+        """Backtest every task.
+
+        Args:
+            tasks (list[tuple]): The tasks as tuples of (params, start_bar,
+                end_bar). See evaluate_parameters().
+
+        Returns:
+            (list[dict]): The metrics of each task, in the order of tasks.
+        """
+        indicator_params = INDICATOR_PARAMS[self.strategy_name]
+        order = sorted(range(len(tasks)),
+                       key=lambda i: [
+                           tasks[i][0][name] for name in indicator_params
+                           if name in tasks[i][0]
+                       ])
+        sorted_tasks = [tasks[i] for i in order]
+
+        if self._pool is None:
+            metrics = [
+                evaluate_parameters(close=self._close,
+                                    strategy_name=self.strategy_name,
+                                    params=params,
+                                    lot_sizes=self._lot_sizes,
+                                    cash=self._cash,
+                                    start_bar=start_bar,
+                                    end_bar=end_bar,
+                                    cache=self._cache)
+                for params, start_bar, end_bar in sorted_tasks
+            ]
+        else:
+            chunksize = math.ceil(len(tasks) / (self.processes * 4))
+            metrics = self._pool.map(_evaluate_in_worker,
+                                     sorted_tasks,
+                                     chunksize=max(chunksize, 1))
+
+        results = [None] * len(tasks)
+        for i, metric in zip(order, metrics):
+            results[i] = metric
+
+        return results
+
+    def close(self):
+        """Terminate the worker processes and free the shared memory."""
+        if self._pool is not None:
+            self._pool.terminate()
+            self._pool.join()
+            self._pool = None
+        if self._shm is not None:
+            self._shm.close()
+            self._shm.unlink()
+            self._shm = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class BaseParameterSearch:
+    """The base class of the searches of the parameters of a strategy.
+
+    The strategy, the metric and the cash are checked, the combinations
+    of parameters are enumerated or sampled, and the close prices and the
+    lot sizes of the codes are prepared for a ParameterEvaluator, in the
+    same way for ParameterSearch and WalkForward.
+
+    Args:
+        stockframe (StockFrame): The stored candlesticks, aligned on the
+            same time_keys for every code.
+        strategy (type | str): The strategy class or its name, one of
+            the keys of STRATEGY_SIGNALS.
+        param_grid (dict[list]): The candidate values of each parameter,
+            e.g. dict(period=[7, 14, 21], oversold_signal=[20, 30]).
+        n_iter (int): The number of randomly sampled combinations.
+            Default: None, meaning every combination of the grid.
+        metric (str): The metric by which the combinations are ranked,
+            one of METRICS. Default: total_return.
+        lot_sizes (dict[float]): The lot sizes of codes. Default: None,
+            meaning a lot size of 100 for every code.
+        cash (float): The initial cash. Default: 1000000.0.
+        processes (int): The number of worker processes. Default: None,
+            meaning os.cpu_count(). If 1, the combinations are evaluated
+            in the current process.
+        seed (int): The random seed of the sampled combinations.
+            Default: 0.
+        cache_size (int): The maximum number of indicator arrays cached by
+            each worker. Default: 16.
+    """
+    def __init__(self,
+                 stockframe,
+                 strategy,
+                 param_grid,
+                 n_iter=None,
+                 metric='total_return',
+                 lot_sizes=None,
+                 cash=1000000.0,
+                 processes=None,
+                 seed=0,
+                 cache_size=16):
+        if not isinstance(stockframe, StockFrame):
+            raise TypeError(f'Only StockFrame type is supported for '
+                            f'stockframe, but got {type(stockframe)}')
+        if isinstance(strategy, str):
+            strategy_name = strategy
+        else:
+            strategy_name = strategy.__name__
+        if strategy_name not in STRATEGY_SIGNALS:
+            raise ValueError(f'Unsupported strategy {strategy_name}')
+        if metric not in METRICS:
+            raise ValueError(f'Unsupported metric {metric}')
+        if not isinstance(cash, float):
+            raise TypeError(f'Only float type is supported for cash, '
+                            f'but got {type(cash)}')
+        assert cash > 0, f'cash must be greater than 0, but got {cash}'
+
+        self.strategy_name = strategy_name
+        self.metric = metric
+        self.cash = cash
+        self.processes = processes
+        self.cache_size = cache_size
+
+        if n_iter is None:
+            self.combinations = grid_parameters(param_grid)
+        else:
+            self.combinations = sample_parameters(param_grid,
+                                                  n_iter,
+                                                  seed=seed)
+
+        close = pivot_prices(stockframe=stockframe)
+        self.time_keys = close.index
+        self.code_list = close.columns.to_list()
+        self.close = close.to_numpy(dtype=np.float64)
+
+        lot_sizes = lot_sizes or {}
+        self.lot_sizes = np.array(
+            [lot_sizes.get(code, 100.0) for code in self.code_list])
+
+    def _create_evaluator(self):
+        """Create a ParameterEvaluator of the close prices."""
+        return ParameterEvaluator(close=self.close,
+                                  strategy_name=self.strategy_name,
+                                  lot_sizes=self.lot_sizes,
+                                  cash=self.cash,
+                                  processes=self.processes,
+                                  cache_size=self.cache_size)
+
+
+class ParameterSearch(BaseParameterSearch):
+    """Search the parameters of a built-in strategy in parallel.
+
+    Every combination of parameters is backtested with the vectorized
+    backtester of futubot.vectorized on a ParameterEvaluator, which shares
+    the close prices with its worker processes and reuses the indicators
+    across the combinations sharing a period.
+
+    Args:
+        stockframe (StockFrame): The stored candlesticks, aligned on the
+            same time_keys for every code.
+        strategy (type | str): The strategy class or its name, one of
+            the keys of STRATEGY_SIGNALS.
+        param_grid (dict[list]): The candidate values of each parameter,
+            e.g. dict(period=[7, 14, 21], oversold_signal=[20, 30]).
+        n_iter (int): The number of randomly sampled combinations.
+            Default: None, meaning every combination of the grid.
+        metric (str): The metric by which the results are ranked, one of
+            METRICS. Default: total_return.
+        lot_sizes (dict[float]): The lot sizes of codes. Default: None,
+            meaning a lot size of 100 for every code.
+        cash (float): The initial cash. Default: 1000000.0.
+        start_date (str): The time of the first bar on which the strategy
+            trades in format yyyy-MM-dd HH:mm:ss. Earlier bars only warm up
+            the indicators. Default: None, meaning from the first bar.
+        processes (int): The number of worker processes. Default: None,
+            meaning os.cpu_count(). If 1, the search runs in the current
+            process.
+        seed (int): The random seed of the sampled combinations.
+            Default: 0.
+        cache_size (int): The maximum number of indicator arrays cached by
+            each worker. Default: 16.
+    """
+    def __init__(self,
+                 stockframe,
+                 strategy,
+                 param_grid,
+                 n_iter=None,
+                 metric='total_return',
+                 lot_sizes=None,
+                 cash=1000000.0,
+                 start_date=None,
+                 processes=None,
+                 seed=0,
+                 cache_size=16):
+        super().__init__(stockframe=stockframe,
+                         strategy=strategy,
+                         param_grid=param_grid,
+                         n_iter=n_iter,
+                         metric=metric,
+                         lot_sizes=lot_sizes,
+                         cash=cash,
+                         processes=processes,
+                         seed=seed,
+                         cache_size=cache_size)
+
+        self.start_bar = 0
+        if start_date is not None:
+            self.start_bar = self.time_keys.searchsorted(
+                pd.to_datetime(start_date))
+
+    def run(self):
+        """Backtest every combination of parameters.
+
+        Returns:
+            (pd.DataFrame): One row per combination with the parameters
+                and the metrics as columns, ranked by metric in descending
+                order.
+        """
+        tasks = [(params, self.start_bar, None)
+                 for params in self.combinations]
+
+        with self._create_evaluator() as evaluator:
+            metrics = evaluator.evaluate(tasks)
+
+        return rank_results(self.combinations, metrics, self.metric)
+
+
+def rank_results(combinations, metrics, metric='total_return'):
+    """Rank the combinations of parameters by a metric.
+
+    Args:
+        combinations (list[dict]): The combinations of parameters.
+        metrics (list[dict]): The metrics of each combination.
+        metric (str): The metric by which the combinations are ranked.
+            Default: total_return.
+
+    Returns:
+        (pd.DataFrame): One row per combination with the parameters and
+            the metrics as columns, ranked by metric in descending order.
+    """
+    results = pd.concat([pd.DataFrame(combinations),
+                         pd.DataFrame(metrics)],
+                        axis=1)
+    results = results.sort_values(metric, ascending=False, kind='stable')
+
+    return results.reset_index(drop=True)
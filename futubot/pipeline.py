@@ -0,0 +1,350 @@
+import math
+import queue
+import threading
+import time
+
+from .robot import Robot
+
+# The item passed down the queues when a stage has finished.
+_STOP = object()
+
+
+class TradingPipeline:
+    """Run the trading loop of tools/main.py as pipelined stages.
+
+    The loop is split into three stages running in their own threads and
+    connected by bounded queues:
+
+    1. ingest: waits for the next bar, fetches the latest bars with
+       Robot.get_latest_bar() and the orders with
+       Accounts.get_history_orders(), from which the pending orders are
+       found with Accounts.check_existing_orders().
+    2. compute: adds the bars to the StockFrame, refreshes the indicators
+       and today's daily bars of the portfolio, journals the new fills of
+       the orders, and calculates the buy and sell signals of the
+       strategy.
+    3. dispatch: places the orders with Robot.execute_signals(), updates
+       the positions of the portfolio, marks them to the latest closes
+       and publishes the snapshot. The mark-to-market positions are
+       reconciled with the broker every reconcile_interval seconds, and
+       the state is checkpointed at the interval of the checkpointer.
+
+    The next bar is fetched and the pending orders are refreshed while the
+    orders of the previous bar are still in flight, so the time from a
+    bar close to its orders is that of the slowest stage instead of the
+    sum of all the stages. A full queue blocks the upstream stage, so a
+    slow stage delays the next bar instead of piling up stale bars.
+
+    The portfolio is only read and updated under a lock, and the orders
+    for it are placed under the same lock. The lock is only held by the
+    dispatch stage while placing the orders, updating and marking the
+    positions and copying the states to be published and checkpointed.
+    The states are written, and the broker is queried for the
+    reconciliation, after releasing it, so that the signals of the next
+    bar only wait for the orders of the previous bar, and not for the
+    snapshot, the checkpoint or the reconciliation.
+
+    The latency of every step is recorded into the LatencyRecorder of the
+    robot: wake_latency (from a bar close plus the scheduler offset to
+    the wake-up), bar_fetch, existing_order_check, stockframe_append,
+    indicator_refresh, daily_bar_roll, signal_calc, order_round_trip,
+    position_update, mark_to_market, checkpoint and bar_to_orders (from
+    the wake-up to the update of the positions). The stats are reported
+    after every bar at the interval of the recorder.
+
+    The pending orders fetched by the ingest stage may miss the orders
+    dispatched after they were fetched. The codes with signals sent to
+    the dispatch stage are therefore treated as having existing orders
+    until the pending orders are fetched again after their dispatch, so
+    that no duplicated orders are placed.
+
+    Args:
+        robot (Robot): The Robot object, whose portfolio is traded.
+        stockframe (StockFrame): The StockFrame object.
+        indicator_client (Indicators): The Indicators object refreshed at
+            every bar.
+        strategy (type): The strategy class, e.g. Strategy.RSIStrategy.
+        strategy_params (dict): The keyword arguments of the strategy.
+            Default: None.
+        publisher (SnapshotPublisher): The publisher of the state after
+            every bar. Default: None.
+        queue_size (int): The maximum number of items waiting between two
+            stages. Default: 1.
+        reconcile_interval (float): The minimum number of seconds between
+            two reconciliations of the mark-to-market PnL with the broker.
+            Default: 300.0.
+        checkpointer (Checkpointer): The checkpointer of the state for a
+            warm restart, which also saves the state when the pipeline
+            finishes. Default: None.
+    """
+    def __init__(self,
+                 robot,
+                 stockframe,
+                 indicator_client,
+                 strategy,
+                 strategy_params=None,
+                 publisher=None,
+                 queue_size=1,
+                 reconcile_interval=300.0,
+                 checkpointer=None):
+        if not isinstance(robot, Robot):
+            raise TypeError(f'Only Robot type is supported for robot, '
+                            f'but got {type(robot)}')
+        assert robot.portfolio is not None, \
+            'Please create the portfolio of the robot first.'
+        assert queue_size >= 1, \
+            f'queue_size must be at least 1, but got {queue_size}'
+        assert reconcile_interval >= 0, \
+            f'reconcile_interval must not be negative, ' \
+            f'but got {reconcile_interval}'
+
+        self.robot = robot
+        self.accounts = robot.accounts
+        self.portfolio = robot.portfolio
+        self.stockframe = stockframe
+        self.indicator_client = indicator_client
+        self.strategy = strategy
+        self.strategy_params = strategy_params or {}
+        self.publisher = publisher
+        self.reconcile_interval = reconcile_interval
+        self.checkpointer = checkpointer
+
+        self.latency = robot.latency
+        self.bars = 0
+
+        self._bar_queue = queue.Queue(maxsize=queue_size)
+        self._signal_queue = queue.Queue(maxsize=queue_size)
+        self._stop = threading.Event()
+        self._errors = []
+        self._reconciled_at = -math.inf
+
+        # The monotonic time at which the orders of each code were last
+        # dispatched, or inf while they are in flight.
+        self._dispatched = {}
+        self._dispatched_lock = threading.Lock()
+        # Serializes the reads of the StockFrame for publishing with its
+        # updates.
+        self._stockframe_lock = threading.Lock()
+        # Serializes the reads and updates of the portfolio and the orders
+        # placed for it. Always taken before the StockFrame lock.
+        self._portfolio_lock = threading.Lock()
+
+    def run(self):
+        """Trade until the end of regular trading time.
+
+        Returns:
+            int: The number of bars traded.
+        """
+        stages = [
+            (self._ingest, self._bar_queue),
+            (self._compute, self._signal_queue),
+            (self._dispatch, None),
+        ]
+        threads = [
+            threading.Thread(target=self._run_stage,
+                             args=(stage, downstream),
+                             name=f'futubot-{stage.__name__.strip("_")}',
+                             daemon=True) for stage, downstream in stages
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        if self.checkpointer is not None and not self._errors:
+            self.checkpointer.save(self.portfolio, self.stockframe,
+                                   self.indicator_client)
+
+        self.latency.report(force=True)
+        if self._errors:
+            raise self._errors[0]
+
+        return self.bars
+
+    def stop(self):
+        """Stop fetching bars after the current bar.
+
+        The bars already fetched are still traded.
+        """
+        self._stop.set()
+
+    def _run_stage(self, stage, downstream):
+        """Run a stage, and tell the downstream stage when it finishes."""
+        try:
+            stage()
+        except BaseException as e:
+            self._errors.append(e)
+            self._stop.set()
+        finally:
+            if downstream is not None:
+                self._put(downstream, _STOP)
+
+    def _ingest(self):
+        """Fetch the latest bars and the pending orders after every bar."""
+        while not self._stop.is_set() and self.robot.wait_for_trading_time():
+            woken_at = time.perf_counter()
+            with self.latency.time('bar_fetch'):
+                latest_prices = self.robot.get_latest_bar()
+
+            fetched_at = time.monotonic()
+            with self._portfolio_lock:
+                code_list = list(self.portfolio.holdings)
+            with self.latency.time('existing_order_check'):
+                orders = self.accounts.get_history_orders()
+                existing_orders = self.accounts.check_existing_orders(
+                    code_list=code_list, orders=orders)
+
+            item = (latest_prices, orders, existing_orders, fetched_at,
+                    woken_at)
+            if not self._put(self._bar_queue, item):
+                return
+
+            if latest_prices:
+                last_bar_timestamp = [
+                    max(bar['time_key'] for bar in latest_prices)
+                ]
+                tick = self.robot.wait_till_next_bar(
+                    last_bar_timestamp=last_bar_timestamp)
+            else:
+                tick = self.robot.scheduler.wait()
+            self.latency.record('wake_latency', max(tick['latency'], 0.0))
+
+    def _compute(self):
+        """Update the StockFrame and calculate the signals of every bar."""
+        while True:
+            item = self._get(self._bar_queue)
+            if item is _STOP:
+                return
+            latest_prices, orders, existing_orders, fetched_at, \
+                woken_at = item
+
+            with self._stockframe_lock:
+                with self.latency.time('stockframe_append'):
+                    self.stockframe.add_rows(data=latest_prices)
+                with self.latency.time('indicator_refresh'):
+                    self.indicator_client.refresh()
+
+            with self._portfolio_lock:
+                with self._stockframe_lock:
+                    with self.latency.time('daily_bar_roll'):
+                        self.portfolio.update_intraday_prices(self.stockframe)
+
+                existing_orders = self._add_dispatching_orders(
+                    existing_orders, fetched_at)
+                print('existing_orders', existing_orders)
+                self.portfolio.update_pending_orders(existing_orders)
+                self.portfolio.update_order_fills(orders)
+
+                strategy_client = self.strategy(self.stockframe,
+                                                self.portfolio,
+                                                self.indicator_client,
+                                                existing_orders,
+                                                **self.strategy_params)
+                with self.latency.time('signal_calc'):
+                    buy_sell_signals = \
+                        strategy_client.calculate_buy_sell_signals()
+
+                codes = set(buy_sell_signals['buys']) | set(
+                    buy_sell_signals['sells'])
+                with self._dispatched_lock:
+                    for code in codes:
+                        self._dispatched[code] = math.inf
+
+            item = (buy_sell_signals, codes, latest_prices, woken_at)
+            if not self._put(self._signal_queue, item):
+                return
+
+    def _dispatch(self):
+        """Place the orders of every bar and update the positions."""
+        while True:
+            item = self._get(self._signal_queue)
+            if item is _STOP:
+                return
+            buy_sell_signals, codes, latest_prices, woken_at = item
+
+            with self._portfolio_lock:
+                order_infos = self.robot.execute_signals(
+                    buy_sell_signals=buy_sell_signals)
+                with self.latency.time('position_update'):
+                    self.portfolio.update_positions(order_infos=order_infos)
+                self.latency.record('bar_to_orders',
+                                    time.perf_counter() - woken_at)
+                print('holdings after', self.portfolio.holdings)
+
+                with self.latency.time('mark_to_market'):
+                    pnl = self.portfolio.mark_to_market(latest_prices)
+                print('pnl', pnl)
+
+                with self._dispatched_lock:
+                    dispatched_at = time.monotonic()
+                    for code in codes:
+                        self._dispatched[code] = dispatched_at
+
+                # The states are copied under the locks, and written after
+                # releasing them.
+                snapshot = checkpoint = None
+                started_at = time.perf_counter()
+                with self._stockframe_lock:
+                    if self.publisher is not None:
+                        snapshot = self.publisher.collect(
+                            self.stockframe, self.portfolio,
+                            self.indicator_client)
+                    if self.checkpointer is not None and \
+                            self.checkpointer.is_due():
+                        checkpoint = self.checkpointer.collect(
+                            self.portfolio, self.stockframe,
+                            self.indicator_client)
+                collected_in = time.perf_counter() - started_at
+
+            if snapshot is not None:
+                self.publisher.write(snapshot)
+            if checkpoint is not None:
+                started_at = time.perf_counter()
+                self.checkpointer.write(checkpoint)
+                self.latency.record(
+                    'checkpoint',
+                    collected_in + time.perf_counter() - started_at)
+
+            now = time.monotonic()
+            if now - self._reconciled_at >= self.reconcile_interval:
+                account_info = self.accounts.get_account_info()
+                positions_dict = self.accounts.get_positions() or {}
+                with self._portfolio_lock:
+                    drifts = self.portfolio.reconcile_pnl(
+                        account_info=account_info,
+                        positions_dict=positions_dict)
+                self._reconciled_at = now
+                print('PnL drifts from broker', drifts)
+
+            self.bars += 1
+            self.latency.report()
+
+    def _add_dispatching_orders(self, existing_orders, fetched_at):
+        """Mark the codes dispatched after fetched_at as existing orders."""
+        existing_orders = dict(existing_orders or {})
+
+        with self._dispatched_lock:
+            for code, dispatched_at in self._dispatched.items():
+                if dispatched_at >= fetched_at:
+                    existing_orders[code] = True
+
+        return existing_orders
+
+    def _put(self, q, item):
+        """Put an item into a queue unless the pipeline has failed."""
+        while True:
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                if self._errors:
+                    return False
+
+    def _get(self, q):
+        """Get an item from a queue, or _STOP if the pipeline has failed."""
+        while True:
+            try:
+                return q.get(timeout=0.1)
+            except queue.Empty:
+                if self._errors:
+                    return _STOP
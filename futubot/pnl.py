@@ -0,0 +1,235 @@
+import numpy as np
+import pandas as pd
+
+
+class PnLTracker:
+    """Mark-to-market value and profit and loss of positions.
+
+    The quantity, average cost, realized PnL and last price of every code
+    are kept in arrays, so that marking all the positions to the latest
+    closes after every bar is a single vectorized update. Fills adjust
+    the positions and the cash locally with the average cost method, and
+    reconcile() resets them to the positions of the broker, which only
+    needs to happen periodically.
+
+    Args:
+        cash (float): The available cash. Default: 0.0.
+    """
+    def __init__(self, cash=0.0):
+        if not isinstance(cash, (int, float)):
+            raise TypeError(f'Only int or float type is supported for cash, '
+                            f'but got {type(cash)}')
+
+        self.cash = float(cash)
+        self.codes = []
+        self._index = {}
+        self.qty = np.zeros(0)
+        self.cost_price = np.zeros(0)
+        self.realized_pnl = np.zeros(0)
+        self.last_price = np.full(0, np.nan)
+
+    def add_codes(self, codes):
+        """Add codes without positions.
+
+        Args:
+            codes (list[str]): The codes, of which the known ones are
+                ignored.
+        """
+        new_codes = [code for code in codes if code not in self._index]
+        if not new_codes:
+            return
+
+        for code in new_codes:
+            self._index[code] = len(self.codes)
+            self.codes.append(code)
+
+        n_new = len(new_codes)
+        self.qty = np.concatenate([self.qty, np.zeros(n_new)])
+        self.cost_price = np.concatenate([self.cost_price, np.zeros(n_new)])
+        self.realized_pnl = np.concatenate(
+            [self.realized_pnl, np.zeros(n_new)])
+        self.last_price = np.concatenate(
+            [self.last_price, np.full(n_new, np.nan)])
+
+    def record_fill(self, code, qty, price):
+        """Record a fill of an order.
+
+        Args:
+            code (str): The code of security.
+            qty (int | float): The quantity filled, positive for buys and
+                negative for sells.
+            price (int | float): The fill price.
+        """
+        if not isinstance(code, str):
+            raise TypeError(f'Only str type is supported for code, '
+                            f'but got {type(code)}')
+        if not isinstance(qty, (int, float)):
+            raise TypeError(f'Only int or float type is supported for qty, '
+                            f'but got {type(qty)}')
+        if not isinstance(price, (int, float)):
+            raise TypeError(f'Only int or float type is supported for price, '
+                            f'but got {type(price)}')
+        assert price > 0, f'price must be greater than 0, but got {price}'
+
+        self.add_codes([code])
+        i = self._index[code]
+        position = self.qty[i]
+
+        if position * qty < 0:
+            # The closed quantity realizes the difference to the cost.
+            closed = min(abs(qty), abs(position)) * np.sign(position)
+            self.realized_pnl[i] += closed * (price - self.cost_price[i])
+            if abs(qty) > abs(position):
+                # The position is reversed at the fill price.
+                self.cost_price[i] = price
+        elif position + qty != 0:
+            self.cost_price[i] = (position * self.cost_price[i] +
+                                  qty * price) / (position + qty)
+
+        self.qty[i] = position + qty
+        if self.qty[i] == 0:
+            self.cost_price[i] = 0.0
+        self.cash -= qty * price
+        self.last_price[i] = price
+
+    def mark(self, prices):
+        """Mark the positions to the latest prices.
+
+        Args:
+            prices (dict[float] | pd.Series): The latest prices with
+                codes as keys. Other codes keep their last prices.
+        """
+        if isinstance(prices, dict):
+            prices = pd.Series(prices, dtype=float)
+        if not isinstance(prices, pd.Series):
+            raise TypeError(f'Only dict or pd.Series type is supported for '
+                            f'prices, but got {type(prices)}')
+
+        self.add_codes(prices.index.to_list())
+        index = np.fromiter((self._index[code] for code in prices.index),
+                            dtype=np.int64,
+                            count=len(prices))
+        self.last_price[index] = prices.to_numpy(dtype=float)
+
+    def reconcile(self, cash, positions):
+        """Reset the cash and positions to those of the broker.
+
+        Args:
+            cash (float): The available cash of the account.
+            positions (dict[dict]): The positions of the account, see
+                Accounts.get_positions(). The codes not in positions are
+                reset to no position.
+
+        Returns:
+            drifts (dict[float]): The differences between the local and
+                the broker values, with keys cash, total_market_value and
+                the codes whose quantities differ.
+        """
+        if not isinstance(positions, dict):
+            raise TypeError(f'Only dict type is supported for positions, '
+                            f'but got {type(positions)}')
+
+        self.add_codes(list(positions))
+        market_value = self.market_values().sum()
+
+        qty = np.zeros(len(self.codes))
+        cost_price = np.zeros(len(self.codes))
+        for code, position in positions.items():
+            i = self._index[code]
+            qty[i] = position['qty']
+            cost_price[i] = position['cost_price']
+            if np.isnan(self.last_price[i]) and 'current_price' in position:
+                self.last_price[i] = position['current_price']
+
+        broker_market_value = sum(
+            position.get('market_value', 0.0)
+            for position in positions.values())
+        drifts = {
+            'cash': self.cash - cash,
+            'total_market_value': market_value - broker_market_value,
+        }
+        for i in np.flatnonzero(self.qty != qty):
+            drifts[self.codes[i]] = self.qty[i] - qty[i]
+
+        self.cash = float(cash)
+        self.qty = qty
+        self.cost_price = cost_price
+
+        return drifts
+
+    def market_values(self):
+        """Get the market values of the positions.
+
+        Returns:
+            (np.ndarray): The market value of each code in self.codes,
+                zero for the codes without a price yet.
+        """
+        return self.qty * np.nan_to_num(self.last_price)
+
+    def positions(self):
+        """Get the mark-to-market state of every code.
+
+        Returns:
+            (pd.DataFrame): A dataframe indexed by code with columns qty,
+                cost_price, last_price, market_value, unrealized_pnl,
+                realized_pnl and exposure (the market value over the
+                total assets).
+        """
+        market_values = self.market_values()
+        total_assets = self.cash + market_values.sum()
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            exposure = market_values / total_assets
+
+        return pd.DataFrame(
+            {
+                'qty': self.qty,
+                'cost_price': self.cost_price,
+                'last_price': self.last_price,
+                'market_value': market_values,
+                'unrealized_pnl': market_values - self.qty * self.cost_price,
+                'realized_pnl': self.realized_pnl,
+                'exposure': exposure,
+            },
+            index=pd.Index(self.codes, name='code'))
+
+    def summary(self):
+        """Summarize the mark-to-market value of the portfolio.
+
+        Returns:
+            summary (dict[float]): A dict with the following keys:
+                total_assets (float): The cash plus the market value.
+                cash (float): The available cash.
+                total_market_value (float): The market value of the
+                    positions.
+                unrealized_pnl (float): The PnL of the open positions.
+                realized_pnl (float): The PnL of the closed positions.
+                total_pnl (float): The unrealized plus the realized PnL.
+                gross_exposure (float): The sum of the absolute market
+                    values over the total assets.
+        """
+        market_values = self.market_values()
+        total_market_value = float(market_values.sum())
+        total_assets = self.cash + total_market_value
+        unrealized_pnl = float(
+            (market_values - self.qty * self.cost_price).sum())
+        realized_pnl = float(self.realized_pnl.sum())
+
+        summary = {
+            'total_assets':
+            total_assets,
+            'cash':
+            self.cash,
+            'total_market_value':
+            total_market_value,
+            'unrealized_pnl':
+            unrealized_pnl,
+            'realized_pnl':
+            realized_pnl,
+            'total_pnl':
+            unrealized_pnl + realized_pnl,
+            'gross_exposure': (float(np.abs(market_values).sum()) /
+                               total_assets if total_assets else np.nan),
+        }
+
+        return summary
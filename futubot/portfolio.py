@@ -1,10 +1,26 @@
-from datetime import datetime, timedelta
+import copy
 
 import numpy as np
-from futu import KLType
-
+import pandas as pd
+from futu import KLType, OrderStatus, TrdSide
+
+from .daily_bars import DailyBarStore, roll_daily_bars
+from .journal import TradeJournal
+from .online_stats import OnlineCovariance
+from .optimizer import (max_sharpe_weights, min_variance_weights,
+                        risk_parity_weights, weights_to_lots)
+from .pnl import PnLTracker
+from .position_store import PositionStore
+from .risk import calculate_risk
 from .stockframe import StockFrame
 
+OPTIMIZATION_METHODS = ('min_variance', 'max_sharpe', 'risk_parity')
+# The statuses of the orders which are not completely filled yet.
+PENDING_STATUSES = (OrderStatus.WAITING_SUBMIT, OrderStatus.SUBMITTING,
+                    OrderStatus.SUBMITTED, OrderStatus.FILLED_PART)
+# The signs of the filled quantities of the transaction directions.
+_FILL_SIGNS = {TrdSide.SELL: -1.0, TrdSide.SELL_SHORT: -1.0}
+
 
 class Portfolio:
     """Implementation of user's portfolio.
@@ -16,40 +32,80 @@ class Portfolio:
 
     Args:
         accounts (Accounts): The Accounts object.
+        daily_bar_store (DailyBarStore): The store of the daily
+            candlesticks of holdings. Default: None, meaning a new store
+            kept in memory.
+        journal (TradeJournal): The journal of the orders and fills.
+            Default: None, meaning a new journal kept in memory.
+        portfolio_info (dict[float]): The portfolio info, e.g. restored
+            from a checkpoint. Default: None, meaning queried from the
+            broker with get_portfolio_info().
     """
-    def __init__(self, accounts):
+    def __init__(self,
+                 accounts,
+                 daily_bar_store=None,
+                 journal=None,
+                 portfolio_info=None):
 
         self.accounts = accounts
-        self.positions = {}
-        self._holdings = {}
+        # The positions kept in arrays, with read-only views of the
+        # positions and holdings.
+        self.position_store = PositionStore()
         self.positions_count = 0
-        self._portfolio_info = self.get_portfolio_info()
+        if portfolio_info is None:
+            portfolio_info = self.get_portfolio_info()
+        self._portfolio_info = portfolio_info
         self.risk_tolerance = 0.0
         self._futu_client = None
         self._historical_prices = []
         self._stockframe_daily = None
+        # The statistics of the log daily returns, and the time_key and
+        # close price of the last daily bar of each code added to them.
+        self._returns_stats = OnlineCovariance()
+        self._last_daily_time_key = None
+        self._last_daily_closes = {}
+        # The log daily returns with a day per row and a code per column.
+        self._daily_returns = None
+        # The daily bars rolled from the intraday StockFrame by code and
+        # time_key. Those of the last day are provisional until it is over.
+        self.daily_bar_store = daily_bar_store or DailyBarStore()
+        self._intraday_daily_bars = {}
+        self._provisional_time_key = None
+        # The mark-to-market PnL, which is reconciled with the broker
+        # before the first mark.
+        self.pnl = PnLTracker()
+        self._pnl_reconciled = False
+        self.journal = journal if journal is not None else TradeJournal()
+        self._open_orders = {}
 
     @property
     def portfolio_info(self):
         """Getter of portfolio_info property."""
         return self._portfolio_info
 
+    @property
+    def positions(self):
+        """Getter of positions property.
+
+        Returns:
+            (PositionsView): A read-only mapping of the codes in portfolio
+                to their positions, see PositionStore.record().
+        """
+        return self.position_store.positions
+
     @property
     def holdings(self):
-        """Getter and setter for holdings property.
+        """Getter of holdings property.
 
-        This function sets the values in holdings dict
-        to be the current holding quantities of codes in
-        portfolio. It also serves as a getter for the holdings
-        dict.
+        The holdings are a read-only view of the quantity array of the
+        position store, so every lookup is a single array read and
+        nothing is rebuilt when the positions change.
 
         Returns:
-            (dict[int | float]): A dict of current holding quantities.
+            (HoldingsView): A read-only mapping of the codes in portfolio
+                to their current holding quantities.
         """
-        for code in self.positions.keys():
-            self._holdings[code] = self.positions[code]['qty']
-
-        return self._holdings
+        return self.position_store.holdings
 
     def get_portfolio_info(self):
         """Get basic information of portfolio.
@@ -97,6 +153,32 @@ class Portfolio:
 
         return portfolio_info
 
+    def get_local_portfolio_info(self):
+        """Get basic information of portfolio from the mark-to-market PnL.
+
+        The same information as get_portfolio_info() is calculated from
+        the local positions and cash of the PnL tracker, so it is
+        available after every bar without any request to Futu.
+
+        Returns:
+            portfolio_info (dict[float]): A dict of portfolio info, see
+                get_portfolio_info(). The total invested value is the
+                cash plus the cost of the positions, and the PnL value
+                is the unrealized PnL of the positions.
+        """
+        summary = self.pnl.summary()
+        positions = self.pnl.positions()
+
+        portfolio_info = {}
+        portfolio_info['total_assets'] = summary['total_assets']
+        portfolio_info['total_market_value'] = summary['total_market_value']
+        portfolio_info['cash'] = summary['cash']
+        portfolio_info['total_invested_value'] = summary['cash'] + float(
+            (positions['qty'] * positions['cost_price']).sum())
+        portfolio_info['today_pnl_value'] = summary['unrealized_pnl']
+
+        return portfolio_info
+
     def add_position(self, code, stock_name, quantity):
         """Add a position to the portfolio.
 
@@ -112,8 +194,9 @@ class Portfolio:
             quantity (int | float): The holding quantity.
 
         Returns:
-            (dict) A dict of holding positions with keys 'code'
-                and values 'code', 'stock_name', 'qty'.
+            (PositionsView) A read-only mapping of holding positions with
+                keys 'code' and values 'code', 'stock_name', 'qty',
+                'cost_price', 'market_value' and 'pending_qty'.
         """
         if not isinstance(code, str):
             raise TypeError(f'Only str type is supported for code, '
@@ -129,10 +212,7 @@ class Portfolio:
         assert quantity >= 0, (f'quantity must be greater than or equal to 0, '
                                f'but got {quantity}')
 
-        self.positions[code] = {}
-        self.positions[code]['code'] = code
-        self.positions[code]['stock_name'] = stock_name
-        self.positions[code]['qty'] = quantity
+        self.position_store.add(code=code, stock_name=stock_name, qty=quantity)
         return self.positions
 
     def remove_position(self, code):
@@ -150,8 +230,7 @@ class Portfolio:
             raise TypeError(f'Only str type is supported for code, '
                             f'but got {type(code)}')
 
-        if code in self.positions:
-            del self.positions[code]
+        if self.position_store.remove(code):
             return (True, '{code} was successfully removed.'.format(code=code))
         else:
             return (False,
@@ -167,12 +246,22 @@ class Portfolio:
         """Update positions in portfolio based on order information.
 
         This function updates the cost price and holding quantity of
-        positions when trading orders are present. Note that we directly
+        positions when trading orders are present. Buying more of a
+        holding sets its cost price to the average cost of all the
+        shares. Note that we directly
         update the positions dict of the Portfolio object instead
         of updating positions using the Futu API position_list_query()
         since it is found that the API has certain latency and
         therefore does not update the positions in real time.
 
+        The quantities of the orders not filled yet when they were
+        placed are also kept as pending quantities, until
+        update_pending_orders() finds no pending order of their codes.
+        Every order is appended to the journal, and only its quantity
+        dealt so far is taken as a fill by the journal and the PnL. The
+        later fills of the pending orders are taken by
+        update_order_fills().
+
         Args:
             order_infos (dict[dict]): A dict of order info.
         """
@@ -182,16 +271,265 @@ class Portfolio:
 
         if order_infos:
             for code in order_infos.keys():
+                self.journal.record_order({'code': code, **order_infos[code]})
                 qty = order_infos[code]['qty']
                 cost_price = order_infos[code]['price']
                 trd_side = order_infos[code]['trd_side']
+                last_qty = self.holdings[code]
 
                 if trd_side == 'SELL':
-                    self.positions[code]['qty'] = 0
+                    new_qty = 0
                 else:
-                    self.positions[code]['qty'] = qty
+                    new_qty = last_qty + qty
+                    if last_qty > 0:
+                        # The cost price of an existing holding becomes the
+                        # average cost of the old and the new shares.
+                        last_cost = self.positions[code]['cost_price']
+                        cost_price = (last_qty * last_cost +
+                                      qty * cost_price) / new_qty
+
+                self.position_store.set(code,
+                                        qty=new_qty,
+                                        cost_price=cost_price)
+                pending = order_infos[code].get(
+                    'order_status') in PENDING_STATUSES
+                if pending:
+                    self.position_store.add_pending(code, new_qty - last_qty)
+
+                # Without the dealt quantity, an order is taken as filled
+                # unless it is pending.
+                dealt_qty = float(order_infos[code].get(
+                    'dealt_qty', 0.0 if pending else qty))
+                dealt_avg_price = float(
+                    order_infos[code].get('dealt_avg_price')
+                    or order_infos[code]['price'])
+                order_id = order_infos[code].get('order_id', '')
+                if dealt_qty > 0:
+                    self._record_fill(
+                        code=code,
+                        qty=_FILL_SIGNS.get(trd_side, 1.0) * dealt_qty,
+                        price=dealt_avg_price,
+                        order_id=order_id,
+                        time=order_infos[code].get('updated_time'))
+                if pending and order_id:
+                    self._open_orders[str(order_id)] = {
+                        'code': code,
+                        'trd_side': trd_side,
+                        'dealt_qty': dealt_qty,
+                        'dealt_avg_price': dealt_avg_price,
+                    }
+
+    def update_order_fills(self, orders):
+        """Record the new fills of the pending orders.
+
+        The quantity dealt since the last update of every order which was
+        pending when it was placed is recorded as a fill to the journal
+        and the PnL tracker, at the average price of that quantity. The
+        orders are no longer followed once they are not pending.
+
+        Args:
+            orders (pd.DataFrame): The orders with columns order_id,
+                order_status, dealt_qty, dealt_avg_price and updated_time,
+                see Accounts.get_history_orders(). None if the orders
+                cannot be queried.
+        """
+        if orders is None or not self._open_orders:
+            return
+
+        if not isinstance(orders, pd.DataFrame):
+            raise TypeError(f'Only pd.DataFrame type is supported for '
+                            f'orders, but got {type(orders)}')
+
+        orders = orders[orders['order_id'].astype(str).isin(
+            list(self._open_orders))]
+        for order in orders.to_dict('records'):
+            order_id = str(order['order_id'])
+            open_order = self._open_orders[order_id]
+            dealt_qty = float(order['dealt_qty'])
+            fill_qty = dealt_qty - open_order['dealt_qty']
+            if fill_qty > 0:
+                dealt_avg_price = float(order['dealt_avg_price'])
+                fill_price = (dealt_qty * dealt_avg_price -
+                              open_order['dealt_qty'] *
+                              open_order['dealt_avg_price']) / fill_qty
+                self._record_fill(
+                    code=open_order['code'],
+                    qty=_FILL_SIGNS.get(open_order['trd_side'], 1.0) *
+                    fill_qty,
+                    price=fill_price,
+                    order_id=order_id,
+                    time=order['updated_time'])
+                open_order['dealt_qty'] = dealt_qty
+                open_order['dealt_avg_price'] = dealt_avg_price
+
+            if order['order_status'] not in PENDING_STATUSES:
+                del self._open_orders[order_id]
+
+    def _record_fill(self, code, qty, price, order_id, time):
+        """Record a fill to both the PnL tracker and the journal."""
+        self.pnl.record_fill(code=code, qty=qty, price=price)
+        self.journal.record_fill(code=code,
+                                 qty=qty,
+                                 price=price,
+                                 order_id=order_id,
+                                 time=time)
+
+    def update_pending_orders(self, existing_orders):
+        """Clear the pending quantities of codes without pending orders.
+
+        Args:
+            existing_orders (dict[bool]): A dict of existing orders, see
+                Accounts.check_existing_orders().
+        """
+        if not isinstance(existing_orders, dict):
+            raise TypeError(
+                f'Only dict type is supported for existing_orders, '
+                f'but got {type(existing_orders)}')
+
+        self.position_store.clear_pending([
+            code for code, existing in existing_orders.items() if not existing
+        ])
 
-                self.positions[code]['cost_price'] = cost_price
+    def mark_to_market(self, latest_prices):
+        """Mark the positions to the closes of the latest bars.
+
+        The value and PnL are calculated locally from the positions, the
+        fills recorded by update_positions() and update_order_fills() and
+        the closes, so they are available after every bar without any
+        request to Futu. The positions are reconciled with the broker
+        before the first mark, and afterwards only when reconcile_pnl() is
+        called.
+
+        Args:
+            latest_prices (list[dict]): A list of the latest candlesticks,
+                e.g. returned by Robot.get_latest_bar(). The codes without
+                a candlestick keep their last prices.
+
+        Returns:
+            (dict[float]): The mark-to-market summary of the portfolio,
+                see PnLTracker.summary().
+        """
+        if not isinstance(latest_prices, list):
+            raise TypeError(f'Only list type is supported for latest_prices, '
+                            f'but got {type(latest_prices)}')
+
+        if not self._pnl_reconciled:
+            self.reconcile_pnl()
+        prices = {bar['code']: bar['close'] for bar in latest_prices}
+        self.pnl.mark(prices)
+        self.position_store.mark(prices)
+
+        return self.pnl.summary()
+
+    def reconcile_pnl(self, account_info=None, positions_dict=None):
+        """Reset the local positions and cash of the PnL to the broker.
+
+        Args:
+            account_info (dict[float]): The account info already queried
+                with Accounts.get_account_info(). Default: None, meaning
+                it is queried.
+            positions_dict (dict[dict]): The positions already queried
+                with Accounts.get_positions(). Default: None, meaning
+                they are queried.
+
+        Returns:
+            drifts (dict[float]): The differences between the local and
+                the broker values, see PnLTracker.reconcile().
+        """
+        if account_info is None:
+            account_info = self.accounts.get_account_info()
+        if positions_dict is None:
+            positions_dict = self.accounts.get_positions() or {}
+
+        self.pnl.add_codes(list(self.positions.keys()))
+        drifts = self.pnl.reconcile(cash=float(account_info['cash']),
+                                    positions=positions_dict)
+        self._pnl_reconciled = True
+
+        return drifts
+
+    def get_state(self):
+        """Get the state of the portfolio to be checkpointed.
+
+        The state is a copy, so that it can be pickled while the portfolio
+        is updated.
+
+        Returns:
+            state (dict): A dict with the following keys:
+                portfolio_info (dict[float]): The portfolio info.
+                positions (list[dict]): The positions, see
+                    PositionStore.record().
+                pnl (PnLTracker): The mark-to-market PnL.
+                pnl_reconciled (bool): Whether the PnL has been
+                    reconciled with the broker.
+                open_orders (dict[dict]): The orders pending when they
+                    were placed, with their quantities dealt so far.
+                daily_returns (dict): The daily history, the statistics
+                    of its log returns and the intraday daily bars.
+        """
+        return copy.deepcopy({
+            'portfolio_info':
+            self._portfolio_info,
+            'positions':
+            [self.position_store.record(code) for code in self.position_store],
+            'pnl':
+            self.pnl,
+            'pnl_reconciled':
+            self._pnl_reconciled,
+            'open_orders':
+            self._open_orders,
+            'daily_returns': {
+                'stockframe_daily': self._stockframe_daily,
+                'returns_stats': self._returns_stats,
+                'last_daily_time_key': self._last_daily_time_key,
+                'last_daily_closes': self._last_daily_closes,
+                'daily_returns': self._daily_returns,
+                'intraday_daily_bars': self._intraday_daily_bars,
+                'provisional_time_key': self._provisional_time_key,
+            },
+        })
+
+    def restore_state(self, state):
+        """Restore the state of the portfolio from a checkpoint.
+
+        The positions, including their pending quantities, the PnL, the
+        pending orders and the daily returns are replaced by those of the
+        state, without any request to Futu.
+
+        Args:
+            state (dict): The state returned by get_state().
+        """
+        if not isinstance(state, dict):
+            raise TypeError(f'Only dict type is supported for state, '
+                            f'but got {type(state)}')
+
+        self._portfolio_info = dict(state['portfolio_info'])
+        for code in list(self.position_store):
+            self.position_store.remove(code)
+        for position in state['positions']:
+            self.position_store.add(code=position['code'],
+                                    stock_name=position['stock_name'],
+                                    qty=position['qty'],
+                                    cost_price=position['cost_price'])
+            self.position_store.set(position['code'],
+                                    market_value=position['market_value'],
+                                    pending_qty=position['pending_qty'])
+
+        self.pnl = state['pnl']
+        self._pnl_reconciled = state['pnl_reconciled']
+        self._open_orders = {
+            order_id: dict(order)
+            for order_id, order in state['open_orders'].items()
+        }
+
+        daily_returns = state['daily_returns']
+        self._stockframe_daily = daily_returns['stockframe_daily']
+        self._returns_stats = daily_returns['returns_stats']
+        self._last_daily_time_key = daily_returns['last_daily_time_key']
+        self._last_daily_closes = daily_returns['last_daily_closes']
+        self._daily_returns = daily_returns['daily_returns']
+        self._intraday_daily_bars = daily_returns['intraday_daily_bars']
+        self._provisional_time_key = daily_returns['provisional_time_key']
 
     # def update_positions(self):
     #     existing_positions = self.get_positions()
@@ -241,6 +579,32 @@ class Portfolio:
 
         return weights
 
+    def calculate_local_portfolio_weights(self):
+        """Calculate the weights of holdings from the mark-to-market PnL.
+
+        The weights are calculated in the same way as
+        calculate_portfolio_weights(), from the local market values and
+        total assets of the PnL tracker instead of those of the broker.
+
+        Returns:
+            weights (dict[float]): The weights of holdings in
+                portfolio, see calculate_portfolio_weights().
+        """
+        total_assets = self.pnl.summary()['total_assets']
+        market_values = self.pnl.positions()['market_value']
+
+        weights = {}
+        weights['cash'] = 1.00
+        for code in self.positions.keys():
+            if code in market_values.index and total_assets:
+                weights[code] = round(
+                    float(market_values[code]) / total_assets, 3)
+            else:
+                weights[code] = 0.0
+            weights['cash'] -= weights[code]
+
+        return weights
+
     def portfolio_variance(self, weights, covariance_matrix):
         """Calculate the portfolio variance.
 
@@ -353,6 +717,9 @@ class Portfolio:
     def calculate_portfolio_metrics(self):
         """Calculate common metrics that measure portfolio performance.
 
+        The metrics include today's provisional daily bars rolled from the
+        intraday StockFrame by update_intraday_prices(), if any.
+
         Returns:
             portfolio_metrics (dict[dict]): A dict of portfolio metrics. The
                 outer dict has keys 'portfolio' and 'codes'. For each code, the
@@ -375,50 +742,30 @@ class Portfolio:
                         portfolio.
                     variance (float): The variance of portfolio.
         """
-        if not self._stockframe_daily:
-            self._get_daily_historical_prices()
+        self._load_daily_returns()
 
         portfolio_weights = self.calculate_portfolio_weights()
 
-        self._stockframe_daily.frame[
-            'log_daily_returns'] = self._stockframe_daily.code_groups[
-                'close'].transform(lambda x: np.log(x / x.shift()))
-
-        self._stockframe_daily.frame[
-            'daily_returns_avg'] = self._stockframe_daily.code_groups[
-                'log_daily_returns'].transform(lambda x: x.mean())
-
-        self._stockframe_daily.frame[
-            'daily_returns_std'] = self._stockframe_daily.code_groups[
-                'log_daily_returns'].transform(lambda x: x.std())
-
-        returns_cov = self._stockframe_daily.frame.unstack(
-            level=0)['log_daily_returns'].cov()
-
-        returns_avg = self._stockframe_daily.code_groups[
-            'daily_returns_avg'].tail(n=1).to_dict()
-
-        returns_std = self._stockframe_daily.code_groups[
-            'daily_returns_std'].tail(n=1).to_dict()
+        returns_stats = self._get_returns_stats()
+        returns_cov = returns_stats.covariance()
+        returns_avg = returns_stats.means()
+        returns_var = returns_stats.variances()
 
         portfolio_metrics = {}
 
         portfolio_variance = self.portfolio_variance(
             weights=portfolio_weights, covariance_matrix=returns_cov)
 
-        for (code, last_datetime) in returns_std:
+        for code in returns_cov.index:
 
             portfolio_metrics[code] = {}
             portfolio_metrics[code]['weight'] = portfolio_weights[code]
-            portfolio_metrics[code]['average_returns'] = returns_avg[(
-                code, last_datetime)]
+            portfolio_metrics[code]['average_returns'] = returns_avg[code]
             portfolio_metrics[code]['weighted_returns'] = returns_avg[
-                (code, last_datetime)] * portfolio_metrics[code]['weight']
-            portfolio_metrics[code][
-                'standard_deviation_of_returns'] = returns_std[(code,
-                                                                last_datetime)]
-            portfolio_metrics[code]['variance_of_returns'] = returns_std[(
-                code, last_datetime)]**2
+                code] * portfolio_metrics[code]['weight']
+            portfolio_metrics[code]['standard_deviation_of_returns'] = \
+                returns_var[code]**0.5
+            portfolio_metrics[code]['variance_of_returns'] = returns_var[code]
             portfolio_metrics[code]['covariance_of_returns'] = returns_cov.loc[
                 [code]].to_dict()
 
@@ -436,13 +783,318 @@ class Portfolio:
 
         return portfolio_metrics
 
+    def update_daily_prices(self, daily_prices):
+        """Update the statistics of the log daily returns with new bars.
+
+        The means, variances and covariances of the log daily returns used
+        by calculate_portfolio_metrics() are updated online in
+        O(codes^2) per day, without recalculating them over the history.
+        The bars not later than the last daily bar already added are
+        ignored.
+
+        Args:
+            daily_prices (list[dict]): A list of daily candlesticks, each a
+                dict with at least keys code, time_key and close.
+        """
+        if not isinstance(daily_prices, list):
+            raise TypeError(f'Only list type is supported for daily_prices, '
+                            f'but got {type(daily_prices)}')
+
+        if self._last_daily_time_key is None and self._stockframe_daily:
+            self._add_daily_stockframe(self._stockframe_daily)
+
+        daily_returns = []
+        daily_closes = {}
+        for daily_price in daily_prices:
+            time_key = pd.Timestamp(daily_price['time_key'])
+            if self._last_daily_time_key is None or \
+                    time_key > self._last_daily_time_key:
+                daily_closes.setdefault(
+                    time_key, {})[daily_price['code']] = daily_price['close']
+
+        for time_key in sorted(daily_closes):
+            closes = daily_closes[time_key]
+            returns = self._get_log_returns(closes)
+            self._returns_stats.update(returns)
+            daily_returns.append(pd.Series(returns, name=time_key))
+
+            self._last_daily_closes.update(closes)
+            self._last_daily_time_key = time_key
+
+        if daily_returns:
+            self._daily_returns = pd.concat(
+                [self._daily_returns,
+                 pd.DataFrame(daily_returns)]).sort_index(axis=1)
+
+    def update_intraday_prices(self, stockframe):
+        """Roll the intraday StockFrame into daily bars.
+
+        The bars of the last day in the StockFrame are kept as today's
+        provisional daily bars, which are included in the metrics but not
+        in their history. The bars of the earlier days not in the history
+        yet are final, and are added to the daily bar store and to the
+        statistics of returns with update_daily_prices() once the history
+        is loaded. Portfolio metrics are therefore refreshed intraday
+        without requesting any daily candlesticks from Futu. Only the days
+        from the last provisional day on are rolled again, so calling it
+        after every bar is cheap.
+
+        Args:
+            stockframe (StockFrame): The StockFrame of intraday
+                candlesticks, e.g. the one of the Robot.
+        """
+        if not isinstance(stockframe, StockFrame):
+            raise TypeError(f'Only StockFrame type is supported for '
+                            f'stockframe, but got {type(stockframe)}')
+
+        frame = stockframe.frame
+        if self._provisional_time_key is not None:
+            time_keys = frame.index.get_level_values('time_key')
+            frame = frame[time_keys >= self._provisional_time_key]
+
+        daily_bars = roll_daily_bars(frame)
+        if not daily_bars:
+            return
+
+        for daily_bar in daily_bars:
+            time_key = pd.Timestamp(daily_bar['time_key'])
+            self._intraday_daily_bars[(daily_bar['code'],
+                                       time_key)] = daily_bar
+            if self._provisional_time_key is None or \
+                    time_key > self._provisional_time_key:
+                self._provisional_time_key = time_key
+
+        if self._last_daily_time_key is not None:
+            self._add_intraday_daily_bars()
+
+    def calculate_risk_metrics(self,
+                               confidence=0.95,
+                               horizon=1,
+                               n_paths=10000,
+                               scenarios=None,
+                               processes=1):
+        """Calculate the VaR, CVaR and stress returns of the portfolio.
+
+        The risk is calculated with futubot.risk.calculate_risk() from the
+        log daily returns and their online statistics, with the weights of
+        the mark-to-market exposures of the PnL, so that it can be
+        refreshed intraday without any request to Futu.
+
+        Args:
+            confidence (float): The confidence level. Default: 0.95.
+            horizon (int): The number of days of the VaR. Default: 1.
+            n_paths (int): The number of Monte Carlo paths.
+                Default: 10000.
+            scenarios (dict[dict]): The simple return of each code under
+                each scenario, see futubot.risk.stress_test().
+                Default: None.
+            processes (int): The number of worker processes of the Monte
+                Carlo paths. Default: 1.
+
+        Returns:
+            risk_metrics (dict): The risk of futubot.risk.calculate_risk()
+                as fractions of the total assets, and for each VaR and
+                CVaR key, a key with suffix _value of the loss in cash.
+        """
+        self._load_daily_returns()
+        if not self._pnl_reconciled:
+            self.reconcile_pnl()
+
+        exposure = self.pnl.positions()['exposure']
+        risk_metrics = calculate_risk(
+            returns=self._daily_returns,
+            weights=exposure,
+            mean=self._returns_stats.means(),
+            covariance=self._returns_stats.covariance(),
+            confidence=confidence,
+            horizon=horizon,
+            n_paths=n_paths,
+            scenarios=scenarios,
+            processes=processes)
+
+        total_assets = self.pnl.summary()['total_assets']
+        for key in list(risk_metrics):
+            if key.endswith('var'):
+                risk_metrics[f'{key}_value'] = risk_metrics[key] * total_assets
+
+        return risk_metrics
+
+    def optimize_weights(self,
+                         method='min_variance',
+                         risk_free_rate=0.0,
+                         long_only=True):
+        """Optimize the weights of the codes in the portfolio.
+
+        The weights are optimized by futubot.optimizer on the mean and
+        covariance of the log daily returns used by
+        calculate_portfolio_metrics().
+
+        Args:
+            method (str): The optimization method, one of min_variance,
+                max_sharpe and risk_parity. Default: min_variance.
+            risk_free_rate (float): The daily return of a zero-risk
+                investment for max_sharpe. Default: 0.0.
+            long_only (bool): Whether the weights must not be negative.
+                Risk parity weights are always positive. Default: True.
+
+        Returns:
+            weights (dict[float]): The weight of each code, summing to 1.
+        """
+        assert method in OPTIMIZATION_METHODS, \
+            f'method must be one of {OPTIMIZATION_METHODS}, but got {method}'
+
+        self._load_daily_returns()
+        returns_stats = self._get_returns_stats()
+        codes = returns_stats.codes
+        mean = returns_stats.means().reindex(codes).fillna(0.0)
+        covariance = returns_stats.covariance().reindex(
+            index=codes, columns=codes).fillna(0.0)
+
+        if method == 'min_variance':
+            weights = min_variance_weights(covariance.to_numpy(),
+                                           long_only=long_only)
+        elif method == 'max_sharpe':
+            weights = max_sharpe_weights(mean.to_numpy(),
+                                         covariance.to_numpy(),
+                                         risk_free_rate=risk_free_rate,
+                                         long_only=long_only)
+        else:
+            weights = risk_parity_weights(covariance.to_numpy())
+
+        return dict(zip(codes, weights.tolist()))
+
+    def target_quantities(self,
+                          lot_sizes,
+                          method='min_variance',
+                          prices=None,
+                          **kwargs):
+        """Calculate the quantities in whole lots of the optimal weights.
+
+        The total assets and prices are those marked to market by the PnL,
+        and the codes without a price yet get no quantity.
+
+        Args:
+            lot_sizes (dict[float]): The lot size of each code, e.g.
+                returned by Accounts.get_lot_size().
+            method (str): The optimization method, see optimize_weights().
+                Default: min_variance.
+            prices (dict[float]): The latest prices of some codes, e.g.
+                the closes of the buy signals, used in place of the
+                marked prices. Default: None.
+            **kwargs: The other arguments of optimize_weights().
+
+        Returns:
+            quantities (dict[float]): The target quantity of each code.
+        """
+        if not isinstance(lot_sizes, dict):
+            raise TypeError(f'Only dict type is supported for lot_sizes, '
+                            f'but got {type(lot_sizes)}')
+
+        weights = pd.Series(self.optimize_weights(method=method, **kwargs))
+        if not self._pnl_reconciled:
+            self.reconcile_pnl()
+
+        last_prices = self.pnl.positions()['last_price']
+        if prices:
+            last_prices = pd.Series(prices,
+                                    dtype=float).combine_first(last_prices)
+        codes = [
+            code for code in weights.index
+            if code in lot_sizes and last_prices.get(code, 0.0) > 0
+        ]
+        quantities = weights_to_lots(
+            weights[codes].to_numpy(),
+            total_value=self.pnl.summary()['total_assets'],
+            prices=last_prices[codes].to_numpy(),
+            lot_sizes=[lot_sizes[code] for code in codes])
+
+        return dict(zip(codes, quantities.tolist()))
+
+    def _get_returns_stats(self):
+        """Get the statistics of the log daily returns including today.
+
+        Returns:
+            (OnlineCovariance): The statistics with the returns of today's
+                provisional daily bars, if any, added to a copy.
+        """
+        if not self._intraday_daily_bars:
+            return self._returns_stats
+
+        intraday_bars = self._intraday_daily_bars.items()
+        provisional_closes = {
+            code: daily_bar['close']
+            for (code, time_key), daily_bar in intraday_bars
+            if time_key > self._last_daily_time_key
+        }
+        returns_stats = self._returns_stats.copy()
+        returns_stats.update(self._get_log_returns(provisional_closes))
+
+        return returns_stats
+
+    def _load_daily_returns(self):
+        """Load the daily history and the final intraday daily bars."""
+        if not self._stockframe_daily:
+            self._get_daily_historical_prices()
+        if self._last_daily_time_key is None:
+            self._add_daily_stockframe(self._stockframe_daily)
+        if self._intraday_daily_bars:
+            self._add_intraday_daily_bars()
+
+    def _add_intraday_daily_bars(self):
+        """Add the final daily bars rolled from the intraday StockFrame."""
+        final_keys = [
+            key for key in self._intraday_daily_bars
+            if key[1] < self._provisional_time_key
+        ]
+        final_bars = []
+        for code, time_key in final_keys:
+            daily_bar = self._intraday_daily_bars.pop((code, time_key))
+            if time_key > self._last_daily_time_key:
+                final_bars.append(daily_bar)
+
+        if final_bars:
+            self.daily_bar_store.add(final_bars)
+            self.update_daily_prices(daily_prices=final_bars)
+
+    def _get_log_returns(self, closes):
+        """Get the log returns of closes from the last daily closes."""
+        return {
+            code: np.log(close / self._last_daily_closes[code])
+            for code, close in closes.items()
+            if code in self._last_daily_closes
+        }
+
+    def _add_daily_stockframe(self, stockframe_daily):
+        """Add the log daily returns of a StockFrame to the statistics."""
+        frame = stockframe_daily.frame.sort_index()
+        codes = frame.index.get_level_values('code')
+        time_keys = pd.DatetimeIndex(frame.index.get_level_values('time_key'))
+
+        # The log return of each bar from the previous bar of its code.
+        log_close = np.log(frame['close'].to_numpy(dtype=float))
+        log_returns = np.diff(log_close, prepend=np.nan)
+        log_returns[1:][codes[1:] != codes[:-1]] = np.nan
+
+        returns = pd.Series(
+            log_returns,
+            index=pd.MultiIndex.from_arrays([time_keys, codes],
+                                            names=['time_key', 'code']))
+        self._daily_returns = returns.unstack(level='code')
+        self._returns_stats.update_batch(self._daily_returns)
+
+        last_bars = frame.groupby(level='code').tail(1)
+        self._last_daily_closes = dict(
+            zip(last_bars.index.get_level_values('code'), last_bars['close']))
+        self._last_daily_time_key = time_keys.max()
+
     def _get_daily_historical_prices(self, ktype=KLType.K_DAY):
         """Get the daily historical prices of holdings in portfolio.
 
         The daily historical prices are used to calculate the common
-        metrics that measure portfolio performance. The end_date of
-        the historical prices is the current date, and the start_date
-        is one year behind the end_date.
+        metrics that measure portfolio performance. They cover the year
+        before today, of which only the days missing from the daily bar
+        store are requested from Futu. Today's prices are rolled from the
+        intraday StockFrame by update_intraday_prices() instead.
 
         Args:
             ktype (KLType): The type of candlestick. Default: K_DAY.
@@ -451,34 +1103,16 @@ class Portfolio:
             (StockFrame): A StockFrame object of historical prices of
                 all holdings in portfolio.
         """
-        historical_prices = []
+        assert ktype == KLType.K_DAY, \
+            f'Only daily candlesticks are stored, but got {ktype}'
 
         code_list = list(self.positions.keys())
 
-        end_date = datetime.today()
-        start_date = end_date - timedelta(days=365)
-        end_date = end_date.strftime('%Y-%m-%d %H:%M:%S')
-        start_date = start_date.strftime('%Y-%m-%d %H:%M:%S')
-
-        for code in code_list:
-            historical_quotes = self.accounts.get_historical_candles(
-                code=code,
-                start=start_date,
-                end=end_date,
-                ktype=ktype,
-            )
-
-            for index, candle in historical_quotes.iterrows():
-                candle = candle.to_dict()
-                historical_price = {}
-                historical_price['time_key'] = candle['time_key']
-                historical_price['code'] = candle['code']
-                historical_price['open'] = candle['open']
-                historical_price['close'] = candle['close']
-                historical_price['high'] = candle['high']
-                historical_price['low'] = candle['low']
-                historical_price['volume'] = candle['volume']
-                historical_prices.append(historical_price)
+        self.daily_bar_store.fetch(accounts=self.accounts,
+                                   code_list=code_list,
+                                   days=365)
+        historical_prices = self.daily_bar_store.get_bars(code_list=code_list,
+                                                          days=365)
 
         self._stockframe_daily = StockFrame(data=historical_prices)
         self._stockframe_daily.create_frame()
@@ -0,0 +1,291 @@
+from collections.abc import Mapping
+
+import numpy as np
+
+POSITION_FIELDS = ('qty', 'cost_price', 'market_value', 'pending_qty')
+
+
+class PositionStore:
+    """Positions of a portfolio kept in arrays indexed by code slots.
+
+    Every code gets a slot the first time it is added, which it keeps even
+    after it is removed, so that the arrays of the fields in
+    POSITION_FIELDS can be indexed by slot and updated with single array
+    operations. The version counter is increased by every change, so that
+    readers can tell whether the positions changed since they last looked.
+
+    Args:
+        capacity (int): The number of slots allocated in advance. The
+            arrays grow by doubling when they are full. Default: 16.
+    """
+    def __init__(self, capacity=16):
+        if not isinstance(capacity, int):
+            raise TypeError(f'Only int type is supported for capacity, '
+                            f'but got {type(capacity)}')
+        assert capacity > 0, \
+            f'capacity must be greater than 0, but got {capacity}'
+
+        self.codes = []
+        self.stock_names = []
+        self.version = 0
+        self._slots = {}
+        self._active = np.zeros(capacity, dtype=bool)
+        self._arrays = {field: np.zeros(capacity) for field in POSITION_FIELDS}
+        self.positions = PositionsView(self)
+        self.holdings = HoldingsView(self)
+
+    def __contains__(self, code):
+        slot = self._slots.get(code)
+        return slot is not None and bool(self._active[slot])
+
+    def __len__(self):
+        return int(self._active[:len(self.codes)].sum())
+
+    def __iter__(self):
+        active = self._active
+        return (code for slot, code in enumerate(self.codes) if active[slot])
+
+    def add(self, code, stock_name, qty=0.0, cost_price=0.0):
+        """Add or replace the position of a code.
+
+        Args:
+            code (str): The code of security.
+            stock_name (str): The name of security.
+            qty (int | float): The holding quantity. Default: 0.0.
+            cost_price (int | float): The average cost. Default: 0.0.
+
+        Returns:
+            slot (int): The slot of the code.
+        """
+        if not isinstance(code, str):
+            raise TypeError(f'Only str type is supported for code, '
+                            f'but got {type(code)}')
+        if not isinstance(stock_name, str):
+            raise TypeError(f'Only str type is supported for stock_name, '
+                            f'but got {type(stock_name)}')
+
+        slot = self._slots.get(code)
+        if slot is None:
+            slot = len(self.codes)
+            if slot == len(self._active):
+                self._grow()
+            self._slots[code] = slot
+            self.codes.append(code)
+            self.stock_names.append(stock_name)
+        self.stock_names[slot] = stock_name
+
+        for array in self._arrays.values():
+            array[slot] = 0.0
+        self._arrays['qty'][slot] = qty
+        self._arrays['cost_price'][slot] = cost_price
+        self._active[slot] = True
+        self.version += 1
+
+        return slot
+
+    def remove(self, code):
+        """Remove the position of a code, which keeps its slot.
+
+        Args:
+            code (str): The code of security.
+
+        Returns:
+            bool: True if the code is removed, otherwise False.
+        """
+        if code not in self:
+            return False
+
+        slot = self._slots[code]
+        self._active[slot] = False
+        for array in self._arrays.values():
+            array[slot] = 0.0
+        self.version += 1
+
+        return True
+
+    def slot(self, code):
+        """Get the slot of a code in the arrays.
+
+        Args:
+            code (str): The code of security.
+
+        Returns:
+            (int): The slot of the code.
+        """
+        if code not in self:
+            raise KeyError(code)
+
+        return self._slots[code]
+
+    def get(self, code, field):
+        """Get a field of the position of a code.
+
+        Args:
+            code (str): The code of security.
+            field (str): One of POSITION_FIELDS.
+
+        Returns:
+            (float): The value of the field.
+        """
+        return float(self._arrays[field][self.slot(code)])
+
+    def set(self, code, **fields):
+        """Set fields of the position of a code.
+
+        Args:
+            code (str): The code of security.
+            **fields: The values of the fields in POSITION_FIELDS.
+        """
+        slot = self.slot(code)
+        for field, value in fields.items():
+            if field not in self._arrays:
+                raise KeyError(field)
+            self._arrays[field][slot] = value
+        self.version += 1
+
+    def add_pending(self, code, qty):
+        """Add the quantity of an order not filled yet.
+
+        Args:
+            code (str): The code of security.
+            qty (int | float): The quantity of the order, positive for
+                buys and negative for sells.
+        """
+        self._arrays['pending_qty'][self.slot(code)] += qty
+        self.version += 1
+
+    def clear_pending(self, codes):
+        """Clear the pending quantities of codes without pending orders.
+
+        Args:
+            codes (list[str]): The codes of security.
+        """
+        slots = [self._slots[code] for code in codes if code in self]
+        self._arrays['pending_qty'][slots] = 0.0
+        self.version += 1
+
+    def mark(self, prices):
+        """Set the market values of the positions at the latest prices.
+
+        Args:
+            prices (dict[float]): The latest prices with codes as keys.
+                Other codes keep their market values.
+        """
+        if not isinstance(prices, dict):
+            raise TypeError(f'Only dict type is supported for prices, '
+                            f'but got {type(prices)}')
+
+        slots = []
+        values = []
+        for code, price in prices.items():
+            if code in self:
+                slots.append(self._slots[code])
+                values.append(price)
+        self._arrays['market_value'][slots] = (self._arrays['qty'][slots] *
+                                               np.asarray(values, dtype=float))
+        self.version += 1
+
+    def view(self, field):
+        """Get a read-only view of a field of all the slots.
+
+        Args:
+            field (str): One of POSITION_FIELDS.
+
+        Returns:
+            (np.ndarray): The values of the field indexed by slot, which
+                are zero for the removed codes.
+        """
+        view = self._arrays[field][:len(self.codes)].view()
+        view.flags.writeable = False
+
+        return view
+
+    def exposures(self, total_value):
+        """Get the exposure of every slot.
+
+        Args:
+            total_value (float): The value of the portfolio.
+
+        Returns:
+            (np.ndarray): The market value over total_value of each slot.
+        """
+        return self.view('market_value') / total_value
+
+    def record(self, code):
+        """Get the position of a code as a dict.
+
+        Args:
+            code (str): The code of security.
+
+        Returns:
+            (dict): A dict with keys code, stock_name and POSITION_FIELDS.
+        """
+        slot = self.slot(code)
+        record = {'code': code, 'stock_name': self.stock_names[slot]}
+        for field, array in self._arrays.items():
+            record[field] = float(array[slot])
+
+        return record
+
+    def _grow(self):
+        """Double the number of slots of the arrays."""
+        capacity = 2 * len(self._active)
+        self._active = np.resize(self._active, capacity)
+        self._active[len(self.codes):] = False
+        for field, array in self._arrays.items():
+            grown = np.zeros(capacity)
+            grown[:len(array)] = array
+            self._arrays[field] = grown
+
+
+class PositionsView(Mapping):
+    """Read-only mapping of codes to their positions as dicts.
+
+    Args:
+        store (PositionStore): The PositionStore object.
+    """
+    def __init__(self, store):
+        self._store = store
+
+    def __getitem__(self, code):
+        return self._store.record(code)
+
+    def __iter__(self):
+        return iter(self._store)
+
+    def __len__(self):
+        return len(self._store)
+
+    def __contains__(self, code):
+        return code in self._store
+
+    def __repr__(self):
+        return repr(dict(self))
+
+
+class HoldingsView(Mapping):
+    """Read-only mapping of codes to their holding quantities.
+
+    Every lookup reads the quantity array at the slot of the code, so
+    that the holdings are never rebuilt.
+
+    Args:
+        store (PositionStore): The PositionStore object.
+    """
+    def __init__(self, store):
+        self._store = store
+
+    def __getitem__(self, code):
+        return float(self._store._arrays['qty'][self._store.slot(code)])
+
+    def __iter__(self):
+        return iter(self._store)
+
+    def __len__(self):
+        return len(self._store)
+
+    def __contains__(self, code):
+        return code in self._store
+
+    def __repr__(self):
+        return repr(dict(self))
@@ -0,0 +1,286 @@
+import multiprocessing
+from statistics import NormalDist
+
+import numpy as np
+import pandas as pd
+
+
+def historical_var(portfolio_returns, confidence=0.95):
+    """Calculate the historical VaR and CVaR of portfolio returns.
+
+    Args:
+        portfolio_returns (np.ndarray): The observed returns of the
+            portfolio.
+        confidence (float): The confidence level. Default: 0.95.
+
+    Returns:
+        (tuple[float]): The value at risk and the conditional value at
+            risk (expected shortfall) as fractions of the portfolio value,
+            positive for losses.
+    """
+    assert 0 < confidence < 1, \
+        f'confidence must be between 0 and 1, but got {confidence}'
+
+    losses = -np.asarray(portfolio_returns, dtype=float)
+    losses = losses[~np.isnan(losses)]
+    if losses.size == 0:
+        return np.nan, np.nan
+
+    var = np.quantile(losses, confidence)
+    cvar = losses[losses >= var].mean()
+
+    return float(var), float(cvar)
+
+
+def parametric_var(mean, variance, confidence=0.95):
+    """Calculate the VaR and CVaR of normally distributed returns.
+
+    Args:
+        mean (float): The mean return of the portfolio.
+        variance (float): The variance of the returns of the portfolio.
+        confidence (float): The confidence level. Default: 0.95.
+
+    Returns:
+        (tuple[float]): The value at risk and the conditional value at
+            risk as fractions of the portfolio value.
+    """
+    assert 0 < confidence < 1, \
+        f'confidence must be between 0 and 1, but got {confidence}'
+    assert variance >= 0, (f'variance must be greater than or equal to 0, '
+                           f'but got {variance}')
+
+    standard_normal = NormalDist()
+    z = standard_normal.inv_cdf(confidence)
+    standard_deviation = variance**0.5
+
+    # The mean of the standard normal beyond z.
+    tail_mean = standard_normal.pdf(z) / (1 - confidence)
+
+    var = -mean + z * standard_deviation
+    cvar = -mean + tail_mean * standard_deviation
+
+    return float(var), float(cvar)
+
+
+def _simulate_portfolio_returns(mean, factor, weights, n_paths, seed):
+    """Simulate the simple returns of the portfolio on n_paths paths."""
+    rng = np.random.default_rng(seed)
+    log_returns = mean + rng.standard_normal(
+        (n_paths, factor.shape[1])) @ factor.T
+
+    return np.expm1(log_returns) @ weights
+
+
+def _simulate_batch(args):
+    """Simulate a batch of paths in a worker process."""
+    return _simulate_portfolio_returns(*args)
+
+
+def simulate_portfolio_returns(mean,
+                               covariance,
+                               weights,
+                               n_paths=10000,
+                               horizon=1,
+                               batch_size=10000,
+                               seed=0,
+                               processes=1):
+    """Simulate the returns of the portfolio over a horizon.
+
+    The log returns of the codes over the horizon are drawn from a
+    multivariate normal distribution with the daily mean and covariance
+    scaled by the horizon, and the portfolio return of each path is the
+    weighted sum of the simple returns of the codes. The paths are drawn
+    in batches of batch_size, each a single matrix product, either in the
+    current process or on a pool of worker processes.
+
+    Args:
+        mean (np.ndarray): The mean daily log return of each code.
+        covariance (np.ndarray): The covariance matrix of the daily log
+            returns, which only needs to be positive semi-definite.
+        weights (np.ndarray): The weight of each code in the portfolio.
+        n_paths (int): The number of paths. Default: 10000.
+        horizon (int): The number of days. Default: 1.
+        batch_size (int): The number of paths drawn at once. Default:
+            10000.
+        seed (int): The seed of the random generator. Default: 0.
+        processes (int): The number of worker processes. Default: 1,
+            meaning the paths are drawn in the current process.
+
+    Returns:
+        (np.ndarray): The simple return of the portfolio on each path.
+    """
+    assert n_paths > 0, f'n_paths must be greater than 0, but got {n_paths}'
+    assert horizon > 0, f'horizon must be greater than 0, but got {horizon}'
+    assert batch_size > 0, \
+        f'batch_size must be greater than 0, but got {batch_size}'
+
+    mean = np.asarray(mean, dtype=float) * horizon
+    covariance = np.asarray(covariance, dtype=float) * horizon
+    weights = np.asarray(weights, dtype=float)
+
+    # The eigendecomposition also factorizes the singular covariance
+    # matrices of codes moving together.
+    eigenvalues, eigenvectors = np.linalg.eigh(covariance)
+    factor = eigenvectors * np.sqrt(np.clip(eigenvalues, 0, None))
+
+    batch_sizes = [batch_size] * (n_paths // batch_size)
+    if n_paths % batch_size:
+        batch_sizes.append(n_paths % batch_size)
+    seeds = np.random.SeedSequence(seed).spawn(len(batch_sizes))
+    tasks = [(mean, factor, weights, size, batch_seed)
+             for size, batch_seed in zip(batch_sizes, seeds)]
+
+    if processes == 1 or len(tasks) == 1:
+        batches = [_simulate_batch(task) for task in tasks]
+    else:
+        with multiprocessing.Pool(processes=processes) as pool:
+            batches = pool.map(_simulate_batch, tasks)
+
+    return np.concatenate(batches)
+
+
+def monte_carlo_var(mean, covariance, weights, confidence=0.95, **kwargs):
+    """Calculate the Monte Carlo VaR and CVaR of a portfolio.
+
+    Args:
+        mean (np.ndarray): The mean daily log return of each code.
+        covariance (np.ndarray): The covariance matrix of the daily log
+            returns.
+        weights (np.ndarray): The weight of each code in the portfolio.
+        confidence (float): The confidence level. Default: 0.95.
+        **kwargs: The arguments of simulate_portfolio_returns(), e.g.
+            n_paths, horizon and processes.
+
+    Returns:
+        (tuple[float]): The value at risk and the conditional value at
+            risk as fractions of the portfolio value.
+    """
+    portfolio_returns = simulate_portfolio_returns(mean, covariance, weights,
+                                                   **kwargs)
+
+    return historical_var(portfolio_returns, confidence=confidence)
+
+
+def stress_test(weights, scenarios):
+    """Calculate the portfolio returns under scenario shocks.
+
+    Args:
+        weights (pd.Series): The weight of each code in the portfolio.
+        scenarios (dict[dict]): The simple return of each code under each
+            scenario, with the names of the scenarios as outer keys and
+            the codes as inner keys. The codes missing from a scenario
+            are not shocked.
+
+    Returns:
+        (dict[float]): The simple return of the portfolio under each
+            scenario.
+    """
+    if not isinstance(weights, pd.Series):
+        raise TypeError(f'Only pd.Series type is supported for weights, '
+                        f'but got {type(weights)}')
+    if not isinstance(scenarios, dict):
+        raise TypeError(f'Only dict type is supported for scenarios, '
+                        f'but got {type(scenarios)}')
+    if not scenarios:
+        return {}
+
+    shocks = pd.DataFrame.from_dict(scenarios, orient='index')
+    shocks = shocks.reindex(columns=weights.index).fillna(0.0)
+    portfolio_returns = shocks.to_numpy(dtype=float) @ weights.to_numpy(
+        dtype=float)
+
+    return dict(zip(shocks.index, portfolio_returns.tolist()))
+
+
+def calculate_risk(returns,
+                   weights,
+                   mean=None,
+                   covariance=None,
+                   confidence=0.95,
+                   horizon=1,
+                   n_paths=10000,
+                   scenarios=None,
+                   seed=0,
+                   processes=1):
+    """Calculate the VaR, CVaR and stress returns of a portfolio.
+
+    Args:
+        returns (pd.DataFrame): The daily log returns with a day per row
+            and a code per column. Missing returns are taken as zero by
+            the historical method and skipped pairwise by the others.
+        weights (pd.Series): The weight of each code in the portfolio.
+            The codes missing from returns have no risk.
+        mean (pd.Series): The mean daily log return of each code, e.g.
+            kept online by OnlineCovariance. Default: None, meaning the
+            mean of returns.
+        covariance (pd.DataFrame): The covariance matrix of the daily log
+            returns. Default: None, meaning the covariance of returns.
+        confidence (float): The confidence level. Default: 0.95.
+        horizon (int): The number of days of the VaR. Default: 1.
+        n_paths (int): The number of Monte Carlo paths. Default: 10000.
+        scenarios (dict[dict]): See stress_test(). Default: None.
+        seed (int): The seed of the Monte Carlo paths. Default: 0.
+        processes (int): The number of worker processes of the Monte
+            Carlo paths. Default: 1.
+
+    Returns:
+        risk (dict): A dict of the risk of the portfolio as fractions of
+            its value, with the following keys:
+                historical_var (float): The VaR of the observed returns
+                    over overlapping periods of horizon days.
+                historical_cvar (float): The CVaR of the observed returns.
+                parametric_var (float): The VaR of normal returns.
+                parametric_cvar (float): The CVaR of normal returns.
+                monte_carlo_var (float): The VaR of the simulated returns.
+                monte_carlo_cvar (float): The CVaR of the simulated
+                    returns.
+                stress (dict[float]): The return under each scenario.
+    """
+    if not isinstance(returns, pd.DataFrame):
+        raise TypeError(f'Only pd.DataFrame type is supported for returns, '
+                        f'but got {type(returns)}')
+    if not isinstance(weights, pd.Series):
+        raise TypeError(f'Only pd.Series type is supported for weights, '
+                        f'but got {type(weights)}')
+
+    codes = returns.columns
+    w = weights.reindex(codes).fillna(0.0).to_numpy(dtype=float)
+
+    # The log returns over overlapping periods of horizon days.
+    log_returns = np.nan_to_num(returns.to_numpy(dtype=float))
+    cumulative = np.cumsum(log_returns, axis=0)
+    cumulative = np.concatenate([np.zeros((1, len(codes))), cumulative])
+    period_returns = cumulative[horizon:] - cumulative[:-horizon]
+    historical = historical_var(np.expm1(period_returns) @ w,
+                                confidence=confidence)
+
+    if mean is None:
+        mean = returns.mean()
+    if covariance is None:
+        covariance = returns.cov()
+    mean = mean.reindex(codes).fillna(0.0).to_numpy(dtype=float)
+    covariance = covariance.reindex(
+        index=codes, columns=codes).fillna(0.0).to_numpy(dtype=float)
+    parametric = parametric_var(mean @ w * horizon,
+                                w @ covariance @ w * horizon,
+                                confidence=confidence)
+    monte_carlo = monte_carlo_var(mean,
+                                  covariance,
+                                  w,
+                                  confidence=confidence,
+                                  n_paths=n_paths,
+                                  horizon=horizon,
+                                  seed=seed,
+                                  processes=processes)
+
+    risk = {
+        'historical_var': historical[0],
+        'historical_cvar': historical[1],
+        'parametric_var': parametric[0],
+        'parametric_cvar': parametric[1],
+        'monte_carlo_var': monte_carlo[0],
+        'monte_carlo_cvar': monte_carlo[1],
+        'stress': stress_test(weights, scenarios or {}),
+    }
+
+    return risk
@@ -1,13 +1,17 @@
 import pprint
 import signal
 import time
-from datetime import datetime, timedelta
+from datetime import timedelta
 
 import pandas as pd
 from futu import KLType, TrdSide
 
+from .clock import WallClock
+from .latency import LatencyRecorder
 from .portfolio import Portfolio
+from .scheduler import BarScheduler
 from .stockframe import StockFrame
+from .trading_calendar import TradingCalendar
 
 
 class Robot:
@@ -16,8 +20,31 @@ class Robot:
     Args:
         accounts (Accounts): The Accounts object.
         order_type (str): The type of order. Default: limit.
+        clock (Clock): The clock telling the current time and putting the
+            robot on sleep, e.g. AcceleratedClock for a fast replay or
+            SimulatedClock for a backtest. Default: None, meaning the
+            WallClock for live trading.
+        scheduler (BarScheduler): The scheduler of the bars to wait for.
+            Default: None, meaning 1-minute bars on the clock and the
+            calendar.
+        calendar (TradingCalendar): The trading calendar of HKEX.
+            Default: None, meaning that every weekday has the regular
+            sessions.
+        latency (LatencyRecorder): The recorder of the latencies of the
+            trading loop, e.g. of every order round trip. Default: None,
+            meaning a new recorder printing the stats.
+        sizing (str): The optimization method of the portfolio weights by
+            which buy orders are sized, see Portfolio.optimize_weights().
+            Default: None, meaning that every buy is one lot.
     """
-    def __init__(self, accounts, order_type='limit'):
+    def __init__(self,
+                 accounts,
+                 order_type='limit',
+                 clock=None,
+                 scheduler=None,
+                 calendar=None,
+                 latency=None,
+                 sizing=None):
 
         self.accounts = accounts
         self.trades = {}
@@ -25,75 +52,91 @@ class Robot:
         self.stockframe = None
         self.portfolio = None
         self.order_type = order_type
+        self.clock = clock or WallClock()
+        self.calendar = calendar or TradingCalendar()
+        self.scheduler = scheduler or BarScheduler(clock=self.clock,
+                                                   calendar=self.calendar)
+        self.latency = latency or LatencyRecorder()
+        self.sizing = sizing
 
         signal.signal(signal.SIGINT, self._keyboard_interrupt_handler)
 
-    @staticmethod
-    def is_regular_trading_time():
+    def is_regular_trading_time(self):
         """Check whether current time is within regular trading time.
 
         For TrdMarket.HK, the regular trading time of HKEX is from
-        HKT 9:30:00 to 16:00:00. Market is temporarily closed from
-        12:00:00 to 13:00:00 for lunch break, during which FutuBot is
-        put on sleep.
+        HKT 9:30:00 to 16:00:00, as given by the sessions of the trading
+        calendar. Market is temporarily closed from 12:00:00 to 13:00:00
+        for lunch break, which is not regular trading time. The afternoon
+        session starts from 13:01:30 so that the first afternoon bar is
+        available.
 
         Returns:
             bool: True if current time is in regular trading time,
-                otherwise False (put on sleep if current time is
-                within lunch break).
+                otherwise False.
 
         Examples:
         >>> current_time = HKT 10:00:00
-        >>> Robot.is_regular_trading_time()
+        >>> futubot.is_regular_trading_time()
         True
         >>> current_time = HKT 12:30:00
-        >>> Robot.is_regular_trading_time()
+        >>> futubot.is_regular_trading_time()
+        False
+        """
+        return (self.calendar.is_in_session(self.clock.now())
+                and not self.is_lunch_break())
+
+    def is_lunch_break(self):
+        """Check whether current time is within lunch break.
+
+        Any break between two sessions of a trading day, e.g. the end of a
+        typhoon closure, is treated as a lunch break.
+
+        Returns:
+            bool: True if current time is after the close of a session and
+                not later than the start of the next session of the same
+                day, otherwise False.
+        """
+        return self._get_lunch_break_end_time(self.clock.now()) is not None
+
+    def wait_for_trading_time(self):
+        """Wait until regular trading time if market is at lunch break.
+
+        Returns:
+            bool: True if current time is in regular trading time, after
+                sleeping through the lunch break if needed, otherwise
+                False.
+
+        Examples:
+        >>> current_time = HKT 12:30:00
+        >>> futubot.wait_for_trading_time()
         Trading is temporarily pasued during lunch break.
-        Sleep time: 1800 s
+        Sleep time: 1890 s
+        True
         >>> current_time = HKT 17:00:00
-        >>> Robot.is_regular_trading_time()
+        >>> futubot.wait_for_trading_time()
         False
         """
-        morning_market_start_time = datetime.utcnow().replace(
-            hour=1, minute=30, second=00).timestamp()
-        morning_market_end_time = datetime.utcnow().replace(
-            hour=4, minute=00, second=00).timestamp()
-
-        lunch_break_start_time = datetime.utcnow().replace(
-            hour=4, minute=00, second=00).timestamp()
-        lunch_break_end_time = datetime.utcnow().replace(
-            hour=5, minute=1, second=30).timestamp()
-
-        afternoon_market_start_time = datetime.utcnow().replace(
-            hour=5, minute=1, second=30).timestamp()
-        afternoon_market_end_time = datetime.utcnow().replace(
-            hour=8, minute=00, second=00).timestamp()
-
-        current_time = datetime.utcnow().timestamp()
-
-        print(
-            'current_time',
-            datetime.fromtimestamp(current_time).strftime('%Y-%m-%d %H:%M:%S'))
-
-        if morning_market_start_time <= current_time <= \
-            morning_market_end_time or afternoon_market_start_time \
-                < current_time <= afternoon_market_end_time:
-            return True
+        current_time = self.clock.now()
+        print('current_time', current_time.strftime('%Y-%m-%d %H:%M:%S'))
 
-        elif lunch_break_start_time < current_time <= lunch_break_end_time:
-            time_diff = datetime.fromtimestamp(
-                lunch_break_end_time) - datetime.fromtimestamp(current_time)
+        lunch_break_end_time = self._get_lunch_break_end_time(current_time)
+        if lunch_break_end_time is not None:
+            time_diff = lunch_break_end_time - current_time
             time_diff = int(time_diff.total_seconds())
 
             print('Trading is temporarily pasued during lunch break.')
             print(f'Sleep time: {time_diff} s')
-            time.sleep(time_diff)
+            self.clock.sleep_until(lunch_break_end_time)
 
             return True
 
-        return False
+        return self.is_regular_trading_time()
 
-    def create_portfolio(self, stocks_of_interest=None):
+    def create_portfolio(self,
+                         stocks_of_interest=None,
+                         daily_bar_store=None,
+                         journal=None):
         """Create a new portfolio object.
 
         The function instantiates a Portfolio object and adds instruments
@@ -107,6 +150,12 @@ class Robot:
         Args:
             stocks_of_interest (list[str]): A list of the codes of stocks
                 of interest.
+            daily_bar_store (DailyBarStore): The store of the daily
+                candlesticks used by the portfolio metrics. Default: None,
+                meaning a new store kept in memory.
+            journal (TradeJournal): The journal of the orders and fills,
+                e.g. reloaded from the file of a previous run. Default:
+                None, meaning a new journal kept in memory.
 
         Returns:
             (Portfolio): A futubot.portfolio.Portfolio object containing
@@ -123,7 +172,9 @@ class Robot:
          'HK.09988': {'code': 'HK.09988', 'qty': 0,
              'stock_name': 'BABA-SW'}}
         """
-        self.portfolio = Portfolio(accounts=self.accounts)
+        self.portfolio = Portfolio(accounts=self.accounts,
+                                   daily_bar_store=daily_bar_store,
+                                   journal=journal)
 
         existing_positions = self.accounts.get_positions()
 
@@ -309,7 +360,7 @@ class Robot:
             else:
                 lookback = timedelta(minutes=60)
 
-            end_date = datetime.today()
+            end_date = self.clock.now()
             start_date = end_date - lookback
             end_date = end_date.strftime('%Y-%m-%d %H:%M:%S')
             start_date = start_date.strftime('%Y-%m-%d %H:%M:%S')
@@ -343,10 +394,12 @@ class Robot:
         buy_sell_signals. When a buy signal is present for a given code,
         the function first checks if the current trading account
         exceeds the maximum cash buying power, and then buys one lot of
-        stock if there is enough cash buying power. Conversely, when a
-        sell signal is present, the function first checks if the account
-        exceeds the maximum position selling power, and then sell all
-        the current holding if there is sufficient selling power.
+        stock, or the lots up to the target quantity of the optimal
+        weights if sizing is set, if there is enough cash buying power.
+        Conversely, when a sell signal is present, the function first
+        checks if the account exceeds the maximum position selling power,
+        and then sell all the current holding if there is sufficient
+        selling power.
 
         Args:
             buy_sell_signals (dict[dict]): A dict of buy and sell
@@ -375,23 +428,43 @@ class Robot:
 
         if buy_signals:
             code_list = list(buy_signals.keys())
-            lot_sizes = self.accounts.get_lot_size(code_list=code_list)
+            if self.sizing:
+                lot_sizes = self.accounts.get_lot_size(
+                    code_list=list(self.portfolio.positions.keys()))
+                with self.latency.time('sizing'):
+                    target_quantities = self.portfolio.target_quantities(
+                        lot_sizes=lot_sizes,
+                        method=self.sizing,
+                        prices={
+                            code: buy_signals[code]['close']
+                            for code in code_list
+                        })
+            else:
+                lot_sizes = self.accounts.get_lot_size(code_list=code_list)
 
             for code in code_list:
                 price = buy_signals[code]['close']
-                # Only buy one lot
-                qty = lot_sizes[code]
+                if self.sizing:
+                    # Buy the lots missing from the target quantity
+                    qty = target_quantities.get(
+                        code, 0.0) - self.portfolio.holdings[code]
+                    if qty < lot_sizes[code]:
+                        continue
+                else:
+                    # Only buy one lot
+                    qty = lot_sizes[code]
 
                 # Check if exceed max buy power:
                 max_power = self.accounts.get_max_power(
                     code=code, price=price, order_type=self.order_type)
                 if qty < max_power['max_cash_buy']:
-                    order_info = self.accounts.place_order(
-                        price=price,
-                        qty=qty,
-                        code=code,
-                        order_type=self.order_type,
-                        trd_side=TrdSide.BUY)
+                    with self.latency.time('order_round_trip'):
+                        order_info = self.accounts.place_order(
+                            price=price,
+                            qty=qty,
+                            code=code,
+                            order_type=self.order_type,
+                            trd_side=TrdSide.BUY)
                     order_infos[code] = order_info
 
         if sell_signals:
@@ -409,13 +482,14 @@ class Robot:
                 max_power = self.accounts.get_max_power(
                     code=code, price=price, order_type=self.order_type)
                 if qty <= max_power['max_position_sell']:
-                    order_info = self.accounts.place_order(
-                        price=price,
-                        qty=qty,
-                        code=code,
-                        order_type=self.order_type,
-                        trd_side=TrdSide.SELL,
-                    )
+                    with self.latency.time('order_round_trip'):
+                        order_info = self.accounts.place_order(
+                            price=price,
+                            qty=qty,
+                            code=code,
+                            order_type=self.order_type,
+                            trd_side=TrdSide.SELL,
+                        )
                     order_infos[code] = order_info
 
         return order_infos
@@ -423,28 +497,26 @@ class Robot:
     def wait_till_next_bar(self, last_bar_timestamp):
         """Wait until the next bar data.
 
-        This function calculates the time difference between
-        the current time and the next bar time, which is 60
-        seconds after the last bar time, and then puts the
-        robot on sleep until the next bar time is reached.
+        This function puts the robot on sleep until shortly after the
+        close of the bar following the last bar, as scheduled by the
+        BarScheduler of the robot.
 
         Args:
             last_bar_timestamp (str): The timestamp of the
                 last bar data in format yyyy-MM-dd HH:mm:ss.
+
+        Returns:
+            tick (dict): The tick of the bar waited for. See
+                BarScheduler.wait().
         """
         last_bar_timestamp = pd.to_datetime(last_bar_timestamp)
 
         last_bar_time = last_bar_timestamp.to_pydatetime()[0]
-        next_bar_time = last_bar_time + timedelta(seconds=60)
-        curr_bar_time = datetime.now()
+        next_bar_time = self.scheduler.next_bar_close(last_bar_time)
+        curr_bar_time = self.clock.now()
 
-        next_bar_timestamp = int(next_bar_time.timestamp())
-        curr_bar_timestamp = int(curr_bar_time.timestamp())
-
-        time_till_next_bar = next_bar_timestamp - curr_bar_timestamp
-
-        if time_till_next_bar < 0:
-            time_till_next_bar = 0
+        time_till_next_bar = (next_bar_time - curr_bar_time).total_seconds()
+        time_till_next_bar = max(time_till_next_bar, 0.0)
 
         print('')
         print('=' * 80)
@@ -454,12 +526,34 @@ class Robot:
             time_curr=curr_bar_time.strftime('%Y-%m-%d %H:%M:%S')))
         print('Next Time: {time_next}'.format(
             time_next=next_bar_time.strftime('%Y-%m-%d %H:%M:%S')))
-        print('Time till next bar: {seconds} s'.format(
+        print('Time till next bar: {seconds:.3f} s'.format(
             seconds=time_till_next_bar))
         print('-' * 80)
         print('')
 
-        time.sleep(time_till_next_bar)
+        return self.scheduler.wait(last_bar_time=last_bar_time)
+
+    def _get_lunch_break_end_time(self, current_time):
+        """Get the time at which the lunch break containing a time ends.
+
+        The lunch break ends 30 seconds after the close of the first bar
+        of the next session, or None if current_time is not within a lunch
+        break.
+        """
+        last_close = self.calendar.previous_close(current_time)
+        if last_close is None or last_close.date() != current_time.date():
+            return None
+
+        next_open = self.calendar.next_open(last_close)
+        if next_open is None or next_open.date() != current_time.date():
+            return None
+
+        lunch_break_end_time = self.scheduler.next_bar_close(
+            next_open) + timedelta(seconds=30)
+        if current_time > lunch_break_end_time:
+            return None
+
+        return lunch_break_end_time
 
     def _keyboard_interrupt_handler(self, signum, frame):
         """Cancel all pending orders when keyboard is interrupted.
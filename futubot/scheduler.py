@@ -0,0 +1,202 @@
+from datetime import timedelta
+
+import pandas as pd
+from futu import KLType
+
+from .clock import WallClock
+from .sessions import KLTYPE_MINUTES
+from .trading_calendar import get_bar_close_offsets
+
+# The close of the regular trading sessions of HKEX.
+MARKET_CLOSE = pd.Timedelta(hours=16)
+
+# The last trading day of the period of each daily or longer candlestick.
+PERIOD_ENDS = {
+    KLType.K_DAY: pd.offsets.BDay(),
+    KLType.K_WEEK: pd.offsets.Week(weekday=4),
+    KLType.K_MON: pd.offsets.BMonthEnd(),
+    KLType.K_QUARTER: pd.offsets.BQuarterEnd(),
+    KLType.K_YEAR: pd.offsets.BYearEnd(),
+}
+
+
+class BarScheduler:
+    """Wake a trading loop up right after the close of every candlestick.
+
+    The close times of the candlesticks are on a fixed grid of the HKEX
+    trading sessions for the ktype (see get_bar_close_offsets() and
+    PERIOD_ENDS), instead of adding an interval to the last wake-up time,
+    so that the wake-ups never drift. The sleep until a close is measured
+    on the monotonic time of the clock, so that it is not affected by
+    adjustments of the system time, and is resumed if woken up early.
+
+    An overrun is reported when a loop iteration ends after the close of
+    the next candlestick (plus offset). The scheduler then returns at
+    once for the latest closed candlestick instead of sleeping, and
+    reports the number of candlesticks skipped.
+
+    Given a TradingCalendar, the close times outside its sessions are
+    skipped, e.g. on holidays, in the afternoon of half days or during
+    typhoon closures, and daily or longer candlesticks close at the last
+    session of their last trading day.
+
+    Args:
+        ktype (KLType): The type of candlestick. Default: K_1M.
+        offset (float): The number of seconds after the close of a
+            candlestick at which to wake up, allowing FutuOpenD to publish
+            it. Default: 0.2.
+        clock (Clock): The clock to read and sleep on. Default: None,
+            meaning the WallClock.
+        calendar (TradingCalendar): The trading calendar. Default: None,
+            meaning that every weekday has the regular sessions.
+    """
+    def __init__(self,
+                 ktype=KLType.K_1M,
+                 offset=0.2,
+                 clock=None,
+                 calendar=None):
+        if ktype not in KLTYPE_MINUTES and ktype not in PERIOD_ENDS:
+            raise ValueError(f'Unsupported ktype {ktype}')
+        assert offset >= 0, f'offset must not be negative, but got {offset}'
+
+        self.ktype = ktype
+        self.offset = timedelta(seconds=offset)
+        self.clock = clock or WallClock()
+        self.calendar = calendar
+
+        self.last_bar_time = None
+        self.overruns = 0
+
+        if ktype in KLTYPE_MINUTES:
+            self._bar_close_offsets = get_bar_close_offsets(ktype)
+
+    def next_bar_close(self, current_time):
+        """Get the close time of the first candlestick closing after a time.
+
+        Args:
+            current_time (datetime): A naive datetime in HKT.
+
+        Returns:
+            (datetime): The close time of the next candlestick, which is
+                its time_key for intraday candlesticks.
+        """
+        current_time = pd.Timestamp(current_time)
+
+        if self.ktype in PERIOD_ENDS:
+            if self.calendar is not None and self.ktype == KLType.K_DAY:
+                return self.calendar.next_day_close(current_time)
+
+            date = current_time.normalize()
+            bar_close = self._get_period_close(date)
+            if bar_close <= current_time:
+                bar_close = self._get_period_close(date + pd.Timedelta(days=1))
+
+            return bar_close.to_pydatetime()
+
+        bar_close = self._get_next_grid_close(current_time)
+        if self.calendar is not None:
+            # Jump to the first candlestick of the next session until the
+            # candlestick closes within a session.
+            while not self.calendar.is_in_session(bar_close):
+                next_open = self.calendar.next_open(bar_close)
+                if next_open is None:
+                    break
+                bar_close = self._get_next_grid_close(
+                    pd.Timestamp(next_open) - pd.Timedelta(1, 'us'))
+
+        return bar_close.to_pydatetime()
+
+    def wait(self, last_bar_time=None):
+        """Sleep until offset seconds after the close of the next candlestick.
+
+        Args:
+            last_bar_time (datetime | str): The time_key of the last
+                candlestick processed. Default: None, meaning the
+                candlestick returned by the previous call, or the current
+                time on the first call.
+
+        Returns:
+            tick (dict): A dict with the following keys:
+                bar_time (datetime): The close time of the candlestick
+                    waited for.
+                wake_time (datetime): The time of the clock after waking
+                    up.
+                latency (float): The number of seconds between
+                    bar_time + offset and wake_time.
+                overrun (bool): Whether the loop iteration ended after
+                    bar_time + offset.
+                skipped_bars (int): The number of candlesticks closed
+                    between last_bar_time and bar_time, which the loop has
+                    not been woken up for.
+        """
+        if last_bar_time is not None:
+            last_bar_time = pd.Timestamp(last_bar_time).to_pydatetime()
+        elif self.last_bar_time is not None:
+            last_bar_time = self.last_bar_time
+        else:
+            last_bar_time = self.clock.now()
+
+        bar_time = self.next_bar_close(last_bar_time)
+        current_time = self.clock.now()
+
+        overrun = current_time >= bar_time + self.offset
+        skipped_bars = 0
+        if overrun:
+            # Catch up with the latest closed candlestick.
+            next_bar_time = self.next_bar_close(bar_time)
+            while next_bar_time + self.offset <= current_time:
+                bar_time = next_bar_time
+                next_bar_time = self.next_bar_close(bar_time)
+                skipped_bars += 1
+
+            self.overruns += 1
+            print(f'Overrun: the loop iteration ended at {current_time}, '
+                  f'{skipped_bars} bar(s) skipped')
+        else:
+            self._sleep_until(bar_time + self.offset)
+
+        wake_time = self.clock.now()
+        self.last_bar_time = bar_time
+
+        tick = {
+            'bar_time': bar_time,
+            'wake_time': wake_time,
+            'latency': (wake_time - bar_time - self.offset).total_seconds(),
+            'overrun': overrun,
+            'skipped_bars': skipped_bars,
+        }
+
+        return tick
+
+    def _get_next_grid_close(self, current_time):
+        """Get the first intraday close time on the grid after a time."""
+        date = current_time.normalize()
+
+        # The first candlestick of the day closing after current_time, or
+        # the first candlestick of the next weekday.
+        index = self._bar_close_offsets.searchsorted(current_time - date,
+                                                     side='right')
+        if index < len(self._bar_close_offsets):
+            return date + self._bar_close_offsets[index]
+
+        return date + pd.offsets.BDay() + self._bar_close_offsets[0]
+
+    def _get_period_close(self, date):
+        """Get the close time of the period of a daily or longer type."""
+        period_end = PERIOD_ENDS[self.ktype].rollforward(date)
+        if self.calendar is not None:
+            bar_close = self.calendar.last_trading_day(period_end)
+            if bar_close is not None:
+                return pd.Timestamp(bar_close)
+
+        return period_end + MARKET_CLOSE
+
+    def _sleep_until(self, deadline):
+        """Sleep until a time on the monotonic time of the clock."""
+        seconds = (deadline - self.clock.now()).total_seconds()
+        monotonic_deadline = self.clock.monotonic() + seconds
+
+        remaining = seconds
+        while remaining > 0:
+            self.clock.sleep(remaining)
+            remaining = monotonic_deadline - self.clock.monotonic()
@@ -0,0 +1,67 @@
+import pandas as pd
+from futu import KLType
+
+# The number of minutes of each intraday candlestick type.
+KLTYPE_MINUTES = {
+    KLType.K_1M: 1,
+    KLType.K_3M: 3,
+    KLType.K_5M: 5,
+    KLType.K_15M: 15,
+    KLType.K_30M: 30,
+    KLType.K_60M: 60,
+}
+
+
+def hkex_session_minutes():
+    """Get the time_keys of 1-minute candlesticks in a HKEX trading day.
+
+    The first candlestick of the morning session (09:30) contains the
+    opening auction, and the afternoon session starts at 13:01.
+
+    Returns:
+        (pd.TimedeltaIndex): The offsets of the time_keys from midnight.
+    """
+    morning = pd.timedelta_range(start='09:30:00', end='12:00:00', freq='min')
+    afternoon = pd.timedelta_range(start='13:01:00',
+                                   end='16:00:00',
+                                   freq='min')
+
+    return morning.append(afternoon)
+
+
+def bucket_time_keys(time_keys, ktype):
+    """Get the time_keys of the candlesticks of ktype containing 1-minute bars.
+
+    Intraday candlesticks are labelled by the end of their interval and
+    never span the lunch break. Daily candlesticks are labelled by the
+    date at midnight, as returned by the Futu API.
+
+    Args:
+        time_keys (pd.Series): The datetime time_keys of 1-minute
+            candlesticks.
+        ktype (KLType): The type of candlestick, either K_DAY or one of
+            the intraday types in KLTYPE_MINUTES.
+
+    Returns:
+        (pd.Series): The datetime time_keys of the candlesticks of ktype.
+    """
+    if ktype == KLType.K_DAY:
+        return time_keys.dt.normalize()
+
+    if ktype not in KLTYPE_MINUTES:
+        raise ValueError(f'Unsupported ktype {ktype}')
+
+    if ktype == KLType.K_1M:
+        return time_keys
+
+    interval = pd.Timedelta(minutes=KLTYPE_MINUTES[ktype])
+    buckets = time_keys.dt.ceil(interval)
+    bucket_times = buckets.dt.strftime('%H:%M')
+    # The 09:30 opening auction belongs to the first interval.
+    buckets = buckets.where(bucket_times != '09:30', buckets + interval)
+    # Intervals spanning the lunch break are closed at 12:00.
+    lunch = (bucket_times > '12:00') & (time_keys.dt.strftime('%H:%M') <=
+                                        '12:00')
+    lunch_break = buckets.dt.normalize() + pd.Timedelta(hours=12)
+
+    return buckets.where(~lunch, lunch_break)
@@ -0,0 +1,218 @@
+import mmap
+import os
+import pickle
+import tempfile
+from datetime import datetime
+
+from .journal import ORDER
+
+
+def write_atomic(path, data):
+    """Write bytes to a file atomically.
+
+    The data is first written to a temporary file in the same directory,
+    flushed to disk and then renamed over path. Readers therefore either
+    see the previous file or the new one, never a partially written file.
+
+    Args:
+        path (str): The path of the file.
+        data (bytes): The bytes to be written.
+    """
+    if not isinstance(path, str):
+        raise TypeError(f'Only str type is supported for path, '
+                        f'but got {type(path)}')
+    if not isinstance(data, bytes):
+        raise TypeError(f'Only bytes type is supported for data, '
+                        f'but got {type(data)}')
+
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+
+    fd, tmp_path = tempfile.mkstemp(dir=directory,
+                                    prefix='.' + os.path.basename(path),
+                                    suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def read_mmap(path):
+    """Unpickle an object from a file through a read-only memory map.
+
+    Mapping the file instead of reading it lets several processes share
+    the same pages of the OS page cache.
+
+    Args:
+        path (str): The path of the file.
+
+    Returns:
+        (object): The unpickled object.
+    """
+    with open(path, 'rb') as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            return pickle.loads(mm)
+
+
+class SnapshotPublisher:
+    """Publish the state of the trading engine to a snapshot file.
+
+    The engine (e.g. tools/main.py) publishes the StockFrame, indicators,
+    positions, portfolio information and today's orders after every bar.
+    Any number of read-only dashboard workers can then serve the state
+    with SnapshotReader without their own FutuOpenD connections.
+
+    Args:
+        path (str): The path of the snapshot file.
+    """
+    def __init__(self, path):
+        if not isinstance(path, str):
+            raise TypeError(f'Only str type is supported for path, '
+                            f'but got {type(path)}')
+
+        self.path = path
+        self.version = 0
+
+    def publish(self, stockframe, portfolio, indicator_client=None):
+        """Publish the current state of the engine.
+
+        Args:
+            stockframe (StockFrame): The StockFrame object.
+            portfolio (Portfolio): The Portfolio object.
+            indicator_client (Indicators): The Indicators object whose
+                current indicators are shown on the dashboard.
+                Default: None.
+
+        Returns:
+            state (dict): The published state, see collect().
+        """
+        return self.write(self.collect(stockframe, portfolio,
+                                       indicator_client))
+
+    def collect(self, stockframe, portfolio, indicator_client=None):
+        """Collect the current state of the engine to be published.
+
+        The state only holds copies, so that it can be written with
+        write() while the engine goes on updating the StockFrame and the
+        portfolio.
+
+        Args:
+            stockframe (StockFrame): The StockFrame object.
+            portfolio (Portfolio): The Portfolio object.
+            indicator_client (Indicators): The Indicators object whose
+                current indicators are shown on the dashboard.
+                Default: None.
+
+        Returns:
+            state (dict): The state to be published with the following
+                keys:
+                version (int): The version of the snapshot, incremented
+                    by one at every publish.
+                published_at (str): The time at which the snapshot is
+                    published. Format: yyyy-MM-dd HH:mm:ss.
+                frame (pd.DataFrame): The frame of the StockFrame.
+                indicators (list[str]): The names of current indicators.
+                positions (dict[dict]): The positions of the portfolio.
+                holdings (dict[float]): The holding quantities.
+                portfolio_info (dict[float]): The portfolio info, see
+                    Portfolio.get_local_portfolio_info().
+                portfolio_weights (dict[float]): The portfolio weights,
+                    see Portfolio.calculate_local_portfolio_weights().
+                pnl (dict[float]): The mark-to-market summary of the
+                    portfolio, see PnLTracker.summary().
+                pnl_positions (pd.DataFrame): The mark-to-market state of
+                    every code, see PnLTracker.positions().
+                today_orders (pd.DataFrame): Today's orders in the
+                    journal of the portfolio, see TradeJournal.to_frame(),
+                    or None if there are no orders today.
+                trade_summary (pd.DataFrame): Today's fills aggregated
+                    by code, see TradeJournal.aggregate().
+        """
+        indicators = []
+        if indicator_client is not None:
+            indicators = list(indicator_client.current_indicators.keys())
+
+        # Today's orders are read from the journal, and the portfolio info
+        # and weights are calculated from the mark-to-market PnL, instead
+        # of being queried from Futu on every publish.
+        today = datetime.now().strftime('%Y-%m-%d')
+        today_orders = portfolio.journal.to_frame(kind=ORDER, since=today)
+
+        state = {
+            'version': self.version + 1,
+            'published_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'frame': stockframe.frame.copy(),
+            'indicators': indicators,
+            'positions': dict(portfolio.positions),
+            'holdings': dict(portfolio.holdings),
+            'portfolio_info': portfolio.get_local_portfolio_info(),
+            'portfolio_weights': portfolio.calculate_local_portfolio_weights(),
+            'pnl': portfolio.pnl.summary(),
+            'pnl_positions': portfolio.pnl.positions(),
+            'today_orders': today_orders if len(today_orders) else None,
+            'trade_summary': portfolio.journal.aggregate(since=today),
+        }
+
+        return state
+
+    def write(self, state):
+        """Write a state collected by collect() to the snapshot file.
+
+        Args:
+            state (dict): The state returned by collect().
+
+        Returns:
+            state (dict): The published state.
+        """
+        write_atomic(self.path,
+                     pickle.dumps(state, protocol=pickle.HIGHEST_PROTOCOL))
+        self.version = state['version']
+
+        return state
+
+
+class SnapshotReader:
+    """Read the state of the trading engine from a snapshot file.
+
+    The snapshot is only unpickled again when the file has been replaced
+    by the publisher, so that reading the state on every dashboard
+    callback is cheap.
+
+    Args:
+        path (str): The path of the snapshot file.
+    """
+    def __init__(self, path):
+        if not isinstance(path, str):
+            raise TypeError(f'Only str type is supported for path, '
+                            f'but got {type(path)}')
+
+        self.path = path
+        self._state = None
+        self._file_id = None
+
+    def read(self):
+        """Read the latest published state.
+
+        Returns:
+            state (dict): The published state. See
+                SnapshotPublisher.publish() for its keys.
+        """
+        if not os.path.exists(self.path):
+            raise OSError(
+                'The snapshot file {path} does not exist. Please start the '
+                'engine with a snapshot path first.'.format(path=self.path))
+
+        stat = os.stat(self.path)
+        file_id = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+        if file_id != self._file_id:
+            self._state = read_mmap(self.path)
+            self._file_id = file_id
+
+        return self._state
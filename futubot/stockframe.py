@@ -1,17 +1,62 @@
 import pandas as pd
+from futu import KLType
+
+from .sessions import KLTYPE_MINUTES, bucket_time_keys
 
 
 class StockFrame:
     """Create a dataframe of stock data.
 
+    Besides the frame of the candlesticks of data, the StockFrame keeps
+    frames of the same candlesticks resampled to the coarser timeframes
+    added with add_timeframe(). The resampled candlesticks are labelled
+    by the end of their interval and never span the lunch break, as
+    those returned by Futu, see futubot.sessions.bucket_time_keys().
+    add_rows() only aggregates again the resampled candlesticks of the
+    new rows, so strategies can use several timeframes without fetching
+    them from Futu.
+
     Args:
         data (list[dict]): A list of historical quotes data
             to be converted to a dataframe.
+        ktype (KLType): The type of candlestick of data. Default: K_1M.
     """
-    def __init__(self, data):
+    def __init__(self, data, ktype=KLType.K_1M):
         self.data = data
+        self.ktype = ktype
         self._frame = self.create_frame()
         self._code_groups = None
+        # The resampled frames by their types of candlestick.
+        self._resampled = {}
+
+    @classmethod
+    def from_frame(cls, frame, ktype=KLType.K_1M):
+        """Create a StockFrame from an existing frame.
+
+        Args:
+            frame (pd.DataFrame): A MultiIndex pandas dataframe with index
+                (code, time_key), e.g. restored from a checkpoint.
+            ktype (KLType): The type of candlestick of frame.
+                Default: K_1M.
+
+        Returns:
+            stockframe (StockFrame): A StockFrame object of the frame.
+        """
+        if not isinstance(frame, pd.DataFrame):
+            raise TypeError(f'Only pd.DataFrame type is supported for frame, '
+                            f'but got {type(frame)}')
+        assert frame.index.names == ['code', 'time_key'], \
+            f'frame must be indexed by (code, time_key), ' \
+            f'but got {frame.index.names}'
+
+        stockframe = cls.__new__(cls)
+        stockframe.data = None
+        stockframe.ktype = ktype
+        stockframe._frame = frame
+        stockframe._code_groups = None
+        stockframe._resampled = {}
+
+        return stockframe
 
     @property
     def frame(self):
@@ -35,6 +80,82 @@ class StockFrame:
 
         return self._code_groups
 
+    @property
+    def timeframes(self):
+        """Getter for the timeframes property.
+
+        Returns:
+            (list[KLType]): The types of candlestick of the resampled
+                frames.
+        """
+        return list(self._resampled)
+
+    def add_timeframe(self, ktype):
+        """Add a frame of the candlesticks resampled to ktype.
+
+        Args:
+            ktype (KLType): The type of candlestick, either K_DAY or one
+                of the intraday types whose interval is a multiple of that
+                of the StockFrame.
+
+        Returns:
+            (pd.DataFrame): The resampled MultiIndex dataframe with index
+                (code, time_key) and columns 'open', 'close', 'high',
+                'low', 'volume'.
+        """
+        if not isinstance(ktype, str):
+            raise TypeError(f'Only str type is supported for ktype, '
+                            f'but got {type(ktype)}')
+
+        if ktype == self.ktype:
+            return self.frame
+        if ktype not in self._resampled:
+            assert self.ktype in KLTYPE_MINUTES, \
+                f'Only intraday candlesticks can be resampled, ' \
+                f'but got {self.ktype}'
+            assert ktype == KLType.K_DAY or (
+                ktype in KLTYPE_MINUTES and
+                KLTYPE_MINUTES[ktype] % KLTYPE_MINUTES[self.ktype] == 0), \
+                f'Cannot resample {self.ktype} candlesticks to {ktype}'
+
+            self._resampled[ktype] = self._resample(self.frame, ktype)
+
+        return self._resampled[ktype]
+
+    def get_frame(self, ktype=None):
+        """Get the frame of a timeframe.
+
+        Args:
+            ktype (KLType): The type of candlestick. The timeframe is
+                added with add_timeframe() if it is not yet. Default: None,
+                meaning that of the StockFrame.
+
+        Returns:
+            (pd.DataFrame): The frame of ktype.
+        """
+        if ktype is None:
+            return self.frame
+
+        return self.add_timeframe(ktype)
+
+    def get_code_groups(self, ktype=None):
+        """Group the frame of a timeframe by 'code'.
+
+        Args:
+            ktype (KLType): The type of candlestick. Default: None,
+                meaning that of the StockFrame.
+
+        Returns:
+            (pd.DataFrameGroupBy) -- A pandas DataFrameGroupBy object grouped
+                by code.
+        """
+        if ktype is None or ktype == self.ktype:
+            return self.code_groups
+
+        return self.get_frame(ktype).groupby(by='code',
+                                             as_index=False,
+                                             sort=True)
+
     def create_frame(self):
         """Create a MultiIndex pandas dataframe for data.
 
@@ -102,6 +223,7 @@ class StockFrame:
                             f'but got {type(data)}')
 
         column_names = ['open', 'close', 'high', 'low', 'volume']
+        time_stamps = []
 
         for quote in data:
 
@@ -121,3 +243,48 @@ class StockFrame:
             new_row = pd.Series(data=row_values)
             self.frame.loc[row_id, column_names] = new_row.values
             self.frame.sort_index(inplace=True)
+            time_stamps.append(time_stamp)
+
+        if time_stamps:
+            for ktype in self._resampled:
+                self._update_timeframe(ktype, min(time_stamps))
+
+    def _resample(self, frame, ktype):
+        """Aggregate the candlesticks of frame into candlesticks of ktype."""
+        time_keys = pd.Series(frame.index.get_level_values('time_key'))
+        buckets = bucket_time_keys(time_keys, ktype)
+
+        codes = frame.index.get_level_values('code')
+        buckets = pd.Index(buckets, name='time_key')
+        grouped = frame.groupby([codes, buckets], sort=True)
+        resampled = grouped.agg(open=('open', 'first'),
+                                close=('close', 'last'),
+                                high=('high', 'max'),
+                                low=('low', 'min'),
+                                volume=('volume', 'sum'))
+
+        return resampled
+
+    def _update_timeframe(self, ktype, since):
+        """Aggregate again the resampled candlesticks from since on.
+
+        Only the candlesticks of ktype containing the rows not earlier
+        than since are aggregated again, from the rows of their
+        intervals. Their indicators are left to be refreshed.
+        """
+        first_bucket = bucket_time_keys(pd.Series([since]), ktype).iloc[0]
+        if ktype == KLType.K_DAY:
+            interval_start = first_bucket
+        else:
+            interval_start = first_bucket - pd.Timedelta(
+                minutes=KLTYPE_MINUTES[ktype])
+
+        time_keys = self.frame.index.get_level_values('time_key')
+        resampled = self._resample(self.frame[time_keys >= interval_start],
+                                   ktype)
+        resampled = resampled[
+            resampled.index.get_level_values('time_key') >= first_bucket]
+
+        frame = self._resampled[ktype]
+        frame = frame[frame.index.get_level_values('time_key') < first_bucket]
+        self._resampled[ktype] = pd.concat([frame, resampled]).sort_index()
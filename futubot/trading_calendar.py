@@ -0,0 +1,315 @@
+import json
+
+import numpy as np
+import pandas as pd
+from futu import KLType
+
+from .sessions import KLTYPE_MINUTES, bucket_time_keys, hkex_session_minutes
+
+# The regular trading sessions of HKEX in HKT.
+REGULAR_SESSIONS = [('09:30', '12:00'), ('13:00', '16:00')]
+
+# The sessions of a half trading day, e.g. Christmas Eve.
+HALF_DAY_SESSIONS = [('09:30', '12:00')]
+
+
+def get_bar_close_offsets(ktype):
+    """Get the close times of the intraday candlesticks of a trading day.
+
+    Args:
+        ktype (KLType): One of the intraday types in KLTYPE_MINUTES.
+
+    Returns:
+        (pd.TimedeltaIndex): The sorted offsets of the close times from
+            midnight, which are the time_keys of the candlesticks.
+    """
+    if ktype not in KLTYPE_MINUTES:
+        raise ValueError(f'Unsupported ktype {ktype}')
+
+    time_keys = pd.Series(pd.Timestamp(0) + hkex_session_minutes())
+    buckets = bucket_time_keys(time_keys, ktype).drop_duplicates()
+
+    return pd.TimedeltaIndex(buckets - pd.Timestamp(0))
+
+
+class TradingCalendar:
+    """The trading days and sessions of HKEX.
+
+    The sessions of every trading day between start_date and end_date are
+    precomputed into a sorted array of open and close times, so that the
+    queries are binary searches. Weekdays are trading days unless they
+    are holidays. Half days only have the morning session, and closures
+    (e.g. typhoon or black rainstorm warnings) remove a period of time
+    from the sessions of a day. Times are naive datetimes in HKT, and a
+    session includes both its open and close times.
+
+    Args:
+        holidays (list[str]): The holidays in format yyyy-MM-dd.
+            Default: None.
+        half_days (list[str]): The half trading days in format
+            yyyy-MM-dd. Default: None.
+        closures (list[dict]): The closures with key 'date' in format
+            yyyy-MM-dd, and optional keys 'start' and 'end' in format
+            HH:mm. Default: None. A closure without 'start' and 'end'
+            closes the whole day.
+        start_date (str): The first date of the calendar in format
+            yyyy-MM-dd. Default: 2000-01-01.
+        end_date (str): The last date of the calendar in format
+            yyyy-MM-dd. Default: 2050-12-31.
+    """
+    def __init__(self,
+                 holidays=None,
+                 half_days=None,
+                 closures=None,
+                 start_date='2000-01-01',
+                 end_date='2050-12-31'):
+        dates = pd.bdate_range(start=start_date, end=end_date)
+        dates = dates.difference(pd.DatetimeIndex(holidays or [])).values
+        half_days = pd.DatetimeIndex(half_days or []).values
+
+        opens, closes = [], []
+        for open_time, close_time in REGULAR_SESSIONS:
+            session_dates = dates
+            if (open_time, close_time) not in HALF_DAY_SESSIONS:
+                session_dates = dates[~np.isin(dates, half_days)]
+            opens.append(session_dates + self._to_timedelta64(open_time))
+            closes.append(session_dates + self._to_timedelta64(close_time))
+        opens, closes = np.concatenate(opens), np.concatenate(closes)
+
+        for closure in closures or []:
+            opens, closes = self._close(opens, closes, closure)
+
+        order = np.argsort(opens, kind='stable')
+        self.opens = opens[order]
+        self.closes = closes[order]
+        # The open and close times of all the sessions in time order.
+        self._bounds = np.column_stack([self.opens, self.closes]).ravel()
+
+        days = self.opens.astype('datetime64[D]')
+        self.trading_days, day_starts = np.unique(days, return_index=True)
+        self.day_opens = self.opens[day_starts]
+        self.day_closes = self.closes[np.append(day_starts[1:], len(days)) - 1]
+
+        self._bar_close_offsets = {}
+
+    @classmethod
+    def from_file(cls, path, **kwargs):
+        """Load a calendar from a JSON file.
+
+        Args:
+            path (str): The path of a JSON file with optional keys
+                'holidays', 'half_days' and 'closures'. See
+                configs/hkex_calendar.json.
+            kwargs: The other keyword arguments of TradingCalendar.
+
+        Returns:
+            (TradingCalendar): The calendar.
+        """
+        with open(path, 'r') as f:
+            calendar = json.load(f)
+
+        return cls(holidays=calendar.get('holidays'),
+                   half_days=calendar.get('half_days'),
+                   closures=calendar.get('closures'),
+                   **kwargs)
+
+    def is_trading_day(self, date):
+        """Check whether a date has any session.
+
+        Args:
+            date (datetime | str): The date.
+
+        Returns:
+            bool: True if the date is a trading day, otherwise False.
+        """
+        date = np.datetime64(pd.Timestamp(date).normalize(), 'D')
+        index = np.searchsorted(self.trading_days, date)
+
+        return bool(index < len(self.trading_days)
+                    and self.trading_days[index] == date)
+
+    def is_in_session(self, time):
+        """Check whether times are within a session.
+
+        Args:
+            time (datetime | str | array-like): A time or an array of
+                times.
+
+        Returns:
+            (bool | np.ndarray): True where the time is within a session,
+                otherwise False.
+        """
+        times = self._to_datetime64(time)
+
+        index = np.searchsorted(self._bounds, times, side='right')
+        on_close = (index > 0) & (self._bounds[np.maximum(index - 1, 0)]
+                                  == times)
+        in_session = (index % 2 == 1) | on_close
+
+        if np.ndim(in_session) == 0:
+            return bool(in_session)
+
+        return in_session
+
+    def next_open(self, time):
+        """Get the open time of the first session opening after a time.
+
+        Args:
+            time (datetime | str): The time.
+
+        Returns:
+            (datetime): The open time, or None if it is beyond the end of
+                the calendar.
+        """
+        index = np.searchsorted(self.opens,
+                                self._to_datetime64(time),
+                                side='right')
+
+        return self._to_datetime(self.opens, index)
+
+    def next_close(self, time):
+        """Get the close time of the first session closing at or after a time.
+
+        Args:
+            time (datetime | str): The time.
+
+        Returns:
+            (datetime): The close time, or None if it is beyond the end of
+                the calendar.
+        """
+        index = np.searchsorted(self.closes,
+                                self._to_datetime64(time),
+                                side='left')
+
+        return self._to_datetime(self.closes, index)
+
+    def previous_close(self, time):
+        """Get the close time of the last session closing before a time.
+
+        Args:
+            time (datetime | str): The time.
+
+        Returns:
+            (datetime): The close time, or None if it is before the start
+                of the calendar.
+        """
+        index = np.searchsorted(
+            self.closes, self._to_datetime64(time), side='left') - 1
+        if index < 0:
+            return None
+
+        return self._to_datetime(self.closes, index)
+
+    def next_day_close(self, time):
+        """Get the close time of the first trading day closing after a time.
+
+        Args:
+            time (datetime | str): The time.
+
+        Returns:
+            (datetime): The close time of the last session of the day, or
+                None if it is beyond the end of the calendar.
+        """
+        index = np.searchsorted(self.day_closes,
+                                self._to_datetime64(time),
+                                side='right')
+
+        return self._to_datetime(self.day_closes, index)
+
+    def last_trading_day(self, date):
+        """Get the close time of the last trading day on or before a date.
+
+        Args:
+            date (datetime | str): The date.
+
+        Returns:
+            (datetime): The close time of the last session of the trading
+                day, or None if it is before the start of the calendar.
+        """
+        date = np.datetime64(pd.Timestamp(date).normalize(), 'D')
+        index = np.searchsorted(self.trading_days, date, side='right') - 1
+        if index < 0:
+            return None
+
+        return self._to_datetime(self.day_closes, index)
+
+    def bars_until_close(self, time, ktype=KLType.K_1M):
+        """Count the candlesticks left until the close of a trading day.
+
+        Args:
+            time (datetime | str): The time.
+            ktype (KLType): One of the intraday types in KLTYPE_MINUTES.
+                Default: K_1M.
+
+        Returns:
+            int: The number of candlesticks of ktype closing after time
+                and within the sessions of the day of time.
+        """
+        if ktype not in self._bar_close_offsets:
+            self._bar_close_offsets[ktype] = get_bar_close_offsets(
+                ktype).to_numpy()
+        offsets = self._bar_close_offsets[ktype]
+        time = self._to_datetime64(time)
+        date = time.astype('datetime64[D]')
+
+        # The sessions of the day closing after time.
+        start = np.searchsorted(self.closes, time, side='right')
+        end = np.searchsorted(self.opens, date + np.timedelta64(1, 'D'))
+
+        n_bars = 0
+        for index in range(start, end):
+            lower = max(self.opens[index] - np.timedelta64(1, 'ns'), time)
+            upper = self.closes[index]
+            n_bars += (np.searchsorted(offsets, upper - date, side='right') -
+                       np.searchsorted(offsets, lower - date, side='right'))
+
+        return int(n_bars)
+
+    @classmethod
+    def _close(cls, opens, closes, closure):
+        """Remove the period of a closure from the sessions."""
+        date = np.datetime64(closure['date'], 'ns')
+        start = date + cls._to_timedelta64(closure.get('start', '00:00'))
+        end = date + cls._to_timedelta64(closure.get('end', '24:00'))
+
+        # Keep the sessions outside the closure, and the parts of the
+        # sessions before its start and after its end.
+        outside = (closes <= start) | (opens >= end)
+        before = (opens < start) & (closes > start)
+        after = (opens < end) & (closes > end)
+
+        opens = np.concatenate([
+            opens[outside], opens[before],
+            np.full(after.sum(), end, dtype=opens.dtype)
+        ])
+        closes = np.concatenate([
+            closes[outside],
+            np.full(before.sum(), start, dtype=closes.dtype), closes[after]
+        ])
+
+        return opens, closes
+
+    @staticmethod
+    def _to_timedelta64(time):
+        """Convert a time in format HH:mm to an offset from midnight."""
+        hours, minutes = time.split(':')
+
+        return np.timedelta64(int(hours) * 60 + int(minutes),
+                              'm').astype('timedelta64[ns]')
+
+    @staticmethod
+    def _to_datetime64(time):
+        """Convert a time or an array of times to datetime64[ns]."""
+        if np.ndim(time) == 0:
+            return np.datetime64(pd.Timestamp(time), 'ns')
+
+        return pd.to_datetime(
+            np.asarray(time)).to_numpy(dtype='datetime64[ns]')
+
+    @staticmethod
+    def _to_datetime(times, index):
+        """Get a time of an array as a datetime, or None if out of range."""
+        if index >= len(times):
+            return None
+
+        return pd.Timestamp(times[index]).to_pydatetime()
@@ -0,0 +1,591 @@
+import collections
+
+import numpy as np
+import pandas as pd
+from futu import TrdSide
+
+from .stockframe import StockFrame
+
+
+def pivot_prices(stockframe, column='close'):
+    """Pivot a column of a StockFrame into a wide dataframe.
+
+    Args:
+        stockframe (StockFrame): The StockFrame of candlesticks.
+        column (str): The column to be pivoted. Default: close.
+
+    Returns:
+        (pd.DataFrame): A dataframe with time_key as index and codes as
+            columns. Bars missing for a code are NaN.
+    """
+    if not isinstance(stockframe, StockFrame):
+        raise TypeError(f'Only StockFrame type is supported for '
+                        f'stockframe, but got {type(stockframe)}')
+
+    prices = stockframe.frame[column].unstack(level='code')
+
+    return prices.sort_index()
+
+
+def rsi(close, period=14):
+    """Calculate the RSI of every code as Indicators.rsi().
+
+    Args:
+        close (pd.DataFrame): The close prices with codes as columns.
+        period (int): The period of RSI calculation. Default: 14.
+
+    Returns:
+        (np.ndarray): The RSI with the same shape as close.
+    """
+    change_in_price = close.diff()
+    up = change_in_price.clip(lower=0)
+    down = -1 * change_in_price.clip(upper=0)
+
+    ma_up = up.ewm(span=period, adjust=True, min_periods=period).mean()
+    ma_down = down.ewm(span=period, adjust=True, min_periods=period).mean()
+
+    relative_strength = ma_up / ma_down
+
+    return (100.0 - (100.0 / (1.0 + relative_strength))).to_numpy()
+
+
+def sma(close, period=20):
+    """Calculate the SMA of every code as Indicators.sma().
+
+    Args:
+        close (pd.DataFrame): The close prices with codes as columns.
+        period (int): The period of SMA calculation. Default: 20.
+
+    Returns:
+        (np.ndarray): The SMA with the same shape as close.
+    """
+    return close.rolling(window=period).mean().to_numpy()
+
+
+def ema(close, period=20, adjust=True):
+    """Calculate the EMA of every code as Indicators.ema().
+
+    Args:
+        close (pd.DataFrame): The close prices with codes as columns.
+        period (int): The period of EMA calculation. Default: 20.
+        adjust (bool): Whether to divide by decaying adjustment factor
+            in beginning periods. Default: True.
+
+    Returns:
+        (np.ndarray): The EMA with the same shape as close.
+    """
+    return close.ewm(span=period, adjust=adjust,
+                     min_periods=period).mean().to_numpy()
+
+
+def macd(close, fast_length=12, slow_length=26, signal_length=9, adjust=False):
+    """Calculate the MACD of every code as Indicators.macd().
+
+    Args:
+        close (pd.DataFrame): The close prices with codes as columns.
+        fast_length (int): The period of the fast EMA. Default: 12.
+        slow_length (int): The period of the slow EMA. Default: 26.
+        signal_length (int): The period of the signal line. Default: 9.
+        adjust (bool): Whether to divide by decaying adjustment factor
+            in beginning periods. Default: False.
+
+    Returns:
+        macd (np.ndarray): The MACD line with the same shape as close.
+        signal (np.ndarray): The signal line with the same shape as close.
+    """
+    fast_ema = close.ewm(span=fast_length,
+                         min_periods=fast_length,
+                         adjust=adjust).mean()
+    slow_ema = close.ewm(span=slow_length,
+                         min_periods=slow_length,
+                         adjust=adjust).mean()
+
+    macd = fast_ema - slow_ema
+    signal = macd.ewm(span=signal_length,
+                      min_periods=signal_length,
+                      adjust=adjust).mean()
+
+    return macd.to_numpy(), signal.to_numpy()
+
+
+def bollinger_bands(close, period=20):
+    """Calculate the Bollinger Bands of every code.
+
+    Args:
+        close (pd.DataFrame): The close prices with codes as columns.
+        period (int): The period of SMA for which the Bollinger Bands
+            are calculated. Default: 20.
+
+    Returns:
+        upper_band (np.ndarray): The upper band with the same shape as
+            close.
+        lower_band (np.ndarray): The lower band with the same shape as
+            close.
+    """
+    rolling = close.rolling(window=period)
+    mean = rolling.mean().to_numpy()
+    std = rolling.std().to_numpy()
+
+    return mean + 2 * std, mean - 2 * std
+
+
+class IndicatorCache:
+    """Memoize the indicators of a fixed set of close prices.
+
+    The indicators and their intermediates are cached by their parameters,
+    so that strategies sharing a period only calculate it once, e.g. the
+    price changes of RSI are shared by every period, the EMAs of MACD are
+    shared by every signal length and the SMA of Bollinger Bands is shared
+    by MAStrategy. The least recently used arrays are dropped once more
+    than max_size arrays are cached.
+
+    Args:
+        close (pd.DataFrame): The close prices with codes as columns.
+        max_size (int): The maximum number of cached arrays. Default: 16.
+    """
+    def __init__(self, close, max_size=16):
+        if not isinstance(close, pd.DataFrame):
+            raise TypeError(f'Only pd.DataFrame type is supported for close, '
+                            f'but got {type(close)}')
+        assert max_size > 0, \
+            f'max_size must be greater than 0, but got {max_size}'
+
+        self.close = close
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+
+        self._cache = collections.OrderedDict()
+
+    def rsi(self, period=14):
+        """Get the RSI. See rsi()."""
+        return self._get(('rsi', period), self._rsi, period)
+
+    def sma(self, period=20):
+        """Get the SMA. See sma()."""
+        return self._get(('sma', period), sma, self.close, period)
+
+    def ema(self, period=20, adjust=True):
+        """Get the EMA. See ema()."""
+        return self._get(('ema', period, adjust), ema, self.close, period,
+                         adjust)
+
+    def macd(self,
+             fast_length=12,
+             slow_length=26,
+             signal_length=9,
+             adjust=False):
+        """Get the MACD and signal lines. See macd()."""
+        macd_line = self._get(('macd', fast_length, slow_length, adjust),
+                              self._macd, fast_length, slow_length, adjust)
+        signal_line = self._get(
+            ('macd_signal', fast_length, slow_length, signal_length, adjust),
+            self._macd_signal, macd_line, signal_length, adjust)
+
+        return macd_line, signal_line
+
+    def bollinger_bands(self, period=20):
+        """Get the upper and lower bands. See bollinger_bands()."""
+        mean = self.sma(period)
+        std = self._get(('std', period), self._std, period)
+
+        return mean + 2 * std, mean - 2 * std
+
+    def _rsi(self, period):
+        """Calculate the RSI from the cached price changes."""
+        up, down = self._get('price_changes', self._price_changes)
+
+        ma_up = up.ewm(span=period, adjust=True, min_periods=period).mean()
+        ma_down = down.ewm(span=period, adjust=True, min_periods=period).mean()
+
+        relative_strength = ma_up / ma_down
+
+        return (100.0 - (100.0 / (1.0 + relative_strength))).to_numpy()
+
+    def _price_changes(self):
+        """Calculate the upward and downward price changes of RSI."""
+        change_in_price = self.close.diff()
+        up = change_in_price.clip(lower=0)
+        down = -1 * change_in_price.clip(upper=0)
+
+        return up, down
+
+    def _macd(self, fast_length, slow_length, adjust):
+        """Calculate the MACD line from the cached EMAs."""
+        return self.ema(fast_length, adjust) - self.ema(slow_length, adjust)
+
+    def _macd_signal(self, macd_line, signal_length, adjust):
+        """Calculate the signal line from the MACD line."""
+        return ema(pd.DataFrame(macd_line, copy=False), signal_length, adjust)
+
+    def _std(self, period):
+        """Calculate the rolling standard deviation."""
+        return self.close.rolling(window=period).std().to_numpy()
+
+    def _get(self, key, function, *args):
+        """Get a cached value, calculating it on a cache miss.
+
+        Args:
+            key (hashable): The key of the value.
+            function (callable): The function calculating the value.
+            *args: The arguments of function.
+
+        Returns:
+            The cached value.
+        """
+        if key in self._cache:
+            self.hits += 1
+            self._cache.move_to_end(key)
+            return self._cache[key]
+
+        self.misses += 1
+        value = function(*args)
+        self._cache[key] = value
+        if len(self._cache) > self.max_size:
+            self._cache.popitem(last=False)
+
+        return value
+
+
+def rsi_signals(close,
+                oversold_signal=30,
+                overbought_signal=70,
+                period=14,
+                cache=None):
+    """Calculate the entry and exit masks of RSIStrategy.
+
+    Args:
+        close (pd.DataFrame): The close prices with codes as columns.
+        oversold_signal (int): The oversold signal. Default: 30.
+        overbought_signal (int): The overbought signal. Default: 70.
+        period (int): The period for RSI calculations. Default: 14.
+        cache (IndicatorCache): The cache of the indicators of close.
+            Default: None, meaning the indicators are not cached.
+
+    Returns:
+        buys (np.ndarray): True where a buy signal is triggered if flat.
+        sells (np.ndarray): True where a sell signal is triggered if
+            holding.
+    """
+    cache = cache or IndicatorCache(close)
+    relative_strength_index = cache.rsi(period=period)
+
+    return (relative_strength_index < oversold_signal,
+            relative_strength_index > overbought_signal)
+
+
+def ma_signals(close,
+               short_period=20,
+               long_period=50,
+               is_ema=False,
+               cache=None):
+    """Calculate the entry and exit masks of MAStrategy.
+
+    Args:
+        close (pd.DataFrame): The close prices with codes as columns.
+        short_period (int): The period of short-term MA. Default: 20.
+        long_period (int): The period of long-term MA. Default: 50.
+        is_ema (bool): Whether to use EMA for MA calculations.
+            Default: False.
+        cache (IndicatorCache): The cache of the indicators of close.
+            Default: None, meaning the indicators are not cached.
+
+    Returns:
+        buys (np.ndarray): True where a buy signal is triggered if flat.
+        sells (np.ndarray): True where a sell signal is triggered if
+            holding.
+    """
+    cache = cache or IndicatorCache(close)
+    if is_ema:
+        ma_short = cache.ema(period=short_period)
+        ma_long = cache.ema(period=long_period)
+    else:
+        ma_short = cache.sma(period=short_period)
+        ma_long = cache.sma(period=long_period)
+
+    return ma_short > ma_long, ma_short < ma_long
+
+
+def macd_signals(close,
+                 fast_length=12,
+                 slow_length=26,
+                 signal_length=9,
+                 adjust=False,
+                 cache=None):
+    """Calculate the entry and exit masks of MACDCrossOverStrategy.
+
+    Args:
+        close (pd.DataFrame): The close prices with codes as columns.
+        fast_length (int): The period of the fast EMA. Default: 12.
+        slow_length (int): The period of the slow EMA. Default: 26.
+        signal_length (int): The period of the signal line. Default: 9.
+        adjust (bool): Whether to divide by decaying adjustment factor
+            in beginning periods. Default: False.
+        cache (IndicatorCache): The cache of the indicators of close.
+            Default: None, meaning the indicators are not cached.
+
+    Returns:
+        buys (np.ndarray): True where a buy signal is triggered if flat.
+        sells (np.ndarray): True where a sell signal is triggered if
+            holding.
+    """
+    cache = cache or IndicatorCache(close)
+    macd_line, signal_line = cache.macd(fast_length=fast_length,
+                                        slow_length=slow_length,
+                                        signal_length=signal_length,
+                                        adjust=adjust)
+
+    return macd_line > signal_line, macd_line < signal_line
+
+
+def bollinger_bands_signals(close, period=20, cache=None):
+    """Calculate the entry and exit masks of BollingerBandsStrategy.
+
+    Args:
+        close (pd.DataFrame): The close prices with codes as columns.
+        period (int): The period for Bollinger Bands calculations.
+            Default: 20.
+        cache (IndicatorCache): The cache of the indicators of close.
+            Default: None, meaning the indicators are not cached.
+
+    Returns:
+        buys (np.ndarray): True where a buy signal is triggered if flat.
+        sells (np.ndarray): True where a sell signal is triggered if
+            holding.
+    """
+    cache = cache or IndicatorCache(close)
+    upper_band, lower_band = cache.bollinger_bands(period=period)
+    close = close.to_numpy()
+
+    return close < lower_band, close > upper_band
+
+
+STRATEGY_SIGNALS = {
+    'RSIStrategy': rsi_signals,
+    'MAStrategy': ma_signals,
+    'MACDCrossOverStrategy': macd_signals,
+    'BollingerBandsStrategy': bollinger_bands_signals,
+}
+
+
+def positions_from_signals(buys, sells):
+    """Derive the positions from the entry and exit masks.
+
+    This follows the rule of Robot.execute_signals(): a buy signal opens
+    a position only if flat, and a sell signal closes the position only
+    if holding. The position is therefore the side of the last signal,
+    which is found by forward filling the index of the last signal of
+    each code. A bar with both a buy and a sell signal, e.g. of an RSI
+    strategy with an oversold level above its overbought level, buys if
+    flat and sells if holding, so it flips the position after the last
+    bar with a single signal.
+
+    Args:
+        buys (np.ndarray): The n_bars x n_codes entry mask.
+        sells (np.ndarray): The n_bars x n_codes exit mask.
+
+    Returns:
+        positions (np.ndarray): The n_bars x n_codes boolean positions
+            after each bar. True if holding, otherwise False.
+    """
+    if buys.shape != sells.shape:
+        raise ValueError(f'buys and sells must have the same shape, '
+                         f'but got {buys.shape} and {sells.shape}')
+
+    n_bars = buys.shape[0]
+    bar_ids = np.arange(n_bars).reshape(-1, *([1] * (buys.ndim - 1)))
+
+    last_signal = np.where(buys ^ sells, bar_ids, -1)
+    np.maximum.accumulate(last_signal, axis=0, out=last_signal)
+
+    positions = np.take_along_axis(buys, np.maximum(last_signal, 0), axis=0)
+    positions &= last_signal >= 0
+
+    # The number of bars with both signals since the last single signal.
+    flips = np.cumsum(buys & sells, axis=0)
+    flips -= np.where(
+        last_signal >= 0,
+        np.take_along_axis(flips, np.maximum(last_signal, 0), axis=0), 0)
+
+    return positions ^ (flips % 2 == 1)
+
+
+def calculate_equity_curve(close, positions, lot_sizes, cash):
+    """Calculate the total assets after each bar.
+
+    Orders are filled at the close price of the bar of the signal, and
+    the cash is assumed to be sufficient for every order.
+
+    Args:
+        close (np.ndarray): The n_bars x n_codes close prices. Missing
+            prices are forward filled for marking the positions.
+        positions (np.ndarray): The n_bars x n_codes boolean positions.
+        lot_sizes (np.ndarray): The lot size of each code.
+        cash (float): The initial cash.
+
+    Returns:
+        equity_curve (np.ndarray): The total assets after each bar.
+        trades (np.ndarray): The n_bars x n_codes trades. 1 for a buy,
+            -1 for a sell and 0 for no trade.
+    """
+    close = pd.DataFrame(close).ffill().fillna(0.0).to_numpy()
+
+    holdings = positions.astype(np.int8)
+    trades = np.diff(holdings, axis=0, prepend=0)
+
+    cash_flows = -(trades * lot_sizes * close).sum(axis=1)
+    market_values = (holdings * lot_sizes * close).sum(axis=1)
+
+    equity_curve = cash + np.cumsum(cash_flows) + market_values
+
+    return equity_curve, trades
+
+
+def backtest_signals(close, buys, sells, lot_sizes, cash, start_bar=0):
+    """Backtest the entry and exit masks of a strategy.
+
+    Args:
+        close (np.ndarray): The n_bars x n_codes close prices.
+        buys (np.ndarray): The n_bars x n_codes entry mask. It is modified
+            in place.
+        sells (np.ndarray): The n_bars x n_codes exit mask. It is modified
+            in place.
+        lot_sizes (np.ndarray): The lot size of each code.
+        cash (float): The initial cash.
+        start_bar (int): The index of the first bar on which the strategy
+            trades. Earlier bars only warm up the indicators. Default: 0.
+
+    Returns:
+        equity_curve (np.ndarray): The total assets after each bar from
+            start_bar.
+        trades (np.ndarray): The n_bars x n_codes trades. See
+            calculate_equity_curve().
+    """
+    buys[:start_bar] = False
+    sells[:start_bar] = False
+
+    positions = positions_from_signals(buys=buys, sells=sells)
+    equity_curve, trades = calculate_equity_curve(close=close,
+                                                  positions=positions,
+                                                  lot_sizes=lot_sizes,
+                                                  cash=cash)
+
+    return equity_curve[start_bar:], trades
+
+
+class VectorizedBacktester:
+    """Backtest a built-in strategy without a per-bar loop.
+
+    The entry and exit masks of the strategy are computed over the whole
+    history at once, the positions are derived from them with the same
+    "buy one lot only if flat, sell all only if holding" rule as
+    Robot.execute_signals(), and the equity curve is computed from the
+    positions. Given sufficient cash, the results match those of
+    futubot.backtest.Backtester, but months of minute data for a whole
+    universe take seconds.
+
+    Args:
+        stockframe (StockFrame): The stored candlesticks, aligned on the
+            same time_keys for every code.
+        strategy (type | str): The strategy class or its name, one of
+            the keys of STRATEGY_SIGNALS.
+        strategy_params (dict): The keyword arguments of the strategy.
+            Default: None.
+        lot_sizes (dict[float]): The lot sizes of codes. Default: None,
+            meaning a lot size of 100 for every code.
+        cash (float): The initial cash. Default: 1000000.0.
+        start_date (str): The time of the first bar on which the strategy
+            trades in format yyyy-MM-dd HH:mm:ss. Earlier bars only warm up
+            the indicators. Default: None, meaning from the first bar.
+    """
+    def __init__(self,
+                 stockframe,
+                 strategy,
+                 strategy_params=None,
+                 lot_sizes=None,
+                 cash=1000000.0,
+                 start_date=None):
+        if isinstance(strategy, str):
+            strategy_name = strategy
+        else:
+            strategy_name = strategy.__name__
+        if strategy_name not in STRATEGY_SIGNALS:
+            raise ValueError(f'Unsupported strategy {strategy_name}')
+        if not isinstance(cash, float):
+            raise TypeError(f'Only float type is supported for cash, '
+                            f'but got {type(cash)}')
+        assert cash > 0, f'cash must be greater than 0, but got {cash}'
+
+        self.strategy_name = strategy_name
+        self.strategy_params = strategy_params or {}
+        self.cash = cash
+
+        self.close = pivot_prices(stockframe=stockframe)
+        self.code_list = self.close.columns.to_list()
+
+        lot_sizes = lot_sizes or {}
+        self.lot_sizes = np.array(
+            [lot_sizes.get(code, 100.0) for code in self.code_list])
+
+        self.start_bar = 0
+        if start_date is not None:
+            self.start_bar = self.close.index.searchsorted(
+                pd.to_datetime(start_date))
+
+    def run(self):
+        """Run the backtest from start_date.
+
+        Returns:
+            results (dict): A dict of backtest results with the same keys
+                as futubot.backtest.Backtester.run().
+        """
+        signals_function = STRATEGY_SIGNALS[self.strategy_name]
+        buys, sells = signals_function(self.close, **self.strategy_params)
+
+        equity_curve, trades = backtest_signals(close=self.close.to_numpy(),
+                                                buys=buys,
+                                                sells=sells,
+                                                lot_sizes=self.lot_sizes,
+                                                cash=self.cash,
+                                                start_bar=self.start_bar)
+
+        time_keys = self.close.index[self.start_bar:]
+        equity_curve = pd.Series(equity_curve, index=time_keys, name='equity')
+        final_equity = float(equity_curve.iloc[-1])
+
+        results = {
+            'equity_curve': equity_curve,
+            'orders': self._get_orders(trades),
+            'final_equity': final_equity,
+            'total_pnl_value': final_equity - self.cash,
+            'total_return': final_equity / self.cash - 1,
+        }
+
+        return results
+
+    def _get_orders(self, trades):
+        """Convert the trades into a dataframe of orders.
+
+        Args:
+            trades (np.ndarray): The n_bars x n_codes trades.
+
+        Returns:
+            (pd.DataFrame): The orders in time order with columns
+                code, trd_side, qty, price, create_time.
+        """
+        bars, codes = np.nonzero(trades)
+
+        code_list = np.array(self.code_list, dtype=object)
+        trd_sides = np.where(trades[bars, codes] > 0, TrdSide.BUY,
+                             TrdSide.SELL)
+        create_times = self.close.index[bars].strftime('%Y-%m-%d %H:%M:%S')
+
+        orders = pd.DataFrame({
+            'code': code_list[codes],
+            'trd_side': trd_sides,
+            'qty': self.lot_sizes[codes],
+            'price': self.close.to_numpy()[bars, codes],
+            'create_time': create_times,
+        })
+
+        return orders
@@ -0,0 +1,190 @@
+import numpy as np
+import pandas as pd
+
+from .param_search import BaseParameterSearch
+
+
+def split_windows(time_keys, in_sample_days, out_of_sample_days):
+    """Split bars into rolling in-sample and out-of-sample windows.
+
+    Each in-sample window of in_sample_days trading days is followed by an
+    out-of-sample window of out_of_sample_days trading days, and the
+    windows roll forward by out_of_sample_days, so that the out-of-sample
+    windows are consecutive and do not overlap. Trailing days too few for
+    a whole out-of-sample window are dropped.
+
+    Args:
+        time_keys (pd.DatetimeIndex): The sorted time_keys of the bars.
+        in_sample_days (int): The number of trading days of each
+            in-sample window.
+        out_of_sample_days (int): The number of trading days of each
+            out-of-sample window.
+
+    Returns:
+        (list[tuple]): The windows as tuples of (in_sample_start,
+            in_sample_end, out_of_sample_end) bar indices, where the
+            out-of-sample window starts at in_sample_end.
+    """
+    if not isinstance(time_keys, pd.DatetimeIndex):
+        raise TypeError(f'Only pd.DatetimeIndex type is supported for '
+                        f'time_keys, but got {type(time_keys)}')
+    assert in_sample_days > 0, \
+        f'in_sample_days must be greater than 0, but got {in_sample_days}'
+    assert out_of_sample_days > 0, (f'out_of_sample_days must be greater '
+                                    f'than 0, but got {out_of_sample_days}')
+
+    dates = time_keys.normalize()
+    # The index of the first bar of each trading day, and the end.
+    day_starts = np.append(
+        np.flatnonzero(dates[1:] != dates[:-1]) + 1, len(time_keys))
+    day_starts = np.insert(day_starts, 0, 0)
+    n_days = len(day_starts) - 1
+
+    windows = []
+    start_day = 0
+    while start_day + in_sample_days + out_of_sample_days <= n_days:
+        in_sample_end_day = start_day + in_sample_days
+        windows.append(
+            (int(day_starts[start_day]), int(day_starts[in_sample_end_day]),
+             int(day_starts[in_sample_end_day + out_of_sample_days])))
+        start_day += out_of_sample_days
+
+    return windows
+
+
+class WalkForward(BaseParameterSearch):
+    """Walk-forward optimization of the parameters of a built-in strategy.
+
+    The parameters are optimized on each in-sample window and the best
+    combination is evaluated on the following out-of-sample window, which
+    validates the parameters on data they were not tuned on. The in-sample
+    searches of all the windows run together on a single
+    ParameterEvaluator. Since the indicators are calculated over the whole
+    history, every window reuses the indicators cached by the workers
+    instead of recalculating the bars it shares with the other windows,
+    and the indicators of each window are warmed up on the bars before it.
+
+    Args:
+        stockframe (StockFrame): The stored candlesticks, aligned on the
+            same time_keys for every code.
+        strategy (type | str): The strategy class or its name, one of
+            the keys of STRATEGY_SIGNALS.
+        param_grid (dict[list]): The candidate values of each parameter,
+            e.g. dict(period=[7, 14, 21], oversold_signal=[20, 30]).
+        in_sample_days (int): The number of trading days of each
+            in-sample window.
+        out_of_sample_days (int): The number of trading days of each
+            out-of-sample window.
+        n_iter (int): The number of randomly sampled combinations.
+            Default: None, meaning every combination of the grid.
+        metric (str): The metric optimized in sample, one of METRICS.
+            Default: total_return.
+        lot_sizes (dict[float]): The lot sizes of codes. Default: None,
+            meaning a lot size of 100 for every code.
+        cash (float): The initial cash of each window. Default: 1000000.0.
+        processes (int): The number of worker processes. Default: None,
+            meaning os.cpu_count(). If 1, the windows are evaluated in the
+            current process.
+        seed (int): The random seed of the sampled combinations.
+            Default: 0.
+        cache_size (int): The maximum number of indicator arrays cached by
+            each worker. Default: 16.
+    """
+    def __init__(self,
+                 stockframe,
+                 strategy,
+                 param_grid,
+                 in_sample_days,
+                 out_of_sample_days,
+                 n_iter=None,
+                 metric='total_return',
+                 lot_sizes=None,
+                 cash=1000000.0,
+                 processes=None,
+                 seed=0,
+                 cache_size=16):
+        super().__init__(stockframe=stockframe,
+                         strategy=strategy,
+                         param_grid=param_grid,
+                         n_iter=n_iter,
+                         metric=metric,
+                         lot_sizes=lot_sizes,
+                         cash=cash,
+                         processes=processes,
+                         seed=seed,
+                         cache_size=cache_size)
+
+        self.windows = split_windows(time_keys=self.time_keys,
+                                     in_sample_days=in_sample_days,
+                                     out_of_sample_days=out_of_sample_days)
+        if not self.windows:
+            raise ValueError(
+                f'The history is shorter than {in_sample_days} in-sample '
+                f'and {out_of_sample_days} out-of-sample trading days')
+
+    def run(self):
+        """Optimize and validate the parameters on every window.
+
+        Returns:
+            results (dict): A dict of walk-forward results with the
+                following keys:
+                    windows (pd.DataFrame): One row per window with the
+                        bounds of the window, the best in-sample
+                        parameters, their in-sample metric and their
+                        out-of-sample metrics.
+                    total_return (float): The compounded out-of-sample
+                        return of all the windows.
+                    best_params (dict): The best parameters of the last
+                        in-sample window.
+        """
+        in_sample_tasks = [
+            (params, in_sample_start, in_sample_end)
+            for in_sample_start, in_sample_end, _ in self.windows
+            for params in self.combinations
+        ]
+
+        with self._create_evaluator() as evaluator:
+            in_sample_metrics = evaluator.evaluate(in_sample_tasks)
+
+            best_params = []
+            best_values = []
+            n_combinations = len(self.combinations)
+            for i in range(len(self.windows)):
+                metrics = in_sample_metrics[i * n_combinations:(i + 1) *
+                                            n_combinations]
+                values = [metric[self.metric] for metric in metrics]
+                best = int(np.argmax(values))
+                best_params.append(self.combinations[best])
+                best_values.append(values[best])
+
+            out_of_sample_tasks = [
+                (params, in_sample_end, out_of_sample_end)
+                for params, (
+                    _, in_sample_end,
+                    out_of_sample_end) in zip(best_params, self.windows)
+            ]
+            out_of_sample_metrics = evaluator.evaluate(out_of_sample_tasks)
+
+        in_sample_starts, in_sample_ends, ends = np.array(self.windows).T
+        bounds = pd.DataFrame(
+            dict(in_sample_start=self.time_keys[in_sample_starts],
+                 out_of_sample_start=self.time_keys[in_sample_ends],
+                 out_of_sample_end=self.time_keys[ends - 1]))
+        bounds[f'in_sample_{self.metric}'] = best_values
+
+        frames = [
+            bounds,
+            pd.DataFrame(best_params),
+            pd.DataFrame(out_of_sample_metrics)
+        ]
+        windows = pd.concat(frames, axis=1)
+
+        total_return = float(np.prod(1 + windows['total_return']) - 1)
+
+        results = {
+            'windows': windows,
+            'total_return': total_return,
+            'best_params': best_params[-1],
+        }
+
+        return results
@@ -0,0 +1,52 @@
+import pytest
+
+from futubot.accounts import Accounts
+from futubot.fake_opend import (CANDLE_COLUMNS, FakeQuoteContext,
+                                FakeTradeContext, generate_synthetic_klines)
+from futubot.stockframe import StockFrame
+
+
+@pytest.fixture
+def create_candles():
+    """Create synthetic candlesticks in the format returned by Robot."""
+    def _create_candles(code_list=('HK.00700', 'HK.09988'), days=1):
+        klines = generate_synthetic_klines(code_list=list(code_list),
+                                           days=days)
+        return klines[CANDLE_COLUMNS].to_dict('records')
+
+    return _create_candles
+
+
+@pytest.fixture
+def create_stockframe(create_candles):
+    """Create a StockFrame of synthetic candlesticks."""
+    def _create_stockframe(code_list=('HK.00700', 'HK.09988'), days=1):
+        return StockFrame(data=create_candles(code_list=code_list, days=days))
+
+    return _create_stockframe
+
+
+@pytest.fixture
+def create_accounts():
+    """Create Accounts connected to a fake FutuOpenD.
+
+    The keyword arguments other than klines, limit_rates and order_interval
+    are passed to FakeTradeContext.
+    """
+    def _create_accounts(klines=None,
+                         limit_rates=False,
+                         order_interval=0.02,
+                         **kwargs):
+        if klines is None:
+            klines = generate_synthetic_klines(
+                code_list=['HK.00700', 'HK.09988'])
+        rate_limits = {} if limit_rates else dict(rate_limits=None)
+
+        return Accounts(paper_trading=True,
+                        quote_context=FakeQuoteContext(klines=klines,
+                                                       **rate_limits),
+                        trade_context=FakeTradeContext(**rate_limits,
+                                                       **kwargs),
+                        order_interval=order_interval)
+
+    return _create_accounts
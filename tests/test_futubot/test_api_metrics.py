@@ -0,0 +1,90 @@
+import urllib.error
+import urllib.request
+
+import pytest
+
+from futubot.api_metrics import (ApiMetrics, EndpointMetrics,
+                                 InstrumentedContext)
+from futubot.fake_opend import generate_synthetic_klines
+
+
+def test_api_metrics(create_accounts):
+    accounts = create_accounts(
+        klines=generate_synthetic_klines(code_list=['HK.00700']),
+        limit_rates=True,
+        order_interval=0.0,
+        cash=100000.0)
+    # get_market_state allows at most 10 requests per 30 seconds.
+    for _ in range(12):
+        accounts.get_market_state(code_list=['HK.00700'])
+    accounts.get_lot_size(code_list=['HK.00700'])
+
+    stats = accounts.metrics.stats()
+    assert stats['get_market_state']['calls'] == 12
+    assert stats['get_market_state']['errors'] == {'-1': 2}
+    assert 'Frequency limitation' in stats['get_market_state']['last_error']
+    assert stats['get_market_state']['quota_used'] == 12
+    assert stats['get_market_state']['quota_limit'] == 10
+    assert stats['get_market_state']['latency']['count'] == 12
+    assert stats['get_stock_basicinfo']['quota_limit'] is None
+
+    # Attributes other than the Futu APIs are passed through.
+    assert accounts.trade_context.cash == 100000.0
+
+    text = accounts.metrics.to_prometheus()
+    assert 'futubot_api_calls_total{endpoint="get_market_state"} 12' in text
+    assert ('futubot_api_errors_total{endpoint="get_market_state",code="-1"} '
+            '2') in text
+    assert 'futubot_api_quota_limit{endpoint="get_market_state"} 10' in text
+    assert ('futubot_api_latency_seconds_count{endpoint="get_market_state"} '
+            '12') in text
+
+
+def test_api_metrics_exception():
+    class BrokenContext:
+        def get_market_state(self, code_list):
+            raise ConnectionError('FutuOpenD is not connected')
+
+    metrics = ApiMetrics()
+    context = InstrumentedContext(BrokenContext(), metrics)
+    with pytest.raises(ConnectionError):
+        context.get_market_state(code_list=['HK.00700'])
+
+    assert metrics.stats()['get_market_state']['errors'] == {
+        'ConnectionError': 1
+    }
+
+
+def test_api_metrics_server(create_accounts):
+    accounts = create_accounts(
+        klines=generate_synthetic_klines(code_list=['HK.00700']),
+        limit_rates=True,
+        order_interval=0.0,
+        cash=100000.0)
+    accounts.get_market_state(code_list=['HK.00700'])
+
+    server = accounts.metrics.serve(port=0)
+    try:
+        url = f'http://127.0.0.1:{server.server_address[1]}'
+        with urllib.request.urlopen(f'{url}/metrics') as response:
+            assert response.status == 200
+            text = response.read().decode('utf-8')
+        assert 'futubot_api_calls_total{endpoint="get_market_state"} 1' in text
+
+        with pytest.raises(urllib.error.HTTPError):
+            urllib.request.urlopen(f'{url}/other')
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_endpoint_metrics_window():
+    metrics = EndpointMetrics(max_requests=10, period=30.0)
+    for second in range(1000):
+        metrics.record(now=float(second), latency=0.01)
+
+    # The call times out of the window are dropped without any stats
+    # being read.
+    assert len(metrics._call_times) == 30
+    assert metrics.calls == 1000
+    assert metrics.quota_used(now=1000.0) == 29
@@ -0,0 +1,85 @@
+import numpy as np
+import pandas as pd
+import pytest
+from futu import KLType
+
+from futubot.backtest import Backtester, ReplayStockFrame
+from futubot.indicators import Indicators
+from futubot.stockframe import StockFrame
+from Strategy import MACDCrossOverStrategy, RSIStrategy
+
+
+def test_replay_stockframe(create_candles):
+    candles = create_candles()
+    stockframe = StockFrame(data=candles)
+    replay_stockframe = ReplayStockFrame(stockframe=stockframe)
+    assert len(replay_stockframe.time_keys) == 331
+    assert len(replay_stockframe.frame) == len(candles)
+
+    replay_stockframe.current_bar = 9
+    assert len(replay_stockframe.frame) == 20
+    assert str(replay_stockframe.current_time) == '2022-08-08 09:39:00'
+
+    # The indicators of the stored frame only depend on previous bars.
+    Indicators(stockframe=stockframe).rsi()
+    prefix_stockframe = StockFrame(data=candles[:100] + candles[331:431])
+    Indicators(stockframe=prefix_stockframe).rsi()
+    replay_stockframe.current_bar = 99
+    np.testing.assert_allclose(replay_stockframe.frame['rsi_14'].values,
+                               prefix_stockframe.frame['rsi_14'].values)
+
+    with pytest.raises(RuntimeError):
+        replay_stockframe.add_rows(data=candles[:1])
+
+
+def test_replay_stockframe_timeframe(create_candles):
+    candles = create_candles()
+    replay_stockframe = ReplayStockFrame(stockframe=StockFrame(data=candles))
+    replay_stockframe.current_bar = 0
+    replay_stockframe.add_timeframe(KLType.K_5M)
+    assert replay_stockframe.timeframes == [KLType.K_5M]
+
+    # The resampled frame only contains the bars up to the current bar,
+    # with the last candlestick aggregated from its bars so far.
+    for bar in [1, 2, 12, 150, 7]:
+        replay_stockframe.current_bar = bar
+        prefix_stockframe = StockFrame(data=candles[:bar + 1] +
+                                       candles[331:331 + bar + 1])
+        pd.testing.assert_frame_equal(replay_stockframe.get_frame(KLType.K_5M),
+                                      prefix_stockframe.get_frame(KLType.K_5M),
+                                      check_dtype=False)
+
+    indicator_client = Indicators(stockframe=replay_stockframe,
+                                  ktype=KLType.K_5M)
+    indicator_client.sma(period=2)
+    assert 'sma_2' in replay_stockframe.get_frame(KLType.K_5M).columns
+
+
+@pytest.mark.parametrize('strategy, indicators', [
+    (RSIStrategy, dict(rsi=dict(period=14))),
+    (MACDCrossOverStrategy, None),
+])
+def test_backtester(strategy, indicators, create_candles):
+    stockframe = StockFrame(data=create_candles())
+    backtester = Backtester(stockframe=stockframe,
+                            strategy=strategy,
+                            indicators=indicators,
+                            cash=100000.0,
+                            start_date='2022-08-08 10:00:00')
+    results = backtester.run()
+
+    equity_curve = results['equity_curve']
+    assert len(equity_curve) == 331 - 30
+    assert str(equity_curve.index[0]) == '2022-08-08 10:00:00'
+
+    orders = results['orders']
+    assert len(orders) > 0
+    assert (orders['create_time'] >= '2022-08-08 10:00:00').all()
+    assert results['final_equity'] == pytest.approx(
+        backtester.trade_context.cash + backtester.trade_context.market_value)
+    assert results['total_pnl_value'] == pytest.approx(
+        results['final_equity'] - 100000.0)
+
+    holdings = backtester.portfolio.holdings
+    for code in backtester.code_list:
+        assert holdings[code] == backtester.trade_context._get_qty(code)
@@ -0,0 +1,132 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from futubot.charts import (LiveGraphBuilder, downsample_columns,
+                            downsample_ohlcv, downsample_series, lttb_indices,
+                            parse_relayout_range, slice_frame)
+
+
+def _create_price_df(periods=3000):
+    rng = np.random.default_rng(0)
+    close = 300 + np.cumsum(rng.normal(size=periods))
+
+    return pd.DataFrame(
+        data={
+            'open': close + rng.normal(size=periods),
+            'close': close,
+            'high': close + 2,
+            'low': close - 2,
+            'volume': rng.integers(1000, 2000, size=periods),
+        },
+        index=pd.date_range('2022-08-08 09:30:00', periods=periods,
+                            freq='min'),
+    )
+
+
+def test_lttb_indices():
+    x = np.arange(10000)
+    y = np.sin(x / 100)
+
+    indices = lttb_indices(x=x, y=y, max_points=500)
+    assert len(indices) == 500
+    assert indices[0] == 0
+    assert indices[-1] == 9999
+    assert np.all(np.diff(indices) > 0)
+
+    # Short series are returned untouched.
+    assert len(lttb_indices(x=x[:100], y=y[:100], max_points=500)) == 100
+
+    with pytest.raises(TypeError):
+        lttb_indices(x=x, y=y, max_points=500.0)
+
+
+def test_downsample_series():
+    price_df = _create_price_df()
+    series = price_df['close'].rolling(window=20).mean()
+
+    downsampled = downsample_series(series, max_points=300)
+    assert len(downsampled) == 300
+    assert not downsampled.isna().any()
+
+
+def test_downsample_columns():
+    price_df = _create_price_df()
+
+    downsampled = downsample_columns(price_df, ['close', 'high'],
+                                     max_points=300)
+    assert list(downsampled.columns) == ['close', 'high']
+    assert len(downsampled) == 300
+
+
+def test_downsample_ohlcv():
+    price_df = _create_price_df()
+
+    candles = downsample_ohlcv(price_df, max_points=700)
+    assert len(candles) <= 700
+    assert candles['high'].max() == price_df['high'].max()
+    assert candles['low'].min() == price_df['low'].min()
+    assert candles['volume'].sum() == price_df['volume'].sum()
+    assert candles['open'].iloc[0] == price_df['open'].iloc[0]
+    assert candles['close'].iloc[-1] == price_df['close'].iloc[-1]
+
+
+def test_slice_frame():
+    price_df = _create_price_df()
+
+    visible = slice_frame(price_df,
+                          x_range=('2022-08-08 10:00:00',
+                                   '2022-08-08 10:59:00'))
+    assert len(visible) == 60
+    assert slice_frame(price_df, x_range=None) is price_df
+
+
+def test_parse_relayout_range():
+    assert parse_relayout_range(None) is None
+    assert parse_relayout_range({'autosize': True}) is None
+    assert parse_relayout_range({'xaxis.autorange': True}) is None
+    assert parse_relayout_range({
+        'xaxis.range[0]': '2022-08-08 10:00:00',
+        'xaxis.range[1]': '2022-08-08 11:00:00'
+    }) == ('2022-08-08 10:00:00', '2022-08-08 11:00:00')
+    assert parse_relayout_range({'xaxis.range': ['a', 'b']}) == ('a', 'b')
+
+
+@pytest.mark.parametrize('indicator_name', [
+    'Candlestick', 'Volume', 'RSI_14', 'SMA_20', 'EMA_20', 'MACD',
+    'BOLLINGER_BANDS', 'STANDARD_DEVIATION', 'STOCHASTIC_OSCILLATOR'
+])
+def test_live_graph_builder(indicator_name):
+    price_df = _create_price_df()
+    close = price_df['close']
+    price_df['rsi_14'] = 50.0
+    price_df['sma_20'] = close.rolling(window=20).mean()
+    price_df['ema_20'] = close.ewm(span=20).mean()
+    price_df['macd'] = close.ewm(span=12).mean() - close.ewm(span=26).mean()
+    price_df['signal'] = price_df['macd'].ewm(span=9).mean()
+    price_df['histogram'] = price_df['macd'] - price_df['signal']
+    price_df['sma'] = price_df['sma_20']
+    price_df['upper_band'] = price_df['sma'] + 1
+    price_df['lower_band'] = price_df['sma'] - 1
+    price_df['standard_deviation'] = close.rolling(window=20).std()
+    price_df['%K'] = 50.0
+    price_df['%D'] = 50.0
+
+    graph_builder = LiveGraphBuilder()
+    figure = graph_builder.build(code='HK.00700',
+                                 price_df=price_df,
+                                 indicator_name=indicator_name,
+                                 max_points=500)
+
+    template = graph_builder.get_template(code='HK.00700',
+                                          indicator_name=indicator_name)
+    assert len(figure['data']) == len(template['data'])
+    assert figure['layout'] is template['layout']
+
+    for trace in figure['data']:
+        assert len(trace['x']) <= 500
+        assert 'x' not in template['data'][0]
+
+    # The template is reused for the same code and indicator.
+    assert graph_builder.get_template(
+        code='HK.00700', indicator_name=indicator_name) is template
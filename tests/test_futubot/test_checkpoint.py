@@ -0,0 +1,118 @@
+import signal
+from datetime import datetime
+
+import pandas as pd
+from futu import KLType, OrderStatus
+
+from futubot.accounts import Accounts
+from futubot.checkpoint import Checkpointer
+from futubot.clock import SimulatedClock
+from futubot.fake_opend import (FakeQuoteContext, FakeTradeContext,
+                                generate_synthetic_klines)
+from futubot.indicators import Indicators
+from futubot.robot import Robot
+from futubot.stockframe import StockFrame
+
+CODE_LIST = ['HK.00700', 'HK.09988']
+
+
+def _create_robot(klines, now):
+    clock = SimulatedClock(start=now)
+    accounts = Accounts(paper_trading=True,
+                        quote_context=FakeQuoteContext(klines=klines,
+                                                       rate_limits=None),
+                        trade_context=FakeTradeContext(cash=1000000.0,
+                                                       now=clock.now,
+                                                       rate_limits=None))
+
+    sigint_handler = signal.getsignal(signal.SIGINT)
+    robot = Robot(accounts=accounts, clock=clock)
+    signal.signal(signal.SIGINT, sigint_handler)
+
+    return robot
+
+
+def test_checkpoint(tmp_path):
+    klines = generate_synthetic_klines(code_list=CODE_LIST)
+    robot = _create_robot(klines, datetime(2022, 8, 8, 11, 0, 20))
+    portfolio = robot.create_portfolio(stocks_of_interest=CODE_LIST)
+    history = klines[klines['time_key'] <= '2022-08-08 11:00:00']
+    stockframe = StockFrame(data=history.to_dict('records'))
+    indicator_client = Indicators(stockframe=stockframe)
+    indicator_client.rsi(period=14)
+    indicator_client.sma(period=20)
+    indicator_client.timeframe(KLType.K_5M).sma(period=5)
+    portfolio.update_positions(
+        order_infos={
+            'HK.00700':
+            dict(order_id='1',
+                 qty=100.0,
+                 price=300.0,
+                 trd_side='BUY',
+                 order_status=OrderStatus.SUBMITTED,
+                 create_time='2022-08-08 11:00:00')
+        })
+
+    checkpointer = Checkpointer(path=str(tmp_path / 'checkpoint.pkl'),
+                                interval=60.0)
+    state = checkpointer.save(portfolio, stockframe, indicator_client)
+    assert state['indicators']['sma_20'] == {
+        'func': 'sma',
+        'args': {
+            'period': 20
+        }
+    }
+    assert len(state['open_orders']) == 1
+    # The state holds copies, which can be written while the robot goes on.
+    assert state['frame'] is not stockframe.frame
+    assert state['portfolio']['pnl'] is not portfolio.pnl
+    # The next save is not due yet.
+    assert not checkpointer.is_due()
+    assert checkpointer.maybe_save(portfolio, stockframe,
+                                   indicator_client) is None
+
+    # The robot is restarted half an hour later.
+    robot = _create_robot(klines, datetime(2022, 8, 8, 11, 30, 20))
+    portfolio, stockframe, indicator_client = checkpointer.restore(robot)
+    assert robot.portfolio is portfolio
+    assert robot.stockframe is stockframe
+
+    # Only the bars since the checkpoint are requested from Futu, and
+    # neither the positions nor the account are queried.
+    stats = robot.accounts.metrics.stats()
+    assert set(stats) == {'request_history_kline'}
+    assert stats['request_history_kline']['calls'] == len(CODE_LIST)
+
+    assert portfolio.positions['HK.00700']['qty'] == 100.0
+    assert portfolio.positions['HK.00700']['pending_qty'] == 100.0
+    assert portfolio.journal.to_frame()['order_id'].to_list() == ['1']
+
+    # The indicators are the same as if calculated over the whole history.
+    history = klines[klines['time_key'] <= '2022-08-08 11:30:00']
+    expected = StockFrame(data=history.to_dict('records'))
+    expected_indicators = Indicators(stockframe=expected)
+    expected_indicators.rsi(period=14)
+    expected_indicators.sma(period=20)
+    columns = ['open', 'close', 'high', 'low', 'volume', 'rsi_14', 'sma_20']
+    pd.testing.assert_frame_equal(stockframe.frame[columns],
+                                  expected.frame[columns],
+                                  check_dtype=False)
+    assert list(indicator_client.current_indicators) == ['rsi_14', 'sma_20']
+
+    # The timeframes are resampled again from the restored frame.
+    expected_indicators.timeframe(KLType.K_5M).sma(period=5)
+    pd.testing.assert_frame_equal(stockframe.get_frame(KLType.K_5M),
+                                  expected.get_frame(KLType.K_5M),
+                                  check_dtype=False)
+    assert list(indicator_client.timeframe(
+        KLType.K_5M).current_indicators) == ['sma_5']
+
+    # A checkpoint of another day is not restored.
+    robot = _create_robot(klines, datetime(2022, 8, 9, 9, 30, 20))
+    assert checkpointer.restore(robot) is None
+    assert robot.portfolio is None
+
+    with open(checkpointer.path, 'wb') as f:
+        f.write(b'\x00' * 16)
+    assert checkpointer.load() is None
+    assert Checkpointer(path=str(tmp_path / 'missing.pkl')).load() is None
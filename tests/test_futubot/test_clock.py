@@ -0,0 +1,84 @@
+import time
+from datetime import datetime
+
+import pytest
+
+from futubot.accounts import Accounts
+from futubot.clock import AcceleratedClock, Clock, SimulatedClock, WallClock
+from futubot.fake_opend import (FakeQuoteContext, FakeTradeContext,
+                                generate_synthetic_klines)
+from futubot.robot import Robot
+
+
+def _create_robot(clock):
+    klines = generate_synthetic_klines(code_list=['HK.00700'])
+    accounts = Accounts(paper_trading=True,
+                        quote_context=FakeQuoteContext(klines=klines,
+                                                       rate_limits=None),
+                        trade_context=FakeTradeContext(now=clock.now,
+                                                       rate_limits=None))
+
+    return Robot(accounts=accounts, clock=clock)
+
+
+def test_simulated_clock():
+    clock = SimulatedClock(start=datetime(2022, 8, 8, 9, 30))
+
+    clock.sleep(90)
+    assert clock.now() == datetime(2022, 8, 8, 9, 31, 30)
+    assert clock.monotonic() == 90
+
+    clock.sleep_until(datetime(2022, 8, 8, 10, 0))
+    assert clock.now() == datetime(2022, 8, 8, 10, 0)
+    clock.sleep_until(datetime(2022, 8, 8, 9, 0))
+    assert clock.now() == datetime(2022, 8, 8, 10, 0)
+
+    with pytest.raises(AssertionError):
+        clock.set_time(datetime(2022, 8, 8, 9, 0))
+
+    # The base clock is abstract.
+    with pytest.raises(TypeError):
+        Clock()
+
+
+def test_accelerated_clock():
+    clock = AcceleratedClock(start=datetime(2022, 8, 8, 9, 30), speed=600.0)
+
+    start = time.monotonic()
+    clock.sleep(6)
+    assert time.monotonic() - start < 1
+    assert clock.now() >= datetime(2022, 8, 8, 9, 30, 6)
+
+    elapsed = AcceleratedClock().now() - WallClock().now()
+    assert abs(elapsed.total_seconds()) < 60
+
+
+def test_robot_trading_time():
+    clock = SimulatedClock(start=datetime(2022, 8, 8, 9, 0))
+    futubot = _create_robot(clock)
+    assert futubot.is_regular_trading_time() is False
+    assert futubot.wait_for_trading_time() is False
+
+    clock.set_time(datetime(2022, 8, 8, 10, 0))
+    assert futubot.is_regular_trading_time() is True
+
+    # The lunch break is slept through on the clock.
+    clock.set_time(datetime(2022, 8, 8, 12, 30))
+    assert futubot.is_regular_trading_time() is False
+    assert futubot.is_lunch_break() is True
+    assert futubot.wait_for_trading_time() is True
+    assert clock.now() == datetime(2022, 8, 8, 13, 1, 30)
+
+    clock.set_time(datetime(2022, 8, 8, 17, 0))
+    assert futubot.wait_for_trading_time() is False
+
+
+def test_robot_wait_till_next_bar():
+    clock = SimulatedClock(start=datetime(2022, 8, 8, 10, 0, 20))
+    futubot = _create_robot(clock)
+
+    futubot.wait_till_next_bar(last_bar_timestamp=['2022-08-08 10:00:00'])
+    assert clock.now() == datetime(2022, 8, 8, 10, 1, 0, 200000)
+
+    latest_prices = futubot.get_latest_bar(code_list=['HK.00700'])
+    assert latest_prices[0]['time_key'] == '2022-08-08 10:01:00'
@@ -0,0 +1,120 @@
+import numpy as np
+import pandas as pd
+import pytest
+from futu import KLType
+
+from futubot.daily_bars import (DAILY_BAR_COLUMNS, DailyBarStore,
+                                roll_daily_bars)
+from futubot.fake_opend import generate_synthetic_klines, resample_klines
+from futubot.portfolio import Portfolio
+from futubot.snapshot import write_atomic
+from futubot.stockframe import StockFrame
+
+CODE_LIST = ['HK.00700', 'HK.09988']
+
+POSITIONS = {code: dict(qty=100.0, cost_price=100.0) for code in CODE_LIST}
+
+
+def _history_requests(accounts):
+    return accounts.metrics.stats()['request_history_kline']['calls']
+
+
+def test_roll_daily_bars():
+    klines = generate_synthetic_klines(code_list=CODE_LIST, days=2)
+    stockframe = StockFrame(data=klines.to_dict('records'))
+
+    daily_bars = roll_daily_bars(stockframe.frame)
+    expected = resample_klines(klines, KLType.K_DAY)[DAILY_BAR_COLUMNS]
+    assert daily_bars == expected.to_dict('records')
+
+    assert roll_daily_bars(stockframe.frame.iloc[:0]) == []
+    with pytest.raises(TypeError):
+        roll_daily_bars(daily_bars)
+
+
+def test_daily_bar_store(tmp_path, monkeypatch, create_accounts):
+    klines = generate_synthetic_klines(code_list=CODE_LIST, days=10)
+    accounts = create_accounts(klines=klines, positions=POSITIONS)
+    path = str(tmp_path / 'daily_bars.pkl')
+
+    writes = []
+    monkeypatch.setattr('futubot.daily_bars.write_atomic',
+                        lambda *args: writes.append(write_atomic(*args)))
+
+    daily_bar_store = DailyBarStore(path=path)
+    assert daily_bar_store.fetch(accounts, CODE_LIST,
+                                 end_date='2022-08-12') == 2
+    # The file is written once for all the codes.
+    assert len(writes) == 1
+    assert daily_bar_store.last_time_keys() == {
+        'HK.00700': '2022-08-12 00:00:00',
+        'HK.09988': '2022-08-12 00:00:00'
+    }
+
+    # The history is kept on disk, and only the missing days are fetched.
+    daily_bar_store = DailyBarStore(path=path)
+    assert len(daily_bar_store.get_bars()) == 10
+    assert daily_bar_store.fetch(accounts, CODE_LIST,
+                                 end_date='2022-08-12') == 0
+    assert daily_bar_store.fetch(accounts, ['HK.00700'],
+                                 end_date='2022-08-19') == 1
+    assert daily_bar_store.last_time_keys()['HK.00700'] == \
+        '2022-08-19 00:00:00'
+
+    expected = resample_klines(klines, KLType.K_DAY)[DAILY_BAR_COLUMNS]
+    expected = expected[expected['code'] == 'HK.00700']
+    daily_bars = daily_bar_store.get_bars(code_list=['HK.00700'], days=7)
+    assert daily_bars == expected.iloc[5:].to_dict('records')
+
+    with pytest.raises(TypeError):
+        daily_bar_store.add(expected)
+
+
+def test_portfolio_update_intraday_prices(create_accounts):
+    klines = generate_synthetic_klines(code_list=CODE_LIST, days=30)
+    time_keys = klines['time_key']
+    # Futu only has the daily history before the last two days.
+    accounts = create_accounts(klines=klines[time_keys < '2022-09-15'],
+                               positions=POSITIONS)
+
+    daily_bar_store = DailyBarStore()
+    daily_bar_store.fetch(accounts, CODE_LIST, end_date='2022-09-14')
+    portfolio = Portfolio(accounts=accounts, daily_bar_store=daily_bar_store)
+    for code in CODE_LIST:
+        portfolio.add_position(code=code, stock_name=code, quantity=100.0)
+
+    intraday_klines = klines[time_keys >= '2022-09-15']
+    stockframe = StockFrame(
+        data=intraday_klines[intraday_klines['time_key'] <
+                             '2022-09-16 12:00:00'].to_dict('records'))
+    portfolio.update_intraday_prices(stockframe)
+    portfolio.calculate_portfolio_metrics()
+    requests = _history_requests(accounts)
+
+    # The metrics are refreshed with the bars of the intraday StockFrame
+    # only.
+    stockframe.add_rows(
+        data=intraday_klines[intraday_klines['time_key'] >=
+                             '2022-09-16 12:00:00'].to_dict('records'))
+    portfolio.update_intraday_prices(stockframe)
+    portfolio_metrics = portfolio.calculate_portfolio_metrics()
+    assert _history_requests(accounts) == requests
+
+    daily_klines = resample_klines(klines, KLType.K_DAY)
+    close = daily_klines.pivot(index='time_key',
+                               columns='code',
+                               values='close')
+    returns = np.log(close).diff()
+    for code in CODE_LIST:
+        np.testing.assert_allclose(portfolio_metrics[code]['average_returns'],
+                                   returns[code].mean())
+        np.testing.assert_allclose(
+            portfolio_metrics[code]['variance_of_returns'],
+            returns[code].var())
+
+    # The finished day is stored, while today is still provisional.
+    assert daily_bar_store.last_time_keys() == {
+        'HK.00700': '2022-09-15 00:00:00',
+        'HK.09988': '2022-09-15 00:00:00'
+    }
+    assert portfolio._last_daily_time_key == pd.Timestamp('2022-09-15')
@@ -0,0 +1,169 @@
+from datetime import datetime, timedelta
+
+import pytest
+from futu import RET_ERROR, RET_OK, KLType, OrderStatus, TrdSide
+
+from futubot.fake_opend import (FakeQuoteContext, RateLimiter,
+                                generate_synthetic_klines, resample_klines)
+from futubot.indicators import Indicators
+from futubot.robot import Robot
+from Strategy import RSIStrategy
+
+CODE_LIST = ['HK.00700', 'HK.09988']
+
+
+def test_generate_synthetic_klines():
+    klines = generate_synthetic_klines(code_list=CODE_LIST, days=2)
+    assert len(klines) == 2 * 2 * 331
+    assert klines['time_key'].iloc[0] == '2022-08-08 09:30:00'
+    assert klines['time_key'].iloc[151] == '2022-08-08 13:01:00'
+    assert klines['time_key'].iloc[-1] == '2022-08-09 16:00:00'
+    assert (klines['high'] >= klines[['open', 'close']].max(axis=1)).all()
+    assert (klines['low'] <= klines[['open', 'close']].min(axis=1)).all()
+
+    # The same seed generates the same candlesticks.
+    assert klines.equals(generate_synthetic_klines(code_list=CODE_LIST,
+                                                   days=2))
+
+    with pytest.raises(TypeError):
+        generate_synthetic_klines(code_list='HK.00700')
+
+
+def test_resample_klines():
+    klines = generate_synthetic_klines(code_list=CODE_LIST, days=2)
+
+    daily = resample_klines(klines, ktype=KLType.K_DAY)
+    assert len(daily) == 4
+    assert daily['time_key'].iloc[0] == '2022-08-08 00:00:00'
+    assert daily['volume'].sum() == klines['volume'].sum()
+
+    bars_5m = resample_klines(klines, ktype=KLType.K_5M)
+    time_keys = bars_5m[bars_5m['code'] == 'HK.00700']['time_key']
+    assert time_keys.iloc[0] == '2022-08-08 09:35:00'
+    assert '2022-08-08 12:00:00' in time_keys.values
+    assert '2022-08-08 13:05:00' in time_keys.values
+    assert len(time_keys) == 2 * (30 + 36)
+
+    with pytest.raises(ValueError):
+        resample_klines(klines, ktype=KLType.K_WEEK)
+
+
+def test_rate_limiter():
+    now = [0.0]
+    rate_limiter = RateLimiter(max_requests=2,
+                               period=30,
+                               min_interval=0.02,
+                               clock=lambda: now[0])
+
+    assert rate_limiter.acquire()
+    assert not rate_limiter.acquire()
+    now[0] = 1.0
+    assert rate_limiter.acquire()
+    assert not rate_limiter.acquire()
+    now[0] = 30.0
+    assert rate_limiter.acquire()
+
+
+def test_fake_quote_context():
+    now = [0.0]
+    klines = generate_synthetic_klines(code_list=CODE_LIST, days=2)
+    quote_context = FakeQuoteContext(klines=klines, clock=lambda: now[0])
+
+    ret, data, page_req_key = quote_context.request_history_kline(
+        code='HK.00700',
+        start='2022-08-08 9:30:00',
+        end='2022-08-08 10:29:00',
+        ktype=KLType.K_1M)
+    assert ret == RET_OK
+    assert len(data) == 60
+    assert page_req_key is None
+
+    ret, data, page_req_key = quote_context.request_history_kline(
+        code='HK.00700', ktype=KLType.K_1M, max_count=100)
+    assert len(data) == 100
+    assert page_req_key == 100
+
+    # At most 10 requests are allowed per 30 seconds.
+    for _ in range(8):
+        ret, data, _ = quote_context.request_history_kline(code='HK.00700')
+        assert ret == RET_OK
+    ret, data, _ = quote_context.request_history_kline(code='HK.00700')
+    assert ret == RET_ERROR
+
+    now[0] = 30.0
+    ret, data, _ = quote_context.request_history_kline(code='HK.00700')
+    assert ret == RET_OK
+    assert len(data) == 2
+
+
+def test_fake_trade_context(create_accounts):
+    accounts = create_accounts(klines=generate_synthetic_klines(
+        code_list=CODE_LIST, days=2),
+                               cash=100000.0,
+                               fill_orders=False,
+                               now=lambda: datetime(2022, 8, 8, 16, 0, 0))
+
+    order_info = accounts.place_order(price=300.0,
+                                      qty=100.0,
+                                      code='HK.00700',
+                                      trd_side=TrdSide.BUY)
+    assert order_info['order_status'] == OrderStatus.SUBMITTED
+    assert accounts.check_existing_orders(code_list=CODE_LIST) == {
+        'HK.00700': True,
+        'HK.09988': False
+    }
+
+    accounts.trade_context.fill_order(order_id=order_info['order_id'])
+    assert accounts.get_positions()['HK.00700']['qty'] == 100
+    assert accounts.get_account_info()['cash'] == 70000.0
+    assert accounts.get_max_power(code='HK.00700',
+                                  price=300.0)['max_position_sell'] == 100
+
+    # Orders exceeding the buying power are rejected.
+    assert accounts.place_order(
+        price=300.0, qty=1000.0, code='HK.00700', trd_side=TrdSide.BUY) is None
+
+
+def test_offline_robot(create_accounts):
+    accounts = create_accounts(klines=generate_synthetic_klines(
+        code_list=CODE_LIST, days=2),
+                               now=lambda: datetime(2022, 8, 8, 16, 0, 0))
+    futubot = Robot(accounts=accounts)
+
+    portfolio = futubot.create_portfolio(stocks_of_interest=CODE_LIST)
+    historical_quotes = futubot.get_historical_quotes(
+        start_date='2022-08-08 9:30:00', end_date='2022-08-08 10:30:00')
+    stockframe = futubot.create_stockframe(data=historical_quotes)
+
+    indicator_client = Indicators(stockframe=stockframe)
+    indicator_client.rsi()
+
+    end_date = datetime(2022, 8, 8, 10, 30)
+    order_count = 0
+
+    for _ in range(60):
+        end_date = end_date + timedelta(minutes=1)
+        latest_prices = futubot.get_latest_bar(
+            start_date='2022-08-08 9:30:00',
+            end_date=end_date.strftime('%Y-%m-%d %H:%M:%S'),
+            demo=True)
+        stockframe.add_rows(data=latest_prices)
+        indicator_client.refresh()
+
+        existing_orders = accounts.check_existing_orders(
+            code_list=portfolio.holdings)
+        strategy_client = RSIStrategy(stockframe, portfolio, indicator_client,
+                                      existing_orders)
+        buy_sell_signals = strategy_client.calculate_buy_sell_signals()
+
+        order_infos = futubot.execute_signals(
+            buy_sell_signals=buy_sell_signals)
+        portfolio.update_positions(order_infos=order_infos)
+        order_count += len(order_infos)
+
+    assert len(stockframe.frame.loc['HK.00700']) == 121
+    assert order_count > 0
+    assert portfolio.holdings == {
+        code: accounts.trade_context._get_qty(code)
+        for code in CODE_LIST
+    }
@@ -1,8 +1,11 @@
-from futu import SecurityFirm, TrdMarket
+import pandas as pd
+from futu import KLType, SecurityFirm, TrdMarket
 
 from futubot.accounts import Accounts
+from futubot.fake_opend import generate_synthetic_klines, resample_klines
 from futubot.indicators import Indicators
 from futubot.robot import Robot
+from futubot.stockframe import StockFrame
 
 
 def test_change_in_price():
@@ -222,3 +225,36 @@ def test_standard_deviation():
 
     accounts.close_quote_context()
     accounts.close_trade_context()
+
+
+def test_timeframe():
+    klines = generate_synthetic_klines(code_list=['HK.00700', 'HK.09988'])
+    history = klines[klines['time_key'] <= '2022-08-08 14:00:00']
+    stockframe = StockFrame(data=history.to_dict('records'))
+    indicator_client = Indicators(stockframe=stockframe)
+    indicator_client.sma(period=5)
+    indicator_client.timeframe(KLType.K_5M).rsi(period=14)
+    indicator_client.timeframe(KLType.K_5M).sma(period=5)
+    assert indicator_client.timeframe(None) is indicator_client
+    assert list(indicator_client.timeframes) == [KLType.K_5M]
+
+    bars = klines[klines['time_key'].between('2022-08-08 14:01:00',
+                                             '2022-08-08 14:07:00')]
+    for _, bar in bars.groupby('time_key'):
+        stockframe.add_rows(data=bar.to_dict('records'))
+        indicator_client.refresh()
+
+    history = klines[klines['time_key'] <= '2022-08-08 14:07:00']
+    expected = StockFrame(
+        data=resample_klines(history, KLType.K_5M).to_dict('records'))
+    expected_indicators = Indicators(stockframe=expected)
+    expected_indicators.rsi(period=14)
+    expected_indicators.sma(period=5)
+
+    columns = ['close', 'rsi_14', 'sma_5']
+    pd.testing.assert_frame_equal(
+        stockframe.get_frame(KLType.K_5M)[columns], expected.frame[columns])
+    # The indicators of the 1-minute bars are not mixed up with them.
+    assert 'rsi_14' not in stockframe.frame.columns
+    n_bars = len(history) // 2
+    assert stockframe.frame['sma_5'].notna().sum() == 2 * (n_bars - 4)
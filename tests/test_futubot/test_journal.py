@@ -0,0 +1,134 @@
+import numpy as np
+import pandas as pd
+import pytest
+from futu import OrderStatus
+
+from futubot.accounts import Accounts
+from futubot.fake_opend import (FakeQuoteContext, FakeTradeContext,
+                                generate_synthetic_klines)
+from futubot.journal import FILL, JOURNAL_DTYPE, ORDER, TradeJournal
+from futubot.portfolio import Portfolio
+
+
+def test_trade_journal(tmp_path):
+    path = str(tmp_path / 'trade_journal.bin')
+    journal = TradeJournal(path=path)
+    journal.record_order(
+        dict(order_id='1',
+             code='HK.00700',
+             trd_side='BUY',
+             qty=200.0,
+             price=300.0,
+             order_status=OrderStatus.SUBMITTED,
+             create_time='2022-08-08 10:00:00'))
+    journal.record_fill(code='HK.00700',
+                        qty=200.0,
+                        price=300.0,
+                        order_id='1',
+                        time='2022-08-08 10:00:00')
+    journal.record_fill(code='HK.00700',
+                        qty=-100.0,
+                        price=310.0,
+                        time='2022-08-08 11:00:00')
+    journal.record_fill(code='HK.09988',
+                        qty=-100.0,
+                        price=80.0,
+                        time='2022-08-09 10:00:00')
+    assert len(journal) == 4
+    assert len(journal.records(kind=ORDER)) == 1
+    assert len(journal.records(since='2022-08-09')) == 1
+
+    aggregates = journal.aggregate()
+    assert aggregates.loc['HK.00700'].to_dict() == {
+        'buy_qty': 200.0,
+        'sell_qty': 100.0,
+        'net_qty': 100.0,
+        'turnover': 91000.0,
+        'average_cost': 300.0,
+        'realized_pnl': 1000.0
+    }
+    assert aggregates.loc['HK.09988', 'average_cost'] == 80.0
+    assert aggregates.loc['HK.09988', 'realized_pnl'] == 0.0
+
+    frame = journal.to_frame(kind=ORDER)
+    assert frame.loc[0, 'time'] == '2022-08-08 10:00:00'
+    assert frame.loc[0, 'kind'] == 'ORDER'
+    assert frame.loc[0, 'order_status'] == OrderStatus.SUBMITTED
+
+    # The journal is reloaded from the file, without the partial record
+    # of an interrupted append.
+    with open(path, 'ab') as f:
+        f.write(b'\x00' * (JOURNAL_DTYPE.itemsize // 2))
+    reloaded = TradeJournal(path=path)
+    np.testing.assert_array_equal(reloaded.records(), journal.records())
+    reloaded.record_fill(code='HK.09988', qty=100.0, price=70.0)
+    assert len(TradeJournal(path=path).records(kind=FILL)) == 4
+    assert TradeJournal(path=path).aggregate().loc['HK.09988',
+                                                   'realized_pnl'] == 1000.0
+
+    with pytest.raises(TypeError):
+        journal.record_fill(code='HK.00700', qty='100', price=300.0)
+    with pytest.raises(ValueError):
+        journal.records()['qty'][0] = 0.0
+
+
+def test_portfolio_journal():
+    klines = generate_synthetic_klines(code_list=['HK.00700'])
+    accounts = Accounts(paper_trading=True,
+                        quote_context=FakeQuoteContext(klines=klines,
+                                                       rate_limits=None),
+                        trade_context=FakeTradeContext(rate_limits=None))
+    portfolio = Portfolio(accounts=accounts)
+    portfolio.add_position(code='HK.00700', stock_name='TENCENT', quantity=0)
+
+    # No fill is journaled for an order not filled yet.
+    portfolio.update_positions(
+        order_infos={
+            'HK.00700':
+            dict(order_id='1',
+                 code='HK.00700',
+                 qty=100.0,
+                 price=300.0,
+                 trd_side='BUY',
+                 order_status=OrderStatus.SUBMITTED,
+                 dealt_qty=0.0,
+                 dealt_avg_price=0.0)
+        })
+    assert portfolio.journal.to_frame()['kind'].to_list() == ['ORDER']
+
+    # The fills are journaled as the order query shows the order filling.
+    for order_status, dealt_qty, dealt_avg_price in [
+        (OrderStatus.FILLED_PART, 40.0, 300.0),
+        (OrderStatus.FILLED_ALL, 100.0, 303.0),
+        (OrderStatus.FILLED_ALL, 100.0, 303.0),
+    ]:
+        portfolio.update_order_fills(
+            pd.DataFrame([
+                dict(order_id='1',
+                     code='HK.00700',
+                     order_status=order_status,
+                     dealt_qty=dealt_qty,
+                     dealt_avg_price=dealt_avg_price,
+                     updated_time='2022-08-08 10:00:00')
+            ]))
+    fills = portfolio.journal.to_frame(kind=FILL)
+    assert fills['qty'].to_list() == [40.0, 60.0]
+    assert fills['price'].to_list() == [300.0, 305.0]
+
+    portfolio.update_positions(
+        order_infos={
+            'HK.00700':
+            dict(order_id='2',
+                 code='HK.00700',
+                 qty=100.0,
+                 price=320.0,
+                 trd_side='SELL',
+                 order_status=OrderStatus.FILLED_ALL,
+                 dealt_qty=100.0,
+                 dealt_avg_price=320.0)
+        })
+    assert portfolio.journal.to_frame()['kind'].to_list() == [
+        'ORDER', 'FILL', 'FILL', 'ORDER', 'FILL'
+    ]
+    assert portfolio.journal.aggregate().loc['HK.00700',
+                                             'realized_pnl'] == 1700.0
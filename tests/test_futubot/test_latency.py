@@ -0,0 +1,54 @@
+import json
+import math
+
+import numpy as np
+import pytest
+
+from futubot.latency import LatencyHistogram, LatencyRecorder
+
+
+def test_latency_histogram():
+    histogram = LatencyHistogram()
+    assert math.isnan(histogram.percentile(50))
+
+    latencies = np.random.default_rng(0).lognormal(mean=-6,
+                                                   sigma=1,
+                                                   size=10000)
+    for latency in latencies:
+        histogram.record(latency)
+
+    summary = histogram.summary()
+    assert summary['count'] == 10000
+    assert summary['mean'] == pytest.approx(latencies.mean())
+    assert summary['max'] == latencies.max()
+    # The percentiles are within the growth of the buckets.
+    for q, key in [(50, 'p50'), (99, 'p99')]:
+        assert summary[key] == pytest.approx(np.percentile(latencies, q),
+                                             rel=0.05)
+
+    # Latencies out of range are counted in the first or last bucket.
+    histogram.record(0.0)
+    histogram.record(1e6)
+    assert histogram.counts[0] >= 1 and histogram.counts[-1] == 1
+
+
+def test_latency_recorder(tmp_path):
+    path = tmp_path / 'latency.jsonl'
+    recorder = LatencyRecorder(path=str(path), interval=3600.0)
+
+    with recorder.time('signal_calc'):
+        pass
+    recorder.record('bar_fetch', 0.25)
+    recorder.record('bar_fetch', 0.5)
+
+    stats = recorder.stats()
+    assert set(stats) == {'signal_calc', 'bar_fetch'}
+    assert stats['bar_fetch']['count'] == 2
+    assert stats['bar_fetch']['max'] == 0.5
+
+    # Nothing is written before interval seconds have passed.
+    assert recorder.report() is False
+    assert recorder.report(force=True) is True
+    records = [json.loads(line) for line in path.read_text().splitlines()]
+    assert len(records) == 1
+    assert records[0]['stats']['bar_fetch']['count'] == 2
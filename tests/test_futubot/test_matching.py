@@ -0,0 +1,114 @@
+import pandas as pd
+import pytest
+from futu import OrderStatus, OrderType, TrdSide
+
+from futubot.fake_opend import generate_synthetic_klines
+from futubot.matching import MatchingEngine
+
+
+def _create_candles():
+    candles = pd.DataFrame({
+        'time_key': [
+            '2022-08-08 15:58:00', '2022-08-08 15:59:00',
+            '2022-08-08 16:00:00', '2022-08-09 09:30:00'
+        ],
+        'code': ['HK.00700'] * 4,
+        'open': [100.0, 101.0, 99.0, 98.0],
+        'high': [101.0, 102.0, 100.0, 99.0],
+        'low': [99.5, 100.5, 98.0, 97.0],
+        'volume': [20000, 5000, 3000, 10000],
+    })
+
+    return candles
+
+
+def _create_order_info(trd_side=TrdSide.BUY,
+                       order_type=OrderType.NORMAL,
+                       price=100.0,
+                       qty=1000.0,
+                       order_id='1'):
+    order_info = {
+        'trd_side': trd_side,
+        'order_type': order_type,
+        'order_status': OrderStatus.SUBMITTED,
+        'order_id': order_id,
+        'code': 'HK.00700',
+        'stock_name': 'TENCENT',
+        'qty': qty,
+        'price': price,
+        'create_time': '2022-08-08 15:58:00',
+        'updated_time': '2022-08-08 15:58:00',
+    }
+
+    return order_info
+
+
+def test_match_limit_order():
+    engine = MatchingEngine(candles=_create_candles(),
+                            lot_sizes={'HK.00700': 100})
+
+    order_events, deal_events = engine.match([_create_order_info()])
+
+    # The bar of 15:59 does not touch the limit price, and the bar of
+    # 16:00 fills up to 10% of its volume at the open price.
+    assert len(deal_events) == 1
+    assert deal_events[0]['qty'] == 300.0
+    assert deal_events[0]['price'] == 99.0
+    assert deal_events[0]['create_time'] == '2022-08-08 16:00:00'
+
+    # The unfilled quantity of the day order is cancelled.
+    assert [event['order_status'] for event in order_events
+            ] == [OrderStatus.FILLED_PART, OrderStatus.CANCELLED_PART]
+    assert order_events[-1]['dealt_qty'] == 300.0
+    assert order_events[-1]['dealt_avg_price'] == 99.0
+    assert set(_create_order_info()) < set(order_events[-1])
+
+    # The volume of the bar has been used up.
+    _, deal_events = engine.match([_create_order_info(order_id='2')])
+    assert deal_events == []
+
+
+def test_match_market_order():
+    engine = MatchingEngine(candles=_create_candles(), slippage=0.01)
+
+    order_info = _create_order_info(trd_side=TrdSide.SELL,
+                                    order_type=OrderType.MARKET,
+                                    qty=600.0)
+    order_events, deal_events = engine.match([order_info])
+
+    assert [deal['qty'] for deal in deal_events] == [500.0, 100.0]
+    assert [deal['price'] for deal in deal_events
+            ] == pytest.approx([101.0 * 0.99, 99.0 * 0.99])
+    assert order_events[-1]['order_status'] == OrderStatus.FILLED_ALL
+    assert order_events[-1]['dealt_avg_price'] == pytest.approx(
+        (500 * 101.0 + 100 * 99.0) * 0.99 / 600)
+
+    # A limit sell is never filled below its price.
+    order_info = _create_order_info(trd_side=TrdSide.SELL, price=101.5)
+    engine = MatchingEngine(candles=_create_candles(), slippage=0.01)
+    _, deal_events = engine.match([order_info])
+    assert deal_events[0]['price'] == 101.5
+
+
+def test_match_many_bars():
+    code_list = [f'HK.{i:05d}' for i in range(100)]
+    klines = generate_synthetic_klines(code_list=code_list, days=5)
+    engine = MatchingEngine(candles=klines)
+
+    order_infos = []
+    for i, code in enumerate(code_list):
+        order_info = _create_order_info(order_type=OrderType.MARKET,
+                                        qty=100.0,
+                                        order_id=str(i))
+        order_info.update(code=code, create_time='2022-08-10 10:00:00')
+        order_infos.append(order_info)
+
+    order_events, deal_events = engine.match(order_infos)
+    assert len(deal_events) == 100
+    assert all(deal['create_time'] == '2022-08-10 10:01:00'
+               for deal in deal_events)
+    assert all(event['order_status'] == OrderStatus.FILLED_ALL
+               for event in order_events)
+
+    with pytest.raises(ValueError):
+        MatchingEngine(candles=klines.drop(columns='volume'))
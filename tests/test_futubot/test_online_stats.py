@@ -0,0 +1,109 @@
+import numpy as np
+import pandas as pd
+
+from futubot.accounts import Accounts
+from futubot.fake_opend import (FakeQuoteContext, FakeTradeContext,
+                                generate_synthetic_klines)
+from futubot.online_stats import OnlineCovariance
+from futubot.portfolio import Portfolio
+from futubot.stockframe import StockFrame
+
+CODE_LIST = ['HK.00700', 'HK.09988', 'HK.00001']
+
+
+def _create_returns(days=200, seed=0):
+    rng = np.random.default_rng(seed)
+    returns = pd.DataFrame(rng.normal(0.001, 0.02, size=(days, 3)),
+                           columns=CODE_LIST)
+    # Missing returns are skipped pairwise.
+    returns[rng.random(returns.shape) < 0.1] = np.nan
+
+    return returns
+
+
+def _assert_stats_equal(stats, returns):
+    np.testing.assert_allclose(stats.covariance(),
+                               returns.cov().sort_index().sort_index(axis=1),
+                               rtol=1e-10)
+    np.testing.assert_allclose(stats.means(),
+                               returns.mean().sort_index(),
+                               rtol=1e-10)
+    np.testing.assert_allclose(stats.variances(),
+                               returns.var().sort_index(),
+                               rtol=1e-10)
+
+
+def test_online_covariance():
+    returns = _create_returns()
+
+    stats = OnlineCovariance()
+    for _, row in returns.iterrows():
+        stats.update(row.to_dict())
+    _assert_stats_equal(stats, returns)
+
+    # Batches and single observations can be mixed in any order.
+    stats = OnlineCovariance(codes=['HK.00700'])
+    stats.update_batch(returns.iloc[:50])
+    stats.update_batch(returns.iloc[50:120])
+    for _, row in returns.iloc[120:].iterrows():
+        stats.update(row.to_dict())
+    _assert_stats_equal(stats, returns)
+
+    # A code with a single observation has no variance.
+    stats.update({'HK.00005': 0.01})
+    assert np.isnan(stats.variances()['HK.00005'])
+    assert stats.means()['HK.00005'] == 0.01
+
+
+def test_portfolio_update_daily_prices():
+    klines = generate_synthetic_klines(code_list=CODE_LIST)
+    positions = {code: dict(qty=100.0, cost_price=100.0) for code in CODE_LIST}
+    accounts = Accounts(paper_trading=True,
+                        quote_context=FakeQuoteContext(klines=klines,
+                                                       rate_limits=None),
+                        trade_context=FakeTradeContext(positions=positions,
+                                                       rate_limits=None))
+    portfolio = Portfolio(accounts=accounts)
+    for code in CODE_LIST:
+        portfolio.add_position(code=code, stock_name=code, quantity=100.0)
+
+    rng = np.random.default_rng(0)
+    time_keys = pd.bdate_range(end='2022-08-08', periods=100)
+    close = pd.DataFrame(
+        100 * np.exp(np.cumsum(rng.normal(scale=0.02, size=(100, 3)), axis=0)),
+        index=time_keys.strftime('%Y-%m-%d 00:00:00'),
+        columns=CODE_LIST)
+    daily_prices = [
+        dict(code=code, time_key=time_key, close=close.loc[time_key, code])
+        for time_key in close.index for code in CODE_LIST
+    ]
+
+    portfolio._stockframe_daily = StockFrame(data=[
+        dict(price, open=0, high=0, low=0, volume=0)
+        for price in daily_prices[:3 * 80]
+    ])
+    portfolio_metrics = portfolio.calculate_portfolio_metrics()
+    returns = np.log(close.iloc[:80]).diff()
+    np.testing.assert_allclose(
+        portfolio_metrics['HK.00700']['average_returns'],
+        returns['HK.00700'].mean())
+
+    # The new daily bars are added online, and the old ones are ignored.
+    portfolio.update_daily_prices(daily_prices=daily_prices)
+    portfolio_metrics = portfolio.calculate_portfolio_metrics()
+
+    returns = np.log(close).diff()
+    for code in CODE_LIST:
+        np.testing.assert_allclose(
+            portfolio_metrics[code]['variance_of_returns'],
+            returns[code].var())
+        np.testing.assert_allclose(
+            portfolio_metrics[code]['covariance_of_returns']['HK.00700'][code],
+            returns.cov().loc[code, 'HK.00700'])
+
+    weights = pd.Series(
+        {code: portfolio_metrics[code]['weight']
+         for code in CODE_LIST}).sort_index()
+    np.testing.assert_allclose(
+        portfolio_metrics['portfolio']['variance'],
+        weights @ returns.cov().sort_index().sort_index(axis=1) @ weights)
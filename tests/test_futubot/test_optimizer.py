@@ -0,0 +1,188 @@
+import numpy as np
+import pytest
+
+from futubot.accounts import Accounts
+from futubot.daily_bars import DailyBarStore
+from futubot.fake_opend import (FakeQuoteContext, FakeTradeContext,
+                                generate_synthetic_klines)
+from futubot.optimizer import (efficient_frontier, max_sharpe_weights,
+                               min_variance_weights, risk_parity_weights,
+                               weights_to_lots)
+from futubot.robot import Robot
+
+CODE_LIST = ['HK.00700', 'HK.09988', 'HK.00001']
+
+
+def _random_returns(n_codes, n_days=250, seed=0):
+    rng = np.random.default_rng(seed)
+    loadings = rng.standard_normal((n_codes, n_codes)) * 0.01
+    returns = rng.standard_normal((n_days, n_codes)) @ loadings
+
+    return returns + rng.standard_normal(n_codes) * 0.001
+
+
+def _max_sharpe_ratio(mean, covariance):
+    # The Sharpe ratios of random long-only weights.
+    rng = np.random.default_rng(1)
+    weights = rng.dirichlet(np.full(len(mean), 0.3), size=100000)
+    volatilities = np.sqrt(
+        np.einsum('ij,jk,ik->i', weights, covariance, weights))
+
+    return (weights @ mean / volatilities).max()
+
+
+def test_min_variance_weights():
+    returns = _random_returns(n_codes=10)
+    covariance = np.cov(returns.T)
+
+    weights = min_variance_weights(covariance, long_only=False)
+    expected = np.linalg.solve(covariance, np.ones(10))
+    np.testing.assert_allclose(weights, expected / expected.sum())
+
+    long_only_weights = min_variance_weights(covariance)
+    assert np.all(long_only_weights >= 0)
+    assert long_only_weights.sum() == pytest.approx(1.0)
+    assert long_only_weights @ covariance @ long_only_weights >= \
+        weights @ covariance @ weights
+
+    # The gradient is the same for all the codes held, and not lower for
+    # the others.
+    gradient = covariance @ long_only_weights
+    held = long_only_weights > 0
+    np.testing.assert_allclose(gradient[held], gradient[held].mean())
+    assert np.all(gradient[~held] >= gradient[held].mean() - 1e-12)
+
+
+def test_efficient_frontier():
+    returns = _random_returns(n_codes=10)
+    mean = returns.mean(axis=0)
+    covariance = np.cov(returns.T)
+
+    for long_only in [True, False]:
+        frontier = efficient_frontier(mean,
+                                      covariance,
+                                      n_points=20,
+                                      long_only=long_only)
+        assert frontier['weights'].shape == (20, 10)
+        np.testing.assert_allclose(frontier['weights'].sum(axis=1), 1.0)
+        np.testing.assert_allclose(frontier['weights'][0],
+                                   min_variance_weights(covariance,
+                                                        long_only=long_only),
+                                   atol=1e-10)
+        # The returns and volatilities increase along the frontier.
+        assert np.all(np.diff(frontier['returns']) >= -1e-12)
+        assert np.all(np.diff(frontier['volatilities']) >= -1e-12)
+
+    # Only the unconstrained frontier sells short.
+    assert np.any(frontier['weights'] < 0)
+    with pytest.raises(AssertionError):
+        efficient_frontier(mean, covariance, n_points=1)
+
+
+def test_max_sharpe_weights():
+    returns = _random_returns(n_codes=5)
+    mean = returns.mean(axis=0) + 0.002
+    covariance = np.cov(returns.T)
+
+    weights = max_sharpe_weights(mean, covariance, long_only=False)
+    expected = np.linalg.solve(covariance, mean)
+    np.testing.assert_allclose(weights, expected / expected.sum())
+
+    weights = max_sharpe_weights(mean, covariance)
+    assert np.all(weights >= 0)
+    assert weights.sum() == pytest.approx(1.0)
+    sharpe_ratio = weights @ mean / np.sqrt(weights @ covariance @ weights)
+    assert sharpe_ratio >= _max_sharpe_ratio(mean, covariance)
+
+    # Without any positive excess return, the frontier is searched.
+    weights = max_sharpe_weights(mean, covariance, risk_free_rate=1.0)
+    assert np.all(weights >= 0)
+    assert weights.sum() == pytest.approx(1.0)
+
+
+def test_risk_parity_weights():
+    covariance = np.cov(_random_returns(n_codes=10).T)
+
+    weights = risk_parity_weights(covariance)
+    risk_contributions = weights * (covariance @ weights)
+    np.testing.assert_allclose(risk_contributions,
+                               risk_contributions.mean(),
+                               rtol=1e-8)
+
+    budgets = np.arange(1, 11)
+    weights = risk_parity_weights(covariance, budgets=budgets)
+    risk_contributions = weights * (covariance @ weights)
+    np.testing.assert_allclose(risk_contributions / risk_contributions.sum(),
+                               budgets / budgets.sum(),
+                               rtol=1e-8)
+
+
+def test_weights_to_lots():
+    quantities = weights_to_lots(weights=[0.5, 0.3, 0.2],
+                                 total_value=10000.0,
+                                 prices=[10.0, 30.0, 7.0],
+                                 lot_sizes=[100, 10, 100])
+    # 5 lots, 10 lots and 2.86 lots are first rounded down to 5, 10 and
+    # 2 lots, and the 600 left buys no third lot of 700.
+    np.testing.assert_allclose(quantities, [500.0, 100.0, 200.0])
+
+    quantities = weights_to_lots(weights=[0.5, 0.5],
+                                 total_value=10000.0,
+                                 prices=[30.0, 70.0],
+                                 lot_sizes=[100, 10])
+    # 1.67 and 7.14 lots are rounded down to 1 and 7 lots, and the 2100
+    # left is too little for the lot with the largest shortfall, so it
+    # buys a lot of the other code.
+    np.testing.assert_allclose(quantities, [100.0, 80.0])
+
+    with pytest.raises(AssertionError):
+        weights_to_lots(weights=[-0.5, 1.5],
+                        total_value=10000.0,
+                        prices=[30.0, 70.0],
+                        lot_sizes=[100, 10])
+
+
+def test_portfolio_optimize_weights():
+    klines = generate_synthetic_klines(code_list=CODE_LIST, days=30)
+    positions = {'HK.00700': dict(qty=100.0, cost_price=300.0)}
+    accounts = Accounts(paper_trading=True,
+                        quote_context=FakeQuoteContext(klines=klines,
+                                                       rate_limits=None),
+                        trade_context=FakeTradeContext(cash=1000000.0,
+                                                       positions=positions,
+                                                       rate_limits=None))
+    daily_bar_store = DailyBarStore()
+    daily_bar_store.fetch(accounts, CODE_LIST, end_date='2022-09-16')
+
+    robot = Robot(accounts=accounts, sizing='risk_parity')
+    portfolio = robot.create_portfolio(stocks_of_interest=CODE_LIST,
+                                       daily_bar_store=daily_bar_store)
+
+    for method in ['min_variance', 'max_sharpe', 'risk_parity']:
+        weights = portfolio.optimize_weights(method=method)
+        assert set(weights) == set(CODE_LIST)
+        assert sum(weights.values()) == pytest.approx(1.0)
+        assert min(weights.values()) >= 0
+    with pytest.raises(AssertionError):
+        portfolio.optimize_weights(method='equal')
+
+    lot_sizes = accounts.get_lot_size(code_list=CODE_LIST)
+    last_closes = klines.groupby('code')['close'].last().to_dict()
+    quantities = portfolio.target_quantities(lot_sizes=lot_sizes,
+                                             method='risk_parity',
+                                             prices=last_closes)
+    for code in CODE_LIST:
+        assert quantities[code] > 0
+        assert quantities[code] % lot_sizes[code] == 0
+
+    # A buy signal tops the holding up to its target quantity.
+    buy_sell_signals = {
+        'buys': {code: {
+            'close': last_closes[code]
+        }
+                 for code in CODE_LIST},
+        'sells': {}
+    }
+    order_infos = robot.execute_signals(buy_sell_signals=buy_sell_signals)
+    assert order_infos['HK.00700']['qty'] == quantities['HK.00700'] - 100.0
+    assert order_infos['HK.09988']['qty'] == quantities['HK.09988']
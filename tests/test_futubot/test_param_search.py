@@ -0,0 +1,100 @@
+import numpy as np
+import pytest
+
+from futubot.param_search import (ParameterSearch, grid_parameters,
+                                  sample_parameters)
+from futubot.vectorized import (IndicatorCache, VectorizedBacktester,
+                                macd_signals, pivot_prices)
+from Strategy import MACDCrossOverStrategy, RSIStrategy
+
+
+def test_grid_and_sample_parameters():
+    param_grid = dict(period=[7, 14, 21], oversold_signal=[20, 30])
+
+    combinations = grid_parameters(param_grid)
+    assert len(combinations) == 6
+    assert combinations[1] == dict(period=7, oversold_signal=30)
+
+    samples = sample_parameters(param_grid, n_iter=4, seed=1)
+    assert len(samples) == 4
+    assert all(sample in combinations for sample in samples)
+    assert len({tuple(sample.values()) for sample in samples}) == 4
+    assert sample_parameters(param_grid, n_iter=4, seed=1) == samples
+
+    assert len(sample_parameters(param_grid, n_iter=100)) == 6
+
+    with pytest.raises(TypeError):
+        grid_parameters([7, 14])
+
+
+def test_indicator_cache(create_stockframe):
+    close = pivot_prices(create_stockframe())
+    cache = IndicatorCache(close, max_size=8)
+
+    buys, sells = macd_signals(close, signal_length=9, cache=cache)
+    expected_buys, expected_sells = macd_signals(close, signal_length=9)
+    np.testing.assert_array_equal(buys, expected_buys)
+    np.testing.assert_array_equal(sells, expected_sells)
+
+    # The EMAs and the MACD line are shared by every signal length.
+    misses = cache.misses
+    macd_signals(close, signal_length=5, cache=cache)
+    assert cache.misses == misses + 1
+    assert cache.hits > 0
+
+    for period in range(10, 20):
+        cache.sma(period=period)
+    assert len(cache._cache) == 8
+
+
+@pytest.mark.parametrize('processes', [1, 2])
+def test_parameter_search(processes, create_stockframe):
+    stockframe = create_stockframe()
+    # Some combinations have an oversold level above the overbought level.
+    param_grid = dict(period=[7, 14],
+                      oversold_signal=[30, 55],
+                      overbought_signal=[50, 70])
+
+    results = ParameterSearch(stockframe=stockframe,
+                              strategy=RSIStrategy,
+                              param_grid=param_grid,
+                              cash=100000.0,
+                              start_date='2022-08-08 10:00:00',
+                              processes=processes).run()
+
+    assert len(results) == 8
+    assert results['total_return'].is_monotonic_decreasing
+
+    # Every row matches a single run of the vectorized backtester.
+    for row in results.itertuples():
+        expected = VectorizedBacktester(
+            stockframe=stockframe,
+            strategy=RSIStrategy,
+            strategy_params=dict(period=row.period,
+                                 oversold_signal=row.oversold_signal,
+                                 overbought_signal=row.overbought_signal),
+            cash=100000.0,
+            start_date='2022-08-08 10:00:00').run()
+        assert row.final_equity == pytest.approx(expected['final_equity'])
+        assert row.number_of_trades == len(expected['orders'])
+        assert row.max_drawdown <= 0
+
+
+def test_random_parameter_search(create_stockframe):
+    results = ParameterSearch(stockframe=create_stockframe(),
+                              strategy='MACDCrossOverStrategy',
+                              param_grid=dict(fast_length=[6, 12],
+                                              slow_length=[26, 30],
+                                              signal_length=[5, 9, 12]),
+                              n_iter=5,
+                              metric='max_drawdown',
+                              processes=2).run()
+
+    assert len(results) == 5
+    assert results['max_drawdown'].is_monotonic_decreasing
+
+    with pytest.raises(ValueError):
+        ParameterSearch(stockframe=create_stockframe(),
+                        strategy=MACDCrossOverStrategy,
+                        param_grid=dict(fast_length=[6, 12]),
+                        metric='sharpe_ratio')
@@ -0,0 +1,103 @@
+import math
+import signal
+from datetime import datetime
+
+import pytest
+
+from futubot.accounts import Accounts
+from futubot.checkpoint import Checkpointer
+from futubot.clock import SimulatedClock
+from futubot.fake_opend import (FakeQuoteContext, FakeTradeContext,
+                                generate_synthetic_klines)
+from futubot.indicators import Indicators
+from futubot.pipeline import TradingPipeline
+from futubot.robot import Robot
+from futubot.stockframe import StockFrame
+from Strategy import RSIStrategy
+
+CODE_LIST = ['HK.00700', 'HK.09988']
+
+
+def _create_pipeline(strategy=RSIStrategy, checkpointer=None):
+    klines = generate_synthetic_klines(code_list=CODE_LIST)
+    clock = SimulatedClock(start=datetime(2022, 8, 8, 15, 30, 20))
+    trade_context = FakeTradeContext(cash=1000000.0,
+                                     now=clock.now,
+                                     rate_limits=None)
+    accounts = Accounts(paper_trading=True,
+                        quote_context=FakeQuoteContext(klines=klines,
+                                                       rate_limits=None),
+                        trade_context=trade_context,
+                        order_interval=0.0)
+
+    sigint_handler = signal.getsignal(signal.SIGINT)
+    robot = Robot(accounts=accounts, clock=clock)
+    signal.signal(signal.SIGINT, sigint_handler)
+    robot.create_portfolio(stocks_of_interest=CODE_LIST)
+
+    history = klines[klines['time_key'] < '2022-08-08 15:30:00']
+    stockframe = StockFrame(data=history.to_dict('records'))
+    indicator_client = Indicators(stockframe=stockframe)
+    indicator_client.rsi(period=14)
+
+    return TradingPipeline(robot=robot,
+                           stockframe=stockframe,
+                           indicator_client=indicator_client,
+                           strategy=strategy,
+                           checkpointer=checkpointer)
+
+
+def test_trading_pipeline():
+    pipeline = _create_pipeline()
+    assert pipeline.run() == 30
+    assert pipeline.robot.clock.now() >= datetime(2022, 8, 8, 16, 0)
+
+    time_keys = pipeline.stockframe.frame.index.get_level_values('time_key')
+    assert str(time_keys.max()) == '2022-08-08 15:59:00'
+
+    stats = pipeline.robot.latency.stats()
+    for stage in [
+            'wake_latency', 'bar_fetch', 'existing_order_check',
+            'stockframe_append', 'indicator_refresh', 'signal_calc',
+            'position_update', 'bar_to_orders'
+    ]:
+        assert stats[stage]['count'] >= 29
+
+    # The codes dispatched after the pending orders were fetched are
+    # treated as having existing orders.
+    pipeline._dispatched = {'HK.00700': 10.0, 'HK.09988': math.inf}
+    existing_orders = pipeline._add_dispatching_orders(
+        {
+            'HK.00700': False,
+            'HK.09988': False
+        }, fetched_at=20.0)
+    assert existing_orders == {'HK.00700': False, 'HK.09988': True}
+    existing_orders = pipeline._add_dispatching_orders(
+        {
+            'HK.00700': False,
+            'HK.09988': False
+        }, fetched_at=5.0)
+    assert existing_orders == {'HK.00700': True, 'HK.09988': True}
+
+
+def test_trading_pipeline_error():
+    class FailingStrategy(RSIStrategy):
+        def calculate_buy_sell_signals(self):
+            raise ValueError('Failed to calculate signals')
+
+    pipeline = _create_pipeline(strategy=FailingStrategy)
+    with pytest.raises(ValueError, match='Failed to calculate signals'):
+        pipeline.run()
+
+
+def test_trading_pipeline_checkpoint(tmp_path):
+    checkpointer = Checkpointer(path=str(tmp_path / 'checkpoint.pkl'),
+                                interval=0.0)
+    pipeline = _create_pipeline(checkpointer=checkpointer)
+    assert pipeline.run() == 30
+    assert pipeline.robot.latency.stats()['checkpoint']['count'] == 30
+
+    state = checkpointer.load()
+    time_keys = state['frame'].index.get_level_values('time_key')
+    assert str(time_keys.max()) == '2022-08-08 15:59:00'
+    assert list(state['indicators']) == ['rsi_14']
@@ -0,0 +1,110 @@
+import pytest
+
+from futubot.accounts import Accounts
+from futubot.fake_opend import (FakeQuoteContext, FakeTradeContext,
+                                generate_synthetic_klines)
+from futubot.pnl import PnLTracker
+from futubot.portfolio import Portfolio
+
+
+def test_pnl_tracker():
+    pnl = PnLTracker(cash=10000.0)
+
+    pnl.record_fill(code='HK.00700', qty=100.0, price=10.0)
+    pnl.record_fill(code='HK.00700', qty=100.0, price=12.0)
+    pnl.record_fill(code='HK.00700', qty=-150.0, price=13.0)
+    pnl.mark({'HK.00700': 14.0, 'HK.09988': 80.0})
+
+    positions = pnl.positions()
+    assert positions.loc['HK.00700', 'qty'] == 50.0
+    assert positions.loc['HK.00700', 'cost_price'] == 11.0
+    assert positions.loc['HK.00700', 'realized_pnl'] == 300.0
+    assert positions.loc['HK.00700', 'unrealized_pnl'] == 150.0
+    assert positions.loc['HK.09988', 'market_value'] == 0.0
+
+    summary = pnl.summary()
+    assert summary['cash'] == 10000.0 - 2200.0 + 1950.0
+    assert summary['total_assets'] == summary['cash'] + 700.0
+    assert summary['total_pnl'] == 450.0
+
+    # Selling more than the position reverses it at the fill price.
+    pnl.record_fill(code='HK.00700', qty=-100.0, price=15.0)
+    positions = pnl.positions()
+    assert positions.loc['HK.00700', 'qty'] == -50.0
+    assert positions.loc['HK.00700', 'cost_price'] == 15.0
+    assert positions.loc['HK.00700', 'realized_pnl'] == 500.0
+
+    broker_positions = {
+        'HK.00700': dict(qty=0.0, cost_price=0.0, market_value=0.0)
+    }
+    drifts = pnl.reconcile(cash=9000.0, positions=broker_positions)
+    assert drifts['HK.00700'] == -50.0
+    assert drifts['cash'] == summary['cash'] + 1500.0 - 9000.0
+    assert pnl.summary()['total_assets'] == 9000.0
+
+    with pytest.raises(TypeError):
+        pnl.record_fill(code='HK.00700', qty=100.0, price='15.0')
+    with pytest.raises(TypeError):
+        pnl.mark([14.0])
+
+
+def test_portfolio_mark_to_market():
+    klines = generate_synthetic_klines(code_list=['HK.00700', 'HK.09988'])
+    positions = {'HK.00700': dict(qty=100.0, cost_price=300.0)}
+    trade_context = FakeTradeContext(cash=100000.0,
+                                     positions=positions,
+                                     rate_limits=None)
+    accounts = Accounts(paper_trading=True,
+                        quote_context=FakeQuoteContext(klines=klines,
+                                                       rate_limits=None),
+                        trade_context=trade_context)
+    portfolio = Portfolio(accounts=accounts)
+    portfolio.add_position(code='HK.00700',
+                           stock_name='TENCENT',
+                           quantity=100.0)
+    portfolio.add_position(code='HK.09988', stock_name='BABA', quantity=0)
+
+    summary = portfolio.mark_to_market([{'code': 'HK.00700', 'close': 310.0}])
+    assert summary['total_assets'] == 100000.0 + 31000.0
+    assert summary['unrealized_pnl'] == 1000.0
+    calls = accounts.metrics.stats()['position_list_query']['calls']
+
+    # Fills and marks are applied locally.
+    portfolio.update_positions(
+        order_infos={
+            'HK.09988': dict(qty=100.0, price=80.0, trd_side='BUY'),
+            'HK.00700': dict(qty=100.0, price=320.0, trd_side='SELL')
+        })
+    summary = portfolio.mark_to_market([{'code': 'HK.09988', 'close': 82.0}])
+    assert summary['realized_pnl'] == 2000.0
+    assert summary['unrealized_pnl'] == 200.0
+    assert summary['total_assets'] == 100000.0 + 32000.0 - 8000.0 + 8200.0
+    assert accounts.metrics.stats()['position_list_query']['calls'] == calls
+
+    # The fake broker has not received the orders.
+    drifts = portfolio.reconcile_pnl()
+    assert drifts == {
+        'cash': 24000.0,
+        'total_market_value': 8200.0 - 30000.0,
+        'HK.00700': -100.0,
+        'HK.09988': 100.0
+    }
+
+    # An order is taken by the PnL only once it is filled.
+    market_value = portfolio.mark_to_market([])['total_market_value']
+    trade_context.fill_orders = False
+    order_info = accounts.place_order(price=82.0,
+                                      qty=100.0,
+                                      code='HK.09988',
+                                      trd_side='BUY')
+    portfolio.update_positions(order_infos={'HK.09988': order_info})
+    summary = portfolio.mark_to_market([{'code': 'HK.09988', 'close': 82.0}])
+    assert summary['cash'] == 100000.0
+    assert summary['total_market_value'] == market_value
+
+    trade_context.fill_order(order_id=order_info['order_id'])
+    portfolio.update_order_fills(accounts.get_history_orders())
+    summary = portfolio.mark_to_market([{'code': 'HK.09988', 'close': 82.0}])
+    assert summary['cash'] == 100000.0 - 8200.0
+    assert summary['total_market_value'] == market_value + 8200.0
+    assert portfolio.reconcile_pnl()['cash'] == 0.0
@@ -0,0 +1,116 @@
+import numpy as np
+import pytest
+from futu import OrderStatus
+
+from futubot.accounts import Accounts
+from futubot.fake_opend import (FakeQuoteContext, FakeTradeContext,
+                                generate_synthetic_klines)
+from futubot.portfolio import Portfolio
+from futubot.position_store import PositionStore
+
+
+def test_position_store():
+    store = PositionStore(capacity=2)
+    store.add(code='HK.00700', stock_name='TENCENT', qty=100.0)
+    store.add(code='HK.09988', stock_name='BABA-SW')
+    # The arrays grow when all the slots are taken.
+    assert store.add(code='HK.00001', stock_name='CKH HOLDINGS', qty=500) == 2
+    assert store.version == 3
+
+    holdings = store.holdings
+    assert holdings == {'HK.00700': 100.0, 'HK.09988': 0.0, 'HK.00001': 500.0}
+    assert store.positions['HK.00700'] == {
+        'code': 'HK.00700',
+        'stock_name': 'TENCENT',
+        'qty': 100.0,
+        'cost_price': 0.0,
+        'market_value': 0.0,
+        'pending_qty': 0.0
+    }
+
+    store.set('HK.09988', qty=200.0, cost_price=80.0)
+    store.add_pending('HK.09988', 200.0)
+    store.mark({'HK.00700': 300.0, 'HK.09988': 80.0, 'HK.00005': 50.0})
+    np.testing.assert_array_equal(store.view('market_value'),
+                                  [30000.0, 16000.0, 0.0])
+    np.testing.assert_array_equal(store.exposures(total_value=100000.0),
+                                  [0.3, 0.16, 0.0])
+    assert holdings['HK.09988'] == 200.0
+    assert store.get('HK.09988', 'pending_qty') == 200.0
+
+    store.clear_pending(['HK.09988'])
+    assert store.get('HK.09988', 'pending_qty') == 0.0
+
+    # The views are read-only.
+    with pytest.raises(ValueError):
+        store.view('qty')[0] = 0.0
+    with pytest.raises(TypeError):
+        holdings['HK.00700'] = 0.0
+
+    # A removed code keeps its slot.
+    version = store.version
+    assert store.remove('HK.00700')
+    assert not store.remove('HK.00700')
+    assert 'HK.00700' not in holdings
+    assert list(holdings) == ['HK.09988', 'HK.00001']
+    assert store.version == version + 1
+    with pytest.raises(KeyError):
+        holdings['HK.00700']
+    assert store.add(code='HK.00700', stock_name='TENCENT') == 0
+
+    with pytest.raises(TypeError):
+        store.add(code=700, stock_name='TENCENT')
+    with pytest.raises(KeyError):
+        store.set('HK.00700', price=300.0)
+
+
+def test_portfolio_positions():
+    klines = generate_synthetic_klines(code_list=['HK.00700', 'HK.09988'])
+    accounts = Accounts(paper_trading=True,
+                        quote_context=FakeQuoteContext(klines=klines,
+                                                       rate_limits=None),
+                        trade_context=FakeTradeContext(rate_limits=None))
+    portfolio = Portfolio(accounts=accounts)
+    portfolio.add_position(code='HK.00700',
+                           stock_name='TENCENT',
+                           quantity=100.0)
+    portfolio.add_position(code='HK.09988', stock_name='BABA', quantity=0)
+    holdings = portfolio.holdings
+
+    portfolio.update_positions(
+        order_infos={
+            'HK.09988':
+            dict(qty=100.0,
+                 price=80.0,
+                 trd_side='BUY',
+                 order_status=OrderStatus.SUBMITTED),
+            'HK.00700':
+            dict(qty=100.0,
+                 price=320.0,
+                 trd_side='SELL',
+                 order_status=OrderStatus.FILLED_ALL)
+        })
+    assert holdings == {'HK.00700': 0.0, 'HK.09988': 100.0}
+    assert portfolio.positions['HK.09988']['cost_price'] == 80.0
+    assert portfolio.positions['HK.09988']['pending_qty'] == 100.0
+    assert portfolio.positions['HK.00700']['pending_qty'] == 0.0
+
+    portfolio.update_pending_orders({'HK.00700': False, 'HK.09988': False})
+    assert portfolio.positions['HK.09988']['pending_qty'] == 0.0
+
+    # Buying more of a holding averages its cost price.
+    portfolio.update_positions(
+        order_infos={
+            'HK.09988':
+            dict(qty=300.0,
+                 price=84.0,
+                 trd_side='BUY',
+                 order_status=OrderStatus.FILLED_ALL)
+        })
+    assert holdings['HK.09988'] == 400.0
+    assert portfolio.positions['HK.09988']['cost_price'] == 83.0
+
+    assert portfolio.remove_position('HK.00700')[0]
+    assert dict(portfolio.positions) == {
+        'HK.09988': portfolio.position_store.record('HK.09988')
+    }
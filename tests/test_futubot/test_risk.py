@@ -0,0 +1,132 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from futubot.accounts import Accounts
+from futubot.fake_opend import (FakeQuoteContext, FakeTradeContext,
+                                generate_synthetic_klines)
+from futubot.portfolio import Portfolio
+from futubot.risk import (calculate_risk, historical_var, monte_carlo_var,
+                          parametric_var, simulate_portfolio_returns,
+                          stress_test)
+from futubot.stockframe import StockFrame
+
+CODE_LIST = ['HK.00700', 'HK.09988', 'HK.00001']
+
+
+def test_var():
+    # The losses are 1% to 100%.
+    portfolio_returns = -np.arange(1, 101) / 100
+    var, cvar = historical_var(portfolio_returns, confidence=0.95)
+    assert var == pytest.approx(np.quantile(-portfolio_returns, 0.95))
+    assert cvar == pytest.approx(0.98)
+
+    var, cvar = parametric_var(mean=0.0, variance=1.0, confidence=0.95)
+    assert var == pytest.approx(1.644854, rel=1e-6)
+    assert cvar == pytest.approx(2.062713, rel=1e-6)
+
+    # Small log returns are close to normal simple returns.
+    mean = np.array([0.0, 0.0005])
+    covariance = np.array([[1e-4, 5e-5], [5e-5, 4e-4]])
+    weights = np.array([0.6, 0.4])
+    var, cvar = monte_carlo_var(mean,
+                                covariance,
+                                weights,
+                                n_paths=200000,
+                                batch_size=30000)
+    expected_var, expected_cvar = parametric_var(
+        mean @ weights, weights @ covariance @ weights)
+    assert var == pytest.approx(expected_var, rel=0.02)
+    assert cvar == pytest.approx(expected_cvar, rel=0.02)
+
+    # The paths do not depend on the number of processes.
+    np.testing.assert_array_equal(
+        simulate_portfolio_returns(mean,
+                                   covariance,
+                                   weights,
+                                   n_paths=1000,
+                                   batch_size=300),
+        simulate_portfolio_returns(mean,
+                                   covariance,
+                                   weights,
+                                   n_paths=1000,
+                                   batch_size=300,
+                                   processes=2))
+
+
+def test_calculate_risk():
+    rng = np.random.default_rng(0)
+    returns = pd.DataFrame(rng.normal(0.0, 0.02, size=(250, 3)),
+                           columns=CODE_LIST)
+    returns.iloc[0, 1] = np.nan
+    weights = pd.Series({'HK.00700': 0.5, 'HK.09988': 0.3, 'HK.00005': 0.2})
+
+    scenarios = {
+        'crash': {
+            'HK.00700': -0.2,
+            'HK.09988': -0.1
+        },
+        'rally': {
+            'HK.00005': 0.1
+        }
+    }
+    risk = calculate_risk(returns, weights, scenarios=scenarios)
+    assert risk['stress'] == pytest.approx({'crash': -0.13, 'rally': 0.02})
+    assert 0 < risk['historical_var'] < risk['historical_cvar']
+    assert risk['monte_carlo_var'] == pytest.approx(risk['parametric_var'],
+                                                    rel=0.05)
+
+    # The VaR over 4 days is about twice the daily VaR.
+    risk_4_days = calculate_risk(returns, weights, horizon=4)
+    assert risk_4_days['parametric_var'] == pytest.approx(
+        2 * risk['parametric_var'], rel=0.05)
+
+    with pytest.raises(TypeError):
+        stress_test(weights.to_dict(), scenarios)
+
+
+def test_portfolio_calculate_risk_metrics():
+    klines = generate_synthetic_klines(code_list=CODE_LIST)
+    positions = {code: dict(qty=100.0, cost_price=100.0) for code in CODE_LIST}
+    accounts = Accounts(paper_trading=True,
+                        quote_context=FakeQuoteContext(klines=klines,
+                                                       rate_limits=None),
+                        trade_context=FakeTradeContext(cash=70000.0,
+                                                       positions=positions,
+                                                       rate_limits=None))
+    portfolio = Portfolio(accounts=accounts)
+    for code in CODE_LIST:
+        portfolio.add_position(code=code, stock_name=code, quantity=100.0)
+
+    rng = np.random.default_rng(0)
+    close = 100 * np.exp(
+        np.cumsum(rng.normal(scale=0.02, size=(100, 3)), axis=0))
+    time_keys = pd.bdate_range(end='2022-08-08', periods=100)
+    portfolio._stockframe_daily = StockFrame(data=[
+        dict(code=code,
+             time_key=time_key.strftime('%Y-%m-%d %H:%M:%S'),
+             open=0,
+             close=close[i, j],
+             high=0,
+             low=0,
+             volume=0) for i, time_key in enumerate(time_keys)
+        for j, code in enumerate(CODE_LIST)
+    ])
+
+    risk_metrics = portfolio.calculate_risk_metrics(
+        scenarios={'crash': {
+            'HK.00700': -0.5
+        }})
+    # A tenth of the assets is held in each code at cost.
+    assert risk_metrics['stress']['crash'] == pytest.approx(-0.05)
+    assert risk_metrics['historical_var_value'] == pytest.approx(
+        risk_metrics['historical_var'] * 100000.0)
+
+    returns = np.log(pd.DataFrame(close, columns=CODE_LIST)).diff()
+    expected = calculate_risk(returns,
+                              pd.Series(0.1, index=CODE_LIST),
+                              scenarios={'crash': {
+                                  'HK.00700': -0.5
+                              }})
+    for key, value in expected.items():
+        assert risk_metrics[key] == pytest.approx(value)
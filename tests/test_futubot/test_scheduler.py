@@ -0,0 +1,63 @@
+from datetime import datetime
+
+import pytest
+from futu import KLType
+
+from futubot.clock import SimulatedClock
+from futubot.scheduler import BarScheduler, get_bar_close_offsets
+
+
+def test_get_bar_close_offsets():
+    assert len(get_bar_close_offsets(KLType.K_1M)) == 331
+
+    offsets = get_bar_close_offsets(KLType.K_30M)
+    assert [str(offset)[-8:] for offset in offsets] == [
+        '10:00:00', '10:30:00', '11:00:00', '11:30:00', '12:00:00', '13:30:00',
+        '14:00:00', '14:30:00', '15:00:00', '15:30:00', '16:00:00'
+    ]
+
+    with pytest.raises(ValueError):
+        get_bar_close_offsets(KLType.K_DAY)
+
+
+@pytest.mark.parametrize('ktype, current_time, expected', [
+    (KLType.K_1M, datetime(2022, 8, 8, 9, 0), datetime(2022, 8, 8, 9, 30)),
+    (KLType.K_1M, datetime(2022, 8, 8, 10, 0), datetime(2022, 8, 8, 10, 1)),
+    (KLType.K_1M, datetime(2022, 8, 8, 12, 0), datetime(2022, 8, 8, 13, 1)),
+    (KLType.K_5M, datetime(2022, 8, 8, 10, 2, 30), datetime(2022, 8, 8, 10,
+                                                            5)),
+    (KLType.K_60M, datetime(2022, 8, 12, 16, 0), datetime(2022, 8, 15, 10)),
+    (KLType.K_DAY, datetime(2022, 8, 8, 16, 0), datetime(2022, 8, 9, 16)),
+    (KLType.K_WEEK, datetime(2022, 8, 8, 10, 0), datetime(2022, 8, 12, 16)),
+    (KLType.K_MON, datetime(2022, 8, 31, 17, 0), datetime(2022, 9, 30, 16)),
+])
+def test_next_bar_close(ktype, current_time, expected):
+    scheduler = BarScheduler(ktype=ktype)
+    assert scheduler.next_bar_close(current_time) == expected
+
+
+def test_bar_scheduler_wait():
+    clock = SimulatedClock(start=datetime(2022, 8, 8, 10, 0, 15))
+    scheduler = BarScheduler(offset=0.2, clock=clock)
+
+    tick = scheduler.wait()
+    assert tick['bar_time'] == datetime(2022, 8, 8, 10, 1)
+    assert clock.now() == datetime(2022, 8, 8, 10, 1, 0, 200000)
+    assert tick['latency'] == 0.0
+    assert tick['overrun'] is False
+
+    # The wake-ups are aligned to the bar closes however long the loop
+    # iteration takes.
+    clock.sleep(42.5)
+    tick = scheduler.wait()
+    assert tick['bar_time'] == datetime(2022, 8, 8, 10, 2)
+    assert clock.now() == datetime(2022, 8, 8, 10, 2, 0, 200000)
+
+    # An iteration ending after the next bar close is an overrun.
+    clock.sleep(150)
+    tick = scheduler.wait()
+    assert tick['overrun'] is True
+    assert tick['bar_time'] == datetime(2022, 8, 8, 10, 4)
+    assert tick['skipped_bars'] == 1
+    assert tick['latency'] == pytest.approx(30.0)
+    assert scheduler.overruns == 1
@@ -0,0 +1,92 @@
+import os
+import pickle
+
+import pytest
+
+from futubot.accounts import Accounts
+from futubot.fake_opend import (FakeQuoteContext, FakeTradeContext,
+                                generate_synthetic_klines)
+from futubot.portfolio import Portfolio
+from futubot.snapshot import (SnapshotPublisher, SnapshotReader, read_mmap,
+                              write_atomic)
+from futubot.stockframe import StockFrame
+
+
+def test_write_atomic(tmp_path):
+    path = str(tmp_path / 'snapshot.pkl')
+
+    write_atomic(path, pickle.dumps({'version': 1}))
+    write_atomic(path, pickle.dumps({'version': 2}))
+
+    assert read_mmap(path) == {'version': 2}
+    # No temporary files are left behind.
+    assert os.listdir(str(tmp_path)) == ['snapshot.pkl']
+
+    with pytest.raises(TypeError):
+        write_atomic(path, {'version': 3})
+
+
+def test_snapshot_reader(tmp_path):
+    path = str(tmp_path / 'snapshot.pkl')
+    snapshot_reader = SnapshotReader(path=path)
+
+    with pytest.raises(OSError):
+        snapshot_reader.read()
+
+    stockframe = StockFrame(data=[{
+        'time_key': '2022-08-08 10:31:00',
+        'code': 'HK.00700',
+        'open': 312.4,
+        'close': 313.6,
+        'high': 314.4,
+        'low': 312.2,
+        'volume': 450500
+    }])
+    write_atomic(path, pickle.dumps({'version': 1, 'frame': stockframe.frame}))
+
+    state = snapshot_reader.read()
+    assert state['version'] == 1
+    assert state['frame'].equals(stockframe.frame)
+    # The snapshot is not unpickled again if the file is unchanged.
+    assert snapshot_reader.read() is state
+
+    write_atomic(path, pickle.dumps({'version': 2, 'frame': stockframe.frame}))
+    assert snapshot_reader.read()['version'] == 2
+
+
+def test_snapshot_publisher(tmp_path):
+    klines = generate_synthetic_klines(code_list=['HK.00700', 'HK.09988'])
+    positions = {'HK.00700': dict(qty=100.0, cost_price=300.0)}
+    accounts = Accounts(paper_trading=True,
+                        quote_context=FakeQuoteContext(klines=klines,
+                                                       rate_limits=None),
+                        trade_context=FakeTradeContext(cash=100000.0,
+                                                       positions=positions,
+                                                       rate_limits=None))
+    portfolio = Portfolio(accounts=accounts)
+    portfolio.add_position(code='HK.00700',
+                           stock_name='TENCENT',
+                           quantity=100.0)
+    portfolio.add_position(code='HK.09988', stock_name='BABA', quantity=0)
+    portfolio.mark_to_market([{'code': 'HK.00700', 'close': 310.0}])
+    stockframe = StockFrame(data=klines.iloc[:2].to_dict('records'))
+
+    # The portfolio info is published without querying Futu.
+    stats = accounts.metrics.stats()
+    state = SnapshotPublisher(path=str(tmp_path / 'snapshot.pkl')).publish(
+        stockframe, portfolio)
+    assert accounts.metrics.stats() == stats
+    assert state['portfolio_info'] == {
+        'total_assets': 131000.0,
+        'total_market_value': 31000.0,
+        'cash': 100000.0,
+        'total_invested_value': 130000.0,
+        'today_pnl_value': 1000.0
+    }
+    assert state['portfolio_weights'] == {
+        'cash': 1.0 - 0.237,
+        'HK.00700': 0.237,
+        'HK.09988': 0.0
+    }
+    assert SnapshotReader(path=str(tmp_path /
+                                   'snapshot.pkl')).read()['version'] == 1
@@ -1,8 +1,11 @@
 import pandas as pd
-from futu import SecurityFirm, TrdMarket
+import pytest
+from futu import KLType, SecurityFirm, TrdMarket
 
 from futubot.accounts import Accounts
+from futubot.fake_opend import generate_synthetic_klines, resample_klines
 from futubot.robot import Robot
+from futubot.stockframe import StockFrame
 
 
 def test_create_frame():
@@ -62,3 +65,39 @@ def test_add_rows():
 
     accounts.close_quote_context()
     accounts.close_trade_context()
+
+
+@pytest.mark.parametrize(
+    'ktype', [KLType.K_5M, KLType.K_15M, KLType.K_60M, KLType.K_DAY])
+def test_add_timeframe(ktype):
+    klines = generate_synthetic_klines(code_list=['HK.00700', 'HK.09988'],
+                                       days=2)
+    time_keys = klines['time_key']
+    history = klines[time_keys <= '2022-08-08 11:57:00']
+    stockframe = StockFrame(data=history.to_dict('records'))
+    stockframe.add_timeframe(ktype)
+    assert stockframe.timeframes == [ktype]
+
+    # The bars are added one by one across the lunch break and the end
+    # of the day.
+    for time_key in [
+            '2022-08-08 11:58:00', '2022-08-08 12:00:00',
+            '2022-08-08 13:01:00', '2022-08-08 13:02:00',
+            '2022-08-08 16:00:00', '2022-08-09 09:30:00', '2022-08-09 09:31:00'
+    ]:
+        bars = klines[time_keys == time_key]
+        stockframe.add_rows(data=bars.to_dict('records'))
+
+        history = pd.concat([history, bars])
+        expected = StockFrame(
+            data=resample_klines(history, ktype).to_dict('records')).frame[[
+                'open', 'close', 'high', 'low', 'volume'
+            ]]
+        pd.testing.assert_frame_equal(stockframe.get_frame(ktype),
+                                      expected,
+                                      check_dtype=False)
+
+    assert stockframe.get_frame() is stockframe.frame
+    assert stockframe.add_timeframe(KLType.K_1M) is stockframe.frame
+    with pytest.raises(AssertionError):
+        stockframe.add_timeframe(KLType.K_WEEK)
@@ -0,0 +1,117 @@
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+from futu import KLType
+
+from futubot.backtest import Backtester
+from futubot.clock import SimulatedClock
+from futubot.fake_opend import generate_synthetic_klines
+from futubot.scheduler import BarScheduler
+from futubot.stockframe import StockFrame
+from futubot.trading_calendar import TradingCalendar
+from Strategy import RSIStrategy
+
+
+@pytest.fixture(scope='module')
+def calendar():
+    return TradingCalendar(holidays=['2022-08-09'],
+                           half_days=['2022-08-10'],
+                           closures=[
+                               dict(date='2022-08-11',
+                                    start='10:00',
+                                    end='14:00'),
+                               dict(date='2022-08-12')
+                           ],
+                           start_date='2022-01-01',
+                           end_date='2022-12-31')
+
+
+def test_trading_calendar(calendar):
+    assert calendar.is_trading_day('2022-08-08')
+    assert not calendar.is_trading_day('2022-08-09')
+    assert not calendar.is_trading_day('2022-08-12')
+    assert not calendar.is_trading_day('2022-08-13')
+
+    assert calendar.is_in_session(datetime(2022, 8, 8, 9, 30))
+    assert calendar.is_in_session(datetime(2022, 8, 8, 12, 0))
+    assert not calendar.is_in_session(datetime(2022, 8, 8, 12, 30))
+    assert not calendar.is_in_session(datetime(2022, 8, 10, 13, 30))
+    np.testing.assert_array_equal(
+        calendar.is_in_session(
+            pd.to_datetime([
+                '2022-08-11 09:45', '2022-08-11 11:00', '2022-08-11 14:01',
+                '2022-08-12 10:00'
+            ])), [True, False, True, False])
+
+    assert calendar.next_open('2022-08-08 12:00') == datetime(
+        2022, 8, 8, 13, 0)
+    assert calendar.next_open('2022-08-08 16:00') == datetime(
+        2022, 8, 10, 9, 30)
+    assert calendar.next_open('2022-08-11 10:30') == datetime(
+        2022, 8, 11, 14, 0)
+    assert calendar.next_close('2022-08-11 09:45') == datetime(
+        2022, 8, 11, 10, 0)
+    assert calendar.previous_close('2022-08-10 09:45') == datetime(
+        2022, 8, 8, 16, 0)
+    assert calendar.next_day_close('2022-08-09 10:00') == datetime(
+        2022, 8, 10, 12, 0)
+    assert calendar.last_trading_day('2022-08-14') == datetime(
+        2022, 8, 11, 16, 0)
+
+
+def test_bars_until_close(calendar):
+    assert calendar.bars_until_close('2022-08-08 09:00') == 331
+    assert calendar.bars_until_close('2022-08-08 12:00') == 180
+    assert calendar.bars_until_close('2022-08-08 15:30',
+                                     ktype=KLType.K_15M) == 2
+    assert calendar.bars_until_close('2022-08-09 10:00') == 0
+    assert calendar.bars_until_close('2022-08-10 09:30') == 150
+    assert calendar.bars_until_close('2022-08-11 09:00') == 31 + 121
+
+
+def test_from_file():
+    calendar = TradingCalendar.from_file('configs/hkex_calendar.json')
+    assert not calendar.is_trading_day('2022-10-04')
+    assert not calendar.is_trading_day('2023-09-08')
+    assert not calendar.is_in_session(datetime(2022, 12, 30, 14, 0))
+
+
+@pytest.mark.parametrize('ktype, current_time, expected', [
+    (KLType.K_1M, datetime(2022, 8, 8, 16, 0), datetime(2022, 8, 10, 9, 30)),
+    (KLType.K_1M, datetime(2022, 8, 10, 12, 0), datetime(2022, 8, 11, 9, 30)),
+    (KLType.K_1M, datetime(2022, 8, 11, 10, 0), datetime(2022, 8, 11, 14, 0)),
+    (KLType.K_30M, datetime(2022, 8, 11, 9, 45), datetime(2022, 8, 11, 10)),
+    (KLType.K_DAY, datetime(2022, 8, 8, 16, 0), datetime(2022, 8, 10, 12)),
+    (KLType.K_WEEK, datetime(2022, 8, 8, 10, 0), datetime(2022, 8, 11, 16)),
+])
+def test_scheduler_with_calendar(calendar, ktype, current_time, expected):
+    scheduler = BarScheduler(ktype=ktype, calendar=calendar)
+    assert scheduler.next_bar_close(current_time) == expected
+
+
+def test_backtester_with_calendar(calendar):
+    klines = generate_synthetic_klines(code_list=['HK.00700'],
+                                       start_date='2022-08-08',
+                                       days=3)
+    stockframe = StockFrame(data=klines)
+
+    backtester = Backtester(stockframe=stockframe,
+                            strategy=RSIStrategy,
+                            indicators=dict(rsi=dict(period=14)),
+                            calendar=calendar)
+    assert backtester.robot.calendar is calendar
+    assert backtester.robot.scheduler.calendar is calendar
+
+    # The synthetic bars on the holiday and in the afternoon of the half
+    # day are not replayed.
+    results = backtester.run()
+    assert len(results['equity_curve']) == 331 + 151
+
+    clock = SimulatedClock(start=datetime(2022, 8, 11, 10, 30))
+    backtester.robot.clock = clock
+    backtester.robot.scheduler.clock = clock
+    assert backtester.robot.is_regular_trading_time() is False
+    assert backtester.robot.wait_for_trading_time() is True
+    assert clock.now() == datetime(2022, 8, 11, 14, 1, 30)
@@ -0,0 +1,85 @@
+import numpy as np
+import pytest
+
+from futubot.backtest import Backtester
+from futubot.indicators import Indicators
+from futubot.vectorized import (VectorizedBacktester, pivot_prices,
+                                positions_from_signals, rsi)
+from Strategy import (BollingerBandsStrategy, MACDCrossOverStrategy,
+                      MAStrategy, RSIStrategy)
+
+
+def test_rsi(create_stockframe):
+    stockframe = create_stockframe()
+    relative_strength_index = rsi(pivot_prices(stockframe), period=14)
+
+    Indicators(stockframe=stockframe).rsi(period=14)
+    expected = stockframe.frame['rsi_14'].unstack(level='code').to_numpy()
+    np.testing.assert_allclose(relative_strength_index, expected)
+
+
+def test_positions_from_signals():
+    buys = np.array([[False], [True], [True], [False], [False], [True]])
+    sells = np.array([[True], [False], [False], [True], [True], [False]])
+
+    positions = positions_from_signals(buys=buys, sells=sells)
+    assert positions.ravel().tolist() == [
+        False, True, True, False, False, True
+    ]
+
+    # A bar with both signals buys if flat and sells if holding.
+    both = np.array([[True], [True], [False], [True], [True], [True]])
+    positions = positions_from_signals(buys=buys | both, sells=sells | both)
+    assert positions.ravel().tolist() == [
+        True, False, True, False, True, False
+    ]
+
+    with pytest.raises(ValueError):
+        positions_from_signals(buys=buys, sells=buys[1:])
+
+
+def test_vectorized_backtester_overlapping_signals(create_stockframe):
+    # The oversold level is above the overbought level, so the RSI of
+    # some bars triggers both a buy and a sell signal.
+    strategy_params = dict(oversold_signal=55, overbought_signal=50)
+    results = VectorizedBacktester(stockframe=create_stockframe(),
+                                   strategy=RSIStrategy,
+                                   strategy_params=strategy_params,
+                                   start_date='2022-08-08 10:00:00').run()
+
+    expected = Backtester(stockframe=create_stockframe(),
+                          strategy=RSIStrategy,
+                          strategy_params=strategy_params,
+                          start_date='2022-08-08 10:00:00').run()
+
+    np.testing.assert_allclose(results['equity_curve'].values,
+                               expected['equity_curve'].values)
+    assert len(results['orders']) == len(expected['orders']) > 0
+
+
+@pytest.mark.parametrize(
+    'strategy',
+    [BollingerBandsStrategy, MACDCrossOverStrategy, MAStrategy, RSIStrategy])
+def test_vectorized_backtester(strategy, create_stockframe):
+    stockframe = create_stockframe()
+
+    results = VectorizedBacktester(stockframe=stockframe,
+                                   strategy=strategy,
+                                   start_date='2022-08-08 10:00:00').run()
+
+    # The event-driven backtester places the same orders.
+    expected = Backtester(stockframe=create_stockframe(),
+                          strategy=strategy,
+                          start_date='2022-08-08 10:00:00').run()
+
+    np.testing.assert_allclose(results['equity_curve'].values,
+                               expected['equity_curve'].values)
+    assert results['equity_curve'].index.equals(expected['equity_curve'].index)
+    assert len(results['orders']) == len(expected['orders'])
+    assert results['final_equity'] == pytest.approx(expected['final_equity'])
+
+
+def test_vectorized_backtester_unsupported_strategy(create_stockframe):
+    with pytest.raises(ValueError):
+        VectorizedBacktester(stockframe=create_stockframe(),
+                             strategy='UnknownStrategy')
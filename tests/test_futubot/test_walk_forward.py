@@ -0,0 +1,84 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from futubot.param_search import evaluate_parameters
+from futubot.vectorized import pivot_prices
+from futubot.walk_forward import WalkForward, split_windows
+from Strategy import RSIStrategy
+
+
+def test_split_windows():
+    time_keys = pd.DatetimeIndex([
+        '2022-08-08 09:30:00', '2022-08-08 16:00:00', '2022-08-09 09:30:00',
+        '2022-08-10 09:30:00', '2022-08-10 16:00:00', '2022-08-11 09:30:00',
+        '2022-08-12 09:30:00'
+    ])
+
+    windows = split_windows(time_keys=time_keys,
+                            in_sample_days=2,
+                            out_of_sample_days=1)
+    assert windows == [(0, 3, 5), (2, 5, 6), (3, 6, 7)]
+
+    assert split_windows(time_keys=time_keys,
+                         in_sample_days=4,
+                         out_of_sample_days=2) == []
+
+    with pytest.raises(TypeError):
+        split_windows(time_keys=list(time_keys),
+                      in_sample_days=2,
+                      out_of_sample_days=1)
+
+
+@pytest.mark.parametrize('processes', [1, 2])
+def test_walk_forward(processes, create_stockframe):
+    stockframe = create_stockframe(days=5)
+    param_grid = dict(period=[7, 14], oversold_signal=[30, 40])
+
+    results = WalkForward(stockframe=stockframe,
+                          strategy=RSIStrategy,
+                          param_grid=param_grid,
+                          in_sample_days=2,
+                          out_of_sample_days=1,
+                          cash=100000.0,
+                          processes=processes).run()
+
+    windows = results['windows']
+    assert len(windows) == 3
+    assert windows['out_of_sample_start'].dt.day.tolist() == [10, 11, 12]
+    assert (windows['out_of_sample_end'].dt.hour == 16).all()
+    assert results['best_params'] == dict(
+        period=int(windows['period'].iloc[-1]),
+        oversold_signal=int(windows['oversold_signal'].iloc[-1]))
+    assert results['total_return'] == pytest.approx(
+        np.prod(1 + windows['total_return']) - 1)
+
+    # The best in-sample parameters beat every other combination.
+    close = pivot_prices(stockframe)
+    lot_sizes = np.full(close.shape[1], 100.0)
+    for window, (in_sample_start, in_sample_end, _) in zip(
+            windows.itertuples(),
+            split_windows(close.index, in_sample_days=2,
+                          out_of_sample_days=1)):
+        for period in param_grid['period']:
+            for oversold_signal in param_grid['oversold_signal']:
+                metrics = evaluate_parameters(
+                    close=close,
+                    strategy_name='RSIStrategy',
+                    params=dict(period=period,
+                                oversold_signal=oversold_signal),
+                    lot_sizes=lot_sizes,
+                    cash=100000.0,
+                    start_bar=in_sample_start,
+                    end_bar=in_sample_end)
+                assert metrics['total_return'] <= (
+                    window.in_sample_total_return + 1e-12)
+
+
+def test_walk_forward_too_short(create_stockframe):
+    with pytest.raises(ValueError):
+        WalkForward(stockframe=create_stockframe(days=2),
+                    strategy=RSIStrategy,
+                    param_grid=dict(period=[7, 14]),
+                    in_sample_days=2,
+                    out_of_sample_days=1)
@@ -1,6 +1,7 @@
 import argparse
 import pprint
 import random
+from datetime import datetime
 
 import dash
 import dash_bootstrap_components as dbc
@@ -12,8 +13,11 @@ import plotly.graph_objects as go
 from dash.dependencies import Input, Output, State
 
 from futubot.accounts import Accounts
+from futubot.charts import LiveGraphBuilder, parse_relayout_range
 from futubot.indicators import Indicators
+from futubot.journal import JOURNAL_DTYPE, ORDER, TradeJournal
 from futubot.robot import Robot
+from futubot.trading_calendar import TradingCalendar
 from utils.config import Config
 
 
@@ -38,11 +42,23 @@ if args.display_all_cols:
 
 accounts = Accounts(**cfg_dict['account'])
 
-futubot = Robot(accounts=accounts, order_type=cfg_dict['order_type'])
+calendar = None
+if cfg_dict.get('calendar_file') is not None:
+    calendar = TradingCalendar.from_file(cfg_dict['calendar_file'])
 
+futubot = Robot(accounts=accounts,
+                order_type=cfg_dict['order_type'],
+                calendar=calendar)
+
+# The orders of previous runs are reloaded from the journal, from which
+# the trading activity table is generated.
 portfolio = futubot.create_portfolio(
-    stocks_of_interest=cfg_dict['stocks_of_interest'])
+    stocks_of_interest=cfg_dict['stocks_of_interest'],
+    journal=TradeJournal(path=cfg_dict.get('journal_file')))
 pprint.pprint(portfolio.positions)
+# The charts of the portfolio are drawn from the mark-to-market PnL, which
+# is reconciled with the broker once here and marked after every run.
+portfolio.mark_to_market([])
 
 historical_quotes = futubot.get_historical_quotes(
     **cfg_dict['historical_quote_dates'], )
@@ -60,12 +76,18 @@ indicator_client.stochastic_oscillator()
 
 colors = {'background': '#000000', 'text': '#ffFFFF'}
 
+# Fallback width (in pixels) of the live graph before the browser reports it.
+DEFAULT_GRAPH_WIDTH = 1000
+
+graph_builder = LiveGraphBuilder(text_color=colors['text'])
+
 app = dash.Dash(__name__, external_stylesheets=[dbc.themes.SLATE])
 
 app.layout = html.Div([
-    html.Div(
-        [dcc.Interval(id='interval-component', interval=10000,
-                      n_intervals=0)]),
+    html.Div([
+        dcc.Interval(id='interval-component', interval=10000, n_intervals=0),
+        dcc.Store(id='graph_width')
+    ]),
     html.Br(),
     dbc.Row([
         dbc.Col(dcc.Dropdown(id='code_names',
@@ -159,34 +181,43 @@ app.layout = html.Div([
     )
 ])
 
+# Report the pixel width of the live graph so that the series are
+# downsampled to at most one point per pixel.
+app.clientside_callback(
+    """
+    function(n_intervals) {
+        var graph = document.getElementById('live_graph');
+        return graph ? graph.offsetWidth : window.innerWidth;
+    }
+    """,
+    Output('graph_width', 'data'),
+    Input('interval-component', 'n_intervals'),
+)
+
 
 def generate_trading_activity_table():
     """Generate trading activity table.
 
-    This function calls the Futu API order_list_query()
-    to get all the orders of today and then generate a
-    table of trading activity.
+    This function generates a table of trading activity from
+    today's orders in the trade journal of the portfolio, so no
+    order query is sent to FutuOpenD.
 
     Returns:
-        (dash_table.DataTable): A dash datatable with columns
-            'order_id', 'code', 'stock_name', 'trd_side',
-            'order_type', 'qty', 'order_status', 'price',
-            'currency', 'create_time', 'updated_time'.
+        (dash_table.DataTable): A dash datatable with the columns of
+            TradeJournal.to_frame(), i.e. 'time', 'kind', 'order_id',
+            'code', 'trd_side', 'qty', 'price', 'order_status'.
     """
-    today_order_info = accounts.check_today_orders()
+    today = datetime.now().strftime('%Y-%m-%d')
+    today_order_info = portfolio.journal.to_frame(kind=ORDER, since=today)
 
-    if today_order_info is None:
+    if len(today_order_info) == 0:
         return [
             dash_table.DataTable(
                 id='table',
                 columns=[{
                     'name': i,
                     'id': i
-                } for i in [
-                    'order_id', 'code', 'stock_name', 'trd_side', 'order_type',
-                    'qty', 'order_status', 'price', 'currency', 'create_time',
-                    'updated_time'
-                ]],
+                } for i in JOURNAL_DTYPE.names],
                 style_table={
                     'height': 'auto',
                     'overflowX': 'scroll'
@@ -305,8 +336,9 @@ def update_portfolio_chart(n_interval):
     """Update the portfolio pie chart in real time.
 
     This function updates the portfolio distribution pie
-    chart by calling calculate_portfolio_weights() when the
-    interval-component fires a callback periodically.
+    chart by calling calculate_local_portfolio_weights() when the
+    interval-component fires a callback periodically, without
+    querying Futu.
 
     Args:
         n_interval (int): The number of times the interval
@@ -319,7 +351,7 @@ def update_portfolio_chart(n_interval):
         (plotly.graph_objects.Pie): A Plotly pie chart of
             portfolio distribution with id 'portfolio_chart'.
     """
-    weights = portfolio.calculate_portfolio_weights()
+    weights = portfolio.calculate_local_portfolio_weights()
 
     portfolio_chart = go.Figure()
     portfolio_chart.add_trace(
@@ -345,9 +377,10 @@ def update_portfolio_chart(n_interval):
 def update_portfolio(n_intervals):
     """Update the portfolio information figure in real time.
 
-    This function calls get_protfolio_info() when the
+    This function calls get_local_portfolio_info() when the
     interval-component fires a callback periodically and updates
-    the Plotly Indicator figure of total assets. The percentage
+    the Plotly Indicator figure of total assets marked to market
+    after every run of the robot. The percentage
     difference between the total assets and total invested value
     is also updated in real time.
 
@@ -365,11 +398,12 @@ def update_portfolio(n_intervals):
     """
     portfolio_fig = go.Figure()
 
-    portfolio_info = portfolio.get_portfolio_info()
+    portfolio_info = portfolio.get_local_portfolio_info()
 
     # today_pnl_value = portfolio_info["today_pnl_value"]
 
-    total_assets = portfolio_info['total_assets']
+    # The total assets marked to market after every run of the robot.
+    total_assets = portfolio.pnl.summary()['total_assets']
     total_invested_value = portfolio_info['total_invested_value']
 
     portfolio_fig.add_trace(
@@ -408,10 +442,13 @@ def update_portfolio(n_intervals):
 
 @app.callback([Output('live_graph', 'figure')], [
     Input('interval-component', 'n_intervals'),
+    Input('live_graph', 'relayoutData'),
     State('code_names', 'value'),
-    State('indicator_names', 'value')
+    State('indicator_names', 'value'),
+    State('graph_width', 'data')
 ])
-def run_futubot(n_intervals, code_name, indicator_name):
+def run_futubot(n_intervals, relayout_data, code_name, indicator_name,
+                graph_width):
     """Implementation of FutuBot in real time.
 
     This function implements the main logic of FutuBot in real time
@@ -429,185 +466,74 @@ def run_futubot(n_intervals, code_name, indicator_name):
         - Standard Deviation
         - Stochastic Oscillator
 
+    The series are downsampled to the pixel width of the graph before
+    being sent to the browser: candlesticks and volume are aggregated
+    into OHLCV buckets and indicator lines are downsampled with LTTB.
+    When the graph is zoomed, only the visible range is downsampled so
+    that details are refined without running the robot again. The
+    figure is built by LiveGraphBuilder from a cached per-code template.
+
     Args:
         n_interval (int): The number of times the interval
             has passed. It is incremented by dcc.Interval with
             id 'interval-component' at every 'interval' milliseconds
             in order to update the app in real time. For live mode,
             the 'interval' is set to 10000 milliseconds.
+        relayout_data (dict): The relayoutData of the live graph, which
+            is updated when the graph is zoomed or reset.
         code_name (str): The name of code for which the live graph
             is plotted. Its value is controlled by the state of the
             dcc.Dropdown table with id 'code_names'.
         indicator (str): The name of indicator for which the live graph
             is plotted. Its value is controlled by the state of the
             dcc.Dropdown table with id 'indicators'.
+        graph_width (int): The width of the live graph in pixels.
 
     Returns:
-        (plotly.graph_objects): A Plotly graph of StockFrame with id
-            'live_graph'.
+        (dict): A Plotly figure dict of StockFrame with id 'live_graph'.
     """
-    df = stockframe.frame.loc[code_name]
-
-    fig = go.Figure()
-
-    print('holdings before', portfolio.holdings)
-
-    latest_prices = futubot.get_latest_bar()
-    stockframe.add_rows(data=latest_prices)
-    indicator_client.refresh()
-
-    existing_orders = accounts.check_existing_orders(
-        code_list=portfolio.holdings)
-    print('existing_orders', existing_orders)
+    triggered = [
+        trigger['prop_id'] for trigger in dash.callback_context.triggered
+    ]
 
-    StrategyClass = cfg_dict['strategy']['name']
-    strategy_client = StrategyClass(stockframe, portfolio, indicator_client,
-                                    existing_orders,
-                                    **cfg_dict['strategy']['params'])
-    buy_sell_signals = strategy_client.calculate_buy_sell_signals()
+    # Zooming only refines the graph, the robot runs on interval only.
+    if 'live_graph.relayoutData' not in triggered:
+        print('holdings before', portfolio.holdings)
 
-    order_infos = futubot.execute_signals(buy_sell_signals=buy_sell_signals)
-    pprint.pprint(order_infos)
+        latest_prices = futubot.get_latest_bar()
+        stockframe.add_rows(data=latest_prices)
+        indicator_client.refresh()
 
-    portfolio.update_positions(order_infos=order_infos)
+        orders = accounts.get_history_orders()
+        existing_orders = accounts.check_existing_orders(
+            code_list=portfolio.holdings, orders=orders)
+        portfolio.update_order_fills(orders)
+        print('existing_orders', existing_orders)
 
-    print('holdings after', portfolio.holdings)
+        StrategyClass = cfg_dict['strategy']['name']
+        strategy_client = StrategyClass(stockframe, portfolio,
+                                        indicator_client, existing_orders,
+                                        **cfg_dict['strategy']['params'])
+        buy_sell_signals = strategy_client.calculate_buy_sell_signals()
 
-    fig.add_trace(trace=go.Candlestick(x=df.index,
-                                       open=df['open'],
-                                       high=df['high'],
-                                       low=df['low'],
-                                       close=df['close'],
-                                       name='Close'))
+        order_infos = futubot.execute_signals(
+            buy_sell_signals=buy_sell_signals)
+        pprint.pprint(order_infos)
 
-    volume_colors = [
-        '#16ff32' if row['open'] - row['close'] >= 0 else 'red'
-        for _, row in df.iterrows()
-    ]
+        portfolio.update_positions(order_infos=order_infos)
 
-    if indicator_name == 'Volume':
-        fig = go.Figure(data=go.Bar(x=df.index,
-                                    y=df['volume'],
-                                    marker_color=volume_colors,
-                                    name='Volume'))
-
-    if indicator_name[:3] == 'RSI':
-        fig = go.Figure(
-            data=go.Scatter(x=df.index,
-                            y=df[indicator_name.lower()],
-                            name=indicator_name,
-                            line=dict(color='rgb(255, 237, 111)', width=2)))
-        fig.update_layout(yaxis_range=[0, 100])
-        fig.add_hline(y=30.0,
-                      line_width=1,
-                      line_dash='dash',
-                      annotation_text='Oversold Line',
-                      line_color='#16ff32',
-                      annotation_font_color='#16ff32')
-        fig.add_hline(y=70.0,
-                      line_width=1,
-                      line_dash='dash',
-                      annotation_text='Overbought Line',
-                      line_color='#fb0d0d',
-                      annotation_font_color='#fb0d0d')
-
-    if indicator_name[:3] == 'SMA':
-        fig.add_trace(trace=go.Scatter(
-            x=df.index,
-            y=df[indicator_name.lower()],
-            name=indicator_name,
-            line=dict(color='orange', width=2),
-        ), )
-
-    if indicator_name[:3] == 'EMA':
-        fig.add_trace(trace=go.Scatter(
-            x=df.index,
-            y=df[indicator_name.lower()],
-            name=indicator_name,
-            line=dict(color='#2ed9ff', width=2),
-        ), )
-
-    if indicator_name == 'MACD':
-        fig = go.Figure()
-        macd_colors = [
-            '#16ff32' if val >= 0 else 'red'
-            for val in df.histogram.values.tolist()
-        ]
+        print('holdings after', portfolio.holdings)
+        pnl = portfolio.mark_to_market(latest_prices)
+        print('pnl', pnl)
 
-        fig.add_trace(
-            go.Bar(x=df.index,
-                   y=df.histogram,
-                   marker_color=macd_colors,
-                   name='Histogram'))
-
-        fig.add_trace(
-            go.Scatter(x=df.index,
-                       y=df.macd,
-                       line=dict(color='#ffa15a', width=2),
-                       name='MACD'))
-
-        fig.add_trace(
-            go.Scatter(x=df.index,
-                       y=df.signal,
-                       line=dict(color='#2ed9ff', width=2),
-                       name='Signal'))
-
-    if indicator_name == 'BOLLINGER_BANDS':
-        fig.add_trace(
-            go.Scatter(x=df.index,
-                       y=df['sma'],
-                       line=dict(color='orange', width=2),
-                       name='SMA'))
-
-        fig.add_trace(
-            go.Scatter(x=df.index,
-                       y=df['upper_band'],
-                       line_color='#2ed9ff',
-                       line={'dash': 'dash'},
-                       name='Upper Band',
-                       opacity=0.1))
-
-        fig.add_trace(
-            go.Scatter(x=df.index,
-                       y=df['lower_band'],
-                       line_color='#2ed9ff',
-                       line={'dash': 'dash'},
-                       fill='tonexty',
-                       name='Lower Band',
-                       opacity=0.1))
-
-    if indicator_name == 'STANDARD_DEVIATION':
-        fig = go.Figure(
-            go.Scatter(x=df.index,
-                       y=df['standard_deviation'],
-                       line=dict(color='rgb(102, 166, 30)', width=2),
-                       name='Standard Deviation'))
-
-    if indicator_name == 'STOCHASTIC_OSCILLATOR':
-        fig = go.Figure()
-        fig.add_trace(
-            go.Scatter(x=df.index,
-                       y=df['%K'],
-                       name='%K Line (Fast)',
-                       line=dict(color='#af0038', width=2)))
-
-        fig.add_trace(
-            go.Scatter(x=df.index,
-                       y=df['%D'],
-                       name='%D Line (Slow)',
-                       line=dict(color='rgb(29, 105, 150)', width=2)))
-
-    fig.update_layout(
-        height=400,
-        showlegend=True,
-        xaxis_rangeslider_visible=False,
-        template='plotly_dark',
-        plot_bgcolor='rgba(0, 0, 0, 0)',
-        paper_bgcolor='rgba(0, 0, 0, 0)',
-        font={'color': colors['text']},
-    )
+    live_graph = graph_builder.build(
+        code=code_name,
+        price_df=stockframe.frame.loc[code_name],
+        indicator_name=indicator_name,
+        max_points=int(graph_width or DEFAULT_GRAPH_WIDTH),
+        x_range=parse_relayout_range(relayout_data))
 
-    return [fig]
+    return [live_graph]
 
 
 if __name__ == '__main__':
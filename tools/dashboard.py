@@ -0,0 +1,462 @@
+"""A read-only FutuBot dashboard served from a snapshot file.
+
+Unlike tools/app.py, this dashboard does not connect to FutuOpenD and does
+not run the robot. It serves the state published by the engine (e.g.
+``python tools/main.py configs/futubot_config.py --snapshot-path
+futubot_snapshot.pkl``), so that several workers can serve the dashboard
+at the same time:
+
+    FUTUBOT_SNAPSHOT=futubot_snapshot.pkl gunicorn --chdir tools -w 4 \
+        -b 0.0.0.0:8054 dashboard:server
+"""
+import os
+import random
+
+import dash
+import dash_bootstrap_components as dbc
+import dash_core_components as dcc
+import dash_html_components as html
+import dash_table as dash_table
+import plotly.graph_objects as go
+from dash.dependencies import Input, Output, State
+
+from futubot.charts import LiveGraphBuilder, parse_relayout_range
+from futubot.journal import JOURNAL_DTYPE
+from futubot.snapshot import SnapshotReader
+
+snapshot_reader = SnapshotReader(
+    path=os.environ.get('FUTUBOT_SNAPSHOT', 'futubot_snapshot.pkl'))
+
+colors = {'background': '#000000', 'text': '#ffFFFF'}
+
+# Fallback width (in pixels) of the live graph before the browser reports it.
+DEFAULT_GRAPH_WIDTH = 1000
+
+graph_builder = LiveGraphBuilder(text_color=colors['text'])
+
+app = dash.Dash(__name__, external_stylesheets=[dbc.themes.SLATE])
+server = app.server
+
+
+def serve_layout():
+    """Serve the layout of the dashboard.
+
+    The layout is served on every page load so that the codes and
+    indicators in the dropdowns follow the latest snapshot.
+
+    Returns:
+        (html.Div): The layout of the dashboard.
+    """
+    state = snapshot_reader.read()
+
+    return html.Div([
+        html.Div([
+            dcc.Interval(id='interval-component',
+                         interval=10000,
+                         n_intervals=0),
+            dcc.Store(id='graph_width')
+        ]),
+        html.Br(),
+        dbc.Row([
+            dbc.Col(dcc.Dropdown(id='code_names',
+                                 options=[{
+                                     'label': code,
+                                     'value': code,
+                                 } for code in state['positions'].keys()],
+                                 searchable=True,
+                                 value=random.choice(
+                                     list(state['positions'].keys())),
+                                 placeholder='Code',
+                                 style={
+                                     'backgroundColor': 'rgba(0, 0, 0, 0)',
+                                     'margin-left': '0.5em'
+                                 }),
+                    width={
+                        'size': 3,
+                        'offset': 0
+                    }),
+            dbc.Col(dcc.Dropdown(
+                id='indicator_names',
+                options=[
+                    {
+                        'label': 'Candlestick',
+                        'value': 'Candlestick'
+                    },
+                    {
+                        'label': 'Volume',
+                        'value': 'Volume'
+                    },
+                ] + [{
+                    'label': current_indicator.upper(),
+                    'value': current_indicator.upper()
+                } for current_indicator in state['indicators']],
+                value='Candlestick',
+                placeholder='Indicator',
+                style={'backgroundColor': 'rgba(0, 0, 0, 0)'}),
+                    width={'size': 3})
+        ]),
+        html.Br(),
+        dbc.Row(
+            [
+                dbc.Col(
+                    [dbc.Card([dbc.CardBody([
+                        dcc.Graph(id='live_graph'),
+                    ])])],
+                    width={'size': 9},
+                ),
+                dbc.Col(
+                    [
+                        dbc.Card([
+                            dbc.CardBody([
+                                dcc.Graph(id='portfolio_fig'),
+                            ])
+                        ]),
+                    ],
+                    width={'size': 3},
+                )
+            ],
+            className='g-0',
+        ),
+        dbc.Row(
+            [
+                dbc.Col([
+                    dbc.Card([
+                        dbc.CardBody([
+                            html.H6('Intraday Trading Activity',
+                                    className='text-left'),
+                            html.Div(
+                                id='trading_activity_table',
+                                children=[],
+                            ),
+                        ])
+                    ])
+                ],
+                        width={'size': 9},
+                        style={
+                            'height': '450px',
+                            'overflow': 'scroll'
+                        }),
+                dbc.Col([
+                    dbc.Card([
+                        dbc.CardBody([
+                            html.H6('Portfolio Distribution',
+                                    className='text-center'),
+                            dcc.Graph(id='portfolio_chart')
+                        ])
+                    ])
+                ],
+                        width={'size': 3})
+            ],
+            className='g-0',
+        )
+    ])
+
+
+app.layout = serve_layout
+
+# Report the pixel width of the live graph so that the series are
+# downsampled to at most one point per pixel.
+app.clientside_callback(
+    """
+    function(n_intervals) {
+        var graph = document.getElementById('live_graph');
+        return graph ? graph.offsetWidth : window.innerWidth;
+    }
+    """,
+    Output('graph_width', 'data'),
+    Input('interval-component', 'n_intervals'),
+)
+
+
+def generate_trading_activity_table():
+    """Generate trading activity table.
+
+    This function generates a table of trading activity from
+    today's orders in the trade journal, as published in the latest
+    snapshot, so no order query is sent to FutuOpenD.
+
+    Returns:
+        (dash_table.DataTable): A dash datatable with the columns of
+            TradeJournal.to_frame(), i.e. 'time', 'kind', 'order_id',
+            'code', 'trd_side', 'qty', 'price', 'order_status'.
+    """
+    today_order_info = snapshot_reader.read()['today_orders']
+
+    if today_order_info is None:
+        return [
+            dash_table.DataTable(
+                id='table',
+                columns=[{
+                    'name': i,
+                    'id': i
+                } for i in JOURNAL_DTYPE.names],
+                style_table={
+                    'height': 'auto',
+                    'overflowX': 'scroll'
+                },
+                style_cell={
+                    'white_space': 'normal',
+                    'height': 'auto',
+                    'backgroundColor': 'rgba(0, 0, 0, 0)',
+                    'color': 'white',
+                    'font_size': '13px',
+                    'font-family': 'Arial'
+                },
+                style_header={
+                    'backgroundColor': 'rgba(0, 0, 0, 0)',
+                    'fontWeight': 'bold',
+                    'border': '#4d4d4d',
+                    'font_size': '16px',
+                },
+                style_cell_conditional=[{
+                    'if': {
+                        'column_id': c
+                    },
+                    'textAlign': 'right'
+                } for c in ['attribute', 'value']],
+                style_as_list_view=True,
+            )
+        ]
+
+    return [
+        dash_table.DataTable(
+            id='table',
+            columns=[{
+                'name': i,
+                'id': i
+            } for i in today_order_info.columns],
+            data=today_order_info.to_dict('records'),
+            # style_table={"maxheight": "10", "overflowY": "scroll"},
+            # css=[{"selector": ".dash-table-container tr",
+            #  "rule":'max-height: "5px"; height: "5px"; '}],
+            # fixed_rows={ 'headers': True, 'data': 0 },
+            style_cell={
+                'white_space': 'normal',
+                'height': 'auto',
+                'backgroundColor': 'rgba(0, 0, 0, 0)',
+                'color': 'white',
+                'font_size': '13px',
+                'font-family': 'Arial'
+            },
+            style_header={
+                'backgroundColor': 'rgba(0, 0, 0, 0)',
+                'fontWeight': 'bold',
+                'border': '#4d4d4d',
+                'font_size': '16px',
+            },
+            style_cell_conditional=[{
+                'if': {
+                    'column_id': c
+                },
+                'textAlign': 'right'
+            } for c in ['attribute', 'value']],
+            style_data_conditional=[{
+                'if': {
+                    'filter_query':
+                    '{order_status} = "CANCELLED_ALL" '
+                    '|| {order_status} = "UNSUBMITTED" '
+                    '|| {order_status} = "SUBMIT_FAILED" '
+                    '|| {order_status} = "FAILED" '
+                    '|| {order_status} = "DELETED"',
+                    'column_id':
+                    'order_status'
+                },
+                'color': 'red'
+            }, {
+                'if': {
+                    'filter_query': '{order_status} = "SUBMITTED" \
+                        || {order_status} = "SUBMITTING"',
+                    'column_id': 'order_status'
+                },
+                'color': 'rgb(255, 255, 51)'
+            }, {
+                'if': {
+                    'filter_query': '{order_status} = "FILLED_ALL"',
+                    'column_id': 'order_status'
+                },
+                'color': '#16ff32'
+            }],
+            style_as_list_view=True,
+        )
+    ]
+
+
+@app.callback([Output('trading_activity_table', 'children')],
+              [Input('interval-component', 'n_intervals')])
+def update_trading_activity_table(n_interval):
+    """Update the trading activity table in real time.
+
+    This function updates the trading activity table by
+    calling generate_trading_activity_table() when the
+    interval-component fires a callback periodically.
+
+    Args:
+        n_interval (int): The number of times the interval
+            has passed. It is incremented by dcc.Interval with
+            id 'interval-component' at every interval milliseconds
+            in order to update the app in real time. For live mode,
+            the 'interval' is set to 10000 milliseconds.
+
+    Returns:
+        (dash_table.DataTable): A dash datatable with id
+            'trading_activity_table'.
+    """
+    return generate_trading_activity_table()
+
+
+@app.callback([Output('portfolio_chart', 'figure')],
+              [Input('interval-component', 'n_intervals')])
+def update_portfolio_chart(n_interval):
+    """Update the portfolio pie chart in real time.
+
+    This function updates the portfolio distribution pie
+    chart from the portfolio weights in the latest snapshot when the
+    interval-component fires a callback periodically.
+
+    Args:
+        n_interval (int): The number of times the interval
+            has passed. It is incremented by dcc.Interval with
+            id 'interval-component' at every interval milliseconds
+            in order to update the app in real time. For live mode,
+            the 'interval' is set to 10000 milliseconds.
+
+    Returns:
+        (plotly.graph_objects.Pie): A Plotly pie chart of
+            portfolio distribution with id 'portfolio_chart'.
+    """
+    weights = snapshot_reader.read()['portfolio_weights']
+
+    portfolio_chart = go.Figure()
+    portfolio_chart.add_trace(
+        go.Pie(labels=list(weights.keys()), values=list(weights.values())))
+    portfolio_chart.update_traces(hole=.7, hoverinfo='label+percent')
+    portfolio_chart.update_traces(textposition='outside',
+                                  textinfo='label+percent')
+    portfolio_chart.update_layout(showlegend=False)
+    portfolio_chart.update_layout(height=400,
+                                  plot_bgcolor='rgba(0, 0, 0, 0)',
+                                  paper_bgcolor='rgba(0, 0, 0, 0)',
+                                  font={'color': colors['text']},
+                                  margin=go.layout.Margin(l=50,
+                                                          r=50,
+                                                          b=50,
+                                                          t=50))
+
+    return [portfolio_chart]
+
+
+@app.callback([Output('portfolio_fig', 'figure')],
+              [Input('interval-component', 'n_intervals')])
+def update_portfolio(n_intervals):
+    """Update the portfolio information figure in real time.
+
+    This function reads the portfolio info in the latest snapshot
+    when the interval-component fires a callback periodically and updates
+    the Plotly Indicator figure of total assets. The percentage
+    difference between the total assets and total invested value
+    is also updated in real time.
+
+    Args:
+        n_interval (int): The number of times the interval
+            has passed. It is incremented by dcc.Interval with
+            id 'interval-component' at every interval milliseconds
+            in order to update the app in real time. For live mode,
+            the 'interval' is set to 10000 milliseconds.
+
+    Returns:
+        (plotly.graph_objects.Indicator): A Plotly Indicator of
+            portfolio's total assets, with percentage reference
+            'total_invested_value'.
+    """
+    portfolio_fig = go.Figure()
+
+    state = snapshot_reader.read()
+    portfolio_info = state['portfolio_info']
+
+    # today_pnl_value = portfolio_info["today_pnl_value"]
+
+    # The total assets marked to market by the engine after every bar.
+    total_assets = state['pnl']['total_assets']
+    total_invested_value = portfolio_info['total_invested_value']
+
+    portfolio_fig.add_trace(
+        go.Indicator(mode='number+delta',
+                     value=abs(total_assets),
+                     number={
+                         'prefix': '$ ',
+                         'valueformat': 'f'
+                     },
+                     title={
+                         'text':
+                         "<br><span style='font-size:0.9em;"
+                         "color:gray'>Total Assets</span>"
+                     },
+                     delta={
+                         'position': 'bottom',
+                         'reference': total_invested_value,
+                         'relative': True,
+                         'valueformat': '.3%'
+                     },
+                     domain={
+                         'row': 0,
+                         'column': 0
+                     }))
+
+    portfolio_fig.update_layout(
+        height=400,
+        template='plotly_dark',
+        plot_bgcolor='rgba(0, 0, 0, 0)',
+        paper_bgcolor='rgba(0, 0, 0, 0)',
+        font={'color': colors['text']},
+    )
+
+    return [portfolio_fig]
+
+
+@app.callback([Output('live_graph', 'figure')], [
+    Input('interval-component', 'n_intervals'),
+    Input('live_graph', 'relayoutData'),
+    State('code_names', 'value'),
+    State('indicator_names', 'value'),
+    State('graph_width', 'data')
+])
+def update_live_graph(n_intervals, relayout_data, code_name, indicator_name,
+                      graph_width):
+    """Update the live graph from the latest snapshot.
+
+    The series are downsampled to the pixel width of the graph, and only
+    the visible range is downsampled when the graph is zoomed.
+
+    Args:
+        n_interval (int): The number of times the interval
+            has passed. It is incremented by dcc.Interval with
+            id 'interval-component' at every 'interval' milliseconds
+            in order to update the app in real time. For live mode,
+            the 'interval' is set to 10000 milliseconds.
+        relayout_data (dict): The relayoutData of the live graph, which
+            is updated when the graph is zoomed or reset.
+        code_name (str): The name of code for which the live graph
+            is plotted. Its value is controlled by the state of the
+            dcc.Dropdown table with id 'code_names'.
+        indicator (str): The name of indicator for which the live graph
+            is plotted. Its value is controlled by the state of the
+            dcc.Dropdown table with id 'indicators'.
+        graph_width (int): The width of the live graph in pixels.
+
+    Returns:
+        (dict): A Plotly figure dict of StockFrame with id 'live_graph'.
+    """
+    frame = snapshot_reader.read()['frame']
+
+    live_graph = graph_builder.build(
+        code=code_name,
+        price_df=frame.loc[code_name],
+        indicator_name=indicator_name,
+        max_points=int(graph_width or DEFAULT_GRAPH_WIDTH),
+        x_range=parse_relayout_range(relayout_data))
+
+    return [live_graph]
+
+
+if __name__ == '__main__':
+    app.run_server(port=8054)
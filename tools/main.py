@@ -4,8 +4,15 @@ import pprint
 import pandas as pd
 
 from futubot.accounts import Accounts
+from futubot.checkpoint import Checkpointer
+from futubot.daily_bars import DailyBarStore
 from futubot.indicators import Indicators
+from futubot.journal import TradeJournal
+from futubot.latency import LatencyRecorder
+from futubot.pipeline import TradingPipeline
 from futubot.robot import Robot
+from futubot.snapshot import SnapshotPublisher
+from futubot.trading_calendar import TradingCalendar
 from utils.config import Config
 
 
@@ -15,6 +22,42 @@ def parse_args():
     parser.add_argument('--display-all-cols',
                         action='store_true',
                         help='whether to display all columns of stockframe.')
+    parser.add_argument('--snapshot-path',
+                        default=None,
+                        help='the snapshot file to which the state of '
+                        'FutuBot is published for read-only dashboards.')
+    parser.add_argument('--latency-path',
+                        default=None,
+                        help='the file to which the latency stats of the '
+                        'trading loop are appended. Default: printed.')
+    parser.add_argument('--latency-interval',
+                        type=float,
+                        default=60.0,
+                        help='the number of seconds between two reports of '
+                        'the latency stats.')
+    parser.add_argument('--reconcile-interval',
+                        type=float,
+                        default=300.0,
+                        help='the number of seconds between two '
+                        'reconciliations of the local mark-to-market PnL '
+                        'with the broker.')
+    parser.add_argument('--checkpoint-path',
+                        default=None,
+                        help='the file to which the state of FutuBot is '
+                        'checkpointed, and from which it is restored on '
+                        'a restart during the same day. Default: no '
+                        'checkpoint.')
+    parser.add_argument('--checkpoint-interval',
+                        type=float,
+                        default=60.0,
+                        help='the number of seconds between two '
+                        'checkpoints.')
+    parser.add_argument('--metrics-port',
+                        type=int,
+                        default=None,
+                        help='the local port on which the metrics of the '
+                        'Futu API calls are served in the Prometheus text '
+                        'format. Default: not served.')
     args = parser.parse_args()
 
     return args
@@ -30,65 +73,88 @@ def main():
         pd.set_option('display.max_columns', None)
 
     accounts = Accounts(**cfg_dict['account'])
-
-    futubot = Robot(accounts=accounts, order_type=cfg_dict['order_type'])
-
-    portfolio = futubot.create_portfolio(
-        stocks_of_interest=cfg_dict['stocks_of_interest'])
-    pprint.pprint(portfolio.positions)
-
-    historical_quotes = futubot.get_historical_quotes(
-        **cfg_dict['historical_quote_dates'], )
-
-    stockframe = futubot.create_stockframe(data=historical_quotes)
-    print(stockframe.frame)
-
-    pprint.pprint(portfolio.calculate_portfolio_metrics())
-    print('')
-    pprint.pprint(portfolio.portfolio_info)
-
-    indicator_client = Indicators(stockframe=stockframe)
-    # indicators.rsi(**cfg_dict["indicators"]["rsi"])
-    indicator_client.rsi()
-    indicator_client.sma()
-    indicator_client.ema()
-    indicator_client.ema()
-    indicator_client.bollinger_bands()
-    indicator_client.macd()
-    indicator_client.stochastic_oscillator()
-    indicator_client.standard_deviation()
-
-    while Robot.is_regular_trading_time():
+    if args.metrics_port is not None:
+        accounts.metrics.serve(port=args.metrics_port)
+
+    calendar = None
+    if cfg_dict.get('calendar_file') is not None:
+        calendar = TradingCalendar.from_file(cfg_dict['calendar_file'])
+
+    latency = LatencyRecorder(path=args.latency_path,
+                              interval=args.latency_interval)
+
+    futubot = Robot(accounts=accounts,
+                    order_type=cfg_dict['order_type'],
+                    calendar=calendar,
+                    latency=latency,
+                    sizing=cfg_dict.get('sizing'))
+
+    # The daily history is kept on disk, so only the days since the last
+    # run are requested from Futu.
+    daily_bar_store = DailyBarStore(path=cfg_dict.get('daily_bar_file'))
+    # The orders and fills of previous runs are reloaded from the journal.
+    journal = TradeJournal(path=cfg_dict.get('journal_file'))
+
+    checkpointer = None
+    restored = None
+    if args.checkpoint_path is not None:
+        checkpointer = Checkpointer(path=args.checkpoint_path,
+                                    interval=args.checkpoint_interval)
+        # After a restart during the day, the state is restored from the
+        # checkpoint and only the bars since then are requested.
+        restored = checkpointer.restore(robot=futubot,
+                                        daily_bar_store=daily_bar_store,
+                                        journal=journal)
+
+    if restored is not None:
+        portfolio, stockframe, indicator_client = restored
+        pprint.pprint(portfolio.positions)
+        print(stockframe.frame)
+    else:
+        portfolio = futubot.create_portfolio(
+            stocks_of_interest=cfg_dict['stocks_of_interest'],
+            daily_bar_store=daily_bar_store,
+            journal=journal)
+        pprint.pprint(portfolio.positions)
+
+        historical_quotes = futubot.get_historical_quotes(
+            **cfg_dict['historical_quote_dates'], )
+
+        stockframe = futubot.create_stockframe(data=historical_quotes)
+        print(stockframe.frame)
+
+        portfolio.update_intraday_prices(stockframe)
+        pprint.pprint(portfolio.calculate_portfolio_metrics())
         print('')
-
-        print('holdings before', portfolio.holdings)
-
-        latest_prices = futubot.get_latest_bar()
-
-        stockframe.add_rows(data=latest_prices)
-        indicator_client.refresh()
-
-        existing_orders = accounts.check_existing_orders(
-            code_list=portfolio.holdings)
-        print('existing_orders', existing_orders)
-
-        StrategyClass = cfg_dict['strategy']['name']
-
-        strategy_client = StrategyClass(stockframe, portfolio,
-                                        indicator_client, existing_orders,
-                                        **cfg_dict['strategy']['params'])
-        buy_sell_signals = strategy_client.calculate_buy_sell_signals()
-
-        order_infos = futubot.execute_signals(
-            buy_sell_signals=buy_sell_signals)
-        pprint.pprint(order_infos)
-
-        portfolio.update_positions(order_infos=order_infos)
-
-        print('holdings after', portfolio.holdings)
-
-        last_bar_timestamp = stockframe.frame.tail(1).index.get_level_values(1)
-        futubot.wait_till_next_bar(last_bar_timestamp=last_bar_timestamp)
+        pprint.pprint(portfolio.portfolio_info)
+
+        indicator_client = Indicators(stockframe=stockframe)
+        # indicators.rsi(**cfg_dict["indicators"]["rsi"])
+        indicator_client.rsi()
+        indicator_client.sma()
+        indicator_client.ema()
+        indicator_client.ema()
+        indicator_client.bollinger_bands()
+        indicator_client.macd()
+        indicator_client.stochastic_oscillator()
+        indicator_client.standard_deviation()
+
+    publisher = None
+    if args.snapshot_path is not None:
+        publisher = SnapshotPublisher(path=args.snapshot_path)
+        publisher.publish(stockframe, portfolio, indicator_client)
+
+    # Fetching bars, computing signals and dispatching orders run as
+    # pipelined stages until the end of regular trading time.
+    pipeline = TradingPipeline(robot=futubot,
+                               stockframe=stockframe,
+                               indicator_client=indicator_client,
+                               strategy=cfg_dict['strategy']['name'],
+                               strategy_params=cfg_dict['strategy']['params'],
+                               publisher=publisher,
+                               reconcile_interval=args.reconcile_interval,
+                               checkpointer=checkpointer)
+    pipeline.run()
 
     # Check portfolio metrics after end of trading day
     pprint.pprint(portfolio.calculate_portfolio_metrics())